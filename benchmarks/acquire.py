@@ -0,0 +1,73 @@
+"""Measures the overhead of ``acquire`` on :class:`nextcore.http.Bucket`, :class:`nextcore.common.TimesPer` and
+:class:`nextcore.http.UnlimitedGlobalRateLimiter`.
+
+The uncontended case acquires and releases ``UNCONTENDED`` times in a row with plenty of spots available.
+The contended case has ``TASKS`` tasks share a bucket with a limit of ``LIMIT``, so most of them are parked and
+released through the waiter queue. Every holder reports a new window that resets straight away.
+
+Usage: ``python benchmarks/acquire.py``
+"""
+
+from __future__ import annotations
+
+import asyncio
+from time import perf_counter
+from typing import AsyncContextManager, Callable
+
+from nextcore.common import TimesPer
+from nextcore.http import Bucket, BucketMetadata, UnlimitedGlobalRateLimiter
+
+UNCONTENDED = 500_000
+TASKS = 1_000
+ROUNDS = 50
+LIMIT = 10
+
+
+async def uncontended(name: str, acquire: Callable[[], AsyncContextManager[None]]) -> None:
+    start = perf_counter()
+    for _ in range(UNCONTENDED):
+        async with acquire():
+            pass
+    elapsed = perf_counter() - start
+    print(f"{name:>28}: {elapsed / UNCONTENDED * 1e9:5.0f}ns per acquire")
+
+
+async def contended() -> None:
+    bucket = Bucket(BucketMetadata(LIMIT))
+    # Learn the limit first
+    async with bucket.acquire():
+        await bucket.update(LIMIT - 1, 0)
+    await asyncio.sleep(0.01)
+
+    async def task() -> None:
+        for _ in range(ROUNDS):
+            async with bucket.acquire():
+                await bucket.update(LIMIT, 0)
+                bucket._release_pending(1)  # pyright: ignore [reportPrivateUsage] # Hand the spot over straight away
+
+    start = perf_counter()
+    await asyncio.gather(*(task() for _ in range(TASKS)))
+    elapsed = perf_counter() - start
+    print(f"{'Bucket (contended)':>28}: {elapsed / (TASKS * ROUNDS) * 1e9:5.0f}ns per acquire")
+
+
+async def main() -> None:
+    bucket = Bucket(BucketMetadata(UNCONTENDED * 2))
+    async with bucket.acquire():
+        await bucket.update(UNCONTENDED * 2, 60)
+    await uncontended("Bucket", bucket.acquire)
+
+    unlimited_bucket = Bucket(BucketMetadata(unlimited=True))
+    await uncontended("Bucket (unlimited)", unlimited_bucket.acquire)
+
+    times_per = TimesPer(UNCONTENDED * 2, 60)
+    await uncontended("TimesPer", times_per.acquire)
+
+    global_rate_limiter = UnlimitedGlobalRateLimiter()
+    await uncontended("UnlimitedGlobalRateLimiter", global_rate_limiter.acquire)
+
+    await contended()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
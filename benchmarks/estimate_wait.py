@@ -0,0 +1,50 @@
+"""Measures the cost of :meth:`nextcore.http.HTTPClient.estimate_wait`.
+
+The route's bucket is used up and has ``WAITING`` requests in its queue, so every call counts the requests ahead of it.
+The waiting requests are spread over ``PRIORITIES`` priorities, as counting goes through the priorities in use.
+
+Usage: ``python benchmarks/estimate_wait.py``
+"""
+
+from __future__ import annotations
+
+import asyncio
+from time import perf_counter
+
+from nextcore.http import Bucket, BucketMetadata, HTTPClient, Route
+
+CALLS = 100_000
+WAITING = (0, 10, 100, 10_000)
+PRIORITIES = 10
+
+
+async def main() -> None:
+    for waiting in WAITING:
+        http_client = HTTPClient()
+        route = Route("GET", "/channels/{channel_id}", channel_id=1)
+        storage = http_client.rate_limit_storages[None]
+        bucket = Bucket(BucketMetadata(5))
+        storage.store_bucket_by_nextcore_id_nowait(route.bucket, bucket)
+        async with bucket.acquire():
+            await bucket.update(0, 60)
+
+        async def wait(priority: int) -> None:
+            async with bucket.acquire(priority=priority):
+                pass
+
+        tasks = [asyncio.create_task(wait(i % PRIORITIES)) for i in range(waiting)]
+        await asyncio.sleep(0)
+
+        start = perf_counter()
+        for _ in range(CALLS):
+            await http_client.estimate_wait(route, None, priority=PRIORITIES)
+        elapsed = perf_counter() - start
+        print(f"{waiting:>6} waiting: {elapsed / CALLS * 1e9:9.0f}ns per estimate")
+
+        await bucket.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await http_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
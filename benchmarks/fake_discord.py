@@ -0,0 +1,111 @@
+"""A local stand-in for the Discord API rate limiter, used by the benchmarks.
+
+Every route is rate limited per rate limit key (the ``Authorization`` header) with a fixed window bucket,
+and every key has a global rate limit. Responses have the same rate limit headers as Discord, and 429s have the
+``Via`` header so they are not mistaken for Cloudflare bans.
+
+``GET /stats`` returns how many requests and 429s the server has seen.
+
+Usage: ``python benchmarks/fake_discord.py [port]``
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from time import time
+
+from aiohttp import web
+
+
+@dataclass
+class Window:
+    reset_at: float = 0
+    used: int = 0
+
+
+@dataclass
+class FakeDiscord:
+    bucket_limit: int = 5
+    bucket_period: float = 0.5
+    global_limit: int = 50
+    requests: int = 0
+    rate_limited: int = 0
+    global_rate_limited: int = 0
+    buckets: dict[tuple[str, str], Window] = field(default_factory=dict)
+    global_windows: dict[str, Window] = field(default_factory=dict)
+
+    def _use(self, window: Window, limit: int, period: float, now: float) -> bool:
+        if window.reset_at <= now:
+            window.reset_at = now + period
+            window.used = 0
+        if window.used >= limit:
+            return False
+        window.used += 1
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        now = time()
+        self.requests += 1
+        key = request.headers.get("Authorization", "")
+
+        global_window = self.global_windows.setdefault(key, Window())
+        if not self._use(global_window, self.global_limit, 1, now):
+            self.rate_limited += 1
+            self.global_rate_limited += 1
+            retry_after = global_window.reset_at - now
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": True},
+                status=429,
+                headers={"Via": "1.1 google", "X-RateLimit-Global": "true", "X-RateLimit-Scope": "global"},
+            )
+
+        bucket_id = f"{request.method} {request.path}"
+        window = self.buckets.setdefault((key, bucket_id), Window())
+        allowed = self._use(window, self.bucket_limit, self.bucket_period, now)
+        headers = {
+            "Via": "1.1 google",
+            "X-RateLimit-Limit": str(self.bucket_limit),
+            "X-RateLimit-Remaining": str(max(self.bucket_limit - window.used, 0)),
+            "X-RateLimit-Reset": f"{window.reset_at:.3f}",
+            "X-RateLimit-Reset-After": f"{window.reset_at - now:.3f}",
+            "X-RateLimit-Bucket": str(abs(hash(bucket_id))),
+        }
+        if not allowed:
+            self.rate_limited += 1
+            headers["X-RateLimit-Scope"] = "user"
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": window.reset_at - now, "global": False},
+                status=429,
+                headers=headers,
+            )
+        return web.json_response({}, headers=headers)
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "global_rate_limited": self.global_rate_limited,
+            }
+        )
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/stats", self.stats)
+        app.router.add_route("*", "/api/v10/{path:.*}", self.handle)
+        return app
+
+
+async def start(fake_discord: FakeDiscord, port: int = 0) -> tuple[web.AppRunner, int]:
+    """Start the server in the running event loop. Returns the runner and the port it is listening on."""
+    runner = web.AppRunner(fake_discord.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore
+    return runner, port
+
+
+if __name__ == "__main__":
+    web.run_app(FakeDiscord().create_app(), host="127.0.0.1", port=int(sys.argv[1]) if len(sys.argv) > 1 else 8080)
@@ -0,0 +1,106 @@
+"""Load benchmark for :class:`nextcore.http.proxy.HTTPProxy` against the fake Discord API in ``benchmarks/fake_discord.py``.
+
+``WORKERS`` stateless workers share one token and send requests with plain :class:`aiohttp.ClientSession` objects,
+retrying after a 429 like a naive client would. This is run once with the workers talking to the fake Discord API
+directly, and once through the proxy.
+
+The first run uses generous rate limits to measure how much the proxy adds to every request,
+and the second one uses Discord-like rate limits to show the 429s the proxy avoids.
+
+Usage: ``python benchmarks/proxy.py``
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+from time import perf_counter
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeDiscord, start  # noqa: E402
+
+from nextcore.http import (  # noqa: E402
+    HTTPClient,
+    LimitedGlobalRateLimiter,
+    RateLimitStorage,
+)
+from nextcore.http.proxy import HTTPProxy  # noqa: E402
+
+WORKERS = 50
+CHANNELS = 4
+TOKEN = "Bot benchmark"
+
+
+async def start_proxy(upstream_port: int, global_limit: int) -> tuple[web.AppRunner, int]:
+    def create_storage(rate_limit_key: str | None) -> RateLimitStorage:
+        storage = RateLimitStorage()
+        storage.global_rate_limiter = LimitedGlobalRateLimiter(global_limit)
+        return storage
+
+    http_client = HTTPClient(max_rate_limit_retries=20, rate_limit_storage_factory=create_storage)
+    proxy = HTTPProxy(http_client, upstream=f"http://127.0.0.1:{upstream_port}/api")
+    runner = web.AppRunner(proxy.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore
+    return runner, port
+
+
+async def run(name: str, fake_discord: FakeDiscord, requests: int, use_proxy: bool) -> None:
+    upstream_runner, upstream_port = await start(fake_discord)
+    if use_proxy:
+        proxy_runner, port = await start_proxy(upstream_port, fake_discord.global_limit)
+    else:
+        proxy_runner, port = None, upstream_port
+
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index % CHANNELS)
+
+    async def worker() -> None:
+        async with ClientSession() as session:
+            while not queue.empty():
+                url = f"http://127.0.0.1:{port}/api/v10/channels/{queue.get_nowait()}"
+                while True:
+                    async with session.get(url, headers={"Authorization": TOKEN}) as response:
+                        body = await response.json()
+                        if response.status != 429:
+                            break
+                    await asyncio.sleep(body["retry_after"])
+
+    start_time = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(WORKERS)))
+    elapsed = perf_counter() - start_time
+
+    if proxy_runner is not None:
+        await proxy_runner.cleanup()
+    await upstream_runner.cleanup()
+
+    print(
+        f"{name:>6}: {requests / elapsed:7.1f} requests/s, "
+        f"{fake_discord.rate_limited} of {fake_discord.requests} upstream requests got a 429 "
+        f"({fake_discord.global_rate_limited} global)"
+    )
+
+
+async def main() -> None:
+    logging.getLogger("nextcore").setLevel(logging.ERROR)
+
+    print(f"Overhead: {WORKERS} workers, 4000 requests, no rate limits hit")
+    for use_proxy in (False, True):
+        fake_discord = FakeDiscord(bucket_limit=100_000, bucket_period=60, global_limit=100_000)
+        await run("proxy" if use_proxy else "direct", fake_discord, 4000, use_proxy)
+
+    print(f"Rate limited: {WORKERS} workers, 200 requests over {CHANNELS} routes")
+    for use_proxy in (False, True):
+        await run("proxy" if use_proxy else "direct", FakeDiscord(), 200, use_proxy)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""Measures the per-request overhead of the :class:`nextcore.http.RateLimitStorage` lookups in :class:`nextcore.http.HTTPClient`.
+
+This runs the bucket lookup, acquire and update that :meth:`nextcore.http.HTTPClient.request` does for every request
+against a fake response, with the ``*_nowait`` fast path and with the async methods (the path remote storages use).
+
+Usage: ``python benchmarks/rate_limit_storage_nowait.py``
+"""
+
+from __future__ import annotations
+
+import asyncio
+from time import perf_counter, time
+
+from multidict import CIMultiDict
+
+from nextcore.http import HTTPClient, RateLimitStorage, Route
+
+REQUESTS = 200_000
+ROUTES = 100
+
+
+class AsyncRateLimitStorage(RateLimitStorage):
+    """The default storage, but without the ``*_nowait`` fast path"""
+
+    __slots__ = ()
+
+    supports_nowait = False
+
+
+class FakeResponse:
+    __slots__ = ("status", "headers")
+
+    def __init__(self) -> None:
+        self.status = 200
+        self.headers = CIMultiDict(
+            {
+                "X-RateLimit-Limit": "1000000",
+                "X-RateLimit-Remaining": "999999",
+                "X-RateLimit-Reset": str(time() + 60),
+                "X-RateLimit-Reset-After": "60",
+                "X-RateLimit-Bucket": "abc",
+            }
+        )
+
+
+async def run(storage: RateLimitStorage) -> float:
+    http_client = HTTPClient(trust_local_time=False)
+    response = FakeResponse()
+    routes = [Route("GET", "/channels/{channel_id}", channel_id=index) for index in range(ROUTES)]
+
+    start = perf_counter()
+    for index in range(REQUESTS):
+        route = routes[index % ROUTES]
+        if storage.supports_nowait:
+            bucket = http_client._get_bucket_nowait(route, storage)  # type: ignore [reportPrivateUsage]
+        else:
+            bucket = await http_client._get_bucket(route, storage)  # type: ignore [reportPrivateUsage]
+        async with bucket.acquire():
+            await http_client._update_bucket(response, route, bucket, storage)  # type: ignore
+    elapsed = perf_counter() - start
+
+    await storage.close()
+    return elapsed / REQUESTS
+
+
+async def main() -> None:
+    print(f"{REQUESTS} requests over {ROUTES} routes")
+    async_time = await run(AsyncRateLimitStorage())
+    nowait_time = await run(RateLimitStorage())
+    print(f" async: {async_time * 1e6:5.2f}µs per request")
+    print(f"nowait: {nowait_time * 1e6:5.2f}µs per request ({1 - nowait_time / async_time:.0%} less)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""Measures how much :class:`nextcore.http.RedisRateLimitStorage` adds to every request.
+
+Requests are sent to the fake Discord API in ``benchmarks/fake_discord.py`` with generous rate limits, while the
+stand-in Redis server adds ``LATENCY`` seconds to every reply to simulate a remote server.
+This compares the in-memory storage against Redis without prefetching (every request waits for the server, although
+concurrent ones are batched) and with prefetching.
+
+Usage: ``python benchmarks/redis_storage.py``
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeDiscord, start  # noqa: E402
+
+from nextcore.http import (  # noqa: E402
+    HTTPClient,
+    LimitedGlobalRateLimiter,
+    RateLimitStorage,
+    RedisRateLimitStorage,
+    Route,
+)
+from nextcore.http.rate_limit_storage.redis_stand_in import RedisStandIn  # noqa: E402
+
+LATENCY = 0.002
+REQUESTS = 2000
+CONCURRENCY = 20
+CHANNELS = 4
+GLOBAL_LIMIT = 100_000
+TOKEN = "Bot benchmark"
+
+
+async def run(name: str, prefetch: int | None) -> None:
+    fake_discord = FakeDiscord(bucket_limit=100_000, bucket_period=60, global_limit=GLOBAL_LIMIT)
+    runner, port = await start(fake_discord)
+    Route.BASE_URL = f"http://127.0.0.1:{port}/api/v10"
+
+    redis = RedisStandIn(latency=LATENCY)
+    await redis.start()
+
+    def create_storage(rate_limit_key: str | None) -> RateLimitStorage:
+        if prefetch is None:
+            storage = RateLimitStorage()
+            storage.global_rate_limiter = LimitedGlobalRateLimiter(GLOBAL_LIMIT)
+            return storage
+        return RedisRateLimitStorage(redis.host, redis.port, prefetch=prefetch, global_limit=GLOBAL_LIMIT)
+
+    http_client = HTTPClient(rate_limit_storage_factory=create_storage)
+    await http_client.setup()
+
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for index in range(REQUESTS):
+        queue.put_nowait(index % CHANNELS)
+
+    async def worker() -> None:
+        while not queue.empty():
+            route = Route("GET", "/channels/{channel_id}", channel_id=queue.get_nowait())
+            response = await http_client.request(route, TOKEN, headers={"Authorization": TOKEN})
+            response.release()
+
+    start_time = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = perf_counter() - start_time
+
+    await http_client.close()
+    await redis.close()
+    await runner.cleanup()
+
+    print(
+        f"{name:>18}: {REQUESTS / elapsed:7.1f} requests/s, "
+        f"{redis.script_calls / REQUESTS:4.2f} Redis scripts per request, "
+        f"{fake_discord.rate_limited} 429s"
+    )
+
+
+async def main() -> None:
+    logging.getLogger("nextcore").setLevel(logging.ERROR)
+    print(f"{REQUESTS} requests, {CONCURRENCY} at a time, Redis latency {LATENCY * 1000:.0f}ms")
+    await run("memory", None)
+    await run("redis prefetch=0", 0)
+    await run("redis prefetch=8", 8)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""Compares creating :class:`nextcore.http.Route` directly against :meth:`nextcore.http.Route.compile`, and the memory
+used by :class:`nextcore.http.RateLimitStorage` bucket keys.
+
+The memory part stores ``BUCKETS`` buckets and compares the tuple keys from :attr:`nextcore.http.Route.bucket` against
+the string keys that were used before (``f"{guild_id}{channel_id}{webhook_id}{webhook_token}{method}{path}"``).
+
+Usage: ``python benchmarks/route_template.py``
+"""
+
+from __future__ import annotations
+
+import tracemalloc
+from time import perf_counter
+from typing import Any, Callable
+
+from nextcore.http import Bucket, BucketMetadata, RateLimitStorage, Route
+
+ROUTES = 1_000_000
+BUCKETS = 100_000
+PATH = "/channels/{channel_id}/messages/{message_id}"
+
+
+def time_routes(name: str, create: Callable[[int], Route]) -> None:
+    start = perf_counter()
+    for index in range(ROUTES):
+        create(index)
+    elapsed = perf_counter() - start
+    print(f"{name:>9}: {elapsed:5.2f}s for {ROUTES} routes ({elapsed / ROUTES * 1e9:4.0f}ns per route)")
+
+
+def measure_keys(name: str, create_key: Callable[[int], Any]) -> None:
+    storage = RateLimitStorage(max_buckets=None, bucket_idle_timeout=None)
+    bucket = Bucket(BucketMetadata())  # Shared, so only the keys and the storage itself are measured
+
+    # Channel IDs usually come from a payload, so they are created before measuring.
+    channel_ids = [str(10**17 + index) for index in range(BUCKETS)]
+
+    tracemalloc.start()
+    for channel_id in channel_ids:
+        storage.store_bucket_by_nextcore_id_nowait(create_key(channel_id), bucket)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>12}: {used / 1024 / 1024:5.1f}MiB for {BUCKETS} buckets ({used / BUCKETS:3.0f} bytes per bucket)")
+
+
+def main() -> None:
+    template = Route.compile("GET", PATH)
+
+    time_routes("Route", lambda index: Route("GET", PATH, channel_id=index, message_id=index))
+    time_routes("compiled", lambda index: template(channel_id=index, message_id=index))
+
+    measure_keys("string keys", lambda channel_id: f"None{channel_id}NoneNoneGET{PATH}")
+    measure_keys("tuple keys", lambda channel_id: template(channel_id=channel_id, message_id=1).bucket)
+
+
+if __name__ == "__main__":
+    main()
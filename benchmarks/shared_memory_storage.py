@@ -0,0 +1,99 @@
+"""Compares the default :class:`nextcore.http.RateLimitStorage` against
+:class:`nextcore.http.SharedMemoryRateLimitStorage` with several worker processes sharing one token.
+
+Every worker sends ``REQUESTS_PER_WORKER`` requests spread over ``CHANNELS`` routes to the fake Discord API in
+``benchmarks/fake_discord.py``, and the throughput and the share of requests that got a 429 are reported.
+
+Usage: ``python benchmarks/shared_memory_storage.py``
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from aiohttp import ClientSession
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeDiscord, start  # noqa: E402
+
+WORKERS = 4
+CHANNELS = 4
+REQUESTS_PER_WORKER = 40
+TOKEN = "Bot benchmark"
+
+
+async def worker_main(port: int, directory: str | None) -> int:
+    from nextcore.http import (
+        HTTPClient,
+        RateLimitingFailedError,
+        Route,
+        SharedMemoryRateLimitStorage,
+    )
+
+    Route.BASE_URL = f"http://127.0.0.1:{port}/api/v10"
+    logging.getLogger("nextcore").setLevel(logging.ERROR)  # 429s are expected with the in-memory storage
+
+    factory = None if directory is None else SharedMemoryRateLimitStorage.factory(directory)
+    http_client = HTTPClient(rate_limit_storage_factory=factory, max_rate_limit_retries=20)
+    await http_client.setup()
+
+    failed = 0
+
+    async def send(channel_id: int) -> None:
+        nonlocal failed
+        route = Route("GET", "/channels/{channel_id}", channel_id=channel_id)
+        try:
+            response = await http_client.request(route, TOKEN, headers={"Authorization": TOKEN})
+            response.release()
+        except RateLimitingFailedError:
+            failed += 1
+
+    await asyncio.gather(*(send(index % CHANNELS) for index in range(REQUESTS_PER_WORKER)))
+    await http_client.close()
+    return failed
+
+
+def worker(port: int, directory: str | None) -> int:
+    return asyncio.run(worker_main(port, directory))
+
+
+async def run(mode: str) -> None:
+    fake_discord = FakeDiscord()
+    runner, port = await start(fake_discord)
+    loop = asyncio.get_running_loop()
+
+    with TemporaryDirectory() as temporary_directory, ProcessPoolExecutor(WORKERS) as pool:
+        directory = temporary_directory if mode == "shared" else None
+
+        start_time = perf_counter()
+        failed = await asyncio.gather(*(loop.run_in_executor(pool, worker, port, directory) for _ in range(WORKERS)))
+        elapsed = perf_counter() - start_time
+
+    async with ClientSession() as session:
+        async with session.get(f"http://127.0.0.1:{port}/stats") as response:
+            stats = await response.json()
+    await runner.cleanup()
+
+    succeeded = WORKERS * REQUESTS_PER_WORKER - sum(failed)
+    print(
+        f"{mode:>7}: {succeeded / elapsed:7.1f} successful requests/s, "
+        f"{stats['rate_limited'] / stats['requests']:6.1%} of {stats['requests']} requests got a 429 "
+        f"({stats['global_rate_limited']} global), {sum(failed)} gave up"
+    )
+
+
+async def main() -> None:
+    print(f"{WORKERS} processes, {REQUESTS_PER_WORKER} requests each over {CHANNELS} routes")
+    for mode in ("memory", "shared"):
+        await run(mode)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
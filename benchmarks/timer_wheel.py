@@ -0,0 +1,61 @@
+"""Compares :class:`nextcore.common.TimerWheel` against a ``loop.call_later`` per timer.
+
+This simulates ``count`` buckets that all schedule a reset between 0.1 and 1 second in the future, and measures the
+CPU time spent scheduling and firing them, as well as how late the timers fired.
+
+Usage: ``python benchmarks/timer_wheel.py``
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from time import process_time
+from typing import Callable
+
+from nextcore.common.timer_wheel import TimerWheel
+
+COUNTS = (1_000, 10_000, 100_000)
+
+
+async def run(count: int, schedule: Callable[[float, Callable[[float], None], float], object]) -> tuple[float, float]:
+    loop = asyncio.get_running_loop()
+    done = asyncio.Event()
+    lateness: list[float] = []
+
+    def callback(when: float) -> None:
+        lateness.append(loop.time() - when)
+        if len(lateness) == count:
+            done.set()
+
+    rng = random.Random(0)
+    delays = [rng.uniform(0.1, 1) for _ in range(count)]
+
+    start = process_time()
+    for delay in delays:
+        schedule(delay, callback, loop.time() + delay)
+    await done.wait()
+    cpu_time = process_time() - start
+
+    lateness.sort()
+    return cpu_time, lateness[int(len(lateness) * 0.99)]
+
+
+async def main() -> None:
+    loop = asyncio.get_running_loop()
+    print(f"{'timers':>8} {'implementation':>16} {'cpu time':>10} {'p99 late':>10}")
+    for count in COUNTS:
+        cpu_time, p99 = await run(count, loop.call_later)
+        print(f"{count:>8} {'call_later':>16} {cpu_time:>9.3f}s {p99 * 1000:>8.2f}ms")
+
+        wheel = TimerWheel()
+        cpu_time, p99 = await run(count, wheel.call_later)
+        print(f"{count:>8} {'TimerWheel':>16} {cpu_time:>9.3f}s {p99 * 1000:>8.2f}ms")
+
+        wheel = TimerWheel(resolution=0.01)
+        cpu_time, p99 = await run(count, wheel.call_later)
+        print(f"{count:>8} {'TimerWheel(10ms)':>16} {cpu_time:>9.3f}s {p99 * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
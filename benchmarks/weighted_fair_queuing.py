@@ -0,0 +1,82 @@
+"""Simulates an overloaded global rate limit shared by three traffic classes.
+
+Every window, ``interactions``, ``moderation`` and ``bulk`` requests arrive at the rates in ``OFFERED``, which is
+three times the limit. :class:`nextcore.http.LimitedGlobalRateLimiter` is given a fixed priority per class, and
+:class:`nextcore.http.WeightedFairGlobalRateLimiter` is given the weights in ``WEIGHTS``.
+
+The windows are shortened to ``PER`` seconds to keep the run short. Throughput is reported per window and waits are
+scaled back to a window of 1 second, the same as Discord's global rate limit. Only requests that got a spot before the
+end of the run are counted in the waits.
+
+Usage: ``python benchmarks/weighted_fair_queuing.py``
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable
+
+from nextcore.common import Histogram
+from nextcore.http import LimitedGlobalRateLimiter, TrafficClass, WeightedFairGlobalRateLimiter
+
+LIMIT = 50
+PER = 0.1
+WINDOWS = 30
+OFFERED = {"interactions": 30, "moderation": 40, "bulk": 80}
+PRIORITIES = {"interactions": 0, "moderation": 1, "bulk": 2}
+WEIGHTS = {"interactions": 4, "moderation": 2, "bulk": 1}
+
+
+async def simulate(name: str, use: Callable[[str], Awaitable[None]]) -> None:
+    loop = asyncio.get_running_loop()
+    waits = {traffic_class: Histogram() for traffic_class in OFFERED}
+    tasks: list[asyncio.Task[None]] = []
+
+    async def request(traffic_class: str) -> None:
+        queued_at = loop.time()
+        await use(traffic_class)
+        waits[traffic_class].record((loop.time() - queued_at) / PER)
+
+    for _ in range(WINDOWS):
+        for traffic_class, offered in OFFERED.items():
+            tasks.extend(asyncio.create_task(request(traffic_class)) for _ in range(offered))
+        await asyncio.sleep(PER)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(name)
+    for traffic_class, histogram in waits.items():
+        p99 = f"{histogram.percentile(0.99):6.2f}s" if histogram.count else "   n/a "
+        print(f"{traffic_class:>14}: {histogram.count / WINDOWS:5.1f} requests/s, p99 wait {p99}")
+
+
+async def main() -> None:
+    print(f"Offered {sum(OFFERED.values())} requests/s to a limit of {LIMIT}/s")
+
+    limited = LimitedGlobalRateLimiter(LIMIT)
+    limited.per = PER
+
+    async def use_limited(traffic_class: str) -> None:
+        async with limited.acquire(priority=PRIORITIES[traffic_class]):
+            pass
+
+    await simulate(f"LimitedGlobalRateLimiter (priorities {PRIORITIES})", use_limited)
+    await limited.close()
+
+    weighted_fair = WeightedFairGlobalRateLimiter(
+        LIMIT, traffic_classes=[TrafficClass(name, weight) for name, weight in WEIGHTS.items()]
+    )
+    weighted_fair.per = PER
+
+    async def use_weighted_fair(traffic_class: str) -> None:
+        async with weighted_fair.acquire(traffic_class=traffic_class):
+            pass
+
+    await simulate(f"WeightedFairGlobalRateLimiter (weights {WEIGHTS})", use_weighted_fair)
+    await weighted_fair.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
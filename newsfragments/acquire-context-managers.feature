@@ -0,0 +1 @@
+``Bucket.acquire``, ``TimesPer.acquire`` and ``UnlimitedGlobalRateLimiter.acquire`` now return lightweight context manager objects instead of generator based ones, and only create a future when they have to wait. See ``benchmarks/acquire.py``.
@@ -0,0 +1 @@
+``LimitedGlobalRateLimiter`` now stops every request until ``retry_after`` is over on a global 429, instead of only logging a warning. Added an ``adaptive`` mode that raises the limit while it is fully used and lowers it on global 429s, for bots with a raised global rate limit.
@@ -0,0 +1 @@
+Added ``HTTPClient.bind`` which returns a ``BoundHTTPClient`` with the rate limit storage and headers for one authentication resolved once instead of on every request.
@@ -0,0 +1 @@
+RateLimitStorage now evicts idle buckets and bucket metadata incrementally in least recently used order with configurable size caps, instead of scanning every bucket from a garbage collection callback.
@@ -0,0 +1 @@
+When Discord reports that two routes with the same major parameters share a bucket hash, the bucket of the new route is now merged into the existing one with ``Bucket.merge_into``. Waiting requests, requests in progress, the remaining count and pauses are moved over, so the shared rate limit is only enforced once.
@@ -0,0 +1 @@
+Buckets are now paused for ``retry_after`` when a request gets a 429 from a ``shared`` or ``user`` rate limit, and the retry is put in front of the other waiting requests instead of retrying straight away.
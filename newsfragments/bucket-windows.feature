@@ -0,0 +1 @@
+``Bucket.update`` now finds out which rate limit window a response belongs to from its reset time. Responses that arrive out of order can no longer raise the remaining count, and responses from a window that has already reset are ignored.
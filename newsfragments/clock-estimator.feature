@@ -0,0 +1 @@
+Added ``ClockEstimator``, which learns the Discord clock offset, the round trip time and a safety margin from responses. ``HTTPClient.clock_estimator`` uses it to time bucket resets.
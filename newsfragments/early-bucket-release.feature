@@ -0,0 +1 @@
+Buckets are now released as soon as the rate limit headers of a response are read, instead of after the response has been dispatched and errors have been handled.
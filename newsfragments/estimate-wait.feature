@@ -0,0 +1 @@
+Added ``HTTPClient.estimate_wait`` to estimate how long a request on a route would wait for the rate limits right now, without reserving anything. Added ``Bucket.estimate_admission``, ``TimesPer.estimate_admission`` and ``WaiterQueue.count_ahead``. See ``benchmarks/estimate_wait.py``.
@@ -0,0 +1 @@
+Added ``HTTPClient.hedge_percentile`` to send a second request for slow ``GET`` requests when the bucket and the global rate limit have a spot free. Added ``Bucket.available`` and ``TimesPer.available``.
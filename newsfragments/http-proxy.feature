@@ -0,0 +1 @@
+Added ``nextcore.http.proxy.HTTPProxy`` and ``python -m nextcore.http.proxy``, a HTTP server that sends Discord API requests from many processes through a single ``HTTPClient`` to centralize rate limiting and reuse connections. See ``benchmarks/proxy.py``.
@@ -0,0 +1 @@
+Added ``InvalidRequestTracker``, which counts ``401``, ``403`` and ``429`` responses and delays or rejects low priority requests before Cloudflare bans the IP. ``HTTPClient.invalid_request_tracker`` is shared by every rate limit key.
@@ -0,0 +1 @@
+Added ``nextcore.metrics.MetricsExporter``, which exports bucket, global rate limit and shard metrics in the Prometheus text format.
@@ -0,0 +1,3 @@
+Added ``HTTPClient.save_rate_limit_state``, ``HTTPClient.load_rate_limit_state`` and the ``rate_limit_state_path`` parameter to persist learned rate limits across restarts. Rate limit keys are hashed before being written to disk.
+Added ``RateLimitStorage.snapshot`` and ``RateLimitStorage.restore``.
+Added ``drain_timeout`` to ``HTTPClient.close`` to wait for requests in progress before saving.
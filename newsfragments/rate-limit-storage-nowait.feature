@@ -0,0 +1 @@
+Added ``*_nowait`` variants of the ``RateLimitStorage`` lookup methods and ``RateLimitStorage.supports_nowait``. ``HTTPClient`` uses them for storages that never suspend, avoiding several coroutines per request. See ``benchmarks/rate_limit_storage_nowait.py``.
@@ -0,0 +1,2 @@
+Added ``RedisRateLimitStorage`` which shares rate limits between machines through a Redis server using atomic scripts. Reserves from concurrent requests are batched, and spots can be prefetched so most requests do not wait for a round trip.
+Added ``nextcore.http.rate_limit_storage.redis_stand_in.RedisStandIn``, a small Redis protocol server for testing without Redis.
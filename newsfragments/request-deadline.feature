@@ -0,0 +1 @@
+Added ``deadline`` to ``HTTPClient.request``. Requests that are estimated to get a spot in the rate limits too late raise ``DeadlineExceededError`` straight away, and requests still waiting for the rate limits when the deadline passes are taken out of the queue. Added ``Bucket.paused_until`` and ``LimitedGlobalRateLimiter.paused_until``.
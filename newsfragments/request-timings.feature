@@ -0,0 +1 @@
+Added ``HTTPClient.request_timings`` with histograms of how long every phase of a request took, by route and status class, and the ``request_timings`` event. Added ``nextcore.common.Histogram``.
@@ -0,0 +1 @@
+Added ``Route.compile`` which returns a ``RouteTemplate`` that parses the path once and creates ``Route`` instances faster. Added ``Route.url``. See ``benchmarks/route_template.py``.
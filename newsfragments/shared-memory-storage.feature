@@ -0,0 +1,2 @@
+Added ``SharedMemoryRateLimitStorage`` which shares bucket and global rate limits between processes on the same machine through a memory mapped file, and the ``rate_limit_storage_factory`` parameter to ``HTTPClient`` to use it.
+Added ``RateLimitStorage.create_bucket`` to let storages provide their own ``Bucket`` implementation.
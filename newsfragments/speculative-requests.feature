@@ -0,0 +1 @@
+Added ``HTTPClient.speculative_requests`` and ``Route.speculative_requests`` to allow more than one request at a time on buckets with unknown rate limits. Speculative requests that get a 429 are retried, and the outcomes are counted in ``HTTPClient.speculation_wins`` and ``HTTPClient.speculation_losses``.
@@ -0,0 +1 @@
+Bucket, TimesPer and UnlimitedGlobalRateLimiter resets are now scheduled on a shared hierarchical timer wheel instead of one event loop timer each. See ``benchmarks/timer_wheel.py``.
@@ -0,0 +1 @@
+Bucket and TimesPer now use a asyncio native priority queue that keeps requests with the same priority in order and skips cancelled requests.
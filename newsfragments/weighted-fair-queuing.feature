@@ -0,0 +1 @@
+Added ``WeightedFairGlobalRateLimiter``, which shares the global rate limit between traffic classes by weight with an optional minimum share, and ages waiting requests so they can not be starved. The traffic class is passed with ``traffic_class`` to ``HTTPClient.request`` or the ``X-Nextcore-Traffic-Class`` proxy header. See ``benchmarks/weighted_fair_queuing.py``.
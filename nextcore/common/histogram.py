@@ -0,0 +1,205 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from math import frexp, inf, ldexp
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Final, Iterator
+
+__all__: Final[tuple[str, ...]] = ("Histogram",)
+
+
+class Histogram:
+    """A histogram with logarithmic buckets.
+
+    Every power of two between ``lowest`` and ``highest`` is split into ``sub_buckets`` buckets,
+    so the error of :meth:`Histogram.percentile` is at most ``1 / sub_buckets`` of the value.
+    Recording a value is O(1) and does not allocate.
+
+    Histograms with the same layout can be added together with :meth:`Histogram.merge`.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        histogram = Histogram()
+        histogram.record(0.25)
+
+        print(histogram.percentile(0.99))
+
+    Parameters
+    ----------
+    lowest:
+        The lowest value to tell apart. Values below this are counted in the first bucket.
+    highest:
+        The highest value to tell apart. Values above this are counted in the last bucket.
+    sub_buckets:
+        How many buckets to split every power of two into.
+
+    Attributes
+    ----------
+    counts:
+        How many values were recorded in every bucket.
+    count:
+        How many values were recorded.
+    sum:
+        The sum of every recorded value.
+    min:
+        The lowest recorded value. This is :data:`None` if nothing has been recorded.
+    max:
+        The highest recorded value. This is :data:`None` if nothing has been recorded.
+    """
+
+    __slots__ = ("counts", "count", "sum", "min", "max", "_lowest_exponent", "_sub_buckets")
+
+    def __init__(self, *, lowest: float = 2**-14, highest: float = 2**7, sub_buckets: int = 8) -> None:
+        if lowest <= 0 or highest <= lowest:
+            raise ValueError("lowest has to be positive and below highest")
+        if sub_buckets < 1:
+            raise ValueError("sub_buckets has to be at least 1")
+
+        self._lowest_exponent: int = frexp(lowest)[1]
+        self._sub_buckets: int = sub_buckets
+        self.counts: list[int] = [0] * ((frexp(highest)[1] - self._lowest_exponent + 1) * sub_buckets)
+        self.count: int = 0
+        self.sum: float = 0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def record(self, value: float) -> None:
+        """Add a value to the histogram.
+
+        Parameters
+        ----------
+        value:
+            The value to add.
+        """
+        mantissa, exponent = frexp(value)  # value = mantissa * 2 ** exponent, and 0.5 <= mantissa < 1
+        sub_buckets = self._sub_buckets
+        index = (exponent - self._lowest_exponent) * sub_buckets + int((mantissa * 2 - 1) * sub_buckets)
+
+        counts = self.counts
+        if index < 0 or value <= 0:
+            index = 0
+        elif index >= len(counts):
+            index = len(counts) - 1
+        counts[index] += 1
+
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def upper_bound(self, index: int) -> float:
+        """The highest value that is counted in a bucket.
+
+        This is infinity for the last bucket, as it counts everything above ``highest``.
+
+        Parameters
+        ----------
+        index:
+            The index of the bucket in :attr:`Histogram.counts`.
+        """
+        if index >= len(self.counts) - 1:
+            return inf
+        exponent, sub_bucket = divmod(index, self._sub_buckets)
+        return ldexp(0.5 + (sub_bucket + 1) / (2 * self._sub_buckets), exponent + self._lowest_exponent)
+
+    def buckets(self) -> Iterator[tuple[float, int]]:
+        """The upper bound and count of every bucket that has values in it, from lowest to highest."""
+        for index, count in enumerate(self.counts):
+            if count:
+                yield self.upper_bound(index), count
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate a percentile.
+
+        Parameters
+        ----------
+        fraction:
+            The percentile as a fraction, for example ``0.99`` for the 99th percentile.
+
+        Raises
+        ------
+        ValueError
+            Nothing has been recorded yet.
+        """
+        if self.min is None or self.max is None:
+            raise ValueError("No values have been recorded")
+
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                # The bucket bounds may be outside of what was actually recorded
+                return min(max(self.upper_bound(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float | None:
+        """The mean of every recorded value. This is :data:`None` if nothing has been recorded."""
+        if not self.count:
+            return None
+        return self.sum / self.count
+
+    def merge(self, other: Histogram) -> None:
+        """Add the values of another histogram to this one.
+
+        Parameters
+        ----------
+        other:
+            The histogram to add. This has to have the same ``lowest``, ``highest`` and ``sub_buckets``.
+
+        Raises
+        ------
+        ValueError
+            The histograms have different layouts.
+        """
+        if (
+            other._lowest_exponent != self._lowest_exponent
+            or other._sub_buckets != self._sub_buckets
+            or len(other.counts) != len(self.counts)
+        ):
+            raise ValueError("Cannot merge histograms with different layouts")
+
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def clear(self) -> None:
+        """Remove every recorded value."""
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
@@ -0,0 +1,368 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from asyncio import get_running_loop
+from heapq import heappop, heappush
+from logging import getLogger
+from math import ceil, floor
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary, ref
+
+if TYPE_CHECKING:
+    from asyncio import AbstractEventLoop
+    from asyncio import TimerHandle as AsyncioTimerHandle
+    from typing import Any, Callable, Final
+    from weakref import ReferenceType
+
+__all__: Final[tuple[str, ...]] = ("TimerWheel", "TimerHandle", "get_timer_wheel", "set_timer_wheel")
+
+logger = getLogger(__name__)
+
+
+class TimerHandle:
+    """A timer scheduled on a :class:`TimerWheel`.
+
+    Attributes
+    ----------
+    tick:
+        The wheel tick the timer expires at.
+    callback:
+        The function to call when the timer expires.
+    args:
+        Arguments to pass to the callback.
+    cancelled:
+        Whether the timer has been cancelled.
+    """
+
+    __slots__ = ("tick", "callback", "args", "cancelled")
+
+    def __init__(self, tick: int, callback: Callable[..., Any], args: tuple[Any, ...]) -> None:
+        self.tick: int = tick
+        self.callback: Callable[..., Any] = callback
+        self.args: tuple[Any, ...] = args
+        self.cancelled: bool = False
+
+    def cancel(self) -> None:
+        """Cancel the timer.
+
+        This is O(1), the timer is removed from the wheel when its slot expires.
+        """
+        self.cancelled = True
+
+
+class TimerWheel:
+    """A hierarchical timing wheel.
+
+    This batches timers that expire in the same tick into a single event loop callback,
+    and only wakes the event loop up when a slot has timers in it.
+
+    Timers are rounded up to the next tick. Like :meth:`asyncio.loop.call_at`, they can still fire up to the clock
+    resolution of the event loop early, as the event loop can wake up that early.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        wheel = get_timer_wheel()
+        handle = wheel.call_later(5, print, "Hello!")
+
+    Parameters
+    ----------
+    resolution:
+        The length of a tick in seconds.
+    slots:
+        How many slots each level of the wheel has.
+    levels:
+        How many levels the wheel has. Timers further away than ``resolution * slots ** (levels - 1)`` will all be stored in the last level.
+
+    Attributes
+    ----------
+    resolution:
+        The length of a tick in seconds.
+    slots:
+        How many slots each level of the wheel has.
+    levels:
+        How many levels the wheel has.
+    """
+
+    __slots__ = (
+        "resolution",
+        "slots",
+        "levels",
+        "_loop",
+        "_origin",
+        "_spans",
+        "_wheels",
+        "_slot_keys",
+        "_size",
+        "_min_tick",
+        "_wakeup_handle",
+        "_wakeup_tick",
+    )
+
+    def __init__(self, *, resolution: float = 0.001, slots: int = 64, levels: int = 4) -> None:
+        if resolution <= 0:
+            raise ValueError("resolution has to be positive")
+        if slots < 2 or levels < 1:
+            raise ValueError("A timer wheel needs at least 2 slots and 1 level")
+
+        self.resolution: Final[float] = resolution
+        self.slots: Final[int] = slots
+        self.levels: Final[int] = levels
+
+        # Internals
+        # Weak, so the wheel stored for a event loop in _timer_wheels does not keep the event loop alive.
+        self._loop: ReferenceType[AbstractEventLoop] | None = None
+        self._origin: float = 0
+        self._spans: tuple[int, ...] = tuple(slots**level for level in range(levels))  # Ticks per slot for each level
+        # Slot key -> timers. The key is the tick the slot starts at divided by the span of the level
+        self._wheels: list[dict[int, list[TimerHandle]]] = [{} for _ in range(levels)]
+        self._slot_keys: list[list[int]] = [[] for _ in range(levels)]  # A heap of the keys in _wheels per level
+        self._size: int = 0
+        self._min_tick: int = 0  # Timers can not be scheduled before this tick to avoid re-running in the same wakeup
+        self._wakeup_handle: ReferenceType[AsyncioTimerHandle] | None = None  # Weak as it references the loop
+        self._wakeup_tick: int | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> TimerHandle:
+        """Schedule a callback to be called after ``delay`` seconds.
+
+        Parameters
+        ----------
+        delay:
+            How long until the callback should be called in seconds.
+        callback:
+            The function to call.
+        args:
+            Arguments to pass to the callback.
+
+        Returns
+        -------
+        TimerHandle
+            A handle that can be used to cancel the timer.
+        """
+        now = self._get_loop().time()
+        return self._add(now + delay, now, callback, args)
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> TimerHandle:
+        """Schedule a callback to be called at a event loop time.
+
+        Parameters
+        ----------
+        when:
+            The event loop time (see :meth:`asyncio.loop.time`) the callback should be called at.
+        callback:
+            The function to call.
+        args:
+            Arguments to pass to the callback.
+
+        Returns
+        -------
+        TimerHandle
+            A handle that can be used to cancel the timer.
+        """
+        return self._add(when, self._get_loop().time(), callback, args)
+
+    def close(self) -> None:
+        """Drop all timers without calling them.
+
+        .. warning::
+            Continued use of this instance will result in instability
+        """
+        self._cancel_wakeup()
+        self._wakeup_tick = None
+
+        for wheel in self._wheels:
+            wheel.clear()
+        for keys in self._slot_keys:
+            keys.clear()
+        self._size = 0
+
+    def _get_loop(self) -> AbstractEventLoop:
+        loop = None if self._loop is None else self._loop()
+        if loop is None:
+            loop = get_running_loop()
+            self._loop = ref(loop)
+            self._origin = loop.time()
+        return loop
+
+    def _current_tick(self, now: float) -> int:
+        # The small offset is to account for the event loop waking up slightly early due to clock resolution.
+        return floor((now - self._origin) / self.resolution + 1e-3)
+
+    def _add(self, when: float, now: float, callback: Callable[..., Any], args: tuple[Any, ...]) -> TimerHandle:
+        if when <= now:
+            # Already expired, no need to wait for the next tick.
+            handle = TimerHandle(self._current_tick(now), callback, args)
+            self._get_loop().call_soon(self._call, self._get_loop(), handle)
+            return handle
+
+        tick = max(ceil((when - self._origin) / self.resolution), self._min_tick)
+        handle = TimerHandle(tick, callback, args)
+
+        self._size += 1
+        event_tick = self._place(handle, self._current_tick(now))
+        if self._wakeup_tick is None or event_tick < self._wakeup_tick:
+            self._schedule_wakeup(event_tick)
+        return handle
+
+    def _place(self, handle: TimerHandle, current_tick: int) -> int:
+        """Add a timer to the wheel.
+
+        Returns
+        -------
+        :class:`int`
+            The tick the slot it was added to needs processing at.
+        """
+        # Find the most precise level that can fit the timer
+        level = 0
+        span = 1
+        key = handle.tick
+        while key - current_tick // span >= self.slots and level < self.levels - 1:
+            level += 1
+            span = self._spans[level]
+            key = handle.tick // span
+
+        wheel = self._wheels[level]
+        timers = wheel.get(key)
+        if timers is None:
+            wheel[key] = [handle]
+            heappush(self._slot_keys[level], key)
+        else:
+            timers.append(handle)
+        return key * span
+
+    def _next_event(self) -> tuple[int, int] | None:
+        """The tick and level of the next slot that needs processing."""
+        next_event: tuple[int, int] | None = None
+        for level, keys in enumerate(self._slot_keys):
+            if not keys:
+                continue
+            tick = keys[0] * self._spans[level]
+            if next_event is None or tick < next_event[0]:
+                next_event = (tick, level)
+        return next_event
+
+    def _cancel_wakeup(self) -> None:
+        wakeup_handle = None if self._wakeup_handle is None else self._wakeup_handle()
+        if wakeup_handle is not None:
+            wakeup_handle.cancel()
+        self._wakeup_handle = None
+
+    def _schedule_wakeup(self, tick: int) -> None:
+        self._cancel_wakeup()
+
+        loop = self._get_loop()
+        self._wakeup_tick = tick
+        # The event loop keeps the handle alive until it is called or cancelled.
+        self._wakeup_handle = ref(loop.call_at(self._origin + tick * self.resolution, self._run))
+
+    def _run(self) -> None:
+        loop = self._get_loop()
+        # The event loop can wake up to its clock resolution early (~15.6ms on Windows), which can be several ticks.
+        # Always process the tick this wakeup was scheduled for, else the same wakeup would be scheduled again.
+        current_tick = self._current_tick(loop.time())
+        if self._wakeup_tick is not None and self._wakeup_tick > current_tick:
+            current_tick = self._wakeup_tick
+
+        # Timers added by callbacks will be scheduled after this, so this stops them from re-scheduling the wakeup.
+        self._wakeup_handle = None
+        self._wakeup_tick = current_tick
+        self._min_tick = current_tick + 1
+
+        while True:
+            next_event = self._next_event()
+            if next_event is None or next_event[0] > current_tick:
+                break
+            level = next_event[1]
+
+            key = heappop(self._slot_keys[level])
+            timers = self._wheels[level].pop(key)
+
+            if level == 0:
+                # Expired, batch call all of them
+                self._size -= len(timers)
+                for handle in timers:
+                    self._call(loop, handle)
+            else:
+                # Cascade down to a more precise level
+                for handle in timers:
+                    if handle.cancelled:
+                        self._size -= 1
+                        continue
+                    self._place(handle, current_tick)
+
+        next_event = self._next_event()
+        if next_event is None:
+            self._wakeup_tick = None
+        else:
+            self._schedule_wakeup(next_event[0])
+
+    def _call(self, loop: AbstractEventLoop, handle: TimerHandle) -> None:
+        if handle.cancelled:
+            return
+        try:
+            handle.callback(*handle.args)
+        except (SystemExit, KeyboardInterrupt):
+            raise
+        except BaseException as error:
+            loop.call_exception_handler(
+                {"message": "Exception in timer wheel callback", "exception": error, "handle": handle}
+            )
+
+
+_timer_wheels: WeakKeyDictionary[AbstractEventLoop, TimerWheel] = WeakKeyDictionary()
+
+
+def get_timer_wheel() -> TimerWheel:
+    """Get the timer wheel shared by all rate limiters on the running event loop.
+
+    This will create one with the default settings if :func:`set_timer_wheel` has not been called.
+    """
+    loop = get_running_loop()
+    wheel = _timer_wheels.get(loop)
+    if wheel is None:
+        wheel = TimerWheel()
+        _timer_wheels[loop] = wheel
+    return wheel
+
+
+def set_timer_wheel(wheel: TimerWheel) -> None:
+    """Set the timer wheel shared by all rate limiters on the running event loop.
+
+    This should be done before any rate limiting happens, as timers on the old wheel will not be moved over.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        set_timer_wheel(TimerWheel(resolution=0.01))
+
+    Parameters
+    ----------
+    wheel:
+        The wheel to use.
+    """
+    _timer_wheels[get_running_loop()] = wheel
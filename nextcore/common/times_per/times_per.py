@@ -21,17 +21,17 @@
 
 from __future__ import annotations
 
-from asyncio import CancelledError, Future, get_running_loop
-from contextlib import asynccontextmanager
+from asyncio import get_running_loop
 from logging import getLogger
-from queue import PriorityQueue
-from typing import TYPE_CHECKING, AsyncIterator
+from typing import TYPE_CHECKING
 
 from ..errors import RateLimitedError
-from .priority_queue_container import PriorityQueueContainer
+from ..timer_wheel import get_timer_wheel
+from ..waiter_queue import WaiterQueue
 
 if TYPE_CHECKING:
-    from typing import Final
+    from types import TracebackType
+    from typing import AsyncContextManager, Final
 
 __all__: Final[tuple[str, ...]] = ("TimesPer",)
 
@@ -59,19 +59,30 @@ class TimesPer:
         This will be added to the reset time, so for example a offset of ``1`` will make resetting 1 second slower.
     """
 
-    __slots__ = ("limit", "per", "remaining", "reset_offset_seconds", "_pending", "_in_progress", "_pending_reset")
+    __slots__ = (
+        "limit",
+        "per",
+        "remaining",
+        "reset_offset_seconds",
+        "_pending",
+        "_in_progress",
+        "_pending_reset",
+        "_reset_at",
+        "_default_acquire",
+    )
 
     def __init__(self, limit: int, per: float) -> None:
         self.limit: int = limit
         self.per: float = per
         self.remaining: int = limit
         self.reset_offset_seconds: float = 0
-        self._pending: PriorityQueue[PriorityQueueContainer] = PriorityQueue()
+        self._pending: WaiterQueue = WaiterQueue()
         self._in_progress: int = 0
         self._pending_reset: bool = False
+        self._reset_at: float | None = None  # Event loop time the pending reset happens at
+        self._default_acquire: _TimesPerAcquire = _TimesPerAcquire(self, 0, True)
 
-    @asynccontextmanager
-    async def acquire(self, *, priority: int = 0, wait: bool = True) -> AsyncIterator[None]:
+    def acquire(self, *, priority: int = 0, wait: bool = True) -> AsyncContextManager[None]:
         """Use a spot in the rate-limit.
 
         Parameters
@@ -92,88 +103,136 @@ class TimesPer:
         :class:`typing.AsyncContextManager`
             A context manager that will wait in __aenter__ until a request should be made.
         """
+        if priority == 0 and wait:
+            # The context manager holds no state between entering and exiting, so the common case can be reused.
+            return self._default_acquire
+        return _TimesPerAcquire(self, priority, wait)
 
-        calculated_remaining = self.remaining - self._in_progress
-        logger.debug("Calculated remaining: %s", calculated_remaining)
-        logger.debug("Reserved requests: %s", self._in_progress)
+    def _reset(self) -> None:
+        self._pending_reset = False
+        self._reset_at = None
 
-        if calculated_remaining == 0:
-            if not wait:
-                raise RateLimitedError()
+        self.remaining = self.limit
 
-            # Wait for a spot
-            future: Future[None] = Future()
-            item = PriorityQueueContainer(priority, future)
+        released = self._pending.release(self.remaining - self._in_progress)
+        logger.debug("Released %s requests", released)
 
-            self._pending.put_nowait(item)
+        if self._pending:
+            self._schedule_reset()
 
-            logger.debug("Added request to queue with priority %s", priority)
-            try:
-                await future
-            except CancelledError:
-                logger.debug("Cancelled .acquire, removing from queue.")
-                self._pending.queue.remove(item)
-                return
-            logger.debug("Out of queue, doing request")
+    def _schedule_reset(self) -> None:
+        delay = self.per + self.reset_offset_seconds
+        self._pending_reset = True
+        self._reset_at = get_running_loop().time() + delay
+        get_timer_wheel().call_later(delay, self._reset)
 
-        self._in_progress += 1
-        try:
-            yield None
-        except:
-            # A exception occured. This will not take from the rate-limit, and as so we have to re-allow a request to run
-            if self._pending.qsize() != 0:
-                container = self._pending.get_nowait()
-                future = container.future
+    def estimate_admission(self, priority: int = 0) -> float:
+        """Estimate when a new request would get a spot, without using one.
 
-                # Mark it as completed, good practice (and saves a bit of memory due to a infinitly expanding int)
-                self._pending.task_done()
+        Parameters
+        ----------
+        priority:
+            The priority of the request. **Lower** number means it will be requested earlier.
 
-                # Release it and allow further requests
-                future.set_result(None)
+        Returns
+        -------
+        :class:`float`
+            The event loop time (see :meth:`asyncio.loop.time`) the request would get a spot at.
+        """
+        if len(self._pending) < self.remaining - self._in_progress:
+            return get_running_loop().time()  # Not even every waiting request would be ahead of it
+        return self._estimate_admission(self._pending.count_ahead(priority))
+
+    def _estimate_admission(self, ahead: int) -> float:
+        now = get_running_loop().time()
+        free = self.remaining - self._in_progress
+        if ahead < free:
+            return now
+
+        # The first reset lets the limit through, and every reset after that lets another limit through.
+        windows = (ahead - max(free, 0)) // max(self.limit, 1)
+        # Requests in progress start a reset when they are done
+        reset_at = now + self.per + self.reset_offset_seconds if self._reset_at is None else self._reset_at
+        return max(reset_at, now) + windows * (self.per + self.reset_offset_seconds)
+
+    @property
+    def pending(self) -> int:
+        """How many requests are waiting for a spot"""
+        return len(self._pending)
+
+    @property
+    def available(self) -> int:
+        """How many more requests can get a spot right now without waiting"""
+        return max(self.remaining - self._in_progress - len(self._pending), 0)
 
-            raise  # Re-raise exception
-        finally:
-            # Start a reset task
-            if not self._pending_reset:
-                self._pending_reset = True
-                loop = get_running_loop()
-                loop.call_later(self.per + self.reset_offset_seconds, self._reset)
+    async def close(self) -> None:
+        """Cleanup this instance.
 
-            self._in_progress -= 1
+        This should be done when this instance is never going to be used anymore
 
-        # This only gets called if no exception got raised.
-        self.remaining -= 1
+        .. warning::
+            Continued use of this instance will result in instability
+        """
+        self._pending.close()
 
-    def _reset(self) -> None:
-        self._pending_reset = False
 
-        self.remaining = self.limit
+class _TimesPerAcquire:
+    """The context manager returned by :meth:`TimesPer.acquire`
 
-        to_release = min(self._pending.qsize(), self.remaining - self._in_progress)
-        logger.debug("Releasing %s requests", to_release)
-        for _ in range(to_release):
-            container = self._pending.get_nowait()
-            future = container.future
+    This only creates a future if it has to wait.
 
-            # Mark it as completed, good practice (and saves a bit of memory due to a infinitly expanding int)
-            self._pending.task_done()
+    Attributes
+    ----------
+    used:
+        Whether the request was sent. A request that is cancelled after this is set still counts against the rate limit.
+    """
 
-            # Release it and allow further requests
-            future.set_result(None)
-        if self._pending.qsize():
-            self._pending_reset = True
+    __slots__ = ("_times_per", "_priority", "_wait", "used")
 
-            loop = get_running_loop()
-            loop.call_later(self.per + self.reset_offset_seconds, self._reset)
+    def __init__(self, times_per: TimesPer, priority: int, wait: bool) -> None:
+        self._times_per: TimesPer = times_per
+        self._priority: int = priority
+        self._wait: bool = wait
+        self.used: bool = False
 
-    async def close(self) -> None:
-        """Cleanup this instance.
+    async def __aenter__(self) -> None:
+        times_per = self._times_per
 
-        This should be done when this instance is never going to be used anymore
+        if times_per.remaining - times_per._in_progress <= 0:
+            if not self._wait:
+                raise RateLimitedError()
 
-        .. warning::
-            Continued use of this instance will result in instability
-        """
-        # No need to clear this, as the .acquire function does it for us.
-        for request in self._pending.queue:
-            request.future.set_exception(CancelledError)
+            # Wait for a spot
+            future = times_per._pending.put(self._priority)
+
+            logger.debug("Added request to queue with priority %s", self._priority)
+            try:
+                await future
+            except:
+                logger.debug("Cancelled .acquire, removing from queue.")
+                times_per._pending.discard(future)
+                raise
+            logger.debug("Out of queue, doing request")
+
+        times_per._in_progress += 1
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        times_per = self._times_per
+        times_per._in_progress -= 1
+
+        if exc_type is not None and not self.used:
+            # A exception occured. This will not take from the rate-limit, and as so we have to re-allow a request to run
+            if times_per.remaining - times_per._in_progress > 0:
+                # The remaining spots may have been taken away in the meantime, for example by a global 429
+                times_per._pending.release(1)
+        else:
+            times_per.remaining -= 1
+
+        # Start a reset task
+        if not times_per._pending_reset:
+            times_per._schedule_reset()
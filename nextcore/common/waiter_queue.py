@@ -0,0 +1,250 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from asyncio import CancelledError, get_running_loop
+from heapq import heapify, heappop, heappush
+from itertools import count
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from asyncio import Future
+    from typing import ClassVar, Final, Iterator, Tuple
+
+    WaiterQueueEntry = Tuple[float, int, "Future[None]"]
+
+__all__: Final[tuple[str, ...]] = ("WaiterQueue",)
+
+logger = getLogger(__name__)
+
+_FRONT_OFFSET: Final[int] = -(1 << 62)
+
+
+class WaiterQueue:
+    """A asyncio native priority queue of waiting requests.
+
+    This is used by :class:`~nextcore.common.TimesPer` and :class:`~nextcore.http.Bucket` to park requests until there is a spot in the rate limit.
+
+    Requests with the same priority are released in the order they were added.
+    Cancelled waiters are not removed from the heap straight away, they are instead skipped when releasing.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        queue = WaiterQueue()
+
+        future = queue.put(priority=0)
+        try:
+            await future
+        except CancelledError:
+            queue.discard(future)
+            raise
+
+        # Somewhere else
+        queue.release(1)
+    """
+
+    __slots__ = ("_heap", "_counter", "_waiting", "_priorities", "_counts")
+
+    # How many cancelled waiters can be in the heap before it gets compacted
+    _COMPACT_THRESHOLD: ClassVar[int] = 64
+
+    def __init__(self) -> None:
+        self._heap: list[WaiterQueueEntry] = []
+        self._counter: Iterator[int] = count()
+        self._waiting: int = 0  # Waiters that have not been released or discarded yet
+        self._priorities: dict[Future[None], float] = {}  # Priority of the waiters counted in _waiting
+        self._counts: dict[float, int] = {}  # How many waiters counted in _waiting have a priority
+
+    def __len__(self) -> int:
+        return self._waiting
+
+    def __bool__(self) -> bool:
+        return self._waiting != 0
+
+    def put(self, priority: float = 0, *, front: bool = False) -> Future[None]:
+        """Add a waiter to the queue.
+
+        Parameters
+        ----------
+        priority:
+            The priority of the waiter. **Lower** number means it will be released earlier.
+        front:
+            Put the waiter in front of the other waiters with the same priority.
+
+            This is for requests that have to be retried, so they do not lose their place.
+
+        Returns
+        -------
+        :class:`asyncio.Future`
+            A future that will be completed when the waiter is released.
+        """
+        future: Future[None] = get_running_loop().create_future()
+        order = next(self._counter)
+        if front:
+            # Still released in the order they were added, but before everything added normally.
+            order += _FRONT_OFFSET
+        heappush(self._heap, (priority, order, future))
+        self._waiting += 1
+        self._priorities[future] = priority
+        self._counts[priority] = self._counts.get(priority, 0) + 1
+        return future
+
+    def release(self, max_count: int | None = None) -> int:
+        """Release waiters from the queue, skipping cancelled ones.
+
+        Parameters
+        ----------
+        max_count:
+            The maximum amount of waiters to release. If this is :data:`None`, all waiters will be released.
+
+        Returns
+        -------
+        :class:`int`
+            How many waiters were released.
+        """
+        heap = self._heap
+        released = 0
+        while heap and (max_count is None or released < max_count):
+            future = heappop(heap)[2]
+            if future.done():
+                # Cancelled while waiting. This is accounted for in discard.
+                continue
+            future.set_result(None)
+            self._forget(future)
+            released += 1
+        return released
+
+    def count_ahead(self, priority: float = 0) -> int:
+        """How many waiters would be released before a new waiter with this priority.
+
+        This goes through the priorities in use rather than the waiters, see ``benchmarks/estimate_wait.py``.
+
+        Parameters
+        ----------
+        priority:
+            The priority of the new waiter. **Lower** number means it will be released earlier.
+        """
+        if not self._waiting:
+            return 0
+        return sum(count for waiter_priority, count in self._counts.items() if waiter_priority <= priority)
+
+    def discard(self, future: Future[None]) -> None:
+        """Remove a waiter that stopped waiting.
+
+        This should be called when awaiting a future from :meth:`WaiterQueue.put` raises a exception.
+        If the waiter was already released, the spot it was given will be passed on to the next waiter.
+
+        Parameters
+        ----------
+        future:
+            The future returned by :meth:`WaiterQueue.put`
+        """
+        if future.done() and not future.cancelled():
+            if future.exception() is not None:
+                # Stopped by close, which already emptied the queue.
+                return
+            # Already out of the queue, however it never used its spot. Give it to someone else.
+            logger.debug("Released waiter was cancelled, passing the spot on")
+            self.release(1)
+            return
+
+        # This is lazily removed in release. Cancelling it here in case it stopped waiting for another reason.
+        future.cancel()
+        if future not in self._priorities:
+            # Already discarded, or it was cancelled before the waiters were moved to another queue.
+            return
+        self._forget(future)
+
+        dead = len(self._heap) - self._waiting
+        if dead > self._COMPACT_THRESHOLD and dead > self._waiting:
+            self._compact()
+
+    def move_to(self, queue: WaiterQueue) -> int:
+        """Move every waiter to another queue.
+
+        The waiters keep their priority and order, and are put behind the waiters with the same priority that are already in ``queue``.
+        This queue is empty afterwards.
+
+        Parameters
+        ----------
+        queue:
+            The queue to move the waiters to.
+
+        Returns
+        -------
+        :class:`int`
+            How many waiters were moved.
+        """
+        entries = sorted(entry for entry in self._heap if not entry[2].done())
+        self._heap = []
+        self._waiting = 0
+        self._priorities = {}
+        self._counts = {}
+
+        for priority, order, future in entries:
+            new_order = next(queue._counter)
+            if order < 0:
+                # Put in the front with put(front=True)
+                new_order += _FRONT_OFFSET
+            heappush(queue._heap, (priority, new_order, future))
+            queue._priorities[future] = priority
+            queue._counts[priority] = queue._counts.get(priority, 0) + 1
+        queue._waiting += len(entries)
+        return len(entries)
+
+    def close(self, exception: BaseException | type[BaseException] = CancelledError) -> None:
+        """Stop every waiter in the queue.
+
+        The queue is empty afterwards, so it can still be used.
+
+        Parameters
+        ----------
+        exception:
+            The exception to raise in the waiters.
+        """
+        heap = self._heap
+        self._heap = []
+        self._waiting = 0
+        self._priorities = {}
+        self._counts = {}
+
+        for _, _, future in heap:
+            if not future.done():
+                future.set_exception(exception)
+
+    def _forget(self, future: Future[None]) -> None:
+        """Stop counting a waiter that was released or discarded"""
+        priority = self._priorities.pop(future)
+        count = self._counts[priority] - 1
+        if count:
+            self._counts[priority] = count
+        else:
+            del self._counts[priority]
+        self._waiting -= 1
+
+    def _compact(self) -> None:
+        logger.debug("Compacting waiter queue with %s cancelled waiters", len(self._heap) - self._waiting)
+        self._heap = [entry for entry in self._heap if not entry[2].done()]
+        heapify(self._heap)
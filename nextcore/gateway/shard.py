@@ -151,6 +151,12 @@ class Shard:
         The last sequence number of the current session.
     should_reconnect:
         Whether the gateway should reconnect or not.
+    reconnects:
+        How many times this shard has reconnected to the gateway.
+    received_events:
+        How many DISPATCH events has been received.
+    decompressed_bytes:
+        How many bytes has been received from the gateway after decompressing.
     """
 
     __slots__ = (
@@ -169,6 +175,9 @@ class Shard:
         "session_id",
         "session_sequence_number",
         "should_reconnect",
+        "reconnects",
+        "received_events",
+        "decompressed_bytes",
         "_identify_rate_limiter",
         "_send_rate_limit",
         "_connect_lock",
@@ -216,6 +225,11 @@ class Shard:
         self.session_sequence_number: int | None = None
         self.should_reconnect: bool = True  # This should be set by the user.
 
+        # Statistics
+        self.reconnects: int = 0
+        self.received_events: int = 0
+        self.decompressed_bytes: int = 0
+
         # User's internals
         # Should generally only be set once
         self._identify_rate_limiter: TimesPer = identify_rate_limiter
@@ -274,6 +288,9 @@ class Shard:
 
             self._logger.debug("Connected to websocket")
 
+            if self._ws is not None:
+                self.reconnects += 1
+
             # Disconnect previously connected ws
             await self.close(cleanup=False)
 
@@ -353,6 +370,14 @@ class Shard:
             raise RuntimeError("Not heartbeated yet.")
         return self._latency
 
+    @property
+    def send_rate_limit(self) -> TimesPer | None:
+        """The rate limit for sending gateway commands.
+
+        This is :data:`None` if not connected to the gateway.
+        """
+        return self._send_rate_limit
+
     async def _send(
         self, data: Any, wait_until_ready: bool = True
     ) -> None:  # TODO: A command union is not implemented in discord_typings yet.
@@ -495,6 +520,8 @@ class Shard:
             self._logger.debug("Received partial data, waiting for more")
             return
 
+        self.decompressed_bytes += len(raw_data)
+
         # Discord is trusted to send valid payloads here.
         data = json_loads(raw_data.decode("utf-8"))
 
@@ -514,6 +541,7 @@ class Shard:
             # Received dispatch
             # We are just trusing discord to provide the correct data here.
             dispatch_data: DispatchEvent = frozen_data
+            self.received_events += 1
             await self.event_dispatcher.dispatch(dispatch_data["t"], dispatch_data["d"])
 
     async def _on_disconnect(self, ws: ClientWebSocketResponse) -> None:
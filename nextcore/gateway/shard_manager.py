@@ -348,6 +348,14 @@ class ShardManager:
 
         await self.close()
 
+    @property
+    def identify_rate_limits(self) -> dict[int, TimesPer]:
+        """The identify rate limits by ``shard_id % max_concurrency``.
+
+        This is a copy, and only includes rate limits that have been used.
+        """
+        return dict(self._identify_rate_limits)
+
     async def close(self) -> None:
         logger.debug("Closing shards")
         for shard in self.active_shards:
@@ -29,8 +29,11 @@ from .authentication import *
 from .bucket import *
 from .bucket_metadata import *
 from .client import *
+from .clock_estimator import *
 from .errors import *
 from .global_rate_limiter import *
+from .invalid_request_tracker import *
 from .rate_limit_storage import *
 from .request_session import *
+from .request_timings import *
 from .route import *
@@ -21,18 +21,19 @@
 
 from __future__ import annotations
 
-from asyncio import CancelledError, Event, get_running_loop
-from contextlib import asynccontextmanager
+from asyncio import Event, get_running_loop
 from logging import getLogger
-from queue import PriorityQueue
 from typing import TYPE_CHECKING, cast, overload
 
 from nextcore.common.errors import RateLimitedError
-
-from .request_session import RequestSession
+from nextcore.common.timer_wheel import get_timer_wheel
+from nextcore.common.waiter_queue import WaiterQueue
 
 if TYPE_CHECKING:
-    from typing import AsyncIterator, Final, Literal
+    from types import TracebackType
+    from typing import AsyncContextManager, Final, Literal
+
+    from nextcore.common.timer_wheel import TimerHandle
 
     from .bucket_metadata import BucketMetadata
 
@@ -40,6 +41,11 @@ logger = getLogger(__name__)
 
 __all__: Final[tuple[str, ...]] = ("Bucket",)
 
+# How a _BucketAcquire got its spot
+_UNLIMITED: Final[int] = 0
+_LIMITED: Final[int] = 1
+_BLIND: Final[int] = 2
+
 
 class Bucket:
     """A discord rate limit implementation around a bucket.
@@ -70,34 +76,60 @@ class Bucket:
         How much the resetting should be offset to account for processing/networking delays.
 
         This will be added to the reset time, so for example a offset of ``1`` will make resetting 1 second slower.
+    speculative_requests:
+        How many requests can be in progress at once while the rate limit is not known yet.
+
+        With the default of ``1``, only one request is made to find out the rate limit, and every other request waits for it.
+        Setting this higher lets more requests through at once, but requests that turn out to be over the limit will get a 429.
+
+        .. note::
+            This is ignored by buckets shared between processes.
     """
 
     __slots__ = (
         "metadata",
         "reset_offset_seconds",
+        "speculative_requests",
         "_remaining",
         "_pending",
         "_reserved",
-        "_resetting",
+        "_reset_at",
+        "_reset_handle",
+        "_window_end",
+        "_window_length",
         "_can_do_blind_request",
+        "_blind_requests",
+        "_paused_until",
+        "_pause_handle",
+        "_merged_into",
         "__weakref__",
     )
 
     def __init__(self, metadata: BucketMetadata):
         self.metadata: BucketMetadata = metadata
         self.reset_offset_seconds: float = 0
+        self.speculative_requests: int = 1
         self._remaining: int | None = None  # None signifies unlimited or not used yet (due to a optimization)
-        self._pending: PriorityQueue[RequestSession] = PriorityQueue()
-        self._reserved: list[RequestSession] = []
-        self._resetting: bool = False
+        self._pending: WaiterQueue = WaiterQueue()
+        self._reserved: int = 0  # Requests currently in progress
+        self._reset_at: float | None = None  # Event loop time of the pending reset
+        self._reset_handle: TimerHandle | None = None
+        self._window_end: float | None = None  # Event loop time the latest known window ends at, kept after it resets
+        self._window_length: float = 0  # The longest reset_after seen, used to tell windows apart
         self._can_do_blind_request: Event = Event()
+        self._blind_requests: int = 0  # Requests in progress while the rate limit is not known
+        self._paused_until: float | None = None  # Event loop time the pause ends at
+        self._pause_handle: TimerHandle | None = None
+        self._merged_into: Bucket | None = None  # The bucket that took over this rate limit
 
         self._can_do_blind_request.set()
 
-    @asynccontextmanager
-    async def acquire(self, *, priority: int = 0, wait: bool = True) -> AsyncIterator[None]:
+    def acquire(self, *, priority: int = 0, wait: bool = True, requeue: bool = False) -> AsyncContextManager[bool]:
         """Use a spot in the rate limit.
 
+        This returns whether the request is speculative. A speculative request is a extra request let through while the rate limit is not known yet,
+        see :attr:`Bucket.speculative_requests`.
+
         **Example usage**
 
         .. code-block:: python3
@@ -114,88 +146,191 @@ class Bucket:
             Wait for a spot in the rate limit.
 
             If this is set to :data:`False`, this will raise :exc:`RateLimitedError` if no spot is available right now.
+        requeue:
+            Whether this is a retry of a request that was rate limited.
+
+            If it has to wait, it will be put in front of the other requests with the same priority.
 
         Raises
         ------
         RateLimitedError
             You are rate limited and ``wait`` was set to :data:`False`
         """
-        if self.metadata.unlimited:
-            # Instantly return and avoid touching any of the state.
-            yield
-            return
+        return _BucketAcquire(self, priority, wait, requeue)
 
-        if self._remaining is None and self.metadata.limit is not None:
-            # We have info from metadata! Use that
-            self._remaining = self.metadata.limit
+    def pause(self, retry_after: float) -> None:
+        """Stop letting requests through for a while.
 
-        if self._remaining is not None:
-            # Already using this bucket
-
-            session = RequestSession(priority=priority)
-
-            estimated_remaining = self._remaining - len(
-                self._reserved
-            )  # We assume every request is successful, and retry when that is not the case.
-
-            if estimated_remaining == 0:
-                if not wait:
-                    raise RateLimitedError()
-                self._pending.put_nowait(
-                    session
-                )  # This can't raise a exception as pending is always infinite unless someone else modified it
-                await session.pending_future  # Wait for a spot in the rate limit.
-                # This will automatically be removed by the waker.
-
-            self._reserved.append(session)
-            try:
-                yield  # Let the user do the request
-            except:
-                # Release one request as we assume the request failed.
-                if self._pending.qsize() >= 1:
-                    self._release_pending(1)
-
-                raise  # Re-raise the exception
-            finally:
-                self._reserved.remove(session)
-            return
+        This is used when a request got a 429 anyway, for example from a ``shared`` rate limit.
+        Requests will wait until the pause is over, and are then let through up to the remaining spots.
 
-        # We have no info on rate limits, so we have to do a "blind" request to find out what the rate limits is.
-        # We will only do one "blind" request at a time per bucket though in case the rate limit is small.
-        # This could be tweaked to use more on routes with higher rate limits, however this would require hard coding which is not a thing I want
-        # for nextcore.
-        session = RequestSession(priority=priority)
+        **Example usage**
 
-        if self._can_do_blind_request.is_set():
-            self._can_do_blind_request.clear()
+        .. code-block:: python3
 
-            self._reserved.append(session)
-            try:
-                yield  # Let the user do the request
-            except:
-                # Release one request as we assume the request failed.
-                if self._pending.qsize() >= 1:
-                    self._release_pending(1)
+            async with bucket.acquire():
+                # Do request
+                if response.status == 429:
+                    bucket.pause(retry_after)
 
-                raise  # Re-raise the exception
-            else:
-                if self._remaining is None:
-                    logger.warning("A user of Bucket is not calling .update! This will cause performance issues...")
-                    self._release_pending(1)
-                else:
-                    self._release_pending(self._remaining)
-            finally:
-                self._reserved.remove(session)
-                self._can_do_blind_request.set()
-                logger.debug("Done cleaning up blind request!")
+        Parameters
+        ----------
+        retry_after:
+            How long to pause for in seconds.
+        """
+        logger.debug("Pausing bucket for %ss", retry_after)
+        self._pause_until(get_running_loop().time() + retry_after + self.reset_offset_seconds)
+
+    def estimate_admission(self, priority: int = 0) -> float:
+        """Estimate when a new request would get a spot, without using one.
+
+        This counts the waiting requests that would go first, and how many resets it takes to get through them.
+
+        .. note::
+            If the rate limit or the next reset is not known yet, this can only say when the request gets in line.
+
+        Parameters
+        ----------
+        priority:
+            The priority of the request. A lower number means it will be executed faster.
+
+        Returns
+        -------
+        :class:`float`
+            The event loop time (see :meth:`asyncio.loop.time`) the request would get a spot at.
+        """
+        bucket = self._canonical()
+        now = get_running_loop().time()
+        start = now if bucket._paused_until is None else max(bucket._paused_until, now)
+
+        metadata = bucket.metadata
+        remaining = bucket._remaining if bucket._remaining is not None else metadata.limit
+        if metadata.unlimited or remaining is None:
+            return start
+
+        free = remaining - bucket._reserved
+        if len(bucket._pending) < free:
+            return start  # Not even every waiting request would be ahead of it
+        ahead = bucket._pending.count_ahead(priority)
+        if ahead < free:
+            return start
+
+        if bucket._reset_at is None:
+            return start  # Waiting for responses to find out when it resets
+        # The first reset lets the limit through, and every reset after that lets another limit through.
+        windows = (ahead - max(free, 0)) // max(metadata.limit or remaining, 1)
+        return max(bucket._reset_at + windows * bucket._window_length, start)
+
+    def _pause_until(self, paused_until: float) -> None:
+        if self._paused_until is not None and paused_until <= self._paused_until:
+            return  # Already paused for longer
+
+        if self._pause_handle is not None:
+            self._pause_handle.cancel()
+        self._paused_until = paused_until
+        self._pause_handle = get_timer_wheel().call_at(paused_until, self._resume)
+
+    def _resume(self) -> None:
+        self._paused_until = None
+        self._pause_handle = None
+        self._release_available()
+
+    def _release_available(self) -> None:
+        if self.metadata.unlimited:
+            self._release_pending()
+        elif self._remaining is None:
+            self._release_pending(self.metadata.limit)
+        else:
+            self._release_pending(max(self._remaining - self._reserved, 0))
+
+    async def _wait_while_paused(self, priority: int, wait: bool, requeue: bool) -> bool:
+        """Wait for :meth:`Bucket.pause` to end.
+
+        Returns
+        -------
+        :class:`bool`
+            Whether it had to wait. A waiter that was released after a pause has been given a spot.
+        """
+        if self._paused_until is None:
+            return False
+        if not wait:
+            raise RateLimitedError()
+
+        while self._paused_until is not None:
+            await self._wait_in_queue(priority, requeue)
+        return True
+
+    async def _wait_in_queue(self, priority: int, requeue: bool) -> None:
+        future = self._pending.put(priority, front=requeue)
+        try:
+            await future  # Wait for a spot in the rate limit.
+        except:
+            # Cancelled while waiting. This removes it from the queue, or gives the spot to someone else if it was already released.
+            # The waiter may have been moved to another bucket by merge_into while waiting.
+            self._canonical()._pending.discard(future)
+            raise
+
+    def merge_into(self, bucket: Bucket) -> None:
+        """Hand this rate limit over to another bucket.
+
+        This is used when Discord says two routes share a rate limit (same bucket hash), so it is only enforced once.
+
+        - Waiting requests are moved to ``bucket`` and keep their priority.
+        - Requests in progress are counted against ``bucket``, and :meth:`Bucket.acquire` calls that have not got a spot yet will continue on ``bucket``.
+        - The lowest remaining and the longest pause of the two are kept.
+
+        .. warning::
+            This instance should not be used afterwards.
+
+        Parameters
+        ----------
+        bucket:
+            The bucket that will enforce the rate limit from now on.
+        """
+        bucket = bucket._canonical()
+        if bucket is self or self._merged_into is not None:
             return
 
-        # Currently doing blind request
-        await self._can_do_blind_request.wait()
+        logger.debug("Merging bucket with %s pending and %s reserved requests", len(self._pending), self._reserved)
+        self._merged_into = bucket
 
-        # Try again
-        async with self.acquire(priority=priority, wait=wait):
-            yield
+        bucket._reserved += self._reserved
+        self._reserved = 0
+
+        if self._remaining is not None:
+            if bucket._remaining is None:
+                bucket._remaining = self._remaining
+            else:
+                bucket._remaining = min(bucket._remaining, self._remaining)
+        if self._reset_at is not None and bucket._reset_at is None:
+            bucket._reset_at = self._reset_at
+            bucket._window_end = self._reset_at
+            bucket._window_length = max(bucket._window_length, self._window_length)
+            bucket._reset_handle = get_timer_wheel().call_at(self._reset_at, bucket._reset_callback)
+        if self._reset_handle is not None:
+            self._reset_handle.cancel()
+        self._remaining = None
+        self._reset_at = None
+        self._reset_handle = None
+
+        if self._paused_until is not None:
+            bucket._pause_until(self._paused_until)
+            if self._pause_handle is not None:
+                self._pause_handle.cancel()
+            self._paused_until = None
+            self._pause_handle = None
+
+        self._pending.move_to(bucket._pending)
+        # Requests waiting for a blind request will retry on the other bucket
+        self._can_do_blind_request.set()
+        # The moved requests may fit in the other bucket straight away
+        bucket._release_available()
+
+    def _canonical(self) -> Bucket:
+        bucket = self
+        while bucket._merged_into is not None:
+            bucket = bucket._merged_into
+        return bucket
 
     @overload
     async def update(self, *, unlimited: Literal[True]) -> None:
@@ -208,45 +343,124 @@ class Bucket:
     async def update(
         self, remaining: int | None = None, reset_after: float | None = None, *, unlimited: bool = False
     ) -> None:
+        """Update the bucket with the rate limit info from a response.
+
+        Responses to concurrent requests can arrive out of order, so the window a response belongs to is found from when it resets.
+
+        - A response from the current window can only lower the remaining requests.
+        - A response from a window that has already reset is ignored.
+        - A response that resets later than the current window starts a new window.
+
+        Parameters
+        ----------
+        remaining:
+            How many requests are left in the window.
+        reset_after:
+            How long until the window resets in seconds.
+        unlimited:
+            Whether the bucket has no rate limit.
+        """
         if unlimited:
             # Updating metadata is handled by the HTTPClient, so we do not need to do this.
 
             # Release remaining requests
             self._release_pending()
-        else:
-            self._remaining = remaining
-
-            # Start a reset
-            if self._resetting:
-                return  # Don't do it when there is already a reset in progress
+            return
 
-            self._resetting = True
+        remaining = cast(int, remaining)
+        reset_after = cast(float, reset_after)
+        window_end = get_running_loop().time() + reset_after + self.reset_offset_seconds
+
+        # A new window can not start before the previous one ends, so it resets at least one window length later.
+        # Responses from the same window are allowed to be off by up to half a window due to network delays.
+        if self._window_end is not None and window_end < self._window_end + self._window_length / 2:
+            if self._reset_at is not None and (self._remaining is None or remaining < self._remaining):
+                # Same window, a lower remaining is always newer.
+                self._remaining = remaining
+            # Otherwise it is from a window that already reset, or a out of order response.
+            return
 
-            # Call the reset callback (after the reset duration)
-            reset_after = cast(float, reset_after)
-            loop = get_running_loop()
-            loop.call_later(reset_after + self.reset_offset_seconds, self._reset_callback)
+        # New window
+        self._window_end = window_end
+        self._window_length = max(self._window_length, reset_after)
+        self._remaining = remaining
+        self._reset_at = window_end
+
+        wheel = get_timer_wheel()
+        if self._reset_handle is not None:
+            # The previous window is over already, and its reset would let requests through in the middle of this one.
+            self._reset_handle.cancel()
+            self._reset_handle = wheel.call_at(window_end, self._reset_callback)
+            self._release_available()
+        else:
+            self._reset_handle = wheel.call_at(window_end, self._reset_callback)
 
     def _reset_callback(self) -> None:
-        self._resetting = False  # Allow future resets
+        if self._merged_into is not None:
+            return  # Taken over by another bucket
+
+        self._reset_at = None  # Allow future resets
+        self._reset_handle = None
         self._remaining = None  # It should use metadata's limit as a starting point.
 
         # Reset up to the limit
         self._release_pending(self.metadata.limit)
 
-    def _release_pending(self, max_count: int | None = None):
-        if max_count is None:
-            max_count = self._pending.qsize()
-        else:
-            max_count = min(max_count, self._pending.qsize())
+    def _release_pending(self, max_count: int | None = None) -> None:
+        if self._paused_until is not None:
+            # Released when the pause ends instead
+            return
+        released = self._pending.release(max_count)
+        logger.debug("Released %s requests", released)
+
+    @property
+    def remaining(self) -> int | None:
+        """How many requests are left in the current rate limit window.
 
-        for _ in range(max_count):
-            session = self._pending.get_nowait()  # This can't raise a exception due to the guard clause.
+        This is :data:`None` if it is not known yet or the bucket has reset.
+        """
+        return self._remaining
 
-            # Mark it as completed in the queue to avoid a infinitly overflowing int
-            self._pending.task_done()
+    @property
+    def pending(self) -> int:
+        """How many requests are waiting for a spot"""
+        return len(self._pending)
 
-            session.pending_future.set_result(None)
+    @property
+    def available(self) -> int | None:
+        """How many more requests can get a spot right now without waiting.
+
+        This is :data:`None` if the bucket is unlimited or the rate limit is not known yet.
+        """
+        if self.metadata.unlimited:
+            return None
+        remaining = self._remaining if self._remaining is not None else self.metadata.limit
+        if remaining is None:
+            return None
+        if self._paused_until is not None:
+            return 0
+        return max(remaining - self._reserved - len(self._pending), 0)
+
+    @property
+    def paused(self) -> bool:
+        """Whether the bucket is paused by :meth:`Bucket.pause`"""
+        return self._paused_until is not None
+
+    @property
+    def paused_until(self) -> float | None:
+        """The event loop time (see :meth:`asyncio.loop.time`) the pause from :meth:`Bucket.pause` ends at.
+
+        This is :data:`None` if the bucket is not paused.
+        """
+        return self._paused_until
+
+    @property
+    def reset_at(self) -> float | None:
+        """The event loop time (see :meth:`asyncio.loop.time`) the bucket will reset at.
+
+        This is :data:`None` if no reset is pending.
+        """
+        return self._reset_at
 
     @property
     def dirty(self) -> bool:
@@ -257,6 +471,9 @@ class Bucket:
         if self._reserved:
             return True  # Currently doing a request.
 
+        if self._paused_until is not None:
+            return True  # Waiting for a pause to end.
+
         if self.metadata.unlimited:
             return False  # Unlimited, following stuff does not matter
 
@@ -273,5 +490,125 @@ class Bucket:
         .. warning::
             Continued use of this instance will result in instability
         """
-        for session in self._pending.queue:
-            session.pending_future.set_exception(CancelledError)
+        if self._pause_handle is not None:
+            self._pause_handle.cancel()
+        if self._reset_handle is not None:
+            self._reset_handle.cancel()
+        self._pending.close()
+
+
+class _BucketAcquire:
+    """The context manager returned by :meth:`Bucket.acquire`
+
+    This only creates a future if it has to wait.
+
+    Attributes
+    ----------
+    used:
+        Whether the request was sent. A request that is cancelled after this is set still counts against the rate limit.
+    """
+
+    __slots__ = ("_bucket", "_priority", "_wait", "_requeue", "_mode", "used")
+
+    def __init__(self, bucket: Bucket, priority: int, wait: bool, requeue: bool) -> None:
+        self._bucket: Bucket = bucket
+        self._priority: int = priority
+        self._wait: bool = wait
+        self._requeue: bool = requeue
+        self._mode: int = _UNLIMITED
+        self.used: bool = False
+
+    async def __aenter__(self) -> bool:
+        bucket = self._bucket
+        metadata = bucket.metadata
+        released = False  # Released from the queue, which means it has been given a spot
+
+        while True:
+            if bucket._merged_into is not None:
+                # Merged while waiting, continue on the bucket that took over.
+                bucket = bucket._canonical()
+                metadata = bucket.metadata
+
+            if bucket._paused_until is not None:
+                released = await bucket._wait_while_paused(self._priority, self._wait, self._requeue)
+                continue
+
+            if metadata.unlimited:
+                # Instantly return and avoid touching any of the state.
+                self._mode = _UNLIMITED
+                return False
+
+            if bucket._remaining is None and metadata.limit is not None:
+                # We have info from metadata! Use that
+                bucket._remaining = metadata.limit
+
+            if bucket._remaining is not None:
+                # Already using this bucket
+
+                # We assume every request is successful, and retry when that is not the case.
+                if not released and bucket._remaining - bucket._reserved <= 0:
+                    if not self._wait:
+                        raise RateLimitedError()
+                    await bucket._wait_in_queue(self._priority, self._requeue)
+                    released = True
+                    continue  # It may have been paused while waiting
+
+                bucket._reserved += 1
+                self._bucket = bucket
+                self._mode = _LIMITED
+                return False
+
+            # We have no info on rate limits, so we have to do a "blind" request to find out what the rate limits is.
+            # By default only one "blind" request is done at a time per bucket in case the rate limit is small.
+            # Users that know their routes have higher rate limits can opt in to more with Bucket.speculative_requests.
+            if bucket._blind_requests < max(bucket.speculative_requests, 1):
+                bucket._blind_requests += 1
+                bucket._reserved += 1
+                self._bucket = bucket
+                self._mode = _BLIND
+                return bucket._blind_requests > 1
+
+            # Too many blind requests, try again after one is done.
+            bucket._can_do_blind_request.clear()
+            await bucket._can_do_blind_request.wait()
+            released = False  # Waiting for the blind request did not give it a spot
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        mode = self._mode
+        if mode == _UNLIMITED:
+            return
+
+        acquired = self._bucket
+        bucket = acquired
+        if bucket._merged_into is not None:
+            # The reservation was moved by Bucket.merge_into
+            bucket = bucket._canonical()
+
+        bucket._reserved -= 1
+
+        if exc_type is not None and self.used and bucket._remaining is not None:
+            # Discord counted the request, but there will be no response to update the bucket from.
+            bucket._remaining = max(bucket._remaining - 1, 0)
+            if mode == _BLIND and bucket is acquired:
+                bucket._release_available()
+        elif exc_type is not None:
+            # Release one request as we assume the request failed.
+            bucket._release_pending(1)
+        elif mode == _BLIND and bucket is acquired:
+            # A merged bucket already released what fits in Bucket.merge_into
+            if bucket._remaining is None:
+                logger.warning("A user of Bucket is not calling .update! This will cause performance issues...")
+                bucket._release_pending(1)
+            else:
+                # Other blind requests may still be in progress, so only release what is left after them.
+                bucket._release_available()
+
+        if mode == _BLIND:
+            acquired._blind_requests -= 1
+            acquired._can_do_blind_request.set()
+            logger.debug("Done cleaning up blind request!")
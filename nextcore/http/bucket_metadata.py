@@ -52,6 +52,8 @@ class BucketMetadata:
     unlimited:
         Whether the bucket has an unlimited number of requests. If this is :class:`True`,
         limit has to be None.
+    bucket_hash:
+        The Discord bucket hash for the route. This can be found in the ``X-RateLimit-Bucket`` header.
 
     Attributes
     ----------
@@ -64,10 +66,15 @@ class BucketMetadata:
             This will also be :data:`None` if no limit has been fetched yet.
     unlimited:
         Wheter the bucket has no rate limiting enabled.
+    bucket_hash:
+        The Discord bucket hash for the route. This can be found in the ``X-RateLimit-Bucket`` header.
+
+        This will be :data:`None` if no request with rate limit headers has been made yet.
     """
 
-    __slots__ = ("limit", "unlimited")
+    __slots__ = ("limit", "unlimited", "bucket_hash")
 
-    def __init__(self, limit: int | None = None, *, unlimited: bool = False) -> None:
+    def __init__(self, limit: int | None = None, *, unlimited: bool = False, bucket_hash: str | None = None) -> None:
         self.limit: int | None = limit
         self.unlimited: bool = unlimited
+        self.bucket_hash: str | None = bucket_hash
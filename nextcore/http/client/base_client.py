@@ -54,7 +54,9 @@ class BaseHTTPClient(ABC):
         headers: dict[str, str] | None = None,
         bucket_priority: int = 0,
         global_priority: int = 0,
+        traffic_class: str | None = None,
         wait: bool = True,
+        deadline: float | None = None,
         **kwargs: Any,
     ) -> ClientResponse:
         ...
@@ -0,0 +1,158 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from frozendict import frozendict
+
+if TYPE_CHECKING:
+    from typing import Any, Final, Mapping
+
+    from aiohttp import ClientResponse
+
+    from ..authentication import BaseAuthentication
+    from ..rate_limit_storage import RateLimitStorage
+    from ..route import Route
+    from .client import HTTPClient
+
+__all__: Final[tuple[str, ...]] = ("BoundHTTPClient",)
+
+
+class BoundHTTPClient:
+    """A :class:`HTTPClient` bound to one :class:`BaseAuthentication`.
+
+    The rate limit storage and the headers are resolved once instead of on every request,
+    which helps when doing a lot of requests with the same token.
+
+    .. note::
+        This should be created through :meth:`HTTPClient.bind`.
+
+    .. warning::
+        Changes to :attr:`HTTPClient.default_headers` after binding will not be picked up.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        bot_client = http_client.bind(BotAuthentication(os.environ["TOKEN"]))
+
+        route = Route("GET", "/gateway/bot")
+        response = await bot_client.request(route)
+
+    Parameters
+    ----------
+    http_client:
+        The client to send requests through.
+    authentication:
+        The authentication to use for every request. If this is :data:`None`, requests will be unauthenticated.
+
+    Attributes
+    ----------
+    http_client:
+        The client to send requests through.
+    authentication:
+        The authentication to use for every request.
+    rate_limit_key:
+        The rate limit key of :attr:`BoundHTTPClient.authentication`.
+    headers:
+        :attr:`HTTPClient.default_headers` merged with the authentication headers.
+    """
+
+    __slots__ = ("http_client", "authentication", "rate_limit_key", "headers", "_rate_limit_storage")
+
+    def __init__(self, http_client: HTTPClient, authentication: BaseAuthentication | None) -> None:
+        self.http_client: HTTPClient = http_client
+        self.authentication: BaseAuthentication | None = authentication
+
+        if authentication is None:
+            self.rate_limit_key: str | None = None
+            self.headers: frozendict[str, str] = frozendict(http_client.default_headers)
+        else:
+            self.rate_limit_key = authentication.rate_limit_key
+            self.headers = frozendict({**http_client.default_headers, **authentication.headers})
+
+        # This is resolved on the first request, as HTTPClient.setup may not have restored it yet.
+        self._rate_limit_storage: RateLimitStorage | None = None
+
+    async def request(
+        self,
+        route: Route,
+        *,
+        headers: Mapping[str, str] | None = None,
+        bucket_priority: int = 0,
+        global_priority: int = 0,
+        traffic_class: str | None = None,
+        wait: bool = True,
+        deadline: float | None = None,
+        **kwargs: Any,
+    ) -> ClientResponse:
+        """Requests a route from the Discord API
+
+        This takes the same parameters as :meth:`HTTPClient.request`, except for ``rate_limit_key``.
+
+        Parameters
+        ----------
+        route:
+            The route to request
+        headers:
+            Headers to mix with :attr:`BoundHTTPClient.headers` to pass to :meth:`aiohttp.ClientSession.request`
+        bucket_priority:
+            The request priority to pass to :class:`Bucket`. **Lower** priority will be picked first.
+        global_priority:
+            The request priority for global requests. **Lower** priority will be picked first.
+        traffic_class:
+            The kind of request, for sharing the global rate limit fairly between them.
+        wait:
+            Wait when rate limited.
+
+            This will raise :exc:`RateLimitedError` if set to :data:`False` and you are rate limited.
+        deadline:
+            The event loop time (see :meth:`asyncio.loop.time`) the request has to get a spot in the rate limits by.
+        kwargs:
+            Keyword arguments to pass to :meth:`aiohttp.ClientSession.request`
+
+        Returns
+        -------
+        ClientResponse
+            The response from the request.
+        """
+        rate_limit_storage = self._rate_limit_storage
+        if rate_limit_storage is None:
+            rate_limit_storage = await self.http_client._get_rate_limit_storage(  # pyright: ignore [reportPrivateUsage]
+                self.rate_limit_key
+            )
+            self._rate_limit_storage = rate_limit_storage
+
+        merged_headers = self.headers if headers is None else {**self.headers, **headers}
+
+        return await self.http_client._request(  # pyright: ignore [reportPrivateUsage]
+            route,
+            rate_limit_storage,
+            merged_headers,
+            bucket_priority=bucket_priority,
+            global_priority=global_priority,
+            traffic_class=traffic_class,
+            wait=wait,
+            deadline=deadline,
+            **kwargs,
+        )
@@ -21,40 +21,102 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
+import os
+from asyncio import TimeoutError as AsyncioTimeoutError
+from asyncio import FIRST_COMPLETED, CancelledError, create_task, get_running_loop
+from asyncio import wait as asyncio_wait
+from asyncio import wait_for
+from collections import Counter, defaultdict
 from logging import getLogger
-from time import time
+from math import inf
 from typing import TYPE_CHECKING
 
-from aiohttp import ClientSession
+from aiohttp import ClientSession, TraceConfig
 
 from ... import __version__ as nextcore_version
-from ...common import UNDEFINED, Dispatcher, UndefinedType
+from ...common import UNDEFINED, Dispatcher, TimesPer, UndefinedType, json_dumps, json_loads
+from ...common.errors import RateLimitedError
 from ..bucket import Bucket
 from ..bucket_metadata import BucketMetadata
+from ..clock_estimator import ClockEstimator
 from ..errors import (
     BadRequestError,
     CloudflareBanError,
+    DeadlineExceededError,
     ForbiddenError,
     HTTPRequestStatusError,
     InternalServerError,
+    InvalidRequestBudgetError,
     NotFoundError,
     RateLimitingFailedError,
     UnauthorizedError,
 )
+from ..invalid_request_tracker import InvalidRequestTracker
 from ..rate_limit_storage import RateLimitStorage
+from ..rate_limit_storage.rate_limit_storage import _hash_rate_limit_key
+from ..request_timings import RequestTimingHistograms, RequestTimings
 from ..route import Route
 from .base_client import BaseHTTPClient
+from .bound_client import BoundHTTPClient
 
 if TYPE_CHECKING:
-    from typing import Any, Final, Literal
+    from asyncio import Future, Task
+    from types import TracebackType
+    from typing import Any, AsyncContextManager, Callable, Final, Literal, Mapping, Union
 
     from aiohttp import ClientResponse, ClientWebSocketResponse
 
+    from ..authentication import BaseAuthentication
+
+    StrPath = Union[str, "os.PathLike[str]"]
+
+    _RateLimitStoragesBase = defaultdict[Union[str, None], RateLimitStorage]
+else:
+    _RateLimitStoragesBase = defaultdict
+
 logger = getLogger(__name__)
 
 __all__: Final[tuple[str, ...]] = ("HTTPClient",)
 
+# Methods that can be sent twice without side effects
+_HEDGEABLE_METHODS: Final[frozenset[str]] = frozenset({"GET", "HEAD", "OPTIONS"})
+# Version 1 stored buckets keyed by string nextcore ids, which can not be restored since bucket keys became tuples.
+_RATE_LIMIT_STATE_VERSION: Final[int] = 2
+
+
+def _write_rate_limit_state(path: StrPath, contents: str) -> None:
+    # Write to a temporary file first so a crash while writing does not corrupt the old state.
+    temporary_path = f"{os.fspath(path)}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(contents)
+    os.replace(temporary_path, path)
+
+
+def _read_rate_limit_state(path: StrPath) -> str:
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+class _RateLimitStorages(_RateLimitStoragesBase):
+    """A :class:`collections.defaultdict` that passes the key to the factory"""
+
+    __slots__ = ("_factory",)
+
+    def __init__(self, factory: Callable[[str | None], RateLimitStorage]) -> None:
+        super().__init__(None)
+        self._factory: Callable[[str | None], RateLimitStorage] = factory
+
+    def __missing__(self, key: str | None) -> RateLimitStorage:
+        storage = self._factory(key)
+        self[key] = storage
+        return storage
+
+
+async def _on_connection_acquired(session: ClientSession, trace_config_ctx: Any, params: object) -> None:
+    timings = trace_config_ctx.trace_request_ctx
+    if isinstance(timings, RequestTimings):
+        timings.connected_at = get_running_loop().time()
+
 
 class HTTPClient(BaseHTTPClient):
     """The HTTP client to interface with the Discord API.
@@ -76,12 +138,30 @@ class HTTPClient(BaseHTTPClient):
         The default request timeout in seconds.
     max_rate_limit_retries:
         How many times to attempt to retry a request after rate limiting failed.
+    rate_limit_state_path:
+        A file to save learned rate limits to on :meth:`HTTPClient.close` and load them from on :meth:`HTTPClient.setup`.
+
+        This lets a restarted bot skip re-learning the rate limits of every route.
+    rate_limit_storage_factory:
+        A function that creates a :class:`RateLimitStorage` for a rate limit key.
+
+        This can be used to share rate limits between processes with :class:`SharedMemoryRateLimitStorage`.
+    speculative_requests:
+        How many requests to a route can be in progress at once while its rate limit is not known yet.
+    dispatch_request_timings:
+        Whether to dispatch the ``request_timings`` event after every request.
+    hedge_percentile:
+        Send a second request for idempotent routes if the first is slower than this percentile of the route.
+
+        If this is :data:`None`, requests are never hedged.
 
     Attributes
     ----------
     trust_local_time:
         If this is enabled, the rate limiter will use the local time instead of the discord provided time. This may improve your bot's speed slightly.
 
+        The local time is corrected by :attr:`HTTPClient.clock_estimator`.
+
         .. warning::
             If your time is not correct, and this is set to :data:`True`, this may result in more rate limits being hit.
 
@@ -141,6 +221,52 @@ class HTTPClient(BaseHTTPClient):
         Classes to store rate limit information.
 
         The key here is the rate_limit_key (often a user ID).
+    rate_limit_state_path:
+        A file to save learned rate limits to on :meth:`HTTPClient.close` and load them from on :meth:`HTTPClient.setup`.
+    rate_limit_storage_factory:
+        A function that creates a :class:`RateLimitStorage` for a rate limit key.
+
+        If this is :data:`None`, a in-memory :class:`RateLimitStorage` will be used.
+    speculative_requests:
+        How many requests to a route can be in progress at once while its rate limit is not known yet.
+
+        By default only one request is made to find out the rate limit, and every other request to the route waits for it.
+        Setting this higher makes bursts to new routes faster, however the requests that turn out to be over the limit will be rate limited and retried.
+        This can be overridden per route with :attr:`Route.speculative_requests`.
+        It is applied to the buckets of routes when they are created.
+    speculation_wins:
+        How many extra requests let through by :attr:`HTTPClient.speculative_requests` were not rate limited.
+    speculation_losses:
+        How many extra requests let through by :attr:`HTTPClient.speculative_requests` were rate limited and had to be retried.
+    rate_limited_responses:
+        How many 429 responses have been received by scope.
+
+        The scope is the ``X-RateLimit-Scope`` header, ``"global"`` or ``"unknown"`` if it was not sent,
+        or ``"cloudflare"`` for Cloudflare bans.
+    clock_estimator:
+        Learns the Discord clock offset, the round trip time and a safety margin to time bucket resets with.
+    invalid_request_tracker:
+        Counts ``401``, ``403`` and ``429`` responses for every rate limit key, and holds back requests
+        with a high ``bucket_priority`` before Cloudflare bans the IP.
+    request_timings:
+        Histograms of how long every phase of a request took, by route template and status class.
+    dispatch_request_timings:
+        Whether to dispatch the ``request_timings`` event after every request.
+    hedge_percentile:
+        Send a second request for ``GET``, ``HEAD`` and ``OPTIONS`` routes if the first one has not received a response after
+        this percentile (as a fraction, for example ``0.95``) of the time from sending a request to receiving the response headers
+        (:attr:`RequestTimings.sent_to_headers`) of the route in :attr:`HTTPClient.request_timings`.
+
+        The second request is only sent if the bucket and the global rate limit have a spot free right now, so it never has to wait or cause a 429.
+        The first response is used, and the other request is cancelled.
+
+        If this is :data:`None`, requests are never hedged.
+    hedge_min_samples:
+        How many successful requests to a route have to be timed before it is hedged.
+    hedged_requests:
+        How many second requests has been sent by :attr:`HTTPClient.hedge_percentile`.
+    hedge_wins:
+        How many second requests sent by :attr:`HTTPClient.hedge_percentile` responded first.
     dispatcher:
         Events from the HTTPClient. See the :ref:`events<HTTPClient dispatcher>`
     """
@@ -151,8 +277,25 @@ class HTTPClient(BaseHTTPClient):
         "default_headers",
         "max_retries",
         "rate_limit_storages",
+        "rate_limit_state_path",
         "dispatcher",
         "_session",
+        "rate_limit_storage_factory",
+        "speculative_requests",
+        "speculation_wins",
+        "speculation_losses",
+        "rate_limited_responses",
+        "clock_estimator",
+        "invalid_request_tracker",
+        "request_timings",
+        "dispatch_request_timings",
+        "hedge_percentile",
+        "hedge_min_samples",
+        "hedged_requests",
+        "hedge_wins",
+        "_pending_rate_limit_snapshots",
+        "_requests_in_progress",
+        "_drained",
     )
 
     def __init__(
@@ -161,6 +304,11 @@ class HTTPClient(BaseHTTPClient):
         trust_local_time: bool = True,
         timeout: float = 60,
         max_rate_limit_retries: int = 10,
+        rate_limit_state_path: StrPath | None = None,
+        rate_limit_storage_factory: Callable[[str | None], RateLimitStorage] | None = None,
+        speculative_requests: int = 1,
+        dispatch_request_timings: bool = False,
+        hedge_percentile: float | None = None,
     ) -> None:
         self.trust_local_time: bool = trust_local_time
         self.timeout: float = timeout
@@ -168,17 +316,36 @@ class HTTPClient(BaseHTTPClient):
             "User-Agent": f"DiscordBot (https://github.com/nextsnake/nextcore, {nextcore_version})"
         }
         self.max_retries: int = max_rate_limit_retries
-        self.rate_limit_storages: defaultdict[str | None, RateLimitStorage] = defaultdict(
-            RateLimitStorage
+        self.rate_limit_storages: defaultdict[str | None, RateLimitStorage] = _RateLimitStorages(
+            self._create_rate_limit_storage
         )  # User ID -> RateLimitStorage
-        self.dispatcher: Dispatcher[Literal["request_response"]] = Dispatcher()
+        self.rate_limit_state_path: StrPath | None = rate_limit_state_path
+        self.rate_limit_storage_factory: Callable[[str | None], RateLimitStorage] | None = rate_limit_storage_factory
+        self.speculative_requests: int = speculative_requests
+        self.speculation_wins: int = 0
+        self.speculation_losses: int = 0
+        self.rate_limited_responses: Counter[str] = Counter()
+        self.clock_estimator: ClockEstimator = ClockEstimator()
+        self.invalid_request_tracker: InvalidRequestTracker = InvalidRequestTracker()
+        self.request_timings: RequestTimingHistograms = RequestTimingHistograms()
+        self.dispatch_request_timings: bool = dispatch_request_timings
+        self.hedge_percentile: float | None = hedge_percentile
+        self.hedge_min_samples: int = 20
+        self.hedged_requests: int = 0
+        self.hedge_wins: int = 0
+        self.dispatcher: Dispatcher[Literal["request_response", "request_timings"]] = Dispatcher()
 
         # Internals
         self._session: ClientSession | None = None
+        self._pending_rate_limit_snapshots: dict[str, Any] = {}  # Hashed rate limit key -> snapshot
+        self._requests_in_progress: int = 0
+        self._drained: Future[None] | None = None  # Set when closing and waiting for requests to finish
 
     async def setup(self) -> None:
         """Sets up the HTTP session
 
+        This will also load rate limits from :attr:`HTTPClient.rate_limit_state_path` if it exists.
+
         .. warning::
             This has to be called before :meth:`HTTPClient._request` or :meth:`HTTPClient.connect_to_gateway`
 
@@ -189,10 +356,47 @@ class HTTPClient(BaseHTTPClient):
         """
         if self._session is not None:
             raise RuntimeError("This method can only be called once!")
-        self._session = ClientSession()
 
-    async def close(self) -> None:
-        """Clean up internal state"""
+        # Used to time how long it takes to get a connection
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(_on_connection_acquired)
+        trace_config.on_connection_reuseconn.append(_on_connection_acquired)
+        self._session = ClientSession(trace_configs=[trace_config])
+
+        if self.rate_limit_state_path is not None and os.path.exists(self.rate_limit_state_path):
+            try:
+                await self.load_rate_limit_state()
+            except (ValueError, KeyError, TypeError):
+                logger.exception("Could not load rate limit state from %s, ignoring it", self.rate_limit_state_path)
+
+    async def close(self, *, drain_timeout: float | None = None) -> None:
+        """Clean up internal state
+
+        If :attr:`HTTPClient.rate_limit_state_path` is set, the learned rate limits will be saved to it.
+
+        Parameters
+        ----------
+        drain_timeout:
+            How long to wait for requests in progress to finish before closing in seconds.
+
+            If this is :data:`None`, it will not wait.
+        """
+        if drain_timeout is not None and self._requests_in_progress:
+            logger.info("Waiting for %s requests to finish", self._requests_in_progress)
+            self._drained = get_running_loop().create_future()
+            try:
+                await wait_for(self._drained, timeout=drain_timeout)
+            except AsyncioTimeoutError:
+                logger.warning("Timed out waiting for %s requests to finish", self._requests_in_progress)
+            self._drained = None
+
+        if self.rate_limit_state_path is not None:
+            try:
+                await self.save_rate_limit_state()
+            except Exception:
+                # Not being able to save should not stop the rest from being cleaned up.
+                logger.exception("Could not save the rate limit state to %s", self.rate_limit_state_path)
+
         for rate_limit_storage in self.rate_limit_storages.values():
             await rate_limit_storage.close()
         self.rate_limit_storages.clear()
@@ -202,6 +406,115 @@ class HTTPClient(BaseHTTPClient):
         if self._session is not None:
             await self._session.close()
 
+    async def save_rate_limit_state(self, path: StrPath | None = None, *, include_buckets: bool = True) -> None:
+        """Save what has been learned about the rate limits to a file.
+
+        Rate limit keys are hashed before being saved.
+
+        Parameters
+        ----------
+        path:
+            The file to save to. If this is :data:`None` this will use :attr:`HTTPClient.rate_limit_state_path`
+        include_buckets:
+            Whether to save how many requests are remaining and when every bucket resets.
+
+        Raises
+        ------
+        ValueError
+            No path was provided and :attr:`HTTPClient.rate_limit_state_path` is not set.
+        """
+        if path is None:
+            path = self.rate_limit_state_path
+        if path is None:
+            raise ValueError("No path provided and HTTPClient.rate_limit_state_path is not set")
+
+        # Snapshots that were loaded but not used yet should be kept around for the next restart.
+        storages: dict[str, Any] = dict(self._pending_rate_limit_snapshots)
+        for rate_limit_key, rate_limit_storage in self.rate_limit_storages.items():
+            hashed_key = _hash_rate_limit_key(rate_limit_key)
+            storages[hashed_key] = await rate_limit_storage.snapshot(include_buckets=include_buckets)
+
+        contents = json_dumps({"version": _RATE_LIMIT_STATE_VERSION, "storages": storages})
+        await get_running_loop().run_in_executor(None, _write_rate_limit_state, path, contents)
+
+        logger.debug("Saved rate limit state for %s rate limit keys", len(storages))
+
+    async def load_rate_limit_state(self, path: StrPath | None = None) -> None:
+        """Load rate limits saved by :meth:`HTTPClient.save_rate_limit_state`
+
+        Parameters
+        ----------
+        path:
+            The file to load from. If this is :data:`None` this will use :attr:`HTTPClient.rate_limit_state_path`
+
+        Raises
+        ------
+        ValueError
+            No path was provided and :attr:`HTTPClient.rate_limit_state_path` is not set.
+        ValueError
+            The file is not a valid rate limit state file.
+        """
+        if path is None:
+            path = self.rate_limit_state_path
+        if path is None:
+            raise ValueError("No path provided and HTTPClient.rate_limit_state_path is not set")
+
+        state = json_loads(await get_running_loop().run_in_executor(None, _read_rate_limit_state, path))
+
+        if state.get("version") != _RATE_LIMIT_STATE_VERSION:
+            raise ValueError("Unsupported rate limit state version")
+
+        loaded_storages: dict[str, Any] = state["storages"]
+        existing_storages = {
+            _hash_rate_limit_key(rate_limit_key): storage
+            for rate_limit_key, storage in self.rate_limit_storages.items()
+        }
+        for hashed_key, snapshot in loaded_storages.items():
+            rate_limit_storage = existing_storages.get(hashed_key)
+            if rate_limit_storage is None:
+                # Rate limit keys are hashed, so this is restored when the storage is first used.
+                self._pending_rate_limit_snapshots[hashed_key] = snapshot
+                continue
+            await rate_limit_storage.restore(snapshot)
+
+        logger.info("Loaded rate limit state for %s rate limit keys", len(loaded_storages))
+
+    def _create_rate_limit_storage(self, rate_limit_key: str | None) -> RateLimitStorage:
+        if self.rate_limit_storage_factory is not None:
+            return self.rate_limit_storage_factory(rate_limit_key)
+        return RateLimitStorage()
+
+    async def _get_rate_limit_storage(self, rate_limit_key: str | None) -> RateLimitStorage:
+        rate_limit_storage = self.rate_limit_storages[rate_limit_key]
+
+        if self._pending_rate_limit_snapshots:
+            snapshot = self._pending_rate_limit_snapshots.pop(_hash_rate_limit_key(rate_limit_key), None)
+            if snapshot is not None:
+                await rate_limit_storage.restore(snapshot)
+        return rate_limit_storage
+
+    def bind(self, authentication: BaseAuthentication | None) -> BoundHTTPClient:
+        """Create a handle that does requests with one authentication
+
+        The rate limit storage and headers are resolved once, instead of on every request.
+        This is useful if you do a lot of requests with the same token.
+
+        **Example usage**
+
+        .. code-block:: python3
+
+            bot_client = http_client.bind(BotAuthentication(os.environ["TOKEN"]))
+
+            route = Route("GET", "/gateway/bot")
+            response = await bot_client.request(route)
+
+        Parameters
+        ----------
+        authentication:
+            The authentication to use. If this is :data:`None`, requests will be unauthenticated.
+        """
+        return BoundHTTPClient(self, authentication)
+
     async def request(
         self,
         route: Route,
@@ -210,7 +523,9 @@ class HTTPClient(BaseHTTPClient):
         headers: dict[str, str] | None = None,
         bucket_priority: int = 0,
         global_priority: int = 0,
+        traffic_class: str | None = None,
         wait: bool = True,
+        deadline: float | None = None,
         **kwargs: Any,
     ) -> ClientResponse:
         """Requests a route from the Discord API
@@ -232,12 +547,27 @@ class HTTPClient(BaseHTTPClient):
         global_priority:
             The request priority for global requests. **Lower** priority will be picked first.
 
+            .. warning::
+                This may be ignored by your :class:`BaseGlobalRateLimiter`.
+        traffic_class:
+            The kind of request, for sharing the global rate limit fairly between them.
+            See :class:`WeightedFairGlobalRateLimiter`.
+
             .. warning::
                 This may be ignored by your :class:`BaseGlobalRateLimiter`.
         wait:
             Wait when rate limited.
 
             This will raise :exc:`RateLimitedError` if set to :data:`False` and you are rate limited.
+        deadline:
+            The event loop time (see :meth:`asyncio.loop.time`) the request has to get a spot in the rate limits by.
+
+            If :meth:`HTTPClient.estimate_wait` says the request will be too late, this will raise :exc:`DeadlineExceededError` straight away.
+            If the deadline passes while waiting, the request is taken out of the queue and the same error is raised.
+            Once the request is sent, the deadline is no longer checked.
+
+            .. hint::
+                Interaction responses have to be sent within 3 seconds of receiving the interaction.
         kwargs:
             Keyword arguments to pass to :meth:`aiohttp.ClientSession.request`
 
@@ -257,6 +587,10 @@ class HTTPClient(BaseHTTPClient):
         CloudflareBanError
             You have been temporarily banned from the Discord API for 1 hour due to too many requests.
             Read the `documentation <https://discord.dev/opics/rate-limits#invalid-request-limit-aka-cloudflare-bans>`__ for more information.
+        InvalidRequestBudgetError
+            The request was not done to avoid a Cloudflare ban. See :attr:`HTTPClient.invalid_request_tracker`.
+        DeadlineExceededError
+            The request could not get a spot in the rate limits before ``deadline``.
         BadRequestError
             The request data was invalid.
         UnauthorizedError
@@ -270,82 +604,455 @@ class HTTPClient(BaseHTTPClient):
         HTTPRequestStatusError
             A non-200 status code was returned.
         """
+        # Get the per user rate limit storage
+        if self._pending_rate_limit_snapshots:
+            rate_limit_storage = await self._get_rate_limit_storage(rate_limit_key)
+        else:
+            # Nothing to restore, skip the coroutine
+            rate_limit_storage = self.rate_limit_storages[rate_limit_key]
+
+        # Merge default headers with user provided ones
+        if headers is None:
+            merged_headers = self.default_headers
+        else:
+            merged_headers = {**self.default_headers, **headers}
+
+        return await self._request(
+            route,
+            rate_limit_storage,
+            merged_headers,
+            bucket_priority=bucket_priority,
+            global_priority=global_priority,
+            traffic_class=traffic_class,
+            wait=wait,
+            deadline=deadline,
+            **kwargs,
+        )
+
+    async def estimate_wait(
+        self,
+        route: Route,
+        rate_limit_key: str | None,
+        *,
+        priority: int = 0,
+        global_priority: int | None = None,
+    ) -> float:
+        """Estimate how long a request would wait for the rate limits right now
+
+        This uses the remaining requests, the requests waiting ahead at the same or a lower priority and the reset times
+        of the bucket and the global rate limiter, as well as :attr:`HTTPClient.invalid_request_tracker`.
+        The same estimate is used for the ``deadline`` of :meth:`HTTPClient.request`.
+        Nothing is reserved, and the bucket is not counted as used. It takes a few microseconds, plus a little for every
+        priority the requests waiting ahead use. See ``benchmarks/estimate_wait.py``.
+
+        .. note::
+            Rate limits that are not known yet, and global rate limiters not based on :class:`TimesPer`, are assumed to not wait.
+
+        **Example usage**
+
+        .. code-block:: python3
+
+            if await http_client.estimate_wait(route, bot_token, priority=1) > 5:
+                # Use a webhook instead
+                ...
+
+        Parameters
+        ----------
+        route:
+            The route to request
+        rate_limit_key:
+            A ID used for differentiating rate limits. See :meth:`HTTPClient.request`.
+        priority:
+            The ``bucket_priority`` the request would be done with.
+        global_priority:
+            The ``global_priority`` the request would be done with. If this is :data:`None`, ``priority`` is used.
+
+        Returns
+        -------
+        :class:`float`
+            How many seconds the request would wait for a spot.
+
+            This is :data:`math.inf` if :attr:`HTTPClient.invalid_request_tracker` would reject the request.
+        """
+        if self._pending_rate_limit_snapshots:
+            rate_limit_storage = await self._get_rate_limit_storage(rate_limit_key)
+        else:
+            rate_limit_storage = self.rate_limit_storages[rate_limit_key]
+
+        # Looked up without creating a bucket or counting it as used. A missing bucket has not been used yet.
+        if rate_limit_storage.supports_nowait:
+            bucket = rate_limit_storage.peek_bucket_by_nextcore_id_nowait(route.bucket)
+        else:
+            bucket = await rate_limit_storage.peek_bucket_by_nextcore_id(route.bucket)
+
+        try:
+            throttle_delay = self.invalid_request_tracker.delay(priority)
+        except InvalidRequestBudgetError:
+            return inf
+
+        if global_priority is None:
+            global_priority = priority
+        estimated_admission = self._estimate_admission(route, bucket, rate_limit_storage, priority, global_priority)
+
+        # Read last so the estimates above are not in the future just because time passed.
+        now = get_running_loop().time()
+        # The invalid request tracker delay comes before the rate limits, and they may reset in the meantime
+        return max(estimated_admission - now, throttle_delay, 0)
+
+    async def _request(
+        self,
+        route: Route,
+        rate_limit_storage: RateLimitStorage,
+        headers: Mapping[str, str],
+        *,
+        bucket_priority: int,
+        global_priority: int,
+        wait: bool,
+        traffic_class: str | None = None,
+        deadline: float | None = None,
+        hedge: bool = True,
+        on_sent: Future[None] | None = None,
+        **kwargs: Any,
+    ) -> ClientResponse:
+        """Requests a route with a already resolved rate limit storage and headers.
+
+        This is shared by :meth:`HTTPClient.request` and :meth:`BoundHTTPClient.request`.
+
+        Parameters
+        ----------
+        route:
+            The route to request
+        rate_limit_storage:
+            The rate limit storage for the rate limit key.
+        headers:
+            The headers to send, already merged with :attr:`HTTPClient.default_headers`.
+        traffic_class:
+            The traffic class to pass to the global rate limiter.
+        deadline:
+            The event loop time the request has to get a spot in the rate limits by.
+        hedge:
+            Whether this request can be hedged. See :attr:`HTTPClient.hedge_percentile`.
+        on_sent:
+            A future to set when the request is handed to aiohttp.
+        """
         # Make sure we have a session
         if self._session is None:
             raise RuntimeError("HTTPClient.setup has to be called before request")
         if self._session.closed:
             raise RuntimeError("HTTPClient is closed")
 
-        # Get the per user rate limit storage
-        rate_limit_storage = self.rate_limit_storages[rate_limit_key]
-
-        # Ensure headers exists
-        if headers is None:
-            headers = {}
-
-        # Merge default headers with user provided ones
-        headers = {**self.default_headers, **headers}
+        if hedge and self.hedge_percentile is not None and route.method in _HEDGEABLE_METHODS:
+            hedge_after = self._get_hedge_threshold(route, self.hedge_percentile)
+            if hedge_after is not None:
+                return await self._hedged_request(
+                    route,
+                    rate_limit_storage,
+                    headers,
+                    hedge_after,
+                    bucket_priority=bucket_priority,
+                    global_priority=global_priority,
+                    traffic_class=traffic_class,
+                    wait=wait,
+                    deadline=deadline,
+                    **kwargs,
+                )
 
         retries = max(self.max_retries + 1, 1)
 
-        for _ in range(retries):
-            bucket = await self._get_bucket(route, rate_limit_storage)
-            async with bucket.acquire(priority=bucket_priority, wait=wait):
-                if not route.ignore_global:
-                    async with rate_limit_storage.global_rate_limiter.acquire(priority=global_priority, wait=wait):
-                        logger.info("Requesting %s %s", route.method, route.path)
-                        response = await self._session.request(
-                            route.method, route.BASE_URL + route.path, headers=headers, timeout=self.timeout, **kwargs
-                        )
+        loop = get_running_loop()
+        # aiohttp only has one context for tracing, so connection timing is skipped if the user brought their own.
+        trace_connection = "trace_request_ctx" not in kwargs
+
+        self._requests_in_progress += 1
+        try:
+            requeue = False  # Retries of rate limited requests keep their place in the queue
+            for _ in range(retries):
+                if deadline is not None and loop.time() >= deadline:
+                    raise DeadlineExceededError(deadline, loop.time())
+
+                # Retries are included, as they are what uses up the invalid request budget.
+                # Most requests are not throttled, so this only awaits when there is a delay.
+                throttle_delay = self.invalid_request_tracker.delay(bucket_priority)
+                if throttle_delay > 0:
+                    if deadline is not None and loop.time() + throttle_delay > deadline:
+                        raise DeadlineExceededError(deadline, loop.time() + throttle_delay)
+                    await self.invalid_request_tracker.acquire(priority=bucket_priority, wait=wait)
+
+                timings = RequestTimings(route.bucket[0], loop.time())
+                if trace_connection:
+                    kwargs["trace_request_ctx"] = timings
+
+                if rate_limit_storage.supports_nowait:
+                    bucket = self._get_bucket_nowait(route, rate_limit_storage)
                 else:
-                    # Interactions are immune to global rate limits, ignore them here.
-                    logger.info("Requesting (NO-GLOBAL) %s %s", route.method, route.path)
-                    response = await self._session.request(
-                        route.method, route.BASE_URL + route.path, headers=headers, timeout=self.timeout, **kwargs
+                    bucket = await self._get_bucket(route, rate_limit_storage)
+                bucket_acquire = bucket.acquire(priority=bucket_priority, wait=wait, requeue=requeue)
+                if deadline is not None:
+                    estimated_admission = self._estimate_admission(
+                        route, bucket, rate_limit_storage, bucket_priority, global_priority
+                    )
+                    if estimated_admission > deadline:
+                        raise DeadlineExceededError(deadline, estimated_admission)
+                    bucket_acquire = _DeadlineAcquire(bucket_acquire, deadline)
+
+                async with bucket_acquire as speculative:
+                    timings.bucket_acquired_at = loop.time()
+                    if not route.ignore_global:
+                        global_rate_limiter = rate_limit_storage.global_rate_limiter
+                        if traffic_class is None:
+                            # Global rate limiters from before traffic classes do not take the argument.
+                            global_acquire = global_rate_limiter.acquire(priority=global_priority, wait=wait)
+                        else:
+                            global_acquire = global_rate_limiter.acquire(
+                                priority=global_priority, wait=wait, traffic_class=traffic_class
+                            )
+                        if deadline is not None:
+                            global_acquire = _DeadlineAcquire(global_acquire, deadline)
+                        async with global_acquire:
+                            logger.info("Requesting %s %s", route.method, route.path)
+                            timings.global_acquired_at = loop.time()
+                            if on_sent is not None and not on_sent.done():
+                                on_sent.set_result(None)
+                            try:
+                                response = await self._session.request(
+                                    route.method,
+                                    route.url,
+                                    headers=headers,
+                                    timeout=self.timeout,
+                                    **kwargs,
+                                )
+                            except CancelledError:
+                                # Discord still counts it, for example when it lost to a hedged request.
+                                _mark_used(bucket_acquire, global_acquire)
+                                raise
+                    else:
+                        # Interactions are immune to global rate limits, ignore them here.
+                        logger.info("Requesting (NO-GLOBAL) %s %s", route.method, route.path)
+                        timings.global_acquired_at = timings.bucket_acquired_at
+                        if on_sent is not None and not on_sent.done():
+                            on_sent.set_result(None)
+                        try:
+                            response = await self._session.request(
+                                route.method, route.url, headers=headers, timeout=self.timeout, **kwargs
+                            )
+                        except CancelledError:
+                            _mark_used(bucket_acquire)
+                            raise
+                    timings.headers_at = loop.time()
+                    bucket = await self._update_bucket(
+                        response, route, bucket, rate_limit_storage, timings.time_to_headers
                     )
-                await self._update_bucket(response, route, bucket, rate_limit_storage)
+
+                    if response.status == 429 and "via" in response.headers:
+                        # The retry after is only in the body, and the bucket has to be paused before anyone else gets to use it.
+                        await self._handle_rate_limited_error(
+                            route, response, bucket, rate_limit_storage, speculative=speculative
+                        )
+                # The bucket is released as soon as the rate limit headers are read.
+
+                if response.status in (401, 403) or (
+                    response.status == 429 and response.headers.get("X-RateLimit-Scope") != "shared"
+                ):
+                    # Shared rate limits are the only ones that do not count towards Cloudflare bans.
+                    self.invalid_request_tracker.record()
+
+                if speculative:
+                    if response.status == 429:
+                        self.speculation_losses += 1
+                    else:
+                        self.speculation_wins += 1
 
                 logger.debug("Response status: %s", response.status)
                 await self.dispatcher.dispatch("request_response", response)
 
+                timings.status = response.status
+                timings.finished_at = loop.time()
+                self.request_timings.record(timings)
+                if self.dispatch_request_timings:
+                    await self.dispatcher.dispatch("request_timings", timings)
+
                 # Response handling
                 if response.status < 300:
                     # Ok!
                     return response
 
-                await self._handle_response_error(route, response, rate_limit_storage)
+                if response.status != 429:
+                    await self._handle_response_error(response)
+
+                # Cloudflare bans arent proxied so via is not sent
+                # These bans are usually 1h, however they can be permenant due to repeat offense.
+                if "via" not in response.headers:
+                    self.rate_limited_responses["cloudflare"] += 1
+                    raise CloudflareBanError()
+                requeue = True
+        finally:
+            self._requests_in_progress -= 1
+            if self._drained is not None and not self._requests_in_progress and not self._drained.done():
+                self._drained.set_result(None)
 
         raise RateLimitingFailedError(self.max_retries, response)  # pyright: ignore [reportUnboundVariable]
 
-    async def _handle_response_error(self, route: Route, response: ClientResponse, storage: RateLimitStorage) -> None:
-        if response.status == 429:
-            await self._handle_rate_limited_error(route, response, storage)
-        else:
-            error = await response.json()
-            if response.status == 400:
-                raise BadRequestError(error, response)
-            if response.status == 401:
-                raise UnauthorizedError(error, response)
-            if response.status == 403:
-                raise ForbiddenError(error, response)
-            if response.status == 404:
-                raise NotFoundError(error, response)
-            if response.status >= 500:
-                raise InternalServerError(error, response)
-            raise HTTPRequestStatusError(error, response)
+    def _estimate_admission(
+        self,
+        route: Route,
+        bucket: Bucket | None,
+        rate_limit_storage: RateLimitStorage,
+        priority: int,
+        global_priority: int,
+    ) -> float:
+        """The event loop time a request is estimated to get a spot in the rate limits at.
+
+        This is used by both :meth:`HTTPClient.estimate_wait` and the ``deadline`` check in :meth:`HTTPClient.request`,
+        so they agree. A missing bucket has not been used yet, and does not wait.
+        """
+        estimated_admission = get_running_loop().time()
+        if bucket is not None:
+            estimated_admission = bucket.estimate_admission(priority)
+
+        global_rate_limiter = rate_limit_storage.global_rate_limiter
+        if not route.ignore_global and isinstance(global_rate_limiter, TimesPer):
+            # This includes pauses from global 429s and WeightedFairGlobalRateLimiter's queues.
+            estimated_admission = max(estimated_admission, global_rate_limiter.estimate_admission(global_priority))
+        return estimated_admission
+
+    def _get_hedge_threshold(self, route: Route, percentile: float) -> float | None:
+        histograms = self.request_timings.get(route.bucket[0], "2xx")
+        if histograms is None:
+            return None
+        # The hedge delay starts when the request is handed to aiohttp, so getting a connection has to be included.
+        sent_to_headers = histograms["sent_to_headers"]
+        if sent_to_headers.count < self.hedge_min_samples:
+            return None  # Not enough samples to know what is slow
+        return sent_to_headers.percentile(percentile)
+
+    def _can_hedge(self, route: Route, rate_limit_storage: RateLimitStorage) -> bool:
+        """Whether a extra request would get a spot in the rate limits without waiting or taking one from a queued request"""
+        if not rate_limit_storage.supports_nowait:
+            return False  # Finding the bucket could suspend.
+        bucket = rate_limit_storage.get_bucket_by_nextcore_id_nowait(route.bucket)
+        if bucket is None:
+            return False
+        if not bucket.metadata.unlimited and not bucket.available:
+            # This also covers unknown rate limits, as a blind request could be rate limited.
+            return False
+
+        global_rate_limiter = rate_limit_storage.global_rate_limiter
+        if route.ignore_global or not isinstance(global_rate_limiter, TimesPer):
+            # The other global rate limiters can not say if they have a spot without taking it.
+            return route.ignore_global
+        return global_rate_limiter.available > 0
+
+    async def _hedged_request(
+        self,
+        route: Route,
+        rate_limit_storage: RateLimitStorage,
+        headers: Mapping[str, str],
+        hedge_after: float,
+        *,
+        bucket_priority: int,
+        global_priority: int,
+        traffic_class: str | None,
+        wait: bool,
+        deadline: float | None,
+        **kwargs: Any,
+    ) -> ClientResponse:
+        """Requests a route, and sends a second request if the first one is slow.
+
+        See :attr:`HTTPClient.hedge_percentile`.
+        """
+        sent: Future[None] = get_running_loop().create_future()
+        primary = create_task(
+            self._request(
+                route,
+                rate_limit_storage,
+                headers,
+                bucket_priority=bucket_priority,
+                global_priority=global_priority,
+                traffic_class=traffic_class,
+                wait=wait,
+                deadline=deadline,
+                hedge=False,
+                on_sent=sent,
+                **kwargs,
+            )
+        )
+        secondary: Task[ClientResponse] | None = None
+        winner: Task[ClientResponse] = primary
+        try:
+            # Waiting for the rate limits is not slowness, so this starts counting when the request is sent.
+            await asyncio_wait((primary, sent), return_when=FIRST_COMPLETED)
+            if not primary.done():
+                await asyncio_wait((primary,), timeout=hedge_after)
+            if primary.done() or not self._can_hedge(route, rate_limit_storage):
+                return await primary
+
+            logger.debug("Hedging slow request to %s %s", route.method, route.path)
+            self.hedged_requests += 1
+            # This never waits for the rate limits, so it can not hold up other requests.
+            secondary = create_task(
+                self._request(
+                    route,
+                    rate_limit_storage,
+                    headers,
+                    bucket_priority=bucket_priority,
+                    global_priority=global_priority,
+                    traffic_class=traffic_class,
+                    wait=False,
+                    hedge=False,
+                    **kwargs,
+                )
+            )
+            await asyncio_wait((primary, secondary), return_when=FIRST_COMPLETED)
+
+            if not primary.done():
+                hedge_error = secondary.exception()
+                if hedge_error is None:
+                    winner = secondary
+                    self.hedge_wins += 1
+                elif not isinstance(hedge_error, RateLimitedError):
+                    logger.debug("Hedged request failed, waiting for the first request", exc_info=hedge_error)
+            return await winner
+        finally:
+            for task in (primary, secondary):
+                if task is None or task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    # Both finished at once, the connection can be re-used.
+                    task.result().release()
+            if not winner.done():
+                # The caller was cancelled.
+                winner.cancel()
+
+    async def _handle_response_error(self, response: ClientResponse) -> None:
+        error = await response.json()
+        if response.status == 400:
+            raise BadRequestError(error, response)
+        if response.status == 401:
+            raise UnauthorizedError(error, response)
+        if response.status == 403:
+            raise ForbiddenError(error, response)
+        if response.status == 404:
+            raise NotFoundError(error, response)
+        if response.status >= 500:
+            raise InternalServerError(error, response)
+        raise HTTPRequestStatusError(error, response)
 
     async def _handle_rate_limited_error(
-        self, route: Route, response: ClientResponse, storage: RateLimitStorage
+        self,
+        route: Route,
+        response: ClientResponse,
+        bucket: Bucket,
+        storage: RateLimitStorage,
+        *,
+        speculative: bool = False,
     ) -> None:
-        # Cloudflare bans arent proxied so via is not sent
-        # These bans are usually 1h, however they can be permenant due to repeat offense.
-        if "via" not in response.headers:
-            raise CloudflareBanError()
-
         error = await response.json()
 
         if "X-RateLimit-Scope" in response.headers:
             scope = response.headers["X-RateLimit-Scope"]
+            self.rate_limited_responses[scope] += 1
 
             if scope == "shared":
                 logger.info(
@@ -355,20 +1062,34 @@ class HTTPClient(BaseHTTPClient):
                     route.bucket,
                     error["retry_after"],
                 )
+                bucket.pause(error["retry_after"])
+            elif scope == "user" and speculative:
+                # Expected when speculating, the request will be retried when the bucket resets.
+                logger.debug(
+                    "Speculative request on bucket %s was rate limited. Retry after: %s",
+                    route.bucket,
+                    error["retry_after"],
+                )
+                bucket.pause(error["retry_after"])
             elif scope == "user":
                 logger.warning(
                     "Exceeded bucket rate-limit on bucket %s! This may be a bug in your bucket implementation. Retry after: %s",
                     route.bucket,
                     error["retry_after"],
                 )
+                # Most likely the bucket was reset too early
+                self.clock_estimator.observe_rate_limited()
+                bucket.pause(error["retry_after"])
             elif scope == "global":
                 # This will be logged by the global rate-limiter the user chose
                 storage.global_rate_limiter.update(error["retry_after"])
             else:
                 logger.warning("Received unknown rate limiting scope %s", scope)
+                bucket.pause(error["retry_after"])
         else:
             logger.debug("Received rate-limited response with no scope header")
             is_global = error["global"]
+            self.rate_limited_responses["global" if is_global else "unknown"] += 1
 
             if is_global:
                 storage.global_rate_limiter.update(error["retry_after"])
@@ -377,6 +1098,7 @@ class HTTPClient(BaseHTTPClient):
                     "Received rate-limited response from a shared or bucket rate limit! No header was present. Bucket: %s",
                     route.bucket,
                 )
+                bucket.pause(error["retry_after"])
 
     async def connect_to_gateway(
         self,
@@ -463,7 +1185,8 @@ class HTTPClient(BaseHTTPClient):
 
         if metadata is not None:
             # Create a new bucket with info from the metadata
-            bucket = Bucket(metadata)
+            bucket = await rate_limit_storage.create_bucket(route.bucket, metadata)
+            bucket.speculative_requests = self._get_speculative_requests(route)
             await rate_limit_storage.store_bucket_by_nextcore_id(route.bucket, bucket)
             return bucket
 
@@ -473,15 +1196,67 @@ class HTTPClient(BaseHTTPClient):
         await rate_limit_storage.store_metadata(route.route, metadata)
 
         # Create the bucket
-        bucket = Bucket(metadata)
+        bucket = await rate_limit_storage.create_bucket(route.bucket, metadata)
+        bucket.speculative_requests = self._get_speculative_requests(route)
         await rate_limit_storage.store_bucket_by_nextcore_id(route.bucket, bucket)
 
         return bucket
 
+    def _get_bucket_nowait(self, route: Route, rate_limit_storage: RateLimitStorage) -> Bucket:
+        """Gets a bucket object for a route without suspending.
+
+        This is the same as :meth:`HTTPClient._get_bucket`, but for storages where
+        :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        route:
+            The route to get the bucket for.
+        rate_limit_storage:
+            The user's rate limits.
+        """
+        bucket = rate_limit_storage.get_bucket_by_nextcore_id_nowait(route.bucket)
+        if bucket is not None:
+            return bucket
+
+        metadata = rate_limit_storage.get_bucket_metadata_nowait(route.route)
+        if metadata is None:
+            metadata = BucketMetadata()
+            rate_limit_storage.store_metadata_nowait(route.route, metadata)
+
+        bucket = rate_limit_storage.create_bucket_nowait(route.bucket, metadata)
+        bucket.speculative_requests = self._get_speculative_requests(route)
+        rate_limit_storage.store_bucket_by_nextcore_id_nowait(route.bucket, bucket)
+
+        return bucket
+
+    def _get_speculative_requests(self, route: Route) -> int:
+        """The :attr:`Bucket.speculative_requests` of new buckets for a route.
+
+        This is only set when the bucket is created, as buckets can be shared by routes once they are merged.
+        """
+        if route.speculative_requests is None:
+            return self.speculative_requests
+        return route.speculative_requests
+
     async def _update_bucket(
-        self, response: ClientResponse, route: Route, bucket: Bucket, rate_limit_storage: RateLimitStorage
-    ) -> None:
-        """Updates the bucket and metadata from the info received from the API."""
+        self,
+        response: ClientResponse,
+        route: Route,
+        bucket: Bucket,
+        rate_limit_storage: RateLimitStorage,
+        round_trip_time: float = 0,
+    ) -> Bucket:
+        """Updates the bucket and metadata from the info received from the API.
+
+        This also teaches :attr:`HTTPClient.clock_estimator` about the Discord clock.
+
+        Returns
+        -------
+        Bucket
+            The bucket used for the route from now on. This is a different bucket if it was merged with another route
+            that shares the rate limit.
+        """
         headers = response.headers
         try:
             remaining = int(headers["X-RateLimit-Remaining"])
@@ -491,28 +1266,120 @@ class HTTPClient(BaseHTTPClient):
             bucket_hash = headers["X-RateLimit-Bucket"]
         except KeyError:
             # No rate limit headers
+            date = headers.get("Date")
+            if date is not None:
+                self.clock_estimator.observe_date(round_trip_time, date)
             if response.status < 300:
                 # No rate limit headers and no error, this is likely a route with no rate limits.
                 bucket.metadata.unlimited = True
                 await bucket.update(unlimited=True)
-            return
+            return bucket
         # Convert reset_at to reset_after
+        self.clock_estimator.observe(round_trip_time, reset_at - reset_after)
         if self.trust_local_time:
-            reset_after = reset_at - time()
-
-        # Update bucket
-        await bucket.update(remaining, reset_after, unlimited=False)
+            reset_after = self.clock_estimator.time_until(reset_at)
+        else:
+            reset_after = self.clock_estimator.adjust_reset_after(reset_after)
 
         # Update metadata
         # TODO: This isnt very extensible. Maybe make a async .update function?
         bucket.metadata.limit = limit
         bucket.metadata.unlimited = False
-
-        # Auto-link buckets based on bucket_hash
-        linked_bucket = await rate_limit_storage.get_bucket_by_discord_id(bucket_hash)
-        if linked_bucket is not None:
-            # TODO: Migrate pending requests to the linked bucket
-            await rate_limit_storage.store_bucket_by_nextcore_id(route.bucket, linked_bucket)
+        bucket.metadata.bucket_hash = bucket_hash
+
+        # Auto-link buckets based on bucket_hash. Discord only shares the rate limit if the major parameters match too.
+        discord_id = (bucket_hash, *route.bucket[1:])
+        if rate_limit_storage.supports_nowait:
+            linked_bucket = rate_limit_storage.get_bucket_by_discord_id_nowait(discord_id)
+            if linked_bucket is None:
+                rate_limit_storage.store_bucket_by_discord_id_nowait(discord_id, bucket)
+            elif linked_bucket is not bucket:
+                rate_limit_storage.store_bucket_by_nextcore_id_nowait(route.bucket, linked_bucket)
         else:
-            # Automatically linking them
-            await rate_limit_storage.store_bucket_by_discord_id(bucket_hash, bucket)
+            linked_bucket = await rate_limit_storage.get_bucket_by_discord_id(discord_id)
+            if linked_bucket is None:
+                # Automatically linking them
+                await rate_limit_storage.store_bucket_by_discord_id(discord_id, bucket)
+            elif linked_bucket is not bucket:
+                await rate_limit_storage.store_bucket_by_nextcore_id(route.bucket, linked_bucket)
+
+        if linked_bucket is not None and linked_bucket is not bucket:
+            # Another route shares this rate limit, so move everything over to enforce it once.
+            logger.debug("Merging bucket for %s into bucket %s", route.bucket, discord_id)
+            bucket.merge_into(linked_bucket)
+            bucket = linked_bucket
+            bucket.metadata.limit = limit
+            bucket.metadata.unlimited = False
+
+        # Update bucket
+        await bucket.update(remaining, reset_after, unlimited=False)
+        return bucket
+
+
+def _mark_used(*acquires: AsyncContextManager[Any]) -> None:
+    """Make rate limit context managers count their spot even though the request raised.
+
+    This is for requests that were sent, but will never get a response.
+    """
+    for acquire in acquires:
+        try:
+            acquire.used = True  # type: ignore [attr-defined]
+        except AttributeError:
+            # Rate limiters that do not support it give the spot back instead.
+            pass
+
+
+class _DeadlineAcquire:
+    """Waits for a rate limit context manager until a deadline, and gives up the spot in the queue once it passes.
+
+    Waiting is done in its own task, so the task of the request is never cancelled by the deadline.
+    """
+
+    __slots__ = ("_acquire", "_deadline")
+
+    def __init__(self, acquire: AsyncContextManager[Any], deadline: float) -> None:
+        self._acquire: AsyncContextManager[Any] = acquire
+        self._deadline: float = deadline
+
+    async def __aenter__(self) -> Any:
+        timeout = self._deadline - get_running_loop().time()
+        if timeout <= 0:
+            raise DeadlineExceededError(self._deadline)
+
+        waiter = create_task(self._acquire.__aenter__())
+        try:
+            done, _ = await asyncio_wait((waiter,), timeout=timeout)
+        except BaseException:
+            # The request was cancelled, so it should stop waiting as well.
+            await self._abandon(waiter)
+            raise
+        if not done:
+            logger.debug("Deadline passed while waiting for the rate limits")
+            await self._abandon(waiter)
+            raise DeadlineExceededError(self._deadline)
+        return waiter.result()
+
+    async def _abandon(self, waiter: Task[Any]) -> None:
+        waiter.cancel()
+        # The rate limits remove the waiter from their queues when it is cancelled.
+        await asyncio_wait((waiter,))
+        if not waiter.cancelled() and waiter.exception() is None:
+            # Got the spot right before the cancellation reached it, so it has to be given back.
+            await self._acquire.__aexit__(DeadlineExceededError, DeadlineExceededError(self._deadline), None)
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self._acquire.__aexit__(exc_type, exc_value, traceback)
+
+    @property
+    def used(self) -> bool:
+        """Whether the request was sent."""
+        return getattr(self._acquire, "used", False)
+
+    @used.setter
+    def used(self, used: bool) -> None:
+        self._acquire.used = used  # type: ignore [attr-defined]
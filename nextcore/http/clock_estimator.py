@@ -0,0 +1,205 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from email.utils import parsedate_to_datetime
+from logging import getLogger
+from time import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Final
+
+logger = getLogger(__name__)
+
+__all__: Final[tuple[str, ...]] = ("ClockEstimator",)
+
+# How much the safety margin grows by at least after a 429
+_MIN_MARGIN_STEP: Final[float] = 0.05
+
+
+class ClockEstimator:
+    """Learns the Discord clock offset and network delay to time rate limit resets.
+
+    The offset is learned from the ``X-RateLimit-Reset`` and ``X-RateLimit-Reset-After`` headers, which together
+    say what time it was on the Discord server with millisecond precision. The ``Date`` header is only used until then.
+
+    A safety margin is added to every reset. It grows when a request is rate limited because a bucket was reset too early,
+    and slowly shrinks again while requests succeed.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        clock_estimator = ClockEstimator()
+        clock_estimator.observe(round_trip_time, reset_at - reset_after)
+
+        await bucket.update(remaining, clock_estimator.time_until(reset_at))
+
+    Parameters
+    ----------
+    smoothing:
+        How much a new sample counts towards the estimate, between ``0`` and ``1``.
+    max_safety_margin:
+        The highest the safety margin can grow to in seconds.
+    safety_margin_decay:
+        How much of the safety margin is kept after every successful response.
+
+    Attributes
+    ----------
+    smoothing:
+        How much a new sample counts towards the estimate, between ``0`` and ``1``.
+    max_safety_margin:
+        The highest the safety margin can grow to in seconds.
+    safety_margin_decay:
+        How much of the safety margin is kept after every successful response.
+    """
+
+    __slots__ = (
+        "smoothing",
+        "max_safety_margin",
+        "safety_margin_decay",
+        "_offset",
+        "_round_trip_time",
+        "_safety_margin",
+        "_samples",
+    )
+
+    def __init__(
+        self, *, smoothing: float = 0.1, max_safety_margin: float = 1, safety_margin_decay: float = 0.99
+    ) -> None:
+        self.smoothing: float = smoothing
+        self.max_safety_margin: float = max_safety_margin
+        self.safety_margin_decay: float = safety_margin_decay
+        self._offset: float = 0
+        self._round_trip_time: float = 0
+        self._safety_margin: float = 0
+        self._samples: int = 0  # Only precise samples, the Date header is too coarse to count
+
+    @property
+    def offset(self) -> float:
+        """How far the Discord clock is ahead of the local clock in seconds"""
+        return self._offset
+
+    @property
+    def round_trip_time(self) -> float:
+        """How long a request takes from being sent to the response arriving in seconds"""
+        return self._round_trip_time
+
+    @property
+    def safety_margin(self) -> float:
+        """How much later than estimated a bucket is reset in seconds"""
+        return self._safety_margin
+
+    @property
+    def samples(self) -> int:
+        """How many responses with rate limit headers the estimate is based on"""
+        return self._samples
+
+    def observe(self, round_trip_time: float, server_time: float, *, received_at: float | None = None) -> None:
+        """Learn from a response with rate limit headers.
+
+        Parameters
+        ----------
+        round_trip_time:
+            How long it took from sending the request to receiving the response headers in seconds.
+        server_time:
+            The unix time on the Discord server when the response was created.
+
+            This is ``X-RateLimit-Reset`` minus ``X-RateLimit-Reset-After``.
+        received_at:
+            The local unix time the response was received at. If this is :data:`None`, the current time is used.
+        """
+        if received_at is None:
+            received_at = time()
+        # The response was created about half way through the request
+        offset = server_time - (received_at - round_trip_time / 2)
+
+        if self._samples == 0:
+            # Replace the estimate from the Date header, if any.
+            self._offset = offset
+            self._round_trip_time = round_trip_time
+        else:
+            self._offset += (offset - self._offset) * self.smoothing
+            self._round_trip_time += (round_trip_time - self._round_trip_time) * self.smoothing
+        self._samples += 1
+        self._safety_margin *= self.safety_margin_decay
+
+    def observe_date(self, round_trip_time: float, date: str, *, received_at: float | None = None) -> None:
+        """Learn from the ``Date`` header of a response without rate limit headers.
+
+        This only has a second of precision, so it is ignored once :meth:`ClockEstimator.observe` has been used.
+
+        Parameters
+        ----------
+        round_trip_time:
+            How long it took from sending the request to receiving the response headers in seconds.
+        date:
+            The ``Date`` header.
+        received_at:
+            The local unix time the response was received at. If this is :data:`None`, the current time is used.
+        """
+        if self._samples:
+            return
+        try:
+            server_time = parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError):
+            logger.debug("Could not parse Date header %r", date)
+            return
+        if received_at is None:
+            received_at = time()
+
+        # The header is truncated to the second, so on average it is half a second behind.
+        offset = server_time + 0.5 - (received_at - round_trip_time / 2)
+        if abs(offset) > 1:
+            # Only correct offsets that are bigger than the precision of the header.
+            self._offset = offset
+
+    def observe_rate_limited(self) -> None:
+        """Learn from a request that was rate limited because a bucket was reset too early.
+
+        This grows the safety margin.
+        """
+        self._safety_margin = min(max(self._safety_margin * 2, _MIN_MARGIN_STEP), self.max_safety_margin)
+        logger.debug("Raised the rate limit safety margin to %ss", self._safety_margin)
+
+    def time_until(self, server_time: float) -> float:
+        """How long until a time on the Discord server in local seconds, including the safety margin.
+
+        Parameters
+        ----------
+        server_time:
+            The unix time on the Discord server, for example ``X-RateLimit-Reset``.
+        """
+        return server_time - self._offset - time() + self._safety_margin
+
+    def adjust_reset_after(self, reset_after: float) -> float:
+        """Correct a ``X-RateLimit-Reset-After`` header for the time the response took to arrive.
+
+        This does not use the local clock at all.
+
+        Parameters
+        ----------
+        reset_after:
+            The ``X-RateLimit-Reset-After`` header.
+        """
+        return reset_after - self._round_trip_time / 2 + self._safety_margin
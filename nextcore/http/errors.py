@@ -38,6 +38,8 @@ __all__: Final[tuple[str, ...]] = (
     "NotFoundError",
     "InternalServerError",
     "CloudflareBanError",
+    "InvalidRequestBudgetError",
+    "DeadlineExceededError",
 )
 
 
@@ -182,3 +184,58 @@ class CloudflareBanError(Exception):
 
     See the `documentation <https://discord.dev/topics/rate-limits#invalid-request-limit-aka-cloudflare-bans>`__ for more info.
     """
+
+
+class InvalidRequestBudgetError(Exception):
+    """A error for when a request was not done to avoid getting banned by cloudflare
+
+    See :class:`InvalidRequestTracker` for more info.
+
+    Parameters
+    ----------
+    usage:
+        The part of the invalid request budget that was used.
+
+    Attributes
+    ----------
+    usage:
+        The part of the invalid request budget that was used.
+    """
+
+    def __init__(self, usage: float) -> None:
+        self.usage: float = usage
+
+        super().__init__(f"{usage:.0%} of the invalid request budget is used")
+
+
+class DeadlineExceededError(Exception):
+    """A error for when a request could not get a spot in the rate limits before its deadline
+
+    The request is not sent.
+
+    Parameters
+    ----------
+    deadline:
+        The deadline of the request in event loop time (see :meth:`asyncio.loop.time`).
+    estimated_admission:
+        When the request was estimated to get a spot in event loop time,
+        or :data:`None` if it was dropped out of the queue when the deadline passed.
+
+    Attributes
+    ----------
+    deadline:
+        The deadline of the request in event loop time (see :meth:`asyncio.loop.time`).
+    estimated_admission:
+        When the request was estimated to get a spot in event loop time,
+        or :data:`None` if it was dropped out of the queue when the deadline passed.
+    """
+
+    def __init__(self, deadline: float, estimated_admission: float | None = None) -> None:
+        self.deadline: float = deadline
+        self.estimated_admission: float | None = estimated_admission
+
+        if estimated_admission is None:
+            message = "The deadline passed while waiting for the rate limits"
+        else:
+            message = f"The rate limits would let the request through {estimated_admission - deadline:.3f}s too late"
+        super().__init__(message)
@@ -26,8 +26,15 @@ from typing import TYPE_CHECKING
 from .base import BaseGlobalRateLimiter
 from .limited import LimitedGlobalRateLimiter
 from .unlimited import UnlimitedGlobalRateLimiter
+from .weighted_fair import TrafficClass, WeightedFairGlobalRateLimiter
 
 if TYPE_CHECKING:
     from typing import Final
 
-__all__: Final[tuple[str, ...]] = ("BaseGlobalRateLimiter", "UnlimitedGlobalRateLimiter", "LimitedGlobalRateLimiter")
+__all__: Final[tuple[str, ...]] = (
+    "BaseGlobalRateLimiter",
+    "UnlimitedGlobalRateLimiter",
+    "LimitedGlobalRateLimiter",
+    "WeightedFairGlobalRateLimiter",
+    "TrafficClass",
+)
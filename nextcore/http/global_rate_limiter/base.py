@@ -44,7 +44,9 @@ class BaseGlobalRateLimiter(ABC):
     __slots__ = ()
 
     @abstractmethod
-    def acquire(self, *, priority: int = 0, wait: bool = True) -> AsyncContextManager[None]:
+    def acquire(
+        self, *, priority: int = 0, wait: bool = True, traffic_class: str | None = None
+    ) -> AsyncContextManager[None]:
         """Use a spot in the rate-limit.
 
         Parameters
@@ -58,6 +60,13 @@ class BaseGlobalRateLimiter(ABC):
             Whether to wait for a spot in the rate limit.
 
             If this is set to :data:`False`, this will raise a :exc:`RateLimitedError`
+        traffic_class:
+            .. warning::
+                This can safely be ignored.
+
+            The name of the kind of request, for sharing the rate limit fairly between them.
+
+            This is only passed by :class:`HTTPClient` when a traffic class is set.
 
         Returns
         -------
@@ -21,14 +21,16 @@
 
 from __future__ import annotations
 
+from asyncio import get_running_loop
 from logging import getLogger
 from typing import TYPE_CHECKING
 
 from ...common import TimesPer
+from ...common.timer_wheel import get_timer_wheel
 from .base import BaseGlobalRateLimiter
 
 if TYPE_CHECKING:
-    from typing import Final
+    from typing import AsyncContextManager, Final
 
 __all__: Final[tuple[str, ...]] = ("LimitedGlobalRateLimiter",)
 
@@ -38,20 +40,188 @@ logger = getLogger(__name__)
 class LimitedGlobalRateLimiter(TimesPer, BaseGlobalRateLimiter):
     """A limited global rate-limiter.
 
+    On a global 429, no requests are let through until ``retry_after`` is over.
+
+    If ``adaptive`` is enabled, the limit is learned with additive increase, multiplicative decrease (AIMD),
+    for bots that have had their global rate limit raised by Discord.
+    Every window that uses the whole limit raises it by ``increase``, and a global 429 multiplies it by ``decrease_factor``.
+    The limit never goes below the ``limit`` it started with.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        global_rate_limiter = LimitedGlobalRateLimiter(50, adaptive=True, max_limit=1200)
+
     Parameters
     ----------
     limit:
         The amount of requests that can be made per second.
+
+        If ``adaptive`` is enabled, this is the lowest the limit can go.
+    adaptive:
+        Whether to learn the limit.
+    max_limit:
+        The highest the limit can be raised to if ``adaptive`` is enabled. If this is :data:`None`, there is no maximum.
+    increase:
+        How much the limit is raised by after a window that used the whole limit.
+    decrease_factor:
+        How much of the limit is kept after a global 429.
+
+    Attributes
+    ----------
+    limit:
+        The amount of requests that can be made per second.
+
+        This is the learned limit if :attr:`LimitedGlobalRateLimiter.adaptive` is enabled.
+    min_limit:
+        The lowest the limit can go if :attr:`LimitedGlobalRateLimiter.adaptive` is enabled.
+    adaptive:
+        Whether to learn the limit.
+    max_limit:
+        The highest the limit can be raised to if :attr:`LimitedGlobalRateLimiter.adaptive` is enabled.
+    increase:
+        How much the limit is raised by after a window that used the whole limit.
+    decrease_factor:
+        How much of the limit is kept after a global 429.
     """
 
-    __slots__ = ()
+    __slots__ = (
+        "min_limit",
+        "adaptive",
+        "max_limit",
+        "increase",
+        "decrease_factor",
+        "_paused_until",
+        "_paused_window",
+    )
 
-    def __init__(self, limit: int = 50) -> None:
+    def __init__(
+        self,
+        limit: int = 50,
+        *,
+        adaptive: bool = False,
+        max_limit: int | None = None,
+        increase: int = 1,
+        decrease_factor: float = 0.5,
+    ) -> None:
         TimesPer.__init__(self, limit, 1)
+        self.min_limit: int = limit
+        self.adaptive: bool = adaptive
+        self.max_limit: int | None = max_limit
+        self.increase: int = increase
+        self.decrease_factor: float = decrease_factor
+        self._paused_until: float | None = None  # Event loop time the pause from a global 429 ends at
+        self._paused_window: bool = False  # Whether the current window ended with a pause from a global 429
+
+    def acquire(
+        self, *, priority: int = 0, wait: bool = True, traffic_class: str | None = None
+    ) -> AsyncContextManager[None]:
+        """Use a spot in the rate-limit.
+
+        Parameters
+        ----------
+        priority:
+            The priority. **Lower** number means it will be requested earlier.
+        wait:
+            Wait for a spot in the rate limit.
+
+            If this is :data:`False`, this will raise :exc:`RateLimitedError` instead.
+        traffic_class:
+            .. warning::
+                Traffic classes are only used by :class:`WeightedFairGlobalRateLimiter`.
+
+        Raises
+        ------
+        RateLimitedError
+            ``wait`` was set to :data:`False` and there was no more spots in the rate limit.
+
+        Returns
+        -------
+        :class:`typing.AsyncContextManager`
+            A context manager that will wait in __aenter__ until a request should be made.
+        """
+        del traffic_class  # Unused
+        return TimesPer.acquire(self, priority=priority, wait=wait)
 
     def update(self, retry_after: float) -> None:
         """A function that gets called whenever the global rate-limit gets exceeded
 
-        This just makes a warning log.
+        This stops every request from getting a spot until ``retry_after`` is over,
+        and lowers the limit if :attr:`LimitedGlobalRateLimiter.adaptive` is enabled.
+
+        Parameters
+        ----------
+        retry_after:
+            The time from the `retry_after` field in the JSON response or the `retry_after` header.
         """
         logger.warning("Exceeded global rate-limit! (Retry after: %s)", retry_after)
+        paused_until = get_running_loop().time() + retry_after
+
+        if self._paused_until is None:
+            # Requests that were in progress when the first 429 came back can also get one, only back off once.
+            if self.adaptive:
+                self.limit = max(int(self.limit * self.decrease_factor), self.min_limit)
+                logger.info("Lowered global rate limit to %s", self.limit)
+        elif paused_until <= self._paused_until:
+            return  # Already paused for longer
+        self._paused_until = paused_until
+        self._paused_window = True
+        self.remaining = 0
+        self._reset_at = paused_until  # A reset that is already pending is moved to the end of the pause
+
+        if not self._pending_reset:
+            self._pending_reset = True
+            get_timer_wheel().call_at(paused_until, self._reset)
+
+    @property
+    def paused(self) -> bool:
+        """Whether requests are held back because of a global 429"""
+        return self._paused_until is not None
+
+    @property
+    def paused_until(self) -> float | None:
+        """The event loop time (see :meth:`asyncio.loop.time`) the pause from a global 429 ends at.
+
+        This is :data:`None` if it is not paused.
+        """
+        return self._paused_until
+
+    def _postpone_reset(self) -> bool:
+        """Moves the reset to the end of the pause if there is one.
+
+        Returns
+        -------
+        :class:`bool`
+            Whether the reset was postponed.
+        """
+        if self._paused_until is None:
+            return False
+        if self._paused_until > get_running_loop().time():
+            self._reset_at = self._paused_until
+            get_timer_wheel().call_at(self._paused_until, self._reset)
+            return True
+        self._paused_until = None
+        logger.info("Global rate limit pause is over")
+        return False
+
+    def _probe(self) -> None:
+        """Raises the limit if the whole window was used"""
+        if self._paused_window:
+            # The window was ended by a global 429, not used up by requests, so this should keep backing off.
+            self._paused_window = False
+            return
+        if not self.adaptive or self.remaining > 0:
+            return
+        limit = self.limit + self.increase
+        if self.max_limit is not None:
+            limit = min(limit, self.max_limit)
+        if limit != self.limit:
+            logger.debug("Raised global rate limit to %s", limit)
+            self.limit = limit
+
+    def _reset(self) -> None:
+        if self._postpone_reset():
+            return
+        self._probe()
+        TimesPer._reset(self)
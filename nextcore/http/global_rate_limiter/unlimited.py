@@ -21,19 +21,21 @@
 
 from __future__ import annotations
 
-from asyncio import CancelledError, Future, Lock, create_task, sleep
+from asyncio import CancelledError, Future, get_running_loop
 from collections import deque
-from contextlib import asynccontextmanager
 from logging import getLogger
-from typing import TYPE_CHECKING, AsyncIterator
+from typing import TYPE_CHECKING
 
 from nextcore.common.errors import RateLimitedError
+from nextcore.common.timer_wheel import get_timer_wheel
 
 from .base import BaseGlobalRateLimiter
 
 if TYPE_CHECKING:
-    from asyncio import Task
-    from typing import Final
+    from types import TracebackType
+    from typing import AsyncContextManager, Final
+
+    from nextcore.common.timer_wheel import TimerHandle
 
 __all__: Final[tuple[str, ...]] = ("UnlimitedGlobalRateLimiter",)
 
@@ -55,15 +57,19 @@ class UnlimitedGlobalRateLimiter(BaseGlobalRateLimiter):
         There is some extra delay due to ping due to this.
     """
 
-    __slots__ = ("_pending_requests", "_pending_release", "_async_update_task")
+    __slots__ = ("_pending_requests", "_release_handle", "_waiting_acquire", "_non_waiting_acquire")
 
     def __init__(self) -> None:
         self._pending_requests: deque[Future[None]] = deque()
-        self._pending_release: Lock = Lock()
-        self._async_update_task: Task[None] | None = None
+        self._release_handle: TimerHandle | None = None  # Set while rate limited
+
+        # The context managers hold no state between entering and exiting, so they can be reused.
+        self._waiting_acquire: _UnlimitedAcquire = _UnlimitedAcquire(self, True)
+        self._non_waiting_acquire: _UnlimitedAcquire = _UnlimitedAcquire(self, False)
 
-    @asynccontextmanager
-    async def acquire(self, *, priority: int = 0, wait: bool = True) -> AsyncIterator[None]:
+    def acquire(
+        self, *, priority: int = 0, wait: bool = True, traffic_class: str | None = None
+    ) -> AsyncContextManager[None]:
         """Acquire a spot in the rate-limit
 
         Parameters
@@ -75,6 +81,9 @@ class UnlimitedGlobalRateLimiter(BaseGlobalRateLimiter):
             Whether to wait for a spot in the rate limit.
 
             If this is :data:`False`, this will raise :exc:`RateLimitedError` instead.
+        traffic_class:
+            .. warning::
+                Traffic classes currently does nothing.
 
         Raises
         ------
@@ -86,25 +95,8 @@ class UnlimitedGlobalRateLimiter(BaseGlobalRateLimiter):
         :class:`typing.AsyncContextManager`
             A context manager that will wait in __aenter__ until a request should be made.
         """
-        del priority  # Unused
-        if self._pending_release.locked():
-            # Rate limited!
-
-            if not wait:
-                raise RateLimitedError()
-
-            # Add to queue
-            future: Future[None] = Future()
-            self._pending_requests.append(future)
-
-            # Wait
-            try:
-                await future
-            except CancelledError:
-                logger.debug("Ratelimit use was cancelled while it was pending. Cancelling!")
-                self._pending_requests.remove(future)
-                raise  # Don't continue
-        yield None
+        del priority, traffic_class  # Unused
+        return self._waiting_acquire if wait else self._non_waiting_acquire
 
     def update(self, retry_after: float) -> None:
         """Updates the rate-limiter with info from a global scoped 429.
@@ -118,32 +110,23 @@ class UnlimitedGlobalRateLimiter(BaseGlobalRateLimiter):
                 The JSON field has more precision than the header.
         """
         logger.debug("Exceeded global rate-limit, however this is expected.")
-        if self._pending_release.locked():
-            logger.debug("Ignoring update because of already running update task.")
-            return
-        self._async_update_task = create_task(self._async_update(retry_after))
-
-    async def _async_update(self, retry_after: float) -> None:
-        """Async version of :attr:`UnlimitedGlobalRateLimiter`"""
-        # Sanity check due to race conditions
-        if self._pending_release.locked():
-            logger.debug("Ignoring update because of already running update task.")
-            self._async_update_task = None
+        if self._release_handle is not None:
+            logger.debug("Ignoring update because of already running update.")
             return
-        async with self._pending_release:
-            logger.debug("Resetting global lock after %ss", retry_after)
-            await sleep(retry_after)
-            logger.debug("Resetting global lock!")
+        logger.debug("Resetting global lock after %ss", retry_after)
+        self._release_handle = get_timer_wheel().call_later(retry_after, self._release)
+
+    def _release(self) -> None:
+        logger.debug("Resetting global lock!")
+        self._release_handle = None
 
         # Let all requests run again.
-        for future in self._pending_requests:
-            # Remove it
-            self._pending_requests.popleft()
+        while self._pending_requests:
+            future = self._pending_requests.popleft()
 
             # Release it to do the request
-            future.set_result(None)
-
-        self._async_update_task = None
+            if not future.done():
+                future.set_result(None)
 
     async def close(self) -> None:
         """Cleanup this instance.
@@ -158,5 +141,49 @@ class UnlimitedGlobalRateLimiter(BaseGlobalRateLimiter):
         for request in self._pending_requests:
             request.set_exception(CancelledError)
 
-        if self._async_update_task is not None:
-            self._async_update_task.cancel()
+        if self._release_handle is not None:
+            self._release_handle.cancel()
+
+
+class _UnlimitedAcquire:
+    """The context manager returned by :meth:`UnlimitedGlobalRateLimiter.acquire`
+
+    This only creates a future if it has to wait.
+    """
+
+    __slots__ = ("_rate_limiter", "_wait")
+
+    def __init__(self, rate_limiter: UnlimitedGlobalRateLimiter, wait: bool) -> None:
+        self._rate_limiter: UnlimitedGlobalRateLimiter = rate_limiter
+        self._wait: bool = wait
+
+    async def __aenter__(self) -> None:
+        rate_limiter = self._rate_limiter
+        if rate_limiter._release_handle is None:
+            return
+
+        # Rate limited!
+        if not self._wait:
+            raise RateLimitedError()
+
+        # Add to queue
+        future: Future[None] = get_running_loop().create_future()
+        rate_limiter._pending_requests.append(future)
+
+        # Wait
+        try:
+            await future
+        except CancelledError:
+            logger.debug("Ratelimit use was cancelled while it was pending. Cancelling!")
+            if future in rate_limiter._pending_requests:
+                # It was not released yet
+                rate_limiter._pending_requests.remove(future)
+            raise  # Don't continue
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        pass
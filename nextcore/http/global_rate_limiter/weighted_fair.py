@@ -0,0 +1,391 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from asyncio import get_running_loop
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from ...common import WaiterQueue
+from ...common.errors import RateLimitedError
+from .limited import LimitedGlobalRateLimiter
+
+if TYPE_CHECKING:
+    from types import TracebackType
+    from typing import AsyncContextManager, ClassVar, Container, Final, Iterable
+
+__all__: Final[tuple[str, ...]] = ("TrafficClass", "WeightedFairGlobalRateLimiter")
+
+logger = getLogger(__name__)
+
+
+class TrafficClass:
+    """A kind of requests that gets a share of a :class:`WeightedFairGlobalRateLimiter`.
+
+    Parameters
+    ----------
+    name:
+        The name of the traffic class. This is what is passed as ``traffic_class`` to :meth:`HTTPClient.request`.
+    weight:
+        How big of a share the traffic class gets compared to the other traffic classes that are waiting.
+    min_share:
+        The part of the limit the traffic class is guaranteed every window while it has requests waiting,
+        between ``0`` and ``1``.
+
+    Attributes
+    ----------
+    name:
+        The name of the traffic class. This is what is passed as ``traffic_class`` to :meth:`HTTPClient.request`.
+    weight:
+        How big of a share the traffic class gets compared to the other traffic classes that are waiting.
+    min_share:
+        The part of the limit the traffic class is guaranteed every window while it has requests waiting,
+        between ``0`` and ``1``.
+    granted:
+        How many requests has been given a spot.
+    """
+
+    __slots__ = ("name", "weight", "min_share", "granted", "_pending", "_finish", "_window_granted", "_replaced_by")
+
+    def __init__(self, name: str, weight: float = 1, *, min_share: float = 0) -> None:
+        if weight <= 0:
+            raise ValueError("weight has to be positive")
+
+        self.name: str = name
+        self.weight: float = weight
+        self.min_share: float = min_share
+        self.granted: int = 0
+        self._pending: WaiterQueue = WaiterQueue()
+        self._finish: float = 0  # Virtual time the last granted request of this class finished at
+        self._window_granted: int = 0  # Requests granted since the last reset
+        self._replaced_by: TrafficClass | None = None  # Set by WeightedFairGlobalRateLimiter.add_traffic_class
+
+    @property
+    def pending(self) -> int:
+        """How many requests are waiting for a spot"""
+        return len(self._pending)
+
+    def _current(self) -> TrafficClass:
+        traffic_class = self
+        while traffic_class._replaced_by is not None:
+            traffic_class = traffic_class._replaced_by
+        return traffic_class
+
+
+class WeightedFairGlobalRateLimiter(LimitedGlobalRateLimiter):
+    """A limited global rate-limiter that shares the limit fairly between traffic classes.
+
+    When requests have to wait, spots are handed out with start-time fair queuing:
+    every traffic class that is waiting gets a share of the limit in proportion to its :attr:`TrafficClass.weight`,
+    no matter how many requests it has waiting or what priority they have.
+    Traffic classes that got less than their :attr:`TrafficClass.min_share` in the current window go first.
+
+    Inside a traffic class, requests are picked by priority. Every :attr:`WeightedFairGlobalRateLimiter.aging` seconds a
+    request has waited counts as one priority level, so a steady stream of important requests can not starve the others.
+
+    Requests without a traffic class, or with a traffic class that is not known, go in a traffic class with a weight of ``1``.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        global_rate_limiter = WeightedFairGlobalRateLimiter(
+            traffic_classes=[
+                TrafficClass("interactions", 4, min_share=0.2),
+                TrafficClass("moderation", 2),
+                TrafficClass("bulk", 1),
+            ]
+        )
+        http_client.rate_limit_storages[None].global_rate_limiter = global_rate_limiter
+
+        await http_client.request(route, rate_limit_key, traffic_class="moderation")
+
+    Parameters
+    ----------
+    limit:
+        The amount of requests that can be made per second.
+    traffic_classes:
+        The traffic classes and their share of the limit.
+    aging:
+        How many seconds of waiting counts as one priority level.
+    adaptive:
+        Whether to learn the limit. See :class:`LimitedGlobalRateLimiter`.
+    max_limit:
+        The highest the limit can be raised to if ``adaptive`` is enabled.
+
+    Attributes
+    ----------
+    traffic_classes:
+        The traffic classes by name.
+    aging:
+        How many seconds of waiting counts as one priority level.
+    """
+
+    __slots__ = ("traffic_classes", "aging", "_virtual_time", "_waiting")
+
+    #: The traffic class of requests that do not have one
+    DEFAULT_TRAFFIC_CLASS: ClassVar[str] = "default"
+
+    def __init__(
+        self,
+        limit: int = 50,
+        *,
+        traffic_classes: Iterable[TrafficClass] = (),
+        aging: float = 1,
+        adaptive: bool = False,
+        max_limit: int | None = None,
+    ) -> None:
+        super().__init__(limit, adaptive=adaptive, max_limit=max_limit)
+        self.traffic_classes: dict[str, TrafficClass] = {
+            traffic_class.name: traffic_class for traffic_class in traffic_classes
+        }
+        self.aging: float = aging
+        self._virtual_time: float = 0  # Start time of the last granted request
+        self._waiting: int = 0  # Waiting requests in every traffic class
+
+    def add_traffic_class(self, name: str, weight: float = 1, *, min_share: float = 0) -> TrafficClass:
+        """Add or replace a traffic class.
+
+        Parameters
+        ----------
+        name:
+            The name of the traffic class.
+        weight:
+            How big of a share the traffic class gets compared to the other traffic classes that are waiting.
+        min_share:
+            The part of the limit the traffic class is guaranteed every window while it has requests waiting.
+
+        Returns
+        -------
+        TrafficClass
+            The new traffic class.
+        """
+        traffic_class = TrafficClass(name, weight, min_share=min_share)
+        old_traffic_class = self.traffic_classes.get(name)
+        if old_traffic_class is not None:
+            # Keep the waiting requests
+            old_traffic_class._pending.move_to(traffic_class._pending)
+            traffic_class._finish = old_traffic_class._finish
+            traffic_class._window_granted = old_traffic_class._window_granted
+            old_traffic_class._replaced_by = traffic_class
+        self.traffic_classes[name] = traffic_class
+        return traffic_class
+
+    def _get_traffic_class(self, name: str | None) -> TrafficClass:
+        if name is None:
+            name = self.DEFAULT_TRAFFIC_CLASS
+        traffic_class = self.traffic_classes.get(name)
+        if traffic_class is None:
+            logger.debug("Adding traffic class %s with the default weight", name)
+            traffic_class = self.traffic_classes[name] = TrafficClass(name)
+        return traffic_class
+
+    def acquire(
+        self, *, priority: int = 0, wait: bool = True, traffic_class: str | None = None
+    ) -> AsyncContextManager[None]:
+        """Use a spot in the rate-limit.
+
+        Parameters
+        ----------
+        priority:
+            The priority inside the traffic class. **Lower** number means it will be requested earlier.
+        wait:
+            Wait for a spot in the rate limit.
+
+            If this is :data:`False`, this will raise :exc:`RateLimitedError` instead.
+        traffic_class:
+            The name of the traffic class of the request.
+
+        Raises
+        ------
+        RateLimitedError
+            ``wait`` was set to :data:`False` and there was no more spots in the rate limit.
+
+        Returns
+        -------
+        :class:`typing.AsyncContextManager`
+            A context manager that will wait in __aenter__ until a request should be made.
+        """
+        return _WeightedFairAcquire(self, self._get_traffic_class(traffic_class), priority, wait)
+
+    def _grant(self, traffic_class: TrafficClass) -> None:
+        # Classes that were idle start from the current virtual time, so they do not get to catch up.
+        start = max(self._virtual_time, traffic_class._finish)
+        traffic_class._finish = start + 1 / traffic_class.weight
+        self._virtual_time = start
+        traffic_class.granted += 1
+        traffic_class._window_granted += 1
+        self._in_progress += 1
+
+    def _next_traffic_class(self, exclude: Container[TrafficClass] = ()) -> TrafficClass | None:
+        best: TrafficClass | None = None
+        best_key: tuple[bool, float] | None = None
+        for traffic_class in self.traffic_classes.values():
+            if not traffic_class._pending or traffic_class in exclude:
+                continue
+            below_min_share = traffic_class._window_granted < traffic_class.min_share * self.limit
+            key = (not below_min_share, max(self._virtual_time, traffic_class._finish))
+            if best_key is None or key < best_key:
+                best = traffic_class
+                best_key = key
+        return best
+
+    def _release(self) -> None:
+        """Give every free spot to the waiting requests"""
+        emptied: list[TrafficClass] = []
+        while self._waiting and self.remaining - self._in_progress > 0:
+            traffic_class = self._next_traffic_class(emptied)
+            if traffic_class is None:
+                break
+            if not traffic_class._pending.release(1):
+                # Only cancelled waiters that have not been discarded yet were left, try the other traffic classes.
+                emptied.append(traffic_class)
+                continue
+            self._waiting -= 1
+            self._grant(traffic_class)
+
+    def _reset(self) -> None:
+        if self._postpone_reset():
+            return
+        self._probe()
+        self._pending_reset = False
+        self._reset_at = None
+
+        self.remaining = self.limit
+        for traffic_class in self.traffic_classes.values():
+            traffic_class._window_granted = 0
+
+        self._release()
+
+        if self._waiting:
+            self._schedule_reset()
+
+    def estimate_admission(self, priority: int = 0) -> float:
+        """Estimate when a new request would get a spot, without using one.
+
+        Every waiting request is counted as ahead, as the traffic class decides the order.
+
+        Parameters
+        ----------
+        priority:
+            Not used.
+
+        Returns
+        -------
+        :class:`float`
+            The event loop time (see :meth:`asyncio.loop.time`) the request would get a spot at.
+        """
+        del priority  # Unused
+        return self._estimate_admission(self._waiting)
+
+    @property
+    def pending(self) -> int:
+        """How many requests are waiting for a spot"""
+        return self._waiting
+
+    @property
+    def available(self) -> int:
+        """How many more requests can get a spot right now without waiting"""
+        return max(self.remaining - self._in_progress - self._waiting, 0)
+
+    async def close(self) -> None:
+        """Cleanup this instance.
+
+        This should be done when this instance is never going to be used anymore
+
+        .. warning::
+            Continued use of this instance will result in instability
+        """
+        for traffic_class in self.traffic_classes.values():
+            traffic_class._pending.close()
+        self._waiting = 0
+
+
+class _WeightedFairAcquire:
+    """The context manager returned by :meth:`WeightedFairGlobalRateLimiter.acquire`
+
+    Attributes
+    ----------
+    used:
+        Whether the request was sent. A request that is cancelled after this is set still counts against the rate limit.
+    """
+
+    __slots__ = ("_rate_limiter", "_traffic_class", "_priority", "_wait", "used")
+
+    def __init__(
+        self, rate_limiter: WeightedFairGlobalRateLimiter, traffic_class: TrafficClass, priority: int, wait: bool
+    ) -> None:
+        self._rate_limiter: WeightedFairGlobalRateLimiter = rate_limiter
+        self._traffic_class: TrafficClass = traffic_class
+        self._priority: int = priority
+        self._wait: bool = wait
+        self.used: bool = False
+
+    async def __aenter__(self) -> None:
+        rate_limiter = self._rate_limiter
+        traffic_class = self._traffic_class
+
+        if not rate_limiter._waiting and rate_limiter.remaining - rate_limiter._in_progress > 0:
+            # Nobody to be fair to
+            rate_limiter._grant(traffic_class)
+            return
+
+        if not self._wait:
+            raise RateLimitedError()
+
+        # Sorting by priority plus the time it was added makes waiting requests move up a level every aging seconds.
+        future = traffic_class._pending.put(self._priority * rate_limiter.aging + get_running_loop().time())
+        rate_limiter._waiting += 1
+
+        try:
+            await future  # The spot is counted as in progress when released.
+        except:
+            if future.done() and not future.cancelled():
+                if future.exception() is None:
+                    # Released, however it never used its spot. Give it to someone else.
+                    rate_limiter._in_progress -= 1
+                    rate_limiter._release()
+                # Otherwise it was stopped by close, which already removed it from the counts.
+            else:
+                # The waiters are moved when the traffic class is replaced.
+                traffic_class._current()._pending.discard(future)
+                rate_limiter._waiting -= 1
+            raise
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        rate_limiter = self._rate_limiter
+
+        rate_limiter._in_progress -= 1
+        if exc_type is None or self.used:
+            rate_limiter.remaining -= 1
+        else:
+            # The request was not made, so the spot can be used by someone else.
+            rate_limiter._release()
+
+        # Start a reset task
+        if not rate_limiter._pending_reset:
+            rate_limiter._schedule_reset()
@@ -0,0 +1,288 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from asyncio import sleep
+from collections import deque
+from logging import getLogger
+from math import floor
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from ..common.errors import RateLimitedError
+from .errors import InvalidRequestBudgetError
+
+if TYPE_CHECKING:
+    from typing import Final
+
+logger = getLogger(__name__)
+
+__all__: Final[tuple[str, ...]] = ("InvalidRequestTracker",)
+
+# How many slots the window is split into. More slots makes the window slide smoother.
+_WINDOW_SLOTS: Final[int] = 60
+
+# Stages of the budget, used to only log when it changes
+_STAGE_OK: Final[int] = 0
+_STAGE_THROTTLE: Final[int] = 1
+_STAGE_REJECT: Final[int] = 2
+_STAGE_SHED: Final[int] = 3
+
+
+class InvalidRequestTracker:
+    """Counts invalid responses to avoid getting banned by Cloudflare.
+
+    Discord bans a IP for a hour after too many ``401``, ``403`` and ``429`` responses in a short time,
+    see the `documentation <https://discord.dev/topics/rate-limits#invalid-request-limit-aka-cloudflare-bans>`__.
+    This keeps a sliding window of those responses, and holds back requests as the budget runs out:
+
+    - From :attr:`InvalidRequestTracker.throttle_at`, low priority requests are delayed, more so the closer it gets to
+      :attr:`InvalidRequestTracker.reject_at`.
+    - From :attr:`InvalidRequestTracker.reject_at`, low priority requests are rejected.
+    - From :attr:`InvalidRequestTracker.shed_at`, every request is rejected.
+
+    A request is low priority if its priority is :attr:`InvalidRequestTracker.low_priority` or higher.
+
+    .. note::
+        The window is split into slots, and a slot only leaves the window once all of it is older than
+        :attr:`InvalidRequestTracker.per`. The count may be a bit too high, but never too low.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        tracker = InvalidRequestTracker()
+
+        await tracker.acquire(priority=1)
+        response = await do_request()
+        if response.status in (401, 403, 429):
+            tracker.record()
+
+    Parameters
+    ----------
+    limit:
+        How many invalid responses Discord allows in the window.
+    per:
+        How long the window is in seconds.
+    throttle_at:
+        The part of the budget used before low priority requests are delayed, between ``0`` and ``1``.
+    reject_at:
+        The part of the budget used before low priority requests are rejected, between ``0`` and ``1``.
+    shed_at:
+        The part of the budget used before every request is rejected, between ``0`` and ``1``.
+    max_throttle_delay:
+        How long low priority requests are delayed for at most in seconds.
+    low_priority:
+        The lowest priority that counts as low priority. **Higher** number means lower priority.
+
+    Attributes
+    ----------
+    limit:
+        How many invalid responses Discord allows in the window.
+    per:
+        How long the window is in seconds.
+    throttle_at:
+        The part of the budget used before low priority requests are delayed, between ``0`` and ``1``.
+    reject_at:
+        The part of the budget used before low priority requests are rejected, between ``0`` and ``1``.
+    shed_at:
+        The part of the budget used before every request is rejected, between ``0`` and ``1``.
+    max_throttle_delay:
+        How long low priority requests are delayed for at most in seconds.
+    low_priority:
+        The lowest priority that counts as low priority. **Higher** number means lower priority.
+    """
+
+    __slots__ = (
+        "limit",
+        "per",
+        "throttle_at",
+        "reject_at",
+        "shed_at",
+        "max_throttle_delay",
+        "low_priority",
+        "_slots",
+        "_count",
+        "_stage",
+    )
+
+    def __init__(
+        self,
+        limit: int = 10_000,
+        per: float = 600,
+        *,
+        throttle_at: float = 0.5,
+        reject_at: float = 0.8,
+        shed_at: float = 0.95,
+        max_throttle_delay: float = 1,
+        low_priority: int = 1,
+    ) -> None:
+        self.limit: int = limit
+        self.per: float = per
+        self.throttle_at: float = throttle_at
+        self.reject_at: float = reject_at
+        self.shed_at: float = shed_at
+        self.max_throttle_delay: float = max_throttle_delay
+        self.low_priority: int = low_priority
+        self._slots: deque[list[int]] = deque()  # [slot number, invalid responses], oldest first
+        self._count: int = 0
+        self._stage: int = _STAGE_OK
+
+    def record(self, count: int = 1) -> None:
+        """Count invalid responses.
+
+        Parameters
+        ----------
+        count:
+            How many invalid responses to count.
+        """
+        slot = self._expire()
+        if self._slots and self._slots[-1][0] == slot:
+            self._slots[-1][1] += count
+        else:
+            self._slots.append([slot, count])
+        self._count += count
+        self._update_stage()
+
+    def _expire(self) -> int:
+        slot_length = self.per / _WINDOW_SLOTS
+        slot = floor(monotonic() / slot_length)
+        # A slot leaves the window once its end is more than per seconds ago
+        while self._slots and self._slots[0][0] + _WINDOW_SLOTS < slot:
+            self._count -= self._slots.popleft()[1]
+        return slot
+
+    def _update_stage(self) -> None:
+        usage = self._count / self.limit
+        if usage >= self.shed_at:
+            stage = _STAGE_SHED
+        elif usage >= self.reject_at:
+            stage = _STAGE_REJECT
+        elif usage >= self.throttle_at:
+            stage = _STAGE_THROTTLE
+        else:
+            stage = _STAGE_OK
+
+        if stage > self._stage:
+            logger.warning("%s of %s invalid requests used, holding back requests", self._count, self.limit)
+        elif stage == _STAGE_OK and self._stage != _STAGE_OK:
+            logger.info("Invalid request budget recovered")
+        self._stage = stage
+
+    @property
+    def count(self) -> int:
+        """How many invalid responses are in the window"""
+        self._expire()
+        return self._count
+
+    @property
+    def remaining(self) -> int:
+        """How many more invalid responses there can be in the window before getting banned"""
+        return max(self.limit - self.count, 0)
+
+    @property
+    def usage(self) -> float:
+        """The part of the budget that is used, between ``0`` and ``1``"""
+        return min(self.count / self.limit, 1)
+
+    def delay(self, priority: int = 0) -> float:
+        """How long a request should be delayed for.
+
+        Parameters
+        ----------
+        priority:
+            The priority of the request. **Higher** number means lower priority.
+
+        Raises
+        ------
+        InvalidRequestBudgetError
+            The request should not be done, as the budget is almost used up.
+        """
+        self._expire()
+        self._update_stage()
+        usage = self._count / self.limit
+
+        if usage >= self.shed_at:
+            raise InvalidRequestBudgetError(usage)
+        if priority < self.low_priority or usage < self.throttle_at:
+            return 0
+        if usage >= self.reject_at:
+            raise InvalidRequestBudgetError(usage)
+        return self.max_throttle_delay * (usage - self.throttle_at) / (self.reject_at - self.throttle_at)
+
+    def retry_after(self, priority: int = 0) -> float:
+        """How long until a request would no longer be rejected.
+
+        This assumes there are no more invalid responses in the meantime.
+
+        Parameters
+        ----------
+        priority:
+            The priority of the request. **Higher** number means lower priority.
+
+        Returns
+        -------
+        :class:`float`
+            How many seconds until :meth:`InvalidRequestTracker.delay` stops raising :exc:`InvalidRequestBudgetError`.
+            This is ``0`` if it does not raise.
+        """
+        self._expire()
+        reject_at = self.shed_at if priority < self.low_priority else min(self.reject_at, self.shed_at)
+        slot_length = self.per / _WINDOW_SLOTS
+        now = monotonic()
+
+        count = self._count
+        retry_at = now
+        # Slots leave the window oldest first
+        for slot, invalid_responses in self._slots:
+            if count < reject_at * self.limit:
+                break
+            count -= invalid_responses
+            retry_at = (slot + _WINDOW_SLOTS + 1) * slot_length
+        return max(retry_at - now, 0)
+
+    async def acquire(self, *, priority: int = 0, wait: bool = True) -> None:
+        """Wait until a request can be done.
+
+        Parameters
+        ----------
+        priority:
+            The priority of the request. **Higher** number means lower priority.
+        wait:
+            Whether to wait if the request is delayed.
+
+            If this is :data:`False`, this will raise :exc:`RateLimitedError` instead.
+
+        Raises
+        ------
+        InvalidRequestBudgetError
+            The request should not be done, as the budget is almost used up.
+        RateLimitedError
+            ``wait`` was set to :data:`False` and the request was delayed.
+        """
+        delay = self.delay(priority)
+        if delay <= 0:
+            return
+        if not wait:
+            raise RateLimitedError()
+        logger.debug("Delaying request with priority %s by %ss to save invalid requests", priority, delay)
+        await sleep(delay)
@@ -0,0 +1,65 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""Run a :class:`~nextcore.http.proxy.HTTPProxy`.
+
+Usage: ``python -m nextcore.http.proxy [--host HOST] [--port PORT] [--upstream URL]``
+"""
+
+from __future__ import annotations
+
+import logging
+from argparse import ArgumentParser
+
+from aiohttp import web
+
+from ..client import HTTPClient
+from .proxy import HTTPProxy
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="python -m nextcore.http.proxy", description="Rate limiting proxy for the Discord API")
+    parser.add_argument("--host", default="127.0.0.1", help="The host to listen on. Defaults to 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="The port to listen on. Defaults to 8080")
+    parser.add_argument(
+        "--upstream", default="https://discord.com/api", help="The URL to forward requests to, without the API version"
+    )
+    parser.add_argument("--timeout", type=float, default=60, help="The timeout for requests to Discord in seconds")
+    parser.add_argument(
+        "--max-rate-limit-retries", type=int, default=10, help="How many times to retry a request after a 429"
+    )
+    parser.add_argument("--rate-limit-state", default=None, help="A file to persist learned rate limits to")
+    parser.add_argument("--log-level", default="INFO", help="The log level. Defaults to INFO")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=arguments.log_level.upper())
+
+    http_client = HTTPClient(
+        timeout=arguments.timeout,
+        max_rate_limit_retries=arguments.max_rate_limit_retries,
+        rate_limit_state_path=arguments.rate_limit_state,
+    )
+    proxy = HTTPProxy(http_client, upstream=arguments.upstream)
+    web.run_app(proxy.create_app(), host=arguments.host, port=arguments.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
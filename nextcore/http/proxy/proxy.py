@@ -0,0 +1,313 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from logging import getLogger
+from typing import TYPE_CHECKING, cast
+
+from aiohttp import web
+from multidict import CIMultiDict
+
+from ...common.errors import RateLimitedError
+from ..client import HTTPClient
+from ..errors import CloudflareBanError, HTTPRequestStatusError, InvalidRequestBudgetError, RateLimitingFailedError
+from ..route import Route
+
+if TYPE_CHECKING:
+    from typing import Any, Final, Literal
+
+    from aiohttp import ClientResponse
+    from typing_extensions import LiteralString
+
+    _Method = Literal["GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"]
+
+logger = getLogger(__name__)
+
+__all__: Final[tuple[str, ...]] = ("HTTPProxy",)
+
+# Headers that only apply to a single connection and should not be forwarded.
+_HOP_BY_HOP_HEADERS: Final[frozenset[str]] = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+# Headers that are set by our own session instead of being forwarded from the client.
+_REQUEST_SKIP_HEADERS: Final[frozenset[str]] = _HOP_BY_HOP_HEADERS | {
+    "host",
+    "content-length",
+    "accept-encoding",
+    "user-agent",
+}
+# aiohttp decompresses the upstream body, so the length and encoding no longer match it.
+_RESPONSE_SKIP_HEADERS: Final[frozenset[str]] = _HOP_BY_HOP_HEADERS | {"content-length", "content-encoding"}
+
+# Segment before a major parameter -> the name of the major parameter
+_MAJOR_PARAMETERS: Final[dict[str, str]] = {
+    "channels": "channel_id",
+    "guilds": "guild_id",
+    "webhooks": "webhook_id",
+}
+
+
+class HTTPProxy:
+    """A HTTP server that sends Discord API requests through a single :class:`HTTPClient`.
+
+    This lets any number of processes share rate limits and keep-alive connections to Discord without coordinating,
+    as every request goes through the same buckets and global rate limiter.
+
+    Requests to ``/api/v{version}/...`` (or ``/api/...``) are mapped to a :class:`Route`, forwarded to ``upstream`` and
+    the response is streamed back. The ``Authorization`` header is used as the rate limit key.
+
+    The following headers are read by the proxy and not forwarded:
+
+    - ``X-Nextcore-Bucket-Priority``: The ``bucket_priority`` of the request.
+    - ``X-Nextcore-Global-Priority``: The ``global_priority`` of the request.
+    - ``X-Nextcore-Traffic-Class``: The ``traffic_class`` of the request.
+    - ``X-Nextcore-Wait``: Set to ``false`` to get a ``429`` response instead of waiting for a rate limit.
+
+    Error responses from Discord are forwarded as is. If a Cloudflare ban is detected, a ``429`` without a ``Via``
+    header is returned, the same as Discord would.
+    Requests the proxy did not send because of the rate limits or :attr:`HTTPClient.invalid_request_tracker` get a
+    ``429`` with a ``X-Nextcore-Rate-Limited`` header, and ``retry_after`` set to how long to wait before retrying.
+
+    **Example usage**
+
+    .. code-block:: bash
+
+        python -m nextcore.http.proxy --host 0.0.0.0 --port 8080
+
+    .. note::
+        Request bodies are read into memory before being sent, as they may have to be re-sent after a ``429``.
+
+    Parameters
+    ----------
+    http_client:
+        The client to send requests with. This will be set up when the app starts and closed when it stops.
+
+        If this is :data:`None`, a :class:`HTTPClient` with the default options will be used.
+    upstream:
+        The URL to forward requests to. This should not include the API version.
+
+    Attributes
+    ----------
+    http_client:
+        The client to send requests with.
+    upstream:
+        The URL to forward requests to.
+    drain_timeout:
+        How long to wait for requests in progress to finish when the app stops in seconds.
+    """
+
+    __slots__ = ("http_client", "upstream", "drain_timeout", "_route_class")
+
+    def __init__(self, http_client: HTTPClient | None = None, *, upstream: str = "https://discord.com/api") -> None:
+        self.http_client: HTTPClient = http_client or HTTPClient()
+        self.upstream: str = upstream.rstrip("/")
+        self.drain_timeout: float | None = 10
+
+        # Route.BASE_URL is a class variable, so a subclass is needed to change it for this proxy only.
+        self._route_class: type[Route] = type("ProxyRoute", (Route,), {"__slots__": (), "BASE_URL": self.upstream})
+
+    def get_route(self, method: str, path: str, *, authenticated: bool = True) -> Route:
+        """Map a request path to a :class:`Route`
+
+        Major parameters (channel, guild and webhook IDs and webhook tokens) are kept as major parameters,
+        and the other IDs, tokens and emojis are turned into parameters so requests to the same endpoint share
+        bucket metadata.
+
+        **Example usage**
+
+        .. code-block:: python3
+
+            route = proxy.get_route("GET", "/v10/channels/1234/messages/5678")
+            assert route.route == "/v10/channels/{channel_id}/messages/{id0}"
+
+        Parameters
+        ----------
+        method:
+            The HTTP method of the request.
+        path:
+            The path of the request relative to :attr:`HTTPProxy.upstream`. This should not include the query string.
+        authenticated:
+            If the request has a ``Authorization`` header. Unauthenticated requests do not count towards the global
+            rate limit.
+        """
+        segments = path.split("/")
+        template_segments: list[str] = []
+        major_parameters: dict[str, str] = {}
+        parameters: dict[str, str] = {}
+        ignore_global = not authenticated
+        ids = 0
+
+        for index, segment in enumerate(segments):
+            previous = segments[index - 1] if index > 0 else ""
+            before_previous = segments[index - 2] if index > 1 else ""
+
+            if (
+                previous in _MAJOR_PARAMETERS
+                and segment.isdigit()
+                and _MAJOR_PARAMETERS[previous] not in major_parameters
+            ):
+                name = _MAJOR_PARAMETERS[previous]
+                major_parameters[name] = segment
+            elif (
+                before_previous == "webhooks"
+                and segment
+                and not segment.isdigit()
+                and "webhook_token" not in major_parameters
+            ):
+                name = "webhook_token"
+                major_parameters[name] = segment
+            elif before_previous == "interactions" and segment:
+                # Interaction callbacks are exempt from the global rate limit
+                name = "interaction_token"
+                parameters[name] = segment
+                ignore_global = True
+            elif previous == "reactions" and segment:
+                name = "emoji"
+                parameters[name] = segment
+            elif segment.isdigit():
+                name = f"id{ids}"
+                ids += 1
+                parameters[name] = segment
+            else:
+                template_segments.append(segment.replace("{", "{{").replace("}", "}}"))
+                continue
+            template_segments.append(f"{{{name}}}")
+
+        template = cast("LiteralString", "/".join(template_segments))
+        return self._route_class(
+            cast("_Method", method.upper()), template, ignore_global=ignore_global, **major_parameters, **parameters
+        )
+
+    def create_app(self) -> web.Application:
+        """Create the :class:`aiohttp.web.Application` for the proxy
+
+        The :attr:`HTTPProxy.http_client` is set up when the app starts and closed when it is cleaned up.
+
+        **Example usage**
+
+        .. code-block:: python3
+
+            web.run_app(HTTPProxy().create_app(), port=8080)
+        """
+        app = web.Application()
+        app.router.add_route("*", "/api/{path:.*}", self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app: web.Application) -> None:
+        del app  # Unused
+        await self.http_client.setup()
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        del app  # Unused
+        await self.http_client.close(drain_timeout=self.drain_timeout)
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        """Forward a request to Discord and stream the response back
+
+        Parameters
+        ----------
+        request:
+            The request from the client.
+        """
+        try:
+            bucket_priority = int(request.headers.get("X-Nextcore-Bucket-Priority", 0))
+            global_priority = int(request.headers.get("X-Nextcore-Global-Priority", 0))
+        except ValueError:
+            return web.json_response({"message": "Invalid priority header", "code": 0}, status=400)
+        wait = request.headers.get("X-Nextcore-Wait", "true").lower() != "false"
+
+        rate_limit_key = request.headers.get("Authorization")
+        path = request.rel_url.raw_path[len("/api") :]
+        route = self.get_route(request.method, path, authenticated=rate_limit_key is not None)
+
+        headers = {
+            name: value
+            for name, value in request.headers.items()
+            if name.lower() not in _REQUEST_SKIP_HEADERS and not name.lower().startswith("x-nextcore-")
+        }
+        kwargs: dict[str, Any] = {"params": request.rel_url.query}
+        if request.body_exists:
+            kwargs["data"] = await request.read()
+
+        try:
+            response = await self.http_client.request(
+                route,
+                rate_limit_key,
+                headers=headers,
+                bucket_priority=bucket_priority,
+                global_priority=global_priority,
+                traffic_class=request.headers.get("X-Nextcore-Traffic-Class"),
+                wait=wait,
+                **kwargs,
+            )
+        except (HTTPRequestStatusError, RateLimitingFailedError) as error:
+            # The body has already been read, so it can not be streamed.
+            return await self._relay_read_response(error.response)
+        except RateLimitedError:
+            retry_after = await self.http_client.estimate_wait(
+                route, rate_limit_key, priority=bucket_priority, global_priority=global_priority
+            )
+            return self._rate_limited_response("You are being rate limited.", retry_after)
+        except InvalidRequestBudgetError:
+            # Sending it could get every client of the proxy banned by Cloudflare.
+            retry_after = self.http_client.invalid_request_tracker.retry_after(bucket_priority)
+            return self._rate_limited_response("Holding back requests to avoid a Cloudflare ban.", retry_after)
+        except CloudflareBanError:
+            logger.error("Received a Cloudflare ban while forwarding %s %s", route.method, route.path)
+            return web.json_response({"message": "Banned by Cloudflare", "code": 0}, status=429)
+
+        try:
+            proxy_response = web.StreamResponse(status=response.status, headers=self._copy_headers(response))
+            await proxy_response.prepare(request)
+            async for chunk in response.content.iter_any():
+                await proxy_response.write(chunk)
+            await proxy_response.write_eof()
+        finally:
+            response.release()
+        return proxy_response
+
+    def _rate_limited_response(self, message: str, retry_after: float) -> web.Response:
+        return web.json_response(
+            {"message": message, "retry_after": round(retry_after, 3), "global": False},
+            status=429,
+            headers={"Via": "nextcore-proxy", "X-Nextcore-Rate-Limited": "true"},
+        )
+
+    async def _relay_read_response(self, response: ClientResponse) -> web.Response:
+        body = await response.read()
+        return web.Response(status=response.status, body=body, headers=self._copy_headers(response))
+
+    def _copy_headers(self, response: ClientResponse) -> CIMultiDict[str]:
+        return CIMultiDict(
+            (name, value) for name, value in response.headers.items() if name.lower() not in _RESPONSE_SKIP_HEADERS
+        )
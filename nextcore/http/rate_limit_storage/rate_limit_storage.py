@@ -0,0 +1,540 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from asyncio import get_running_loop
+from collections import OrderedDict
+from hashlib import sha256
+from logging import getLogger
+from time import monotonic, time
+from typing import TYPE_CHECKING
+from weakref import WeakValueDictionary
+
+from ..bucket import Bucket
+from ..bucket_metadata import BucketMetadata
+from ..global_rate_limiter import BaseGlobalRateLimiter, LimitedGlobalRateLimiter
+
+if TYPE_CHECKING:
+    from typing import Any, ClassVar, Final, Iterator, Optional, Tuple
+
+    from ..route import BucketKey
+
+    # The Discord bucket hash followed by the major parameters, see Route.bucket.
+    DiscordBucketKey = Tuple[str, Optional[str], Optional[str], Optional[str], Optional[str]]
+
+logger = getLogger(__name__)
+
+__all__: Final[tuple[str, ...]] = ("RateLimitStorage",)
+
+# Methods that have a *_nowait variant
+_NOWAIT_METHODS: Final[tuple[str, ...]] = (
+    "get_bucket_by_nextcore_id",
+    "peek_bucket_by_nextcore_id",
+    "store_bucket_by_nextcore_id",
+    "create_bucket",
+    "get_bucket_by_discord_id",
+    "store_bucket_by_discord_id",
+    "get_bucket_metadata",
+    "store_metadata",
+)
+
+
+def _hash_rate_limit_key(rate_limit_key: str | None) -> str:
+    # Rate limit keys are usually tokens, so they should never leave the process in plain text.
+    if rate_limit_key is None:
+        return "null"
+    return sha256(rate_limit_key.encode("utf-8")).hexdigest()
+
+
+class RateLimitStorage:
+    """Storage for rate limits for a user.
+
+    One of these should be created for each user.
+
+    Buckets and metadata are evicted in least recently used order. This is done incrementally,
+    with a bit of work being done every time a bucket is looked up or stored.
+
+    Parameters
+    ----------
+    max_buckets:
+        The maximum amount of buckets to keep. If this is :data:`None`, there is no limit.
+
+        .. note::
+            Buckets that are in use will never be evicted, so this may be exceeded temporarily.
+    bucket_idle_timeout:
+        How long in seconds a bucket can go unused before it gets evicted. If this is :data:`None`, buckets will only be evicted when over ``max_buckets``.
+    max_bucket_metadata:
+        The maximum amount of :class:`BucketMetadata` to keep. If this is :data:`None`, there is no limit.
+    eviction_batch_size:
+        The maximum amount of buckets and metadata to check for eviction per lookup.
+
+    Attributes
+    ----------
+    global_rate_limiter:
+        The users per user global rate limit.
+    max_buckets:
+        The maximum amount of buckets to keep. If this is :data:`None`, there is no limit.
+    bucket_idle_timeout:
+        How long in seconds a bucket can go unused before it gets evicted. If this is :data:`None`, buckets will only be evicted when over ``max_buckets``.
+    max_bucket_metadata:
+        The maximum amount of :class:`BucketMetadata` to keep. If this is :data:`None`, there is no limit.
+    eviction_batch_size:
+        The maximum amount of buckets and metadata to check for eviction per lookup.
+    evicted_buckets:
+        How many buckets has been evicted.
+    evicted_bucket_metadata:
+        How many :class:`BucketMetadata` has been evicted.
+    supports_nowait:
+        Whether the ``*_nowait`` methods can be used instead of the async ones.
+        :class:`HTTPClient` uses them when possible to avoid creating coroutines on every request.
+
+        This is set to :data:`False` automatically for subclasses that override a async method without overriding the
+        matching ``*_nowait`` method. Storages that need to suspend, for example to talk to a remote server,
+        should only override the async methods.
+    """
+
+    __slots__ = (
+        "_nextcore_buckets",
+        "_bucket_last_used",
+        "_discord_buckets",
+        "_bucket_metadata",
+        "global_rate_limiter",
+        "max_buckets",
+        "bucket_idle_timeout",
+        "max_bucket_metadata",
+        "eviction_batch_size",
+        "evicted_buckets",
+        "evicted_bucket_metadata",
+    )
+
+    supports_nowait: ClassVar[bool] = True
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "supports_nowait" in cls.__dict__:
+            # Explicitly set
+            return
+        for method_name in _NOWAIT_METHODS:
+            if method_name in cls.__dict__ and f"{method_name}_nowait" not in cls.__dict__:
+                # The async version was overridden, so the *_nowait version would skip it.
+                cls.supports_nowait = False
+                return
+
+    def __init__(
+        self,
+        *,
+        max_buckets: int | None = 100_000,
+        bucket_idle_timeout: float | None = 60,
+        max_bucket_metadata: int | None = 10_000,
+        eviction_batch_size: int = 4,
+    ) -> None:
+        self._nextcore_buckets: OrderedDict[BucketKey, Bucket] = OrderedDict()  # Least recently used first
+        self._bucket_last_used: dict[BucketKey, float] = {}
+        self._discord_buckets: WeakValueDictionary[DiscordBucketKey, Bucket] = WeakValueDictionary()
+        self._bucket_metadata: OrderedDict[str, BucketMetadata] = OrderedDict()  # Least recently used first
+        self.global_rate_limiter: BaseGlobalRateLimiter = LimitedGlobalRateLimiter()
+
+        # Eviction
+        self.max_buckets: int | None = max_buckets
+        self.bucket_idle_timeout: float | None = bucket_idle_timeout
+        self.max_bucket_metadata: int | None = max_bucket_metadata
+        self.eviction_batch_size: int = eviction_batch_size
+        self.evicted_buckets: int = 0
+        self.evicted_bucket_metadata: int = 0
+
+    # These are async and not just public dicts because we want to support custom implementations that use asyncio.
+    # Storages that never suspend also implement the *_nowait variants, which HTTPClient uses to skip the coroutines.
+    async def get_bucket_by_nextcore_id(self, nextcore_id: BucketKey) -> Bucket | None:
+        """Get a rate limit bucket from a nextcore created id.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated bucket id. This can be gotten by using :attr:`Route.bucket`
+        """
+        return self.get_bucket_by_nextcore_id_nowait(nextcore_id)
+
+    def iter_buckets(self) -> Iterator[tuple[BucketKey, Bucket]]:
+        """Every bucket stored in this process by its nextcore id.
+
+        This does not count as using the buckets, so it does not affect eviction.
+
+        .. note::
+            Buckets shared by multiple routes are included once for every route.
+        """
+        return iter(list(self._nextcore_buckets.items()))
+
+    def get_bucket_by_nextcore_id_nowait(self, nextcore_id: BucketKey) -> Bucket | None:
+        """Get a rate limit bucket from a nextcore created id without suspending.
+
+        This is only used if :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated bucket id. This can be gotten by using :attr:`Route.bucket`
+        """
+        now = monotonic()
+        self._evict_buckets(now)
+
+        bucket = self._nextcore_buckets.get(nextcore_id)
+        if bucket is not None:
+            self._nextcore_buckets.move_to_end(nextcore_id)
+            self._bucket_last_used[nextcore_id] = now
+        return bucket
+
+    async def peek_bucket_by_nextcore_id(self, nextcore_id: BucketKey) -> Bucket | None:
+        """Get a rate limit bucket from a nextcore created id without counting it as used.
+
+        Unlike :meth:`RateLimitStorage.get_bucket_by_nextcore_id`, this does not affect eviction.
+        Storages that override :meth:`RateLimitStorage.get_bucket_by_nextcore_id` but not this use it instead.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated bucket id. This can be gotten by using :attr:`Route.bucket`
+        """
+        if type(self).get_bucket_by_nextcore_id is not RateLimitStorage.get_bucket_by_nextcore_id:
+            # The buckets may not be stored in this process.
+            return await self.get_bucket_by_nextcore_id(nextcore_id)
+        return self.peek_bucket_by_nextcore_id_nowait(nextcore_id)
+
+    def peek_bucket_by_nextcore_id_nowait(self, nextcore_id: BucketKey) -> Bucket | None:
+        """Get a rate limit bucket from a nextcore created id without counting it as used or suspending.
+
+        This is only used if :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated bucket id. This can be gotten by using :attr:`Route.bucket`
+        """
+        return self._nextcore_buckets.get(nextcore_id)
+
+    async def store_bucket_by_nextcore_id(self, nextcore_id: BucketKey, bucket: Bucket) -> None:
+        """Store a rate limit bucket by nextcore generated id.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated id of the
+        bucket:
+            The bucket to store.
+        """
+        self.store_bucket_by_nextcore_id_nowait(nextcore_id, bucket)
+
+    def store_bucket_by_nextcore_id_nowait(self, nextcore_id: BucketKey, bucket: Bucket) -> None:
+        """Store a rate limit bucket by nextcore generated id without suspending.
+
+        This is only used if :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated id of the
+        bucket:
+            The bucket to store.
+        """
+        now = monotonic()
+        self._evict_buckets(now)
+
+        self._nextcore_buckets[nextcore_id] = bucket
+        self._nextcore_buckets.move_to_end(nextcore_id)
+        self._bucket_last_used[nextcore_id] = now
+
+    async def create_bucket(self, nextcore_id: BucketKey, metadata: BucketMetadata) -> Bucket:
+        """Create a new rate limit bucket.
+
+        This does not store the bucket, use :meth:`RateLimitStorage.store_bucket_by_nextcore_id` for that.
+
+        .. note::
+            This is a extension point for storages that need a custom :class:`Bucket` implementation.
+            Override :meth:`RateLimitStorage.create_bucket_nowait` instead if creating it does not need to suspend.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated id of the bucket. This can be gotten by using :attr:`Route.bucket`
+        metadata:
+            The metadata for the bucket.
+        """
+        return self.create_bucket_nowait(nextcore_id, metadata)
+
+    def create_bucket_nowait(self, nextcore_id: BucketKey, metadata: BucketMetadata) -> Bucket:
+        """Create a new rate limit bucket without suspending.
+
+        This is only used if :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated id of the bucket. This can be gotten by using :attr:`Route.bucket`
+        metadata:
+            The metadata for the bucket.
+        """
+        return Bucket(metadata)
+
+    async def get_bucket_by_discord_id(self, discord_id: DiscordBucketKey) -> Bucket | None:
+        """Get a rate limit bucket from the Discord bucket hash.
+
+        This can be obtained via the ``X-Ratelimit-Bucket`` header.
+
+        Parameters
+        ----------
+        discord_id:
+            The Discord bucket hash followed by the major parameters of the route, like in :attr:`Route.bucket`.
+
+            Discord only shares a rate limit between routes with the same hash and major parameters.
+        """
+        return self.get_bucket_by_discord_id_nowait(discord_id)
+
+    def get_bucket_by_discord_id_nowait(self, discord_id: DiscordBucketKey) -> Bucket | None:
+        """Get a rate limit bucket from the Discord bucket hash without suspending.
+
+        This is only used if :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        discord_id:
+            The Discord bucket hash followed by the major parameters of the route, like in :attr:`Route.bucket`.
+
+            Discord only shares a rate limit between routes with the same hash and major parameters.
+        """
+        return self._discord_buckets.get(discord_id)
+
+    async def store_bucket_by_discord_id(self, discord_id: DiscordBucketKey, bucket: Bucket) -> None:
+        """Store a rate limit bucket by the discord bucket hash.
+
+        This can be obtained via the ``X-Ratelimit-Bucket`` header.
+
+        Parameters
+        ----------
+        discord_id:
+            The Discord bucket hash followed by the major parameters of the route, like in :attr:`Route.bucket`.
+
+            Discord only shares a rate limit between routes with the same hash and major parameters.
+        bucket:
+            The bucket to store.
+        """
+        self.store_bucket_by_discord_id_nowait(discord_id, bucket)
+
+    def store_bucket_by_discord_id_nowait(self, discord_id: DiscordBucketKey, bucket: Bucket) -> None:
+        """Store a rate limit bucket by the discord bucket hash without suspending.
+
+        This is only used if :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        discord_id:
+            The Discord bucket hash followed by the major parameters of the route, like in :attr:`Route.bucket`.
+
+            Discord only shares a rate limit between routes with the same hash and major parameters.
+        bucket:
+            The bucket to store.
+        """
+        self._discord_buckets[discord_id] = bucket
+
+    async def get_bucket_metadata(self, bucket_route: str) -> BucketMetadata | None:
+        """Get the metadata for a bucket from the route.
+
+        Parameters
+        ----------
+        bucket_route:
+            The bucket route.
+        """
+        return self.get_bucket_metadata_nowait(bucket_route)
+
+    def get_bucket_metadata_nowait(self, bucket_route: str) -> BucketMetadata | None:
+        """Get the metadata for a bucket from the route without suspending.
+
+        This is only used if :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        bucket_route:
+            The bucket route.
+        """
+        metadata = self._bucket_metadata.get(bucket_route)
+        if metadata is not None:
+            self._bucket_metadata.move_to_end(bucket_route)
+        return metadata
+
+    async def store_metadata(self, bucket_route: str, metadata: BucketMetadata) -> None:
+        """Store the metadata for a bucket from the route.
+
+        Parameters
+        ----------
+        bucket_route:
+            The bucket route.
+        metadata:
+            The metadata to store.
+        """
+        self.store_metadata_nowait(bucket_route, metadata)
+
+    def store_metadata_nowait(self, bucket_route: str, metadata: BucketMetadata) -> None:
+        """Store the metadata for a bucket from the route without suspending.
+
+        This is only used if :attr:`RateLimitStorage.supports_nowait` is :data:`True`.
+
+        Parameters
+        ----------
+        bucket_route:
+            The bucket route.
+        metadata:
+            The metadata to store.
+        """
+        self._bucket_metadata[bucket_route] = metadata
+        self._bucket_metadata.move_to_end(bucket_route)
+        self._evict_bucket_metadata()
+
+    # Persistence
+    async def snapshot(self, *, include_buckets: bool = False) -> dict[str, Any]:
+        """Export what has been learned about the rate limits so it can be restored with :meth:`RateLimitStorage.restore`
+
+        This includes the limit and Discord bucket hash of every route.
+
+        Parameters
+        ----------
+        include_buckets:
+            Whether to include how many requests are remaining and when every bucket resets.
+
+            This is only useful if the snapshot is restored before the buckets reset.
+
+        Returns
+        -------
+        :class:`dict`
+            A JSON serializable snapshot.
+        """
+        metadata_routes: dict[int, str] = {}
+        metadata: dict[str, list[Any]] = {}
+        for bucket_route, bucket_metadata in self._bucket_metadata.items():
+            metadata_routes[id(bucket_metadata)] = bucket_route
+            metadata[bucket_route] = [bucket_metadata.limit, bucket_metadata.unlimited, bucket_metadata.bucket_hash]
+
+        snapshot: dict[str, Any] = {"metadata": metadata}
+
+        if include_buckets:
+            buckets: list[list[Any]] = []
+            loop_offset = time() - get_running_loop().time()  # Converts event loop time to unix time
+
+            for nextcore_id, bucket in self._nextcore_buckets.items():
+                bucket_route = metadata_routes.get(id(bucket.metadata))
+                if bucket_route is None or bucket.remaining is None or bucket.reset_at is None:
+                    # Nothing worth saving
+                    continue
+                # JSON has no tuples, they are turned back into one by restore.
+                raw_nextcore_id = nextcore_id if isinstance(nextcore_id, str) else list(nextcore_id)
+                buckets.append([raw_nextcore_id, bucket_route, bucket.remaining, bucket.reset_at + loop_offset])
+
+            snapshot["buckets"] = buckets
+        return snapshot
+
+    async def restore(self, snapshot: dict[str, Any]) -> None:
+        """Restore rate limit info from :meth:`RateLimitStorage.snapshot`
+
+        Buckets that have already reset will be ignored.
+
+        Parameters
+        ----------
+        snapshot:
+            The snapshot to restore.
+        """
+        for bucket_route, (limit, unlimited, bucket_hash) in snapshot["metadata"].items():
+            await self.store_metadata(bucket_route, BucketMetadata(limit, unlimited=unlimited, bucket_hash=bucket_hash))
+
+        now = time()
+        for raw_nextcore_id, bucket_route, remaining, reset_at in snapshot.get("buckets", []):
+            nextcore_id = raw_nextcore_id if isinstance(raw_nextcore_id, str) else tuple(raw_nextcore_id)
+            bucket_metadata = await self.get_bucket_metadata(bucket_route)
+            if bucket_metadata is None or reset_at <= now:
+                continue
+
+            bucket = await self.create_bucket(nextcore_id, bucket_metadata)
+            await bucket.update(remaining, reset_at - now)
+            await self.store_bucket_by_nextcore_id(nextcore_id, bucket)
+            if bucket_metadata.bucket_hash is not None and not isinstance(nextcore_id, str):
+                # Only linked to buckets with the same major parameters, like HTTPClient does.
+                await self.store_bucket_by_discord_id((bucket_metadata.bucket_hash, *nextcore_id[1:]), bucket)
+
+        logger.debug("Restored rate limit info for %s routes", len(snapshot["metadata"]))
+
+    # Eviction
+    def _evict_buckets(self, now: float) -> None:
+        buckets = self._nextcore_buckets
+        idle_timeout = self.bucket_idle_timeout
+
+        for _ in range(self.eviction_batch_size):
+            if not buckets:
+                return
+
+            # The least recently used bucket
+            bucket_id = next(iter(buckets))
+
+            over_capacity = self.max_buckets is not None and len(buckets) > self.max_buckets
+            idle = idle_timeout is not None and now - self._bucket_last_used[bucket_id] >= idle_timeout
+            if not over_capacity and not idle:
+                # Every other bucket was used more recently than this one.
+                return
+
+            if buckets[bucket_id].dirty:
+                # In use, check it again later.
+                buckets.move_to_end(bucket_id)
+                self._bucket_last_used[bucket_id] = now
+                continue
+
+            logger.debug("Evicting bucket %s", bucket_id)
+            # Delete the main reference. Other references like RateLimitStorage._discord_buckets should get cleaned up automatically as it is a weakref.
+            del buckets[bucket_id]
+            del self._bucket_last_used[bucket_id]
+            self.evicted_buckets += 1
+
+    def _evict_bucket_metadata(self) -> None:
+        if self.max_bucket_metadata is None:
+            return
+
+        metadata = self._bucket_metadata
+        for _ in range(self.eviction_batch_size):
+            if len(metadata) <= self.max_bucket_metadata:
+                return
+            bucket_route, _ = metadata.popitem(last=False)
+            logger.debug("Evicting bucket metadata for %s", bucket_route)
+            self.evicted_bucket_metadata += 1
+
+    async def close(self) -> None:
+        """Clean up before deletion.
+
+        This should be done when this instance is never going to be used anymore
+
+        .. warning::
+            This will cancel all pending requests.
+        """
+        await self.global_rate_limiter.close()
+
+        # Clear up the buckets
+        for bucket in self._nextcore_buckets.values():
+            await bucket.close()
+
+        self._nextcore_buckets.clear()
+        self._bucket_last_used.clear()
+
+        # Clear up the metadata
+        self._bucket_metadata.clear()
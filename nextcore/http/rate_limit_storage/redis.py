@@ -0,0 +1,1131 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from asyncio import (
+    CancelledError,
+    Lock,
+    create_task,
+    get_running_loop,
+    open_connection,
+    wait,
+)
+from collections import deque
+from hashlib import sha1
+from logging import getLogger
+from typing import TYPE_CHECKING, cast
+
+from ...common.errors import RateLimitedError
+from ...common.timer_wheel import get_timer_wheel
+from ...common.waiter_queue import WaiterQueue
+from ..bucket import Bucket
+from ..global_rate_limiter import BaseGlobalRateLimiter
+from .rate_limit_storage import RateLimitStorage, _hash_rate_limit_key
+
+if TYPE_CHECKING:
+    from asyncio import Future, StreamReader, StreamWriter, Task
+    from types import TracebackType
+    from typing import Any, AsyncContextManager, Awaitable, Callable, Final, Tuple, Union
+
+    from ..bucket_metadata import BucketMetadata
+    from ..route import BucketKey
+
+    RedisReply = Union[bytes, int, str, None, "list[RedisReply]"]
+    ReserveReply = Tuple[int, int, int]
+
+logger = getLogger(__name__)
+
+__all__: Final[tuple[str, ...]] = (
+    "RedisError",
+    "RedisRateLimitStorage",
+    "RedisBucket",
+    "RedisGlobalRateLimiter",
+)
+
+# Reply kinds from the reserve scripts. The scripts return {kind, amount, milliseconds}.
+_GRANTED: Final[int] = 0  # amount spots were reserved, the window resets in milliseconds
+_BLIND: Final[int] = 1  # The limit is unknown, one request can be made to find out
+_UNLIMITED: Final[int] = 2
+_WAIT: Final[int] = 3  # Try again in amount milliseconds
+
+# Bucket hash fields: l = limit (0 is unknown, -1 is unlimited), r = remaining, t = reset at, w = window length,
+# b = a request to find out the limit is in progress until, h = Discord bucket hash. Times are in milliseconds.
+_TIME_SOURCE: Final = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+"""
+
+
+class _Script:
+    """A Lua script that is ran on the server."""
+
+    __slots__ = ("name", "source", "sha")
+
+    def __init__(self, name: str, source: str) -> None:
+        self.name: str = name
+        self.source: str = source
+        self.sha: str = sha1(source.encode("utf-8")).hexdigest()
+
+
+# KEYS: bucket. ARGV: count, limit hint, blind request timeout, poll interval, ttl
+_RESERVE_BUCKET: Final[_Script] = _Script(
+    "reserve_bucket",
+    _TIME_SOURCE
+    + """
+local count = tonumber(ARGV[1])
+local record = redis.call('HMGET', KEYS[1], 'l', 'r', 't', 'w', 'b')
+local limit = tonumber(record[1]) or 0
+local remaining = tonumber(record[2]) or 0
+local reset_at = tonumber(record[3]) or 0
+local window = tonumber(record[4]) or 0
+local blind_until = tonumber(record[5]) or 0
+
+if limit == -1 then
+    return {2, 0, 0}
+end
+if limit == 0 then
+    limit = tonumber(ARGV[2])
+end
+
+if limit > 0 and window > 0 then
+    if reset_at <= now then
+        remaining = limit
+        reset_at = now + window
+    end
+    if remaining <= 0 then
+        return {3, reset_at - now, 0}
+    end
+    local granted = math.min(count, remaining)
+    redis.call('HSET', KEYS[1], 'l', limit, 'r', remaining - granted, 't', reset_at)
+    redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[5]))
+    return {0, granted, reset_at - now}
+end
+
+if blind_until > now then
+    return {3, math.min(blind_until - now, tonumber(ARGV[4])), 0}
+end
+redis.call('HSET', KEYS[1], 'l', limit, 'b', now + tonumber(ARGV[3]))
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[5]))
+return {1, 1, 0}
+""",
+)
+
+# KEYS: bucket. ARGV: remaining, reset after, limit, unlimited, bucket hash, ttl
+_UPDATE_BUCKET: Final[_Script] = _Script(
+    "update_bucket",
+    _TIME_SOURCE
+    + """
+local ttl = tonumber(ARGV[6])
+if ARGV[4] == '1' then
+    redis.call('HSET', KEYS[1], 'l', -1, 'b', 0)
+    redis.call('PEXPIRE', KEYS[1], ttl)
+    return 1
+end
+
+local record = redis.call('HMGET', KEYS[1], 'l', 'r', 't', 'w')
+local stored_limit = tonumber(record[1]) or 0
+local stored_remaining = tonumber(record[2]) or 0
+local reset_at = tonumber(record[3]) or 0
+local window = tonumber(record[4]) or 0
+
+local remaining = tonumber(ARGV[1])
+local reset_after = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+if stored_limit > 0 and window > 0 and reset_at > now then
+    -- Same window, requests from other clients may not be counted by Discord yet.
+    remaining = math.min(stored_remaining, remaining)
+end
+if limit == 0 then
+    limit = math.max(stored_limit, remaining)
+end
+
+redis.call(
+    'HSET', KEYS[1], 'l', limit, 'r', remaining, 't', now + reset_after, 'w', math.max(window, reset_after), 'b', 0,
+    'h', ARGV[5]
+)
+redis.call('PEXPIRE', KEYS[1], math.max(ttl, reset_after))
+return 1
+""",
+)
+
+# KEYS: bucket. ARGV: was the request finding out the limit (1 or 0), did the request fail (1 or 0)
+_RELEASE_BUCKET: Final[_Script] = _Script(
+    "release_bucket",
+    _TIME_SOURCE
+    + """
+local record = redis.call('HMGET', KEYS[1], 'l', 'r', 't', 'w')
+local limit = tonumber(record[1]) or 0
+local remaining = tonumber(record[2]) or 0
+local reset_at = tonumber(record[3]) or 0
+local window = tonumber(record[4]) or 0
+local known = limit > 0 and window > 0
+
+if ARGV[1] == '1' then
+    if not known and limit ~= -1 then
+        redis.call('HSET', KEYS[1], 'b', 0)
+    end
+elseif ARGV[2] == '1' and known and reset_at > now then
+    redis.call('HSET', KEYS[1], 'r', math.min(remaining + 1, limit))
+end
+return 1
+""",
+)
+
+# KEYS: global. ARGV: count, limit
+_RESERVE_GLOBAL: Final[_Script] = _Script(
+    "reserve_global",
+    _TIME_SOURCE
+    + """
+local record = redis.call('HMGET', KEYS[1], 'c', 's', 'b')
+local used = tonumber(record[1]) or 0
+local window_start = tonumber(record[2]) or 0
+local blocked_until = tonumber(record[3]) or 0
+local limit = tonumber(ARGV[2])
+
+if blocked_until > now then
+    return {3, blocked_until - now, 0}
+end
+if now - window_start >= 1000 then
+    window_start = now
+    used = 0
+end
+if used >= limit then
+    return {3, window_start + 1000 - now, 0}
+end
+
+local granted = math.min(tonumber(ARGV[1]), limit - used)
+redis.call('HSET', KEYS[1], 'c', used + granted, 's', window_start)
+redis.call('PEXPIRE', KEYS[1], 60000)
+return {0, granted, window_start + 1000 - now}
+""",
+)
+
+# KEYS: global. ARGV: retry after
+_BLOCK_GLOBAL: Final[_Script] = _Script(
+    "block_global",
+    _TIME_SOURCE
+    + """
+local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'b')) or 0
+redis.call('HSET', KEYS[1], 'b', math.max(blocked_until, now + tonumber(ARGV[1])))
+redis.call('PEXPIRE', KEYS[1], 60000 + tonumber(ARGV[1]))
+return 1
+""",
+)
+
+_SCRIPTS: Final[tuple[_Script, ...]] = (
+    _RESERVE_BUCKET,
+    _UPDATE_BUCKET,
+    _RELEASE_BUCKET,
+    _RESERVE_GLOBAL,
+    _BLOCK_GLOBAL,
+)
+
+
+class RedisError(Exception):
+    """A error reply from the Redis server.
+
+    Parameters
+    ----------
+    message:
+        The error message from the server.
+
+    Attributes
+    ----------
+    message:
+        The error message from the server.
+    """
+
+    def __init__(self, message: str) -> None:
+        self.message: str = message
+
+        super().__init__(message)
+
+
+def _encode_command(args: tuple[str | bytes | int, ...]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, int):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: StreamReader) -> RedisReply | RedisError:
+    line = await reader.readuntil(b"\r\n")
+    prefix = line[:1]
+    body = line[1:-2]
+
+    if prefix == b"+":
+        return body.decode("utf-8")
+    if prefix == b"-":
+        return RedisError(body.decode("utf-8"))
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        length = int(body)
+        if length == -1:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(body)
+        if length == -1:
+            return None
+        replies: list[RedisReply] = []
+        for _ in range(length):
+            reply = await _read_reply(reader)
+            if isinstance(reply, RedisError):
+                raise reply
+            replies.append(reply)
+        return replies
+    raise ConnectionError(f"Invalid reply from Redis: {line!r}")
+
+
+class _RedisConnection:
+    """A pipelined connection to a Redis server.
+
+    Commands are not sent straight away, they are buffered and sent together on the next event loop iteration.
+    Replies are matched up with commands in the order they were sent, so there can be many commands in flight at once.
+    """
+
+    __slots__ = (
+        "host",
+        "port",
+        "password",
+        "database",
+        "_reader",
+        "_writer",
+        "_read_task",
+        "_replies",
+        "_write_buffer",
+        "_connect_lock",
+        "_users",
+    )
+
+    def __init__(self, host: str, port: int, *, password: str | None = None, database: int = 0) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.password: str | None = password
+        self.database: int = database
+        self._reader: StreamReader | None = None
+        self._writer: StreamWriter | None = None
+        self._read_task: Task[None] | None = None
+        self._replies: deque[Future[RedisReply]] = deque()
+        self._write_buffer: list[bytes] = []
+        self._connect_lock: Lock | None = None
+        self._users: int = 0  # Storages using this connection
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> None:
+        """Connect if not already connected."""
+        if self.connected:
+            return
+
+        if self._connect_lock is None:
+            self._connect_lock = Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return
+
+            logger.debug("Connecting to Redis at %s:%s", self.host, self.port)
+            self._reader, self._writer = await open_connection(self.host, self.port)
+            self._read_task = create_task(self._read_loop(self._reader))
+
+            setup: list[Future[RedisReply]] = []
+            if self.password is not None:
+                setup.append(self.call("AUTH", self.password))
+            if self.database != 0:
+                setup.append(self.call("SELECT", self.database))
+            for script in _SCRIPTS:
+                setup.append(self.call("SCRIPT", "LOAD", script.source))
+            for future in setup:
+                await future
+
+    def call(self, *args: str | bytes | int) -> Future[RedisReply]:
+        """Send a command.
+
+        This has to be connected.
+
+        Returns
+        -------
+        :class:`asyncio.Future`
+            A future that will be completed with the reply.
+        """
+        if not self.connected:
+            raise ConnectionError("Not connected to Redis")
+
+        loop = get_running_loop()
+        future: Future[RedisReply] = loop.create_future()
+        self._replies.append(future)
+
+        if not self._write_buffer:
+            loop.call_soon(self._flush)
+        self._write_buffer.append(_encode_command(args))
+        return future
+
+    async def run_script(self, script: _Script, keys: tuple[str, ...], *args: str | int) -> RedisReply:
+        """Run a script, connecting if needed."""
+        await self.connect()
+        try:
+            return await self.call("EVALSHA", script.sha, len(keys), *keys, *args)
+        except RedisError as error:
+            if not error.message.startswith("NOSCRIPT"):
+                raise
+            # The script cache was cleared, for example by a restart.
+            return await self.call("EVAL", script.source, len(keys), *keys, *args)
+
+    def run_script_nowait(self, script: _Script, keys: tuple[str, ...], *args: str | int) -> None:
+        """Run a script without waiting for the reply.
+
+        Errors will be logged.
+        """
+        if not self.connected:
+            logger.warning("Not connected to Redis, dropping %s", script.name)
+            return
+
+        def on_reply(future: Future[RedisReply]) -> None:
+            if future.cancelled():
+                return
+            error = future.exception()
+            if isinstance(error, RedisError) and error.message.startswith("NOSCRIPT") and self.connected:
+                self.call("EVAL", script.source, len(keys), *keys, *args).add_done_callback(on_reply)
+            elif error is not None:
+                logger.error("Running %s failed", script.name, exc_info=error)
+
+        self.call("EVALSHA", script.sha, len(keys), *keys, *args).add_done_callback(on_reply)
+
+    def _flush(self) -> None:
+        if not self._write_buffer:
+            return
+        data = b"".join(self._write_buffer)
+        self._write_buffer.clear()
+        if self._writer is None:
+            return
+        self._writer.write(data)
+
+    async def _read_loop(self, reader: StreamReader) -> None:
+        error: BaseException = ConnectionError("Connection to Redis was lost")
+        try:
+            while True:
+                reply = await _read_reply(reader)
+                future = self._replies.popleft()
+                if future.done():
+                    continue
+                if isinstance(reply, RedisError):
+                    future.set_exception(reply)
+                else:
+                    future.set_result(reply)
+        except (ConnectionError, EOFError, IndexError) as exception:
+            logger.debug("Redis connection closed", exc_info=exception)
+        except CancelledError:
+            error = ConnectionError("Connection to Redis was closed")
+            raise
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = None
+            self._reader = None
+            self._write_buffer.clear()
+
+            replies = self._replies
+            self._replies = deque()
+            for future in replies:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def close(self, *, timeout: float = 1) -> None:
+        """Close the connection.
+
+        Parameters
+        ----------
+        timeout:
+            How long to wait for replies to commands that were already sent.
+        """
+        if self._replies and self.connected:
+            # Commands that were not waited for, like bucket updates, should still reach the server.
+            self._flush()
+            await wait(list(self._replies), timeout=timeout)
+
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except CancelledError:
+                pass
+            self._read_task = None
+
+
+class _BucketMerged(Exception):
+    """Stops requests waiting for a merged :class:`RedisBucket`, so they retry on the bucket that took over"""
+
+
+class _LeasePool:
+    """Hands out spots reserved from the server in batches.
+
+    While a reserve is in flight, other requests queue up locally and are all reserved in the next round trip.
+    ``prefetch`` extra spots are reserved every time, these are used without contacting the server until the window resets.
+    """
+
+    __slots__ = (
+        "prefetch",
+        "_fetch",
+        "_pending",
+        "_leased",
+        "_lease_expires_at",
+        "_blind_grants",
+        "_unlimited",
+        "_refill_task",
+        "_sleeper",
+    )
+
+    def __init__(self, fetch: Callable[[int], Awaitable[ReserveReply]], prefetch: int) -> None:
+        self.prefetch: int = prefetch
+        self._fetch: Callable[[int], Awaitable[ReserveReply]] = fetch
+        self._pending: WaiterQueue = WaiterQueue()
+        self._leased: int = 0
+        self._lease_expires_at: float = 0  # Event loop time
+        self._blind_grants: int = 0
+        self._unlimited: bool = False
+        self._refill_task: Task[None] | None = None
+        self._sleeper: Future[None] | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self._pending) or self._refill_task is not None
+
+    async def acquire(self, priority: int, wait: bool, *, front: bool = False) -> int:
+        """Get a spot
+
+        Returns
+        -------
+        :class:`int`
+            The kind of spot, :data:`_GRANTED`, :data:`_BLIND` or :data:`_UNLIMITED`
+        """
+        if self._unlimited:
+            return _UNLIMITED
+        if self._take_lease():
+            return _GRANTED
+
+        if not wait:
+            kind, amount, reset_after = await self._fetch(1 + self.prefetch)
+            if kind == _WAIT:
+                raise RateLimitedError()
+            if kind == _GRANTED:
+                self._add_leases(amount - 1, reset_after)
+            elif kind == _UNLIMITED:
+                self._unlimited = True
+            return kind
+
+        future = self._pending.put(priority, front=front)
+        if self._refill_task is None:
+            self._refill_task = create_task(self._refill())
+        try:
+            await future
+        except:
+            self._pending.discard(future)
+            raise
+
+        if self._unlimited:
+            return _UNLIMITED
+        if self._blind_grants:
+            self._blind_grants -= 1
+            return _BLIND
+        return _GRANTED
+
+    def wake(self) -> None:
+        """Retry reserving now instead of waiting."""
+        if self._sleeper is not None and not self._sleeper.done():
+            self._sleeper.set_result(None)
+
+    def drop_leases(self) -> None:
+        """Stop using the spots that were reserved, for example because the rate limit was hit."""
+        self._leased = 0
+
+    def hand_over(self) -> None:
+        """Make the waiters raise :exc:`_BucketMerged`, and stop reserving spots for them."""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+        self.drop_leases()
+        self._pending.close(_BucketMerged)
+
+    def _take_lease(self) -> bool:
+        if not self._leased or self._pending:
+            # Waiters are handled in priority order by the refill task.
+            return False
+        if get_running_loop().time() >= self._lease_expires_at:
+            # The window has reset, so the spots are not valid anymore.
+            self._leased = 0
+            return False
+        self._leased -= 1
+        return True
+
+    def _add_leases(self, count: int, reset_after: int) -> None:
+        if count <= 0:
+            return
+        now = get_running_loop().time()
+        if now >= self._lease_expires_at:
+            self._leased = 0
+        self._leased += count
+        self._lease_expires_at = now + reset_after / 1000
+
+    async def _refill(self) -> None:
+        try:
+            while self._pending:
+                # Use leases left over from the last round first
+                while self._pending and self._take_lease_for_waiter():
+                    ...
+
+                if not self._pending:
+                    break
+
+                kind, amount, reset_after = await self._fetch(len(self._pending) + self.prefetch)
+
+                if kind == _GRANTED:
+                    released = self._pending.release(amount)
+                    self._add_leases(amount - released, reset_after)
+                elif kind == _BLIND:
+                    self._blind_grants += 1
+                    self._pending.release(1)
+                elif kind == _UNLIMITED:
+                    self._unlimited = True
+                    self._pending.release()
+                else:
+                    await self._sleep(amount / 1000)
+        except CancelledError:
+            raise
+        except Exception as error:
+            logger.exception("Reserving rate limit spots failed")
+            self._pending.close(error)
+        finally:
+            self._refill_task = None
+
+    def _take_lease_for_waiter(self) -> bool:
+        if not self._leased or get_running_loop().time() >= self._lease_expires_at:
+            return False
+        if self._pending.release(1):
+            self._leased -= 1
+            return True
+        return False
+
+    async def _sleep(self, delay: float) -> None:
+        self._sleeper = get_running_loop().create_future()
+        handle = get_timer_wheel().call_later(delay, self.wake)
+        try:
+            await self._sleeper
+        finally:
+            handle.cancel()
+            self._sleeper = None
+
+    async def close(self) -> None:
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+        self._pending.close()
+
+
+class RedisBucket(Bucket):
+    """A :class:`Bucket` that is shared through a Redis server with :class:`RedisRateLimitStorage`.
+
+    .. note::
+        This should be created through :meth:`RedisRateLimitStorage.create_bucket`
+
+    Parameters
+    ----------
+    storage:
+        The storage the bucket belongs to.
+    key:
+        The Redis key of the bucket.
+    metadata:
+        The metadata for the bucket.
+
+    Attributes
+    ----------
+    key:
+        The Redis key of the bucket.
+    """
+
+    __slots__ = ("key", "_storage", "_pool")
+
+    def __init__(self, storage: RedisRateLimitStorage, key: str, metadata: BucketMetadata) -> None:
+        super().__init__(metadata)
+        self.key: str = key
+        self._storage: RedisRateLimitStorage = storage
+        self._pool: _LeasePool = _LeasePool(self._fetch, storage.prefetch)
+
+    def acquire(self, *, priority: int = 0, wait: bool = True, requeue: bool = False) -> AsyncContextManager[bool]:
+        """Use a spot in the rate limit.
+
+        Parameters
+        ----------
+        priority:
+            The priority of a request. A lower number means it will be executed faster.
+
+            .. note::
+                This only applies to requests from the current process.
+        wait:
+            Wait for a spot in the rate limit.
+
+            If this is set to :data:`False`, this will raise :exc:`RateLimitedError` if no spot is available right now.
+        requeue:
+            Whether this is a retry of a request that was rate limited.
+
+            If it has to wait, it will be put in front of the other requests from this process with the same priority.
+
+        Raises
+        ------
+        RateLimitedError
+            You are rate limited and ``wait`` was set to :data:`False`
+        """
+        return _RedisBucketAcquire(self, priority, wait, requeue)
+
+    async def update(  # type: ignore [override] # The overloads are inherited
+        self, remaining: int | None = None, reset_after: float | None = None, *, unlimited: bool = False
+    ) -> None:
+        # Keep the local state updated so Bucket.remaining and Bucket.reset_at works.
+        if unlimited:
+            await super().update(unlimited=True)
+            args = ("0", "0", "0", "1", "")
+        else:
+            assert remaining is not None and reset_after is not None
+            await super().update(remaining, reset_after)
+            args = (
+                str(remaining),
+                str(int((reset_after + self.reset_offset_seconds) * 1000)),
+                str(self.metadata.limit or 0),
+                "0",
+                self.metadata.bucket_hash or "",
+            )
+
+        # This is not waited for to avoid adding a round trip to every request.
+        # Commands are handled in order, so the next reserve will see this.
+        self._storage.connection.run_script_nowait(
+            _UPDATE_BUCKET, (self.key,), *args, str(int(self._storage.bucket_ttl * 1000))
+        )
+        self._pool.wake()
+
+    async def _fetch(self, count: int) -> ReserveReply:
+        storage = self._storage
+        reply = await storage.connection.run_script(
+            _RESERVE_BUCKET,
+            (self.key,),
+            count,
+            self.metadata.limit or 0,
+            int(storage.blind_request_timeout * 1000),
+            int(storage.poll_interval * 1000),
+            int(storage.bucket_ttl * 1000),
+        )
+        return _parse_reserve_reply(reply)
+
+    def merge_into(self, bucket: Bucket) -> None:
+        """Hand this rate limit over to another bucket.
+
+        Requests that have not got a spot yet will reserve from the Redis key of ``bucket`` from now on.
+        Requests already in progress give their spot back to the key they got it from.
+        The spots used from this key are not moved, the response that found out the rate limit is shared updates
+        ``bucket`` with the remaining requests from Discord, which counts both.
+
+        .. note::
+            Other clients keep using this key until they find out about the shared bucket hash themselves.
+
+        Parameters
+        ----------
+        bucket:
+            The bucket that will enforce the rate limit from now on.
+
+        Raises
+        ------
+        TypeError
+            ``bucket`` is not a :class:`RedisBucket`, so its rate limit is not shared with other clients.
+        """
+        if not isinstance(bucket, RedisBucket):
+            raise TypeError("A RedisBucket can only be merged into another RedisBucket")
+        super().merge_into(bucket)
+        if self._merged_into is not None:
+            # The waiters will retry on the bucket that took over
+            self._pool.hand_over()
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the bucket is currently any different from a clean bucket created from a :class:`BucketMetadata`.
+
+        The shared state is kept in Redis, so this is only about the current process.
+        """
+        return super().dirty or bool(self._pool)
+
+    async def close(self) -> None:
+        """Cleanup this instance.
+
+        This should be done when this instance is never going to be used anymore
+
+        .. warning::
+            Continued use of this instance will result in instability
+        """
+        await self._pool.close()
+        await super().close()
+
+
+class RedisGlobalRateLimiter(BaseGlobalRateLimiter):
+    """A global rate limiter that is shared through a Redis server with :class:`RedisRateLimitStorage`.
+
+    This uses a fixed window of 1 second.
+
+    Parameters
+    ----------
+    storage:
+        The storage the rate limiter belongs to.
+    key:
+        The Redis key of the rate limiter.
+    limit:
+        The amount of requests that can be made per second by all clients combined.
+
+    Attributes
+    ----------
+    key:
+        The Redis key of the rate limiter.
+    limit:
+        The amount of requests that can be made per second by all clients combined.
+    """
+
+    __slots__ = ("key", "limit", "_storage", "_pool")
+
+    def __init__(self, storage: RedisRateLimitStorage, key: str, limit: int = 50) -> None:
+        self.key: str = key
+        self.limit: int = limit
+        self._storage: RedisRateLimitStorage = storage
+        self._pool: _LeasePool = _LeasePool(self._fetch, storage.prefetch)
+
+    def acquire(
+        self, *, priority: int = 0, wait: bool = True, traffic_class: str | None = None
+    ) -> AsyncContextManager[None]:
+        """Use a spot in the rate-limit.
+
+        Parameters
+        ----------
+        priority:
+            The request priority. **Lower** number means it will be requested earlier.
+
+            .. note::
+                This only applies to requests from the current process.
+        wait:
+            Whether to wait for a spot in the rate limit.
+
+            If this is set to :data:`False`, this will raise a :exc:`RateLimitedError`
+        traffic_class:
+            .. warning::
+                Traffic classes currently does nothing.
+
+        Returns
+        -------
+        :class:`typing.AsyncContextManager`
+            A context manager that will wait in __aenter__ until a request should be made.
+        """
+        del traffic_class  # Unused
+        return _RedisGlobalAcquire(self, priority, wait)
+
+    def update(self, retry_after: float) -> None:
+        """Stop every client from doing requests for ``retry_after`` seconds.
+
+        Parameters
+        ----------
+        retry_after:
+            The time from the `retry_after` field in the JSON response or the `retry_after` header.
+        """
+        logger.warning("Exceeded global rate-limit! (Retry after: %s)", retry_after)
+        self._storage.connection.run_script_nowait(_BLOCK_GLOBAL, (self.key,), str(int(retry_after * 1000)))
+        # The spots reserved before the rate limit was hit should not be used either.
+        self._pool.drop_leases()
+
+    async def _fetch(self, count: int) -> ReserveReply:
+        reply = await self._storage.connection.run_script(_RESERVE_GLOBAL, (self.key,), count, self.limit)
+        return _parse_reserve_reply(reply)
+
+    async def close(self) -> None:
+        """Cleanup this instance.
+
+        This should be done when this instance is never going to be used anymore
+
+        .. warning::
+            Continued use of this instance will result in instability
+        """
+        await self._pool.close()
+
+
+def _parse_reserve_reply(reply: RedisReply) -> ReserveReply:
+    if not isinstance(reply, list) or len(reply) != 3:
+        raise RedisError(f"Unexpected reply from reserve script: {reply!r}")
+    kind, amount, reset_after = (int(part) for part in reply)  # type: ignore [arg-type]
+    return kind, amount, reset_after
+
+
+class RedisRateLimitStorage(RateLimitStorage):
+    """A :class:`RateLimitStorage` that shares rate limits through a Redis server.
+
+    This can be used to share rate limits between multiple machines. Spots in the rate limits are reserved with
+    scripts so they are atomic, and the server clock is used so clients do not need synchronized clocks.
+
+    To avoid adding a round trip to every request, reserves from concurrent requests are batched together, and
+    ``prefetch`` extra spots are reserved each time to be used by later requests without contacting the server.
+
+    .. note::
+        Spots that are prefetched but not used before the rate limit resets are wasted. Set ``prefetch`` to ``0`` if
+        many clients share few rate limits.
+
+    A stand-in server for testing can be found in :mod:`nextcore.http.rate_limit_storage.redis_stand_in`.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        http_client = HTTPClient(rate_limit_storage_factory=RedisRateLimitStorage.factory("redis.internal"))
+
+    Parameters
+    ----------
+    host:
+        The host of the Redis server.
+    port:
+        The port of the Redis server.
+    key_prefix:
+        The prefix for all Redis keys. Every client using the same rate limit key should use the same prefix.
+    password:
+        The password for the Redis server.
+    database:
+        The Redis database to use.
+    prefetch:
+        How many extra spots to reserve every time the server is contacted.
+    global_limit:
+        The amount of requests that can be made per second by all clients combined.
+    max_buckets:
+        The maximum amount of buckets to keep. If this is :data:`None`, there is no limit.
+    bucket_idle_timeout:
+        How long in seconds a bucket can go unused before it gets evicted. If this is :data:`None`, buckets will only be evicted when over ``max_buckets``.
+    max_bucket_metadata:
+        The maximum amount of :class:`BucketMetadata` to keep. If this is :data:`None`, there is no limit.
+    eviction_batch_size:
+        The maximum amount of buckets and metadata to check for eviction per lookup.
+
+    Attributes
+    ----------
+    connection:
+        The connection to the Redis server.
+    key_prefix:
+        The prefix for all Redis keys.
+    prefetch:
+        How many extra spots to reserve every time the server is contacted.
+    blind_request_timeout:
+        How long other clients should wait for a request that is finding out the rate limit before doing their own.
+    poll_interval:
+        How often to check if a request from another client found out the rate limit.
+    bucket_ttl:
+        How long in seconds the server should keep buckets that are not used.
+    """
+
+    __slots__ = ("connection", "key_prefix", "prefetch", "blind_request_timeout", "poll_interval", "bucket_ttl")
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        key_prefix: str = "nextcore",
+        password: str | None = None,
+        database: int = 0,
+        prefetch: int = 2,
+        global_limit: int = 50,
+        max_buckets: int | None = 100_000,
+        bucket_idle_timeout: float | None = 60,
+        max_bucket_metadata: int | None = 10_000,
+        eviction_batch_size: int = 4,
+    ) -> None:
+        super().__init__(
+            max_buckets=max_buckets,
+            bucket_idle_timeout=bucket_idle_timeout,
+            max_bucket_metadata=max_bucket_metadata,
+            eviction_batch_size=eviction_batch_size,
+        )
+        self.connection: _RedisConnection = _RedisConnection(host, port, password=password, database=database)
+        self.connection._users += 1
+        self.key_prefix: str = key_prefix
+        self.prefetch: int = prefetch
+        self.blind_request_timeout: float = 10
+        self.poll_interval: float = 0.05
+        self.bucket_ttl: float = 600
+        self.global_rate_limiter = RedisGlobalRateLimiter(self, f"{key_prefix}:global", global_limit)
+
+    @classmethod
+    def factory(
+        cls, host: str = "localhost", port: int = 6379, *, key_prefix: str = "nextcore", **kwargs: Any
+    ) -> Callable[[str | None], RedisRateLimitStorage]:
+        """Create a function that creates a storage for every rate limit key.
+
+        This can be passed to :class:`HTTPClient` as ``rate_limit_storage_factory``.
+
+        The rate limit key is hashed to create the key prefix, so tokens are not sent to the server.
+
+        Every storage created by the function shares one connection, as commands are pipelined over it.
+
+        Parameters
+        ----------
+        host:
+            The host of the Redis server.
+        port:
+            The port of the Redis server.
+        key_prefix:
+            The prefix for all Redis keys.
+        kwargs:
+            Keyword arguments to pass to :class:`RedisRateLimitStorage`
+        """
+
+        connection = _RedisConnection(
+            host, port, password=kwargs.get("password"), database=kwargs.get("database", 0)
+        )
+
+        def create(rate_limit_key: str | None) -> RedisRateLimitStorage:
+            storage = cls(host, port, key_prefix=f"{key_prefix}:{_hash_rate_limit_key(rate_limit_key)}", **kwargs)
+            # Swap out the connection it made, which has not connected yet.
+            storage.connection._users -= 1
+            storage.connection = connection
+            connection._users += 1
+            return storage
+
+        return create
+
+    def create_bucket_nowait(self, nextcore_id: BucketKey, metadata: BucketMetadata) -> Bucket:
+        """Create a bucket shared through Redis.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated id of the bucket. This can be gotten by using :attr:`Route.bucket`
+        metadata:
+            The metadata for the bucket.
+        """
+        # Hashed to keep keys short, and free of the {} Redis Cluster uses for hash tags.
+        key_hash = sha1(str(nextcore_id).encode("utf-8")).hexdigest()
+        return RedisBucket(self, f"{self.key_prefix}:bucket:{key_hash}", metadata)
+
+    async def close(self) -> None:
+        """Clean up before deletion.
+
+        .. warning::
+            This will cancel all pending requests.
+        """
+        await super().close()
+
+        self.connection._users -= 1
+        if self.connection._users <= 0:
+            # Other storages from the same factory may still be using it. It will reconnect if used again.
+            await self.connection.close()
+
+
+class _RedisBucketAcquire:
+    """The context manager returned by :meth:`RedisBucket.acquire`
+
+    Attributes
+    ----------
+    used:
+        Whether the request was sent. A request that is cancelled after this is set still counts against the rate limit.
+    """
+
+    __slots__ = ("_bucket", "_priority", "_wait", "_requeue", "_kind", "used")
+
+    def __init__(self, bucket: RedisBucket, priority: int, wait: bool, requeue: bool) -> None:
+        self._bucket: RedisBucket = bucket
+        self._priority: int = priority
+        self._wait: bool = wait
+        self._requeue: bool = requeue
+        self._kind: int = _UNLIMITED
+        self.used: bool = False
+
+    async def __aenter__(self) -> bool:
+        while True:
+            # Merged while waiting, continue on the bucket that took over.
+            bucket = cast(RedisBucket, self._bucket._canonical())
+
+            # Paused after a 429 in this process
+            await bucket._wait_while_paused(self._priority, self._wait, self._requeue)
+
+            if bucket.metadata.unlimited:
+                self._kind = _UNLIMITED
+                return False
+
+            try:
+                kind = await bucket._pool.acquire(self._priority, self._wait, front=self._requeue)
+            except _BucketMerged:
+                continue
+            break
+
+        self._bucket = bucket
+        if kind == _UNLIMITED:
+            # Another client found out this is unlimited.
+            bucket.metadata.unlimited = True
+        else:
+            bucket._reserved += 1
+        self._kind = kind
+        return False
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        kind = self._kind
+        if kind == _UNLIMITED:
+            return
+
+        bucket = self._bucket
+        # RedisBucket.merge_into moves the reservation, but the spot is still in the key it came from.
+        bucket._canonical()._reserved -= 1
+
+        blind = "1" if kind == _BLIND else "0"
+        if exc_type is not None and not self.used:
+            # Give the spot back as we assume the request failed.
+            bucket._storage.connection.run_script_nowait(_RELEASE_BUCKET, (bucket.key,), blind, "1")
+            bucket._pool.wake()
+        elif kind == _BLIND:
+            # In case .update was not called.
+            bucket._storage.connection.run_script_nowait(_RELEASE_BUCKET, (bucket.key,), blind, "0")
+
+
+class _RedisGlobalAcquire:
+    """The context manager returned by :meth:`RedisGlobalRateLimiter.acquire`"""
+
+    __slots__ = ("_rate_limiter", "_priority", "_wait")
+
+    def __init__(self, rate_limiter: RedisGlobalRateLimiter, priority: int, wait: bool) -> None:
+        self._rate_limiter: RedisGlobalRateLimiter = rate_limiter
+        self._priority: int = priority
+        self._wait: bool = wait
+
+    async def __aenter__(self) -> None:
+        await self._rate_limiter._pool.acquire(self._priority, self._wait)
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        pass
@@ -0,0 +1,503 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""A small Redis protocol server that can run the :class:`RedisRateLimitStorage` scripts.
+
+This is meant for testing without a Redis server, and only supports the commands the storage uses.
+By default the scripts are implemented in Python instead of being interpreted. With ``lua=True`` the scripts are ran
+by a Lua 5.1 interpreter like Redis does, this requires :mod:`lupa` to be installed.
+
+It can be started with ``python -m nextcore.http.rate_limit_storage.redis_stand_in [port]``
+"""
+
+from __future__ import annotations
+
+import sys
+from asyncio import (
+    CancelledError,
+    IncompleteReadError,
+    Queue,
+    create_task,
+    get_running_loop,
+    run,
+    sleep,
+    start_server,
+)
+from hashlib import sha1
+from logging import getLogger
+from time import time
+from typing import TYPE_CHECKING
+
+from .redis import (
+    _BLOCK_GLOBAL,
+    _RELEASE_BUCKET,
+    _RESERVE_BUCKET,
+    _RESERVE_GLOBAL,
+    _UPDATE_BUCKET,
+    RedisError,
+)
+
+try:
+    from lupa.lua51 import LuaError, LuaRuntime, lua_type  # type: ignore [import]
+
+    _has_lupa: bool = True
+except ImportError:
+    _has_lupa = False
+
+if TYPE_CHECKING:
+    from asyncio import AbstractServer, StreamReader, StreamWriter
+    from typing import Any, Callable, Final, List, Union
+
+    Reply = Union[bytes, str, int, None, RedisError, List["Reply"]]
+    Record = dict[str, Union[int, str]]
+    ScriptImplementation = Callable[["RedisStandIn", List[str], List[str]], Reply]
+
+logger = getLogger(__name__)
+
+__all__: Final[tuple[str, ...]] = ("RedisStandIn",)
+
+
+class RedisStandIn:
+    """A stand-in for a Redis server.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        server = RedisStandIn()
+        await server.start()
+
+        storage = RedisRateLimitStorage(server.host, server.port)
+
+    Parameters
+    ----------
+    host:
+        The host to listen on.
+    port:
+        The port to listen on. If this is ``0``, a free port will be picked.
+    latency:
+        How long to wait before handling each batch of commands in seconds. This can be used to simulate a remote server.
+    lua:
+        Run the scripts with a Lua interpreter instead of the Python implementations.
+
+        This requires :mod:`lupa` to be installed.
+
+    Raises
+    ------
+    RuntimeError
+        ``lua`` was set to :data:`True` and :mod:`lupa` is not installed.
+
+    Attributes
+    ----------
+    host:
+        The host to listen on.
+    port:
+        The port the server is listening on.
+    latency:
+        How long to wait before handling each batch of commands in seconds.
+    commands:
+        How many commands the server has handled.
+    script_calls:
+        How many scripts the server has ran.
+    """
+
+    __slots__ = ("host", "port", "latency", "commands", "script_calls", "_server", "_data", "_scripts", "_lua")
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *, latency: float = 0, lua: bool = False) -> None:
+        if lua and not _has_lupa:
+            raise RuntimeError("Running the scripts with Lua requires lupa to be installed")
+
+        self.host: str = host
+        self.port: int = port
+        self.latency: float = latency
+        self.commands: int = 0
+        self.script_calls: int = 0
+        self._server: AbstractServer | None = None
+        self._data: dict[str, tuple[Record, int | None]] = {}  # Key -> hash, expires at
+        self._scripts: dict[str, ScriptImplementation] = {}  # Loaded scripts by sha
+        self._lua: _LuaScripts | None = _LuaScripts(self) if lua else None
+
+    async def start(self) -> None:
+        """Start listening for connections."""
+        self._server = await start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def flush_scripts(self) -> None:
+        """Forget every loaded script, like ``SCRIPT FLUSH``."""
+        self._scripts.clear()
+
+    async def _handle_connection(self, reader: StreamReader, writer: StreamWriter) -> None:
+        loop = get_running_loop()
+        delayed: Queue[tuple[float, bytes]] = Queue()
+        delayed_writer = create_task(self._write_delayed(writer, delayed)) if self.latency else None
+        try:
+            while True:
+                reply = _encode_reply(self._run(await self._read_command(reader)))
+                if delayed_writer is None:
+                    writer.write(reply)
+                else:
+                    delayed.put_nowait((loop.time() + self.latency, reply))
+        except (IncompleteReadError, ConnectionError, CancelledError):
+            pass
+        finally:
+            if delayed_writer is not None:
+                delayed_writer.cancel()
+            writer.close()
+
+    async def _write_delayed(self, writer: StreamWriter, delayed: Queue[tuple[float, bytes]]) -> None:
+        loop = get_running_loop()
+        while True:
+            send_at, reply = await delayed.get()
+            delay = send_at - loop.time()
+            if delay > 0:
+                await sleep(delay)
+            writer.write(reply)
+
+    async def _read_command(self, reader: StreamReader) -> list[str]:
+        line = await reader.readuntil(b"\r\n")
+        if line[:1] != b"*":
+            # Inline command
+            return line.decode("utf-8").split()
+        args: list[str] = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readuntil(b"\r\n"))[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2].decode("utf-8"))
+        return args
+
+    def _run(self, command: list[str]) -> Reply:
+        self.commands += 1
+        name = command[0].upper()
+
+        if name == "PING":
+            return "PONG"
+        if name in ("AUTH", "SELECT"):
+            return "OK"
+        if name in ("FLUSHALL", "FLUSHDB"):
+            self._data.clear()
+            return "OK"
+        if name == "SCRIPT" and len(command) == 2 and command[1].upper() == "FLUSH":
+            self.flush_scripts()
+            return "OK"
+        if name == "SCRIPT" and len(command) == 3 and command[1].upper() == "LOAD":
+            implementation = self._get_implementation(command[2])
+            if implementation is None:
+                return RedisError("ERR Only nextcore scripts are supported by this server")
+            sha = sha1(command[2].encode("utf-8")).hexdigest()
+            self._scripts[sha] = implementation
+            return sha.encode("ascii")
+        if name == "EVALSHA":
+            implementation = self._scripts.get(command[1])
+            if implementation is None:
+                return RedisError("NOSCRIPT No matching script. Please use EVAL.")
+            return self._run_script(implementation, command)
+        if name == "EVAL":
+            implementation = self._get_implementation(command[1])
+            if implementation is None:
+                return RedisError("ERR Only nextcore scripts are supported by this server")
+            return self._run_script(implementation, command)
+        return RedisError(f"ERR unknown command '{command[0]}'")
+
+    def _get_implementation(self, source: str) -> ScriptImplementation | None:
+        if self._lua is not None:
+            return self._lua.compile(source)
+        for script, implementation in _IMPLEMENTATIONS:
+            if script.source == source:
+                return implementation
+        return None
+
+    def _run_script(self, implementation: ScriptImplementation, command: list[str]) -> Reply:
+        self.script_calls += 1
+        key_count = int(command[2])
+        keys = command[3 : 3 + key_count]
+        args = command[3 + key_count :]
+        return implementation(self, keys, args)
+
+    # Storage
+    def _get(self, key: str, now: int) -> Record:
+        record, expires_at = self._data.get(key, ({}, None))
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return {}
+        return record
+
+    def _set(self, key: str, now: int, ttl: int | None = None, **fields: int | str) -> None:
+        record, expires_at = self._data.get(key, ({}, None))
+        if expires_at is not None and expires_at <= now:
+            record = {}
+        record.update(fields)
+        if ttl is not None:
+            expires_at = now + ttl
+        self._data[key] = (record, expires_at)
+
+
+def _now() -> int:
+    return int(time() * 1000)
+
+
+def _number(record: Record, field: str) -> int:
+    return int(record.get(field, 0))
+
+
+# These mirror the Lua scripts in nextcore.http.rate_limit_storage.redis
+def _reserve_bucket(server: RedisStandIn, keys: list[str], args: list[str]) -> Reply:
+    now = _now()
+    count, limit_hint, blind_timeout, poll_interval, ttl = (int(arg) for arg in args)
+    record = server._get(keys[0], now)
+    limit = _number(record, "l")
+    remaining = _number(record, "r")
+    reset_at = _number(record, "t")
+    window = _number(record, "w")
+    blind_until = _number(record, "b")
+
+    if limit == -1:
+        return [2, 0, 0]
+    if limit == 0:
+        limit = limit_hint
+
+    if limit > 0 and window > 0:
+        if reset_at <= now:
+            remaining = limit
+            reset_at = now + window
+        if remaining <= 0:
+            return [3, reset_at - now, 0]
+        granted = min(count, remaining)
+        server._set(keys[0], now, ttl, l=limit, r=remaining - granted, t=reset_at)
+        return [0, granted, reset_at - now]
+
+    if blind_until > now:
+        return [3, min(blind_until - now, poll_interval), 0]
+    server._set(keys[0], now, ttl, l=limit, b=now + blind_timeout)
+    return [1, 1, 0]
+
+
+def _update_bucket(server: RedisStandIn, keys: list[str], args: list[str]) -> Reply:
+    now = _now()
+    ttl = int(args[5])
+    if args[3] == "1":
+        server._set(keys[0], now, ttl, l=-1, b=0)
+        return 1
+
+    record = server._get(keys[0], now)
+    stored_limit = _number(record, "l")
+    stored_remaining = _number(record, "r")
+    reset_at = _number(record, "t")
+    window = _number(record, "w")
+
+    remaining = int(args[0])
+    reset_after = int(args[1])
+    limit = int(args[2])
+
+    if stored_limit > 0 and window > 0 and reset_at > now:
+        remaining = min(stored_remaining, remaining)
+    if limit == 0:
+        limit = max(stored_limit, remaining)
+
+    server._set(
+        keys[0],
+        now,
+        max(ttl, reset_after),
+        l=limit,
+        r=remaining,
+        t=now + reset_after,
+        w=max(window, reset_after),
+        b=0,
+        h=args[4],
+    )
+    return 1
+
+
+def _release_bucket(server: RedisStandIn, keys: list[str], args: list[str]) -> Reply:
+    now = _now()
+    record = server._get(keys[0], now)
+    limit = _number(record, "l")
+    remaining = _number(record, "r")
+    reset_at = _number(record, "t")
+    window = _number(record, "w")
+    known = limit > 0 and window > 0
+
+    if args[0] == "1":
+        if not known and limit != -1:
+            server._set(keys[0], now, b=0)
+    elif args[1] == "1" and known and reset_at > now:
+        server._set(keys[0], now, r=min(remaining + 1, limit))
+    return 1
+
+
+def _reserve_global(server: RedisStandIn, keys: list[str], args: list[str]) -> Reply:
+    now = _now()
+    record = server._get(keys[0], now)
+    used = _number(record, "c")
+    window_start = _number(record, "s")
+    blocked_until = _number(record, "b")
+    limit = int(args[1])
+
+    if blocked_until > now:
+        return [3, blocked_until - now, 0]
+    if now - window_start >= 1000:
+        window_start = now
+        used = 0
+    if used >= limit:
+        return [3, window_start + 1000 - now, 0]
+
+    granted = min(int(args[0]), limit - used)
+    server._set(keys[0], now, 60000, c=used + granted, s=window_start)
+    return [0, granted, window_start + 1000 - now]
+
+
+def _block_global(server: RedisStandIn, keys: list[str], args: list[str]) -> Reply:
+    now = _now()
+    retry_after = int(args[0])
+    blocked_until = _number(server._get(keys[0], now), "b")
+    server._set(keys[0], now, 60000 + retry_after, b=max(blocked_until, now + retry_after))
+    return 1
+
+
+_IMPLEMENTATIONS: Final = (
+    (_RESERVE_BUCKET, _reserve_bucket),
+    (_UPDATE_BUCKET, _update_bucket),
+    (_RELEASE_BUCKET, _release_bucket),
+    (_RESERVE_GLOBAL, _reserve_global),
+    (_BLOCK_GLOBAL, _block_global),
+)
+
+
+class _LuaScripts:
+    """Runs scripts with a Lua 5.1 interpreter, like Redis does.
+
+    Only the commands the scripts use are available through ``redis.call``.
+    """
+
+    __slots__ = ("_server", "_runtime")
+
+    def __init__(self, server: RedisStandIn) -> None:
+        self._server: RedisStandIn = server
+        self._runtime: Any = LuaRuntime(unpack_returned_tuples=True)
+        self._runtime.globals().redis = self._runtime.table_from({"call": self._call})
+
+    def compile(self, source: str) -> ScriptImplementation | None:
+        try:
+            function = self._runtime.eval(f"function(KEYS, ARGV)\n{source}\nend")
+        except LuaError:
+            logger.exception("Compiling script failed")
+            return None
+
+        def run(server: RedisStandIn, keys: list[str], args: list[str]) -> Reply:
+            try:
+                result = function(self._runtime.table_from(keys), self._runtime.table_from(args))
+            except LuaError as error:
+                return RedisError(f"ERR Error running script: {error}")
+            return self._to_reply(result)
+
+        return run
+
+    def _call(self, command: str, *args: Any) -> Any:
+        server = self._server
+        command = command.upper()
+        now = _now()
+
+        if command == "TIME":
+            current = time()
+            return self._runtime.table_from([str(int(current)), str(int(current % 1 * 1_000_000))])
+        if command == "HGET":
+            return self._to_lua(server._get(args[0], now).get(args[1]))
+        if command == "HMGET":
+            record = server._get(args[0], now)
+            return self._runtime.table_from([self._to_lua(record.get(field)) for field in args[1:]])
+        if command == "HSET":
+            fields = {str(field): _to_redis_string(value) for field, value in zip(args[1::2], args[2::2])}
+            server._set(args[0], now, **fields)
+            return len(fields)
+        if command == "PEXPIRE":
+            if not server._get(args[0], now):
+                return 0
+            server._set(args[0], now, int(args[1]))
+            return 1
+        raise LuaError(f"Unknown Redis command called from Lua script: {command}")
+
+    def _to_lua(self, value: int | str | None) -> Any:
+        # Redis turns a nil reply into false
+        return False if value is None else str(value)
+
+    def _to_reply(self, value: Any) -> Reply:
+        # The same conversion Redis does for values returned by a script
+        if value is None or value is False:
+            return None
+        if value is True:
+            return 1
+        if isinstance(value, (int, float)):
+            return int(value)
+        if isinstance(value, str):
+            return value.encode("utf-8")
+        if isinstance(value, bytes):
+            return value
+        if lua_type(value) == "table":
+            replies: list[Reply] = []
+            index = 1
+            while value[index] is not None:
+                replies.append(self._to_reply(value[index]))
+                index += 1
+            return replies
+        return None
+
+
+def _to_redis_string(value: Any) -> str:
+    # Redis stores numbers from Lua with %.17g, which leaves out the decimals of whole numbers.
+    if isinstance(value, float):
+        return "%.17g" % value
+    return str(value)
+
+
+def _encode_reply(reply: Reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, RedisError):
+        return b"-%s\r\n" % reply.message.encode("utf-8")
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode("utf-8")
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode_reply(part) for part in reply)
+
+
+async def _main(port: int) -> None:
+    server = RedisStandIn(port=port)
+    await server.start()
+    logger.info("Listening on %s:%s", server.host, server.port)
+    try:
+        await sleep(float("inf"))
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    import logging
+
+    logging.basicConfig(level=logging.INFO)
+    run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 6379))
@@ -0,0 +1,835 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+import mmap
+import os
+from asyncio import get_running_loop
+from contextlib import contextmanager
+from hashlib import blake2b
+from logging import getLogger
+from struct import Struct
+from time import monotonic, time
+from typing import TYPE_CHECKING, cast
+
+from ...common.errors import RateLimitedError
+from ...common.timer_wheel import get_timer_wheel
+from ...common.waiter_queue import WaiterQueue
+from ..bucket import Bucket, _BucketAcquire
+from ..global_rate_limiter import BaseGlobalRateLimiter
+from .rate_limit_storage import RateLimitStorage, _hash_rate_limit_key
+
+try:
+    import fcntl
+
+    _has_fcntl: bool = True
+except ImportError:
+    _has_fcntl = False
+
+if TYPE_CHECKING:
+    from types import TracebackType
+    from typing import AsyncContextManager, Callable, ClassVar, Final, Iterator, Union
+
+    from ...common.timer_wheel import TimerHandle
+    from ..bucket_metadata import BucketMetadata
+    from ..route import BucketKey
+
+    StrPath = Union[str, "os.PathLike[str]"]
+
+logger = getLogger(__name__)
+
+__all__: Final[tuple[str, ...]] = (
+    "SharedMemoryRateLimitStorage",
+    "SharedMemoryBucket",
+    "SharedMemoryGlobalRateLimiter",
+)
+
+# File layout
+# The header is followed by a open addressing hash table of fixed size bucket records.
+# Times are from time.monotonic, which is shared by every process on the machine but restarts on boot.
+_MAGIC: Final[bytes] = b"NCRL"
+_VERSION: Final[int] = 2
+_HEADER: Final[Struct] = Struct("<4sIId")  # magic, version, record count, unix time the monotonic clock started at
+_GLOBAL: Final[Struct] = Struct("<Idd")  # requests this window, window start, blocked until
+_GLOBAL_OFFSET: Final[int] = _HEADER.size
+_HEADER_SIZE: Final[int] = 64
+_RECORD: Final[Struct] = Struct("<16siiddd32s")  # key, limit, remaining, reset at, window, blind until, bucket hash
+_KEY_SIZE: Final[int] = 16
+_EMPTY_KEY: Final[bytes] = bytes(_KEY_SIZE)
+_MAX_PROBES: Final[int] = 64
+
+# Record limit values
+_LIMIT_UNKNOWN: Final[int] = 0
+_LIMIT_UNLIMITED: Final[int] = -1
+
+# Results from reserving a spot. Positive numbers are how long to wait before trying again.
+_RESERVED: Final[float] = 0
+_RESERVED_BLIND: Final[float] = -1
+_UNLIMITED: Final[float] = -2
+
+# How far apart the start of the monotonic clock can be before the file is assumed to be from before a reboot
+_BOOT_TOLERANCE: Final[float] = 60
+
+
+def _boot_time() -> float:
+    return time() - monotonic()
+
+
+class _SharedMemoryFile:
+    """A memory mapped file holding rate limits shared between processes.
+
+    Every access has to be done while holding :meth:`_SharedMemoryFile.lock`.
+    """
+
+    __slots__ = ("path", "record_count", "_fd", "_map", "_pid")
+
+    def __init__(self, path: StrPath, record_count: int) -> None:
+        if not _has_fcntl:
+            raise RuntimeError("Shared memory rate limiting requires fcntl, which is not available on this platform")
+        if record_count < 1:
+            raise ValueError("record_count has to be positive")
+
+        self.path: StrPath = path
+        self.record_count: int = record_count
+        self._fd: int | None = None
+        self._map: mmap.mmap | None = None
+        self._pid: int = os.getpid()
+
+        self._open()
+
+    def _open(self) -> None:
+        size = _HEADER_SIZE + self.record_count * _RECORD.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    # New file, initialize it
+                    os.ftruncate(fd, size)
+                    shared = mmap.mmap(fd, size)
+                    _HEADER.pack_into(shared, 0, _MAGIC, _VERSION, self.record_count, _boot_time())
+                else:
+                    shared = mmap.mmap(fd, 0)
+                    magic, version, record_count, boot_time = _HEADER.unpack_from(shared, 0)
+                    if magic != _MAGIC or version != _VERSION:
+                        shared.close()
+                        raise ValueError(
+                            f"{self.path} is not a nextcore rate limit file or is from a different version"
+                        )
+                    if record_count != self.record_count:
+                        shared.close()
+                        raise ValueError(
+                            f"{self.path} was created with {record_count} records, not {self.record_count}"
+                        )
+                    current_boot_time = _boot_time()
+                    if abs(boot_time - current_boot_time) > _BOOT_TOLERANCE:
+                        # Created before a reboot, so the times in it are from another monotonic clock.
+                        logger.info("Clearing %s as it is from before the last reboot", self.path)
+                        shared[_GLOBAL_OFFSET:] = bytes(len(shared) - _GLOBAL_OFFSET)
+                        _HEADER.pack_into(shared, 0, _MAGIC, _VERSION, self.record_count, current_boot_time)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+        self._map = shared
+        self._pid = os.getpid()
+
+    @contextmanager
+    def lock(self) -> Iterator[mmap.mmap]:
+        """Lock the file for every process.
+
+        This should not be held across a ``await``.
+        """
+        if self._pid != os.getpid():
+            # flock is shared with the parent process after a fork, so the file has to be re-opened.
+            self._open()
+
+        if self._fd is None or self._map is None:
+            raise RuntimeError("The shared memory file is closed")
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield self._map
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def find_record(self, shared: mmap.mmap, key: bytes, hint: int | None, now: float) -> int | None:
+        """Find the offset of the record for a key, or claim one for it.
+
+        Parameters
+        ----------
+        shared:
+            The mapped file from :meth:`_SharedMemoryFile.lock`
+        key:
+            The record key.
+        hint:
+            The offset the record was at last time. Records can be re-used by other keys, so this is only a hint.
+        now:
+            The current :func:`time.monotonic` time.
+
+        Returns
+        -------
+        :class:`int` | :data:`None`
+            The offset of the record, or :data:`None` if no record could be claimed.
+        """
+        if hint is not None and shared[hint : hint + _KEY_SIZE] == key:
+            return hint
+
+        start = int.from_bytes(key[:8], "little")
+        claimable: int | None = None
+        for probe in range(min(self.record_count, _MAX_PROBES)):
+            offset = _HEADER_SIZE + (start + probe) % self.record_count * _RECORD.size
+            record_key = shared[offset : offset + _KEY_SIZE]
+
+            if record_key == key:
+                return offset
+            if record_key == _EMPTY_KEY:
+                # End of the probe chain, the key is not stored.
+                if claimable is None:
+                    claimable = offset
+                break
+            if claimable is None:
+                _, _, _, reset_at, _, blind_until, _ = _RECORD.unpack_from(shared, offset)
+                if reset_at <= now and blind_until <= now:
+                    # Not rate limited, so it can be re-used without any side effects other than forgetting the limit.
+                    claimable = offset
+
+        if claimable is None:
+            return None
+        _RECORD.pack_into(shared, claimable, key, _LIMIT_UNKNOWN, 0, 0, 0, 0, b"")
+        return claimable
+
+    def close(self) -> None:
+        """Unmap the file.
+
+        .. warning::
+            Continued use of this instance will result in instability
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _SharedMemoryWaiters:
+    """Local waiters for a shared rate limit.
+
+    Other processes can not wake these up, so they are woken up when the rate limit is expected to have space.
+    """
+
+    __slots__ = ("_pending", "_wakeup", "_wakeup_at")
+
+    def __init__(self) -> None:
+        self._pending: WaiterQueue = WaiterQueue()
+        self._wakeup: TimerHandle | None = None
+        self._wakeup_at: float = 0
+
+    def __bool__(self) -> bool:
+        return bool(self._pending)
+
+    async def wait(self, delay: float, priority: int, *, front: bool = False) -> None:
+        when = get_running_loop().time() + delay
+        if self._wakeup is None or when < self._wakeup_at:
+            if self._wakeup is not None:
+                self._wakeup.cancel()
+            self._wakeup = get_timer_wheel().call_at(when, self.wake)
+            self._wakeup_at = when
+
+        future = self._pending.put(priority, front=front)
+        try:
+            await future
+        except:
+            self._pending.discard(future)
+            raise
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        # Every waiter will try again, the ones that do not get a spot will wait again.
+        self._pending.release()
+
+    def close(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        self._pending.close()
+
+
+class SharedMemoryBucket(Bucket):
+    """A :class:`Bucket` that is shared between processes through a :class:`SharedMemoryRateLimitStorage`.
+
+    .. note::
+        This should be created through :meth:`SharedMemoryRateLimitStorage.create_bucket`
+
+    If the shared memory is full, this will fall back to only rate limiting the current process.
+
+    Parameters
+    ----------
+    shared_file:
+        The shared memory file of the storage.
+    nextcore_id:
+        The nextcore generated id of the bucket. This is used to find the bucket in other processes.
+    metadata:
+        The metadata for the bucket.
+
+    Attributes
+    ----------
+    blind_request_timeout:
+        How long other processes should wait for a request that is finding out the rate limit before doing their own.
+    poll_interval:
+        How often to check if a request in another process found out the rate limit.
+    """
+
+    __slots__ = ("blind_request_timeout", "poll_interval", "_shared_file", "_key", "_offset", "_waiters")
+
+    def __init__(self, shared_file: _SharedMemoryFile, nextcore_id: BucketKey, metadata: BucketMetadata) -> None:
+        super().__init__(metadata)
+        self.blind_request_timeout: float = 10
+        self.poll_interval: float = 0.05
+        self._shared_file: _SharedMemoryFile = shared_file
+        self._key: bytes = blake2b(str(nextcore_id).encode("utf-8"), digest_size=_KEY_SIZE).digest()
+        self._offset: int | None = None
+        self._waiters: _SharedMemoryWaiters = _SharedMemoryWaiters()
+
+    def acquire(self, *, priority: int = 0, wait: bool = True, requeue: bool = False) -> AsyncContextManager[bool]:
+        """Use a spot in the rate limit.
+
+        Parameters
+        ----------
+        priority:
+            The priority of a request. A lower number means it will be executed faster.
+
+            .. note::
+                This only applies to requests from the current process.
+        wait:
+            Wait for a spot in the rate limit.
+
+            If this is set to :data:`False`, this will raise :exc:`RateLimitedError` if no spot is available right now.
+        requeue:
+            Whether this is a retry of a request that was rate limited.
+
+            If it has to wait, it will be put in front of the other requests from this process with the same priority.
+
+        Raises
+        ------
+        RateLimitedError
+            You are rate limited and ``wait`` was set to :data:`False`
+        """
+        return _SharedMemoryBucketAcquire(self, priority, wait, requeue)
+
+    async def update(  # type: ignore [override] # The overloads are inherited
+        self, remaining: int | None = None, reset_after: float | None = None, *, unlimited: bool = False
+    ) -> None:
+        # Keep the local state updated so Bucket.remaining and Bucket.reset_at works.
+        if unlimited:
+            await super().update(unlimited=True)
+        else:
+            assert remaining is not None and reset_after is not None
+            await super().update(remaining, reset_after)
+
+        now = monotonic()
+        with self._shared_file.lock() as shared:
+            offset = self._shared_file.find_record(shared, self._key, self._offset, now)
+            if offset is None:
+                return
+            self._offset = offset
+
+            (
+                _,
+                limit,
+                shared_remaining,
+                reset_at,
+                window,
+                _,
+                bucket_hash,
+            ) = _RECORD.unpack_from(shared, offset)
+
+            if unlimited:
+                _RECORD.pack_into(shared, offset, self._key, _LIMIT_UNLIMITED, 0, 0, 0, 0, bucket_hash)
+            else:
+                assert remaining is not None and reset_after is not None
+
+                known = limit > 0 and window > 0
+                if known and reset_at > now:
+                    # Same window, requests in other processes may not be counted by Discord yet.
+                    remaining = min(shared_remaining, remaining)
+
+                if self.metadata.limit is not None:
+                    limit = self.metadata.limit
+                else:
+                    limit = max(limit, remaining)
+                if self.metadata.bucket_hash is not None:
+                    bucket_hash = self.metadata.bucket_hash.encode("utf-8")
+
+                _RECORD.pack_into(
+                    shared,
+                    offset,
+                    self._key,
+                    limit,
+                    remaining,
+                    now + reset_after + self.reset_offset_seconds,
+                    max(window, reset_after),
+                    0,
+                    bucket_hash,
+                )
+
+        # Requests in this process may be able to go through now.
+        self._waiters.wake()
+
+    def _reserve(self) -> float | None:
+        now = monotonic()
+        with self._shared_file.lock() as shared:
+            offset = self._shared_file.find_record(shared, self._key, self._offset, now)
+            if offset is None:
+                return None
+            self._offset = offset
+
+            _, limit, remaining, reset_at, window, blind_until, bucket_hash = _RECORD.unpack_from(shared, offset)
+
+            if limit == _LIMIT_UNLIMITED:
+                return _UNLIMITED
+            if limit == _LIMIT_UNKNOWN and self.metadata.limit is not None:
+                limit = self.metadata.limit
+
+            if limit > 0 and window > 0:
+                if reset_at <= now:
+                    # New window. The exact reset time will be set when a response is received.
+                    remaining = limit
+                    reset_at = now + window
+                if remaining <= 0:
+                    return reset_at - now
+                remaining -= 1
+            else:
+                # No process knows the rate limit yet, so only one process can do a request to find out.
+                if blind_until > now:
+                    return min(blind_until - now, self.poll_interval)
+                blind_until = now + self.blind_request_timeout
+                _RECORD.pack_into(
+                    shared, offset, self._key, limit, remaining, reset_at, window, blind_until, bucket_hash
+                )
+                return _RESERVED_BLIND
+
+            _RECORD.pack_into(shared, offset, self._key, limit, remaining, reset_at, window, blind_until, bucket_hash)
+        return _RESERVED
+
+    def _release(self) -> None:
+        with self._shared_file.lock() as shared:
+            offset = self._shared_file.find_record(shared, self._key, self._offset, monotonic())
+            if offset is None:
+                return
+            _, limit, remaining, reset_at, window, blind_until, bucket_hash = _RECORD.unpack_from(shared, offset)
+
+            if limit > 0 and window > 0:
+                remaining = min(remaining + 1, limit)
+            else:
+                blind_until = 0
+
+            _RECORD.pack_into(shared, offset, self._key, limit, remaining, reset_at, window, blind_until, bucket_hash)
+        self._waiters.wake()
+
+    def _end_blind_request(self) -> None:
+        with self._shared_file.lock() as shared:
+            offset = self._shared_file.find_record(shared, self._key, self._offset, monotonic())
+            if offset is None:
+                return
+            _, limit, remaining, reset_at, window, blind_until, bucket_hash = _RECORD.unpack_from(shared, offset)
+
+            if (limit > 0 and window > 0) or limit == _LIMIT_UNLIMITED:
+                return  # Updated with the rate limit
+
+            logger.warning("A user of SharedMemoryBucket is not calling .update! This will cause performance issues...")
+            _RECORD.pack_into(shared, offset, self._key, limit, remaining, reset_at, window, 0, bucket_hash)
+        self._waiters.wake()
+
+    def merge_into(self, bucket: Bucket) -> None:
+        """Hand this rate limit over to another bucket.
+
+        Requests that have not got a spot yet will use the shared memory record of ``bucket`` from now on.
+        Requests already in progress give their spot back to the record they got it from.
+
+        .. note::
+            Other processes keep using this record until they find out about the shared bucket hash themselves.
+
+        Parameters
+        ----------
+        bucket:
+            The bucket that will enforce the rate limit from now on.
+
+        Raises
+        ------
+        TypeError
+            ``bucket`` is not a :class:`SharedMemoryBucket`, so its rate limit is not shared with other processes.
+        """
+        if not isinstance(bucket, SharedMemoryBucket):
+            raise TypeError("A SharedMemoryBucket can only be merged into another SharedMemoryBucket")
+        super().merge_into(bucket)
+        # The waiters will retry on the bucket that took over
+        self._waiters.wake()
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the bucket is currently any different from a clean bucket created from a :class:`BucketMetadata`.
+
+        The shared state is kept in the shared memory, so this is only about the current process.
+        """
+        return super().dirty or bool(self._waiters)
+
+    async def close(self) -> None:
+        """Cleanup this instance.
+
+        This should be done when this instance is never going to be used anymore
+
+        .. warning::
+            Continued use of this instance will result in instability
+        """
+        self._waiters.close()
+        await super().close()
+
+
+class SharedMemoryGlobalRateLimiter(BaseGlobalRateLimiter):
+    """A global rate limiter that is shared between processes through a :class:`SharedMemoryRateLimitStorage`.
+
+    Like :class:`~nextcore.http.LimitedGlobalRateLimiter`, this uses a fixed window of 1 second that starts at the first request after the previous window.
+
+    Parameters
+    ----------
+    shared_file:
+        The shared memory file of the storage.
+    limit:
+        The amount of requests that can be made per second by all processes combined.
+
+    Attributes
+    ----------
+    limit:
+        The amount of requests that can be made per second by all processes combined.
+    """
+
+    __slots__ = ("limit", "_shared_file", "_waiters")
+
+    WINDOW: ClassVar[float] = 1
+
+    def __init__(self, shared_file: _SharedMemoryFile, limit: int = 50) -> None:
+        self.limit: int = limit
+        self._shared_file: _SharedMemoryFile = shared_file
+        self._waiters: _SharedMemoryWaiters = _SharedMemoryWaiters()
+
+    def acquire(
+        self, *, priority: int = 0, wait: bool = True, traffic_class: str | None = None
+    ) -> AsyncContextManager[None]:
+        """Use a spot in the rate-limit.
+
+        Parameters
+        ----------
+        priority:
+            The request priority. **Lower** number means it will be requested earlier.
+
+            .. note::
+                This only applies to requests from the current process.
+        wait:
+            Whether to wait for a spot in the rate limit.
+
+            If this is set to :data:`False`, this will raise a :exc:`RateLimitedError`
+        traffic_class:
+            .. warning::
+                Traffic classes currently does nothing.
+
+        Returns
+        -------
+        :class:`typing.AsyncContextManager`
+            A context manager that will wait in __aenter__ until a request should be made.
+        """
+        del traffic_class  # Unused
+        return _SharedMemoryGlobalAcquire(self, priority, wait)
+
+    def update(self, retry_after: float) -> None:
+        """Stop every process from doing requests for ``retry_after`` seconds.
+
+        Parameters
+        ----------
+        retry_after:
+            The time from the `retry_after` field in the JSON response or the `retry_after` header.
+        """
+        logger.warning("Exceeded global rate-limit! (Retry after: %s)", retry_after)
+
+        with self._shared_file.lock() as shared:
+            count, window_start, blocked_until = _GLOBAL.unpack_from(shared, _GLOBAL_OFFSET)
+            blocked_until = max(blocked_until, monotonic() + retry_after)
+            _GLOBAL.pack_into(shared, _GLOBAL_OFFSET, count, window_start, blocked_until)
+
+    def _reserve(self) -> float:
+        now = monotonic()
+        with self._shared_file.lock() as shared:
+            count, window_start, blocked_until = _GLOBAL.unpack_from(shared, _GLOBAL_OFFSET)
+
+            if blocked_until > now:
+                return blocked_until - now
+            if now - window_start >= self.WINDOW:
+                window_start = now
+                count = 0
+            if count >= self.limit:
+                return window_start + self.WINDOW - now
+
+            _GLOBAL.pack_into(shared, _GLOBAL_OFFSET, count + 1, window_start, blocked_until)
+        return _RESERVED
+
+    async def close(self) -> None:
+        """Cleanup this instance.
+
+        This should be done when this instance is never going to be used anymore
+
+        .. warning::
+            Continued use of this instance will result in instability
+        """
+        self._waiters.close()
+
+
+class SharedMemoryRateLimitStorage(RateLimitStorage):
+    """A :class:`RateLimitStorage` that shares rate limits between processes on the same machine.
+
+    Buckets and the global rate limit are kept in a memory mapped file, and updates are done while holding a file lock.
+
+    .. note::
+        This is only supported on platforms with :mod:`fcntl`.
+
+    .. hint::
+        Putting the file in a memory backed filesystem like ``/dev/shm`` avoids writing it to disk.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        http_client = HTTPClient(rate_limit_storage_factory=SharedMemoryRateLimitStorage.factory("/dev/shm/my-bot"))
+
+    Parameters
+    ----------
+    path:
+        The file to store the rate limits in. Every process using the same rate limit key should use the same file.
+    max_records:
+        How many buckets can be stored in the file. Every process has to use the same amount.
+    global_limit:
+        The amount of requests that can be made per second by all processes combined.
+    max_buckets:
+        The maximum amount of buckets to keep. If this is :data:`None`, there is no limit.
+    bucket_idle_timeout:
+        How long in seconds a bucket can go unused before it gets evicted. If this is :data:`None`, buckets will only be evicted when over ``max_buckets``.
+    max_bucket_metadata:
+        The maximum amount of :class:`BucketMetadata` to keep. If this is :data:`None`, there is no limit.
+    eviction_batch_size:
+        The maximum amount of buckets and metadata to check for eviction per lookup.
+
+    Attributes
+    ----------
+    path:
+        The file the rate limits are stored in.
+    """
+
+    __slots__ = ("path", "_shared_file")
+
+    def __init__(
+        self,
+        path: StrPath,
+        *,
+        max_records: int = 16384,
+        global_limit: int = 50,
+        max_buckets: int | None = 100_000,
+        bucket_idle_timeout: float | None = 60,
+        max_bucket_metadata: int | None = 10_000,
+        eviction_batch_size: int = 4,
+    ) -> None:
+        super().__init__(
+            max_buckets=max_buckets,
+            bucket_idle_timeout=bucket_idle_timeout,
+            max_bucket_metadata=max_bucket_metadata,
+            eviction_batch_size=eviction_batch_size,
+        )
+        self.path: StrPath = path
+        self._shared_file: _SharedMemoryFile = _SharedMemoryFile(path, max_records)
+        self.global_rate_limiter = SharedMemoryGlobalRateLimiter(self._shared_file, global_limit)
+
+    @classmethod
+    def factory(
+        cls, directory: StrPath, *, max_records: int = 16384, global_limit: int = 50
+    ) -> Callable[[str | None], SharedMemoryRateLimitStorage]:
+        """Create a function that creates a storage for every rate limit key in a directory.
+
+        This can be passed to :class:`HTTPClient` as ``rate_limit_storage_factory``.
+
+        The rate limit key is hashed to create the file name, so tokens are not leaked through the file system.
+
+        Parameters
+        ----------
+        directory:
+            The directory to store the files in. It will be created if it does not exist.
+        max_records:
+            How many buckets can be stored per rate limit key.
+        global_limit:
+            The amount of requests that can be made per second by all processes combined.
+        """
+
+        def create(rate_limit_key: str | None) -> SharedMemoryRateLimitStorage:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{_hash_rate_limit_key(rate_limit_key)}.ratelimits")
+            return cls(path, max_records=max_records, global_limit=global_limit)
+
+        return create
+
+    def create_bucket_nowait(self, nextcore_id: BucketKey, metadata: BucketMetadata) -> Bucket:
+        """Create a bucket shared with other processes.
+
+        Parameters
+        ----------
+        nextcore_id:
+            The nextcore generated id of the bucket. This can be gotten by using :attr:`Route.bucket`
+        metadata:
+            The metadata for the bucket.
+        """
+        return SharedMemoryBucket(self._shared_file, nextcore_id, metadata)
+
+    async def close(self) -> None:
+        """Clean up before deletion.
+
+        The file is not deleted, as other processes may still be using it.
+
+        .. warning::
+            This will cancel all pending requests.
+        """
+        await super().close()
+        self._shared_file.close()
+
+
+class _SharedMemoryBucketAcquire:
+    """The context manager returned by :meth:`SharedMemoryBucket.acquire`
+
+    Attributes
+    ----------
+    used:
+        Whether the request was sent. A request that is cancelled after this is set still counts against the rate limit.
+    """
+
+    __slots__ = ("_bucket", "_priority", "_wait", "_requeue", "_result", "_local", "used")
+
+    def __init__(self, bucket: SharedMemoryBucket, priority: int, wait: bool, requeue: bool) -> None:
+        self._bucket: SharedMemoryBucket = bucket
+        self._priority: int = priority
+        self._wait: bool = wait
+        self._requeue: bool = requeue
+        self._result: float = _UNLIMITED
+        self._local: _BucketAcquire | None = None  # Set when rate limiting locally
+        self.used: bool = False
+
+    async def __aenter__(self) -> bool:
+        while True:
+            # Merged while waiting, continue on the bucket that took over.
+            bucket = cast(SharedMemoryBucket, self._bucket._canonical())
+
+            if bucket._paused_until is not None:
+                # Paused after a 429 in this process
+                await bucket._wait_while_paused(self._priority, self._wait, self._requeue)
+                continue
+
+            if bucket.metadata.unlimited:
+                self._result = _UNLIMITED
+                return False
+
+            result = bucket._reserve()
+            if result is None:
+                # The shared memory is full, fall back to only rate limiting this process.
+                logger.debug("No shared memory record available, rate limiting locally")
+                local = _BucketAcquire(bucket, self._priority, self._wait, self._requeue)
+                speculative = await local.__aenter__()
+                self._local = local
+                return speculative
+            if result == _UNLIMITED:
+                # Another process found out this is unlimited.
+                bucket.metadata.unlimited = True
+                self._result = _UNLIMITED
+                return False
+            if result == _RESERVED or result == _RESERVED_BLIND:
+                break
+
+            if not self._wait:
+                raise RateLimitedError()
+            await bucket._waiters.wait(result, self._priority, front=self._requeue)
+
+        bucket._reserved += 1
+        self._bucket = bucket
+        self._result = result
+        return False
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._local is not None:
+            self._local.used = self.used
+            await self._local.__aexit__(exc_type, exc_value, traceback)
+            return
+        result = self._result
+        if result == _UNLIMITED:
+            return
+
+        acquired = self._bucket
+        # SharedMemoryBucket.merge_into moves the reservation, but the spot is still in the record it came from.
+        acquired._canonical()._reserved -= 1
+
+        if exc_type is not None and not self.used:
+            # Give the spot back as we assume the request failed.
+            acquired._release()
+        elif result == _RESERVED_BLIND:
+            acquired._end_blind_request()
+
+
+class _SharedMemoryGlobalAcquire:
+    """The context manager returned by :meth:`SharedMemoryGlobalRateLimiter.acquire`"""
+
+    __slots__ = ("_rate_limiter", "_priority", "_wait")
+
+    def __init__(self, rate_limiter: SharedMemoryGlobalRateLimiter, priority: int, wait: bool) -> None:
+        self._rate_limiter: SharedMemoryGlobalRateLimiter = rate_limiter
+        self._priority: int = priority
+        self._wait: bool = wait
+
+    async def __aenter__(self) -> None:
+        rate_limiter = self._rate_limiter
+        while True:
+            delay = rate_limiter._reserve()
+            if delay == _RESERVED:
+                return
+            if not self._wait:
+                raise RateLimitedError()
+            await rate_limiter._waiters.wait(delay, self._priority)
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        pass
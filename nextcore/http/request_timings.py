@@ -0,0 +1,233 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from ..common.histogram import Histogram
+
+if TYPE_CHECKING:
+    from typing import Final, ItemsView
+
+__all__: Final[tuple[str, ...]] = ("RequestTimings", "RequestTimingHistograms", "REQUEST_PHASES")
+
+#: The phases of a request that are timed.
+REQUEST_PHASES: Final[tuple[str, ...]] = (
+    "bucket_wait",
+    "global_wait",
+    "connection",
+    "time_to_headers",
+    "sent_to_headers",
+    "total",
+)
+
+
+class RequestTimings:
+    """When every phase of a request happened.
+
+    Every timestamp is in event loop time (see :meth:`asyncio.loop.time`).
+    A request that was retried after being rate limited gets one of these for every attempt.
+
+    Parameters
+    ----------
+    route:
+        The route template of the request. This is :attr:`Route.method` joined with :attr:`Route.route`.
+    started_at:
+        When the request started waiting for the bucket.
+
+    Attributes
+    ----------
+    route:
+        The route template of the request. This is :attr:`Route.method` joined with :attr:`Route.route`.
+    status:
+        The status code of the response. This is ``0`` until the response has been received.
+    started_at:
+        When the request started waiting for the bucket.
+    bucket_acquired_at:
+        When the request got a spot in the bucket.
+    global_acquired_at:
+        When the request got a spot in the global rate limit, and was handed to aiohttp.
+    connected_at:
+        When aiohttp got a connection for the request.
+
+        This is :data:`None` if aiohttp did not report it, for example if ``trace_request_ctx`` was passed to the request.
+    headers_at:
+        When the response headers were received.
+    finished_at:
+        When the response was handed back, after the ``request_response`` event was dispatched.
+    """
+
+    __slots__ = (
+        "route",
+        "status",
+        "started_at",
+        "bucket_acquired_at",
+        "global_acquired_at",
+        "connected_at",
+        "headers_at",
+        "finished_at",
+    )
+
+    def __init__(self, route: str, started_at: float) -> None:
+        self.route: str = route
+        self.status: int = 0
+        self.started_at: float = started_at
+        self.bucket_acquired_at: float = started_at
+        self.global_acquired_at: float = started_at
+        self.connected_at: float | None = None
+        self.headers_at: float = started_at
+        self.finished_at: float = started_at
+
+    @property
+    def bucket_wait(self) -> float:
+        """How long the request waited for the bucket in seconds"""
+        return self.bucket_acquired_at - self.started_at
+
+    @property
+    def global_wait(self) -> float:
+        """How long the request waited for the global rate limit in seconds"""
+        return self.global_acquired_at - self.bucket_acquired_at
+
+    @property
+    def connection(self) -> float | None:
+        """How long it took to get a connection in seconds, including DNS, TCP and TLS for new connections.
+
+        This is :data:`None` if aiohttp did not report it.
+        """
+        if self.connected_at is None:
+            return None
+        return self.connected_at - self.global_acquired_at
+
+    @property
+    def time_to_headers(self) -> float:
+        """How long it took from having a connection to receiving the response headers in seconds.
+
+        This includes the time Discord took to handle the request.
+        """
+        if self.connected_at is None:
+            return self.headers_at - self.global_acquired_at
+        return self.headers_at - self.connected_at
+
+    @property
+    def sent_to_headers(self) -> float:
+        """How long it took from handing the request to aiohttp to receiving the response headers in seconds.
+
+        This is :attr:`RequestTimings.connection` and :attr:`RequestTimings.time_to_headers` combined,
+        so it does not depend on aiohttp reporting when it got a connection.
+        """
+        return self.headers_at - self.global_acquired_at
+
+    @property
+    def total(self) -> float:
+        """How long the whole request took in seconds"""
+        return self.finished_at - self.started_at
+
+
+class RequestTimingHistograms:
+    """Histograms of :class:`RequestTimings` by route template and status class.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        histograms = http_client.request_timings.get("GET/channels/{channel_id}", "2xx")
+        if histograms is not None:
+            print(histograms["bucket_wait"].percentile(0.99))
+
+    Attributes
+    ----------
+    histograms:
+        The histograms of every phase in :data:`REQUEST_PHASES`.
+
+        The key is the route template and the status class, for example ``("GET/channels/{channel_id}", "2xx")``.
+    """
+
+    __slots__ = ("histograms",)
+
+    def __init__(self) -> None:
+        self.histograms: dict[tuple[str, str], dict[str, Histogram]] = {}
+
+    def record(self, timings: RequestTimings) -> None:
+        """Add the phases of a request to the histograms.
+
+        Parameters
+        ----------
+        timings:
+            The timings of the request.
+        """
+        key = (timings.route, f"{timings.status // 100}xx")
+        histograms = self.histograms.get(key)
+        if histograms is None:
+            histograms = {phase: Histogram() for phase in REQUEST_PHASES}
+            self.histograms[key] = histograms
+
+        histograms["bucket_wait"].record(timings.bucket_wait)
+        histograms["global_wait"].record(timings.global_wait)
+        connection = timings.connection
+        if connection is not None:
+            histograms["connection"].record(connection)
+        histograms["time_to_headers"].record(timings.time_to_headers)
+        histograms["sent_to_headers"].record(timings.sent_to_headers)
+        histograms["total"].record(timings.total)
+
+    def get(self, route: str, status_class: str) -> dict[str, Histogram] | None:
+        """Get the histograms of a route template and status class.
+
+        Parameters
+        ----------
+        route:
+            The route template. This is :attr:`Route.method` joined with :attr:`Route.route`.
+        status_class:
+            The status class, for example ``"2xx"``.
+
+        Returns
+        -------
+        dict[str, Histogram] | None
+            The histogram of every phase, or :data:`None` if no requests were recorded.
+        """
+        return self.histograms.get((route, status_class))
+
+    def items(self) -> ItemsView[tuple[str, str], dict[str, Histogram]]:
+        """Every route template and status class with the histograms of every phase"""
+        return self.histograms.items()
+
+    def merge(self, other: RequestTimingHistograms) -> None:
+        """Add the histograms of another instance to this one.
+
+        This can be used to combine the timings of multiple :class:`HTTPClient` instances.
+
+        Parameters
+        ----------
+        other:
+            The histograms to add.
+        """
+        for key, other_histograms in other.histograms.items():
+            histograms = self.histograms.get(key)
+            if histograms is None:
+                histograms = {phase: Histogram() for phase in REQUEST_PHASES}
+                self.histograms[key] = histograms
+            for phase, histogram in other_histograms.items():
+                histograms[phase].merge(histogram)
+
+    def clear(self) -> None:
+        """Remove every recorded request"""
+        self.histograms.clear()
@@ -21,15 +21,52 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
+from string import Formatter
+from sys import intern
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import ClassVar, Final, Literal
+    from typing import Any, ClassVar, Final, Literal, Optional, Tuple
 
     from discord_typings import Snowflake
     from typing_extensions import LiteralString
 
-__all__: Final[tuple[str, ...]] = ("Route",)
+    #: ``(method + route, guild_id, channel_id, webhook_id, webhook_token)``
+    BucketKey = Tuple[str, Optional[str], Optional[str], Optional[str], Optional[str]]
+
+    Method = Literal["GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"]
+
+__all__: Final[tuple[str, ...]] = ("Route", "RouteTemplate")
+
+_MAJOR_PARAMETERS: Final[tuple[str, ...]] = ("guild_id", "channel_id", "webhook_id", "webhook_token")
+
+
+@lru_cache(maxsize=4096)
+def _parse_major_parameters(path: str) -> frozenset[str]:
+    """The major parameters that are in a path"""
+    field_names = {field_name for _, field_name, _, _ in Formatter().parse(path) if field_name is not None}
+    return frozenset(field_names.intersection(_MAJOR_PARAMETERS))
+
+
+def _create_bucket_key(
+    bucket_route: str,
+    major_parameters: frozenset[str],
+    guild_id: Snowflake | None,
+    channel_id: Snowflake | None,
+    webhook_id: Snowflake | None,
+    webhook_token: str | None,
+) -> BucketKey:
+    """Create a :attr:`Route.bucket`. Only the major parameters in the path count towards the rate limit."""
+    if not major_parameters:
+        return (bucket_route, None, None, None, None)
+    return (
+        bucket_route,
+        None if guild_id is None or "guild_id" not in major_parameters else str(guild_id),
+        None if channel_id is None or "channel_id" not in major_parameters else str(channel_id),
+        None if webhook_id is None or "webhook_id" not in major_parameters else str(webhook_id),
+        None if "webhook_token" not in major_parameters else webhook_token,
+    )
 
 
 class Route:
@@ -41,6 +78,9 @@ class Route:
 
         route = Route("GET", "/guilds/{guild_id}", guild_id=1234567890)
 
+    .. hint::
+        Use :meth:`Route.compile` for routes that are used often.
+
     Parameters
     ----------
     method:
@@ -49,14 +89,22 @@ class Route:
         The path of the route. This can include python formatting strings ({var_here}) from kwargs
     ignore_global:
         If this route bypasses the global rate limit.
+    speculative_requests:
+        How many requests can be in progress at once while the rate limit of this route is not known yet.
+
+        If this is :data:`None`, :attr:`HTTPClient.speculative_requests` is used.
     guild_id:
-        Major parameters which will be included in ``parameters`` and count towards the rate limit.
+        Major parameters which will be included in ``parameters``.
+        They count towards the rate limit if they are in ``path``.
     channel_id:
-        Major parameters which will be included in ``parameters`` and count towards the rate limit.
+        Major parameters which will be included in ``parameters``.
+        They count towards the rate limit if they are in ``path``.
     webhook_id:
-        Major parameters which will be included in ``parameters`` and count towards the rate limit.
+        Major parameters which will be included in ``parameters``.
+        They count towards the rate limit if they are in ``path``.
     webhook_token:
-        Major parameters which will be included in ``parameters`` and count towards the rate limit.
+        Major parameters which will be included in ``parameters``.
+        They count towards the rate limit if they are in ``path``.
     parameters:
         The parameters of the route. These will be used to format the path.
 
@@ -70,36 +118,33 @@ class Route:
         The path of the route. This can include python formatting strings ({var_here}) from kwargs.
     path:
         The formatted version of :attr:`Route.route`
+    url:
+        The full URL of the route. This is :attr:`Route.BASE_URL` joined with :attr:`Route.path`
     ignore_global:
         If this route bypasses the global rate limit.
 
         This is always :data:`True` for unauthenticated routes.
+    speculative_requests:
+        How many requests can be in progress at once while the rate limit of this route is not known yet.
+
+        If this is :data:`None`, :attr:`HTTPClient.speculative_requests` is used.
     bucket:
         The rate limit bucket this fits in.
 
-        This is created from :attr:`Route.guild_id`, :attr:`Route.channel_id`, :attr:`Route.webhook_id`, :attr:`Bucket.method` and :attr:`Route.path`
+        This is a tuple of :attr:`Route.method` joined with :attr:`Route.route`, followed by the guild_id, channel_id, webhook_id and webhook_token major parameters as strings.
     """
 
-    __slots__ = ("method", "route", "path", "ignore_global", "bucket")
+    __slots__ = ("method", "route", "path", "url", "ignore_global", "speculative_requests", "bucket")
 
     BASE_URL: ClassVar[str] = "https://discord.com/api/v10"
 
     def __init__(
         self,
-        method: Literal[
-            "GET",
-            "HEAD",
-            "POST",
-            "PUT",
-            "DELETE",
-            "CONNECT",
-            "OPTIONS",
-            "TRACE",
-            "PATCH",
-        ],
+        method: Method,
         path: LiteralString,
         *,
         ignore_global: bool = False,
+        speculative_requests: int | None = None,
         guild_id: Snowflake | None = None,
         channel_id: Snowflake | None = None,
         webhook_id: Snowflake | None = None,
@@ -111,6 +156,154 @@ class Route:
         self.path: str = path.format(
             guild_id=guild_id, channel_id=channel_id, webhook_id=webhook_id, webhook_token=webhook_token, **parameters
         )
+        self.url: str = self.BASE_URL + self.path
         self.ignore_global: bool = ignore_global
+        self.speculative_requests: int | None = speculative_requests
+
+        self.bucket: BucketKey = _create_bucket_key(
+            method + path, _parse_major_parameters(path), guild_id, channel_id, webhook_id, webhook_token
+        )
+
+    @classmethod
+    def compile(
+        cls,
+        method: Method,
+        path: LiteralString,
+        *,
+        ignore_global: bool = False,
+        speculative_requests: int | None = None,
+    ) -> RouteTemplate:
+        """Parse a route once to create :class:`Route` instances for it quickly
+
+        **Example usage**
+
+        .. code-block:: python3
+
+            GET_CHANNEL = Route.compile("GET", "/channels/{channel_id}")
+
+            route = GET_CHANNEL(channel_id=1234567890)
+
+        Parameters
+        ----------
+        method:
+            The HTTP method of the route
+        path:
+            The path of the route. This can include python formatting strings ({var_here}).
+        ignore_global:
+            If this route bypasses the global rate limit.
+        speculative_requests:
+            How many requests can be in progress at once while the rate limit of this route is not known yet.
+
+            If this is :data:`None`, :attr:`HTTPClient.speculative_requests` is used.
+        """
+        return RouteTemplate(
+            method, path, ignore_global=ignore_global, speculative_requests=speculative_requests, route_class=cls
+        )
+
+
+class RouteTemplate:
+    """A pre-parsed :class:`Route`
+
+    This parses the path once, and creates :class:`Route` instances without re-computing the parts of
+    :attr:`Route.bucket` and :attr:`Route.url` that do not change.
+
+    .. note::
+        This should be created through :meth:`Route.compile`.
+
+    Parameters
+    ----------
+    method:
+        The HTTP method of the route
+    path:
+        The path of the route. This can include python formatting strings ({var_here}).
+    ignore_global:
+        If this route bypasses the global rate limit.
+    speculative_requests:
+        How many requests can be in progress at once while the rate limit of this route is not known yet.
+
+        If this is :data:`None`, :attr:`HTTPClient.speculative_requests` is used.
+    route_class:
+        The class of the routes to create.
+
+    Attributes
+    ----------
+    method:
+        The HTTP method of the route
+    route:
+        The path of the route.
+    ignore_global:
+        If this route bypasses the global rate limit.
+    speculative_requests:
+        How many requests can be in progress at once while the rate limit of this route is not known yet.
+    route_class:
+        The class of the routes to create.
+    major_parameters:
+        The major parameters that are in the path. Only these count towards the rate limit.
+    """
+
+    __slots__ = (
+        "method",
+        "route",
+        "ignore_global",
+        "speculative_requests",
+        "route_class",
+        "major_parameters",
+        "_bucket_route",
+        "_static",
+    )
+
+    def __init__(
+        self,
+        method: Method,
+        path: LiteralString,
+        *,
+        ignore_global: bool = False,
+        speculative_requests: int | None = None,
+        route_class: type[Route] = Route,
+    ) -> None:
+        self.method: str = method
+        self.route: str = path
+        self.ignore_global: bool = ignore_global
+        self.speculative_requests: int | None = speculative_requests
+        self.route_class: type[Route] = route_class
+
+        self.major_parameters: frozenset[str] = _parse_major_parameters(path)
+
+        # Shared between every bucket key created from this template
+        self._bucket_route: str = intern(method + path)
+        self._static: bool = not any(field_name is not None for _, field_name, _, _ in Formatter().parse(path))
+
+    def __call__(self, **parameters: Any) -> Route:
+        """Create a :class:`Route`
+
+        Parameters
+        ----------
+        parameters:
+            The parameters of the route, including major parameters. These will be used to format the path.
+
+        Raises
+        ------
+        KeyError
+            A parameter in the path was not provided.
+        """
+        route = self.route_class.__new__(self.route_class)
+        route.method = self.method
+        route.route = self.route
+        route.path = path = self.route if self._static else self.route.format_map(parameters)
+        route.url = route.BASE_URL + path
+        route.ignore_global = self.ignore_global
+        route.speculative_requests = self.speculative_requests
 
-        self.bucket: str = f"{guild_id}{channel_id}{webhook_id}{webhook_token}{method}{path}"
+        major_parameters = self.major_parameters
+        if major_parameters:
+            route.bucket = _create_bucket_key(
+                self._bucket_route,
+                major_parameters,
+                parameters.get("guild_id"),
+                parameters.get("channel_id"),
+                parameters.get("webhook_id"),
+                parameters.get("webhook_token"),
+            )
+        else:
+            route.bucket = (self._bucket_route, None, None, None, None)
+        return route
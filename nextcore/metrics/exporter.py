@@ -0,0 +1,391 @@
+# The MIT License (MIT)
+# Copyright (c) 2021-present tag-epic
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from __future__ import annotations
+
+from asyncio import get_running_loop
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+from ..common import TimesPer
+from ..http.rate_limit_storage.rate_limit_storage import _hash_rate_limit_key
+
+if TYPE_CHECKING:
+    from typing import Any, Final, Iterable
+
+    from ..gateway import Shard, ShardManager
+    from ..http import HTTPClient, RateLimitStorage
+
+logger = getLogger(__name__)
+
+__all__: Final[tuple[str, ...]] = ("MetricsExporter",)
+
+# The content type of the Prometheus text format
+_CONTENT_TYPE: Final[str] = "text/plain; version=0.0.4; charset=utf-8"
+
+# Names of the major parameters in Route.bucket, after the route itself
+_MAJOR_PARAMETERS: Final[tuple[str, ...]] = ("guild_id", "channel_id", "webhook_id")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _MetricFamilies:
+    """Groups samples by metric so every metric is written once with its HELP and TYPE"""
+
+    __slots__ = ("_families",)
+
+    def __init__(self) -> None:
+        self._families: dict[str, tuple[str, str, list[str]]] = {}
+
+    def add(self, name: str, kind: str, description: str, value: float, **labels: str) -> None:
+        family = self._families.get(name)
+        if family is None:
+            family = (kind, description, [])
+            self._families[name] = family
+
+        if labels:
+            formatted_labels = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+            family[2].append(f"{name}{{{formatted_labels}}} {float(value)!r}")
+        else:
+            family[2].append(f"{name} {float(value)!r}")
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for name, (kind, description, samples) in self._families.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        lines.append("")
+        return "\n".join(lines)
+
+
+class MetricsExporter:
+    """Exports metrics about rate limiting and the gateway in the Prometheus text format.
+
+    Everything is read from the :class:`HTTPClient`, :class:`ShardManager` and :class:`Shard` instances
+    when :meth:`MetricsExporter.render` is called, so nothing is done while nobody is scraping.
+
+    The following metrics are exported:
+
+    - ``nextcore_buckets``, ``nextcore_bucket_pending_requests``, ``nextcore_bucket_remaining`` and
+      ``nextcore_bucket_reset_seconds`` for every route with buckets that are in use. Clean buckets are skipped.
+      The buckets of a route are combined, see ``major_parameter_labels``.
+    - ``nextcore_global_pending_requests``, ``nextcore_global_remaining`` and ``nextcore_global_limit``
+      for every global rate limiter based on :class:`TimesPer`.
+    - ``nextcore_rate_limited_responses_total`` by scope, and ``nextcore_speculative_requests_total`` by result.
+    - ``nextcore_hedged_requests_total`` and ``nextcore_hedge_wins_total``.
+    - ``nextcore_invalid_requests`` and ``nextcore_invalid_request_budget_usage`` for the Cloudflare ban budget.
+    - ``nextcore_shard_latency_seconds``, ``nextcore_shard_reconnects_total``, ``nextcore_shard_events_total``,
+      ``nextcore_shard_decompressed_bytes_total`` and ``nextcore_shard_send_remaining`` for every shard.
+    - ``nextcore_identify_pending_requests`` for every :class:`ShardManager` identify rate limit.
+
+    Rate limit keys are exported as the first 12 characters of their SHA-256 hash, as they are usually tokens.
+
+    **Example usage**
+
+    .. code-block:: python3
+
+        exporter = MetricsExporter(http_clients=[http_client], shard_managers=[shard_manager])
+        await exporter.start(port=9100)
+
+    Parameters
+    ----------
+    http_clients:
+        The HTTP clients to export rate limits of.
+    shard_managers:
+        The shard managers to export shards and identify rate limits of.
+    shards:
+        Shards that are not managed by a :class:`ShardManager`.
+    major_parameter_labels:
+        Export every bucket on its own with ``guild_id``, ``channel_id`` and ``webhook_id`` labels.
+
+        By default the buckets of a route are combined, by summing the pending requests and exporting the lowest
+        remaining and the longest time until a reset. This keeps the amount of series bounded by the amount of routes.
+
+        .. warning::
+            This creates series for every guild, channel and webhook that is used.
+
+    Attributes
+    ----------
+    http_clients:
+        The HTTP clients to export rate limits of.
+    shard_managers:
+        The shard managers to export shards and identify rate limits of.
+    shards:
+        Shards that are not managed by a :class:`ShardManager`.
+    major_parameter_labels:
+        Whether every bucket is exported on its own with labels for its major parameters.
+    """
+
+    __slots__ = ("http_clients", "shard_managers", "shards", "major_parameter_labels", "_runner")
+
+    def __init__(
+        self,
+        *,
+        http_clients: Iterable[HTTPClient] = (),
+        shard_managers: Iterable[ShardManager] = (),
+        shards: Iterable[Shard] = (),
+        major_parameter_labels: bool = False,
+    ) -> None:
+        self.http_clients: list[HTTPClient] = list(http_clients)
+        self.shard_managers: list[ShardManager] = list(shard_managers)
+        self.shards: list[Shard] = list(shards)
+        self.major_parameter_labels: bool = major_parameter_labels
+        self._runner: web.AppRunner | None = None
+
+    def render(self) -> str:
+        """Collect every metric and render them in the Prometheus text format.
+
+        .. note::
+            This has to be called from inside the event loop, as bucket resets are in event loop time.
+        """
+        families = _MetricFamilies()
+        now = get_running_loop().time()
+
+        for http_client in self.http_clients:
+            self._collect_http_client(families, http_client, now)
+
+        for shard_manager in self.shard_managers:
+            for shard in shard_manager.active_shards:
+                self._collect_shard(families, shard, "active")
+            for shard in shard_manager.pending_shards:
+                self._collect_shard(families, shard, "pending")
+            for rate_limit_bucket, rate_limiter in shard_manager.identify_rate_limits.items():
+                families.add(
+                    "nextcore_identify_pending_requests",
+                    "gauge",
+                    "Shards waiting to identify",
+                    rate_limiter.pending,
+                    bucket=str(rate_limit_bucket),
+                )
+        for shard in self.shards:
+            self._collect_shard(families, shard, "active")
+
+        return families.render()
+
+    def _collect_http_client(self, families: _MetricFamilies, http_client: HTTPClient, now: float) -> None:
+        for scope, count in http_client.rate_limited_responses.items():
+            families.add(
+                "nextcore_rate_limited_responses_total", "counter", "429 responses received by scope", count, scope=scope
+            )
+        families.add(
+            "nextcore_speculative_requests_total",
+            "counter",
+            "Speculative requests by whether they were rate limited",
+            http_client.speculation_wins,
+            result="win",
+        )
+        families.add(
+            "nextcore_speculative_requests_total",
+            "counter",
+            "Speculative requests by whether they were rate limited",
+            http_client.speculation_losses,
+            result="loss",
+        )
+        families.add(
+            "nextcore_hedged_requests_total", "counter", "Second requests sent for slow requests", http_client.hedged_requests
+        )
+        families.add(
+            "nextcore_hedge_wins_total",
+            "counter",
+            "Second requests sent for slow requests that responded first",
+            http_client.hedge_wins,
+        )
+        families.add(
+            "nextcore_invalid_requests",
+            "gauge",
+            "401, 403 and 429 responses in the Cloudflare ban window",
+            http_client.invalid_request_tracker.count,
+        )
+        families.add(
+            "nextcore_invalid_request_budget_usage",
+            "gauge",
+            "Part of the Cloudflare ban budget that is used",
+            http_client.invalid_request_tracker.usage,
+        )
+
+        for rate_limit_key, storage in list(http_client.rate_limit_storages.items()):
+            self._collect_rate_limit_storage(families, _hash_rate_limit_key(rate_limit_key)[:12], storage, now)
+
+    def _collect_rate_limit_storage(
+        self, families: _MetricFamilies, rate_limit_key: str, storage: RateLimitStorage, now: float
+    ) -> None:
+        global_rate_limiter = storage.global_rate_limiter
+        if isinstance(global_rate_limiter, TimesPer):
+            families.add(
+                "nextcore_global_pending_requests",
+                "gauge",
+                "Requests waiting for the global rate limit",
+                global_rate_limiter.pending,
+                rate_limit_key=rate_limit_key,
+            )
+            families.add(
+                "nextcore_global_remaining",
+                "gauge",
+                "Requests left in the global rate limit window",
+                global_rate_limiter.remaining,
+                rate_limit_key=rate_limit_key,
+            )
+            families.add(
+                "nextcore_global_limit",
+                "gauge",
+                "Requests allowed per global rate limit window",
+                global_rate_limiter.limit,
+                rate_limit_key=rate_limit_key,
+            )
+
+        seen: set[int] = set()
+        # Labels -> [buckets, pending requests, lowest remaining, longest time until reset]
+        combined: dict[tuple[tuple[str, str], ...], list[Any]] = {}
+        for nextcore_id, bucket in storage.iter_buckets():
+            if id(bucket) in seen or not bucket.dirty:
+                # Shared buckets are only exported once, and clean buckets would only add noise.
+                continue
+            seen.add(id(bucket))
+
+            if isinstance(nextcore_id, str):
+                labels: tuple[tuple[str, str], ...] = (("rate_limit_key", rate_limit_key), ("route", nextcore_id))
+            else:
+                labels = (("rate_limit_key", rate_limit_key), ("route", nextcore_id[0]))
+                if self.major_parameter_labels:
+                    labels += tuple(
+                        (name, value) for name, value in zip(_MAJOR_PARAMETERS, nextcore_id[1:]) if value is not None
+                    )
+
+            stats = combined.get(labels)
+            if stats is None:
+                stats = [0, 0, None, None]
+                combined[labels] = stats
+            stats[0] += 1
+            stats[1] += bucket.pending
+            if bucket.remaining is not None:
+                stats[2] = bucket.remaining if stats[2] is None else min(stats[2], bucket.remaining)
+            if bucket.reset_at is not None:
+                reset_after = max(bucket.reset_at - now, 0)
+                stats[3] = reset_after if stats[3] is None else max(stats[3], reset_after)
+
+        for labels, (buckets, pending, remaining, reset_after) in combined.items():
+            label_values = dict(labels)
+            families.add("nextcore_buckets", "gauge", "Buckets in use", buckets, **label_values)
+            families.add(
+                "nextcore_bucket_pending_requests",
+                "gauge",
+                "Requests waiting for the bucket",
+                pending,
+                **label_values,
+            )
+            if remaining is not None:
+                families.add(
+                    "nextcore_bucket_remaining",
+                    "gauge",
+                    "Requests left in the bucket rate limit window",
+                    remaining,
+                    **label_values,
+                )
+            if reset_after is not None:
+                families.add(
+                    "nextcore_bucket_reset_seconds",
+                    "gauge",
+                    "Seconds until the bucket resets",
+                    reset_after,
+                    **label_values,
+                )
+
+    def _collect_shard(self, families: _MetricFamilies, shard: Shard, state: str) -> None:
+        labels = {"shard_id": str(shard.shard_id), "state": state}
+
+        try:
+            latency = shard.latency
+        except RuntimeError:
+            pass  # Not connected or not heartbeated yet
+        else:
+            families.add("nextcore_shard_latency_seconds", "gauge", "Gateway heartbeat latency", latency, **labels)
+
+        families.add(
+            "nextcore_shard_reconnects_total", "counter", "Reconnects to the gateway", shard.reconnects, **labels
+        )
+        families.add(
+            "nextcore_shard_events_total", "counter", "DISPATCH events received", shard.received_events, **labels
+        )
+        families.add(
+            "nextcore_shard_decompressed_bytes_total",
+            "counter",
+            "Bytes received from the gateway after decompressing",
+            shard.decompressed_bytes,
+            **labels,
+        )
+        send_rate_limit = shard.send_rate_limit
+        if send_rate_limit is not None:
+            families.add(
+                "nextcore_shard_send_remaining",
+                "gauge",
+                "Gateway commands left in the send rate limit window",
+                send_rate_limit.remaining,
+                **labels,
+            )
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        del request  # Unused
+        return web.Response(body=self.render().encode("utf-8"), headers={"Content-Type": _CONTENT_TYPE})
+
+    def create_app(self) -> web.Application:
+        """Create a :class:`aiohttp.web.Application` with a ``/metrics`` endpoint
+
+        This can be used to add the endpoint to your own web server.
+        """
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 9100) -> None:
+        """Start a web server with a ``/metrics`` endpoint
+
+        Parameters
+        ----------
+        host:
+            The host to listen on.
+        port:
+            The port to listen on.
+
+        Raises
+        ------
+        RuntimeError
+            The server is already started.
+        """
+        if self._runner is not None:
+            raise RuntimeError("The metrics server is already started")
+
+        runner = web.AppRunner(self.create_app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        self._runner = runner
+        logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+
+    async def close(self) -> None:
+        """Stop the web server started by :meth:`MetricsExporter.start`"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
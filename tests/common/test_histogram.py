@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from math import inf
+
+from pytest import approx, raises
+
+from nextcore.common import Histogram
+
+
+def test_percentile_precision() -> None:
+    histogram = Histogram(sub_buckets=8)
+
+    for value in range(1, 101):
+        histogram.record(value / 100)
+
+    assert histogram.count == 100
+    assert histogram.mean == approx(0.505)
+    assert histogram.percentile(0.5) == approx(0.5, rel=1 / 8)
+    assert histogram.percentile(0.99) == approx(0.99, rel=1 / 8)
+    assert histogram.percentile(1) == 1
+
+
+def test_out_of_range_values() -> None:
+    histogram = Histogram(lowest=0.5, highest=2)
+
+    histogram.record(0)
+    histogram.record(100)
+
+    assert histogram.counts[0] == 1
+    assert histogram.counts[-1] == 1
+    assert histogram.upper_bound(len(histogram.counts) - 1) == inf
+    assert histogram.percentile(1) == 100
+
+
+def test_merge() -> None:
+    first = Histogram()
+    second = Histogram()
+    first.record(0.1)
+    second.record(0.2)
+    second.record(0.3)
+
+    first.merge(second)
+
+    assert first.count == 3
+    assert first.min == 0.1
+    assert first.max == 0.3
+    assert sum(count for _, count in first.buckets()) == 3
+
+    with raises(ValueError):
+        first.merge(Histogram(sub_buckets=4))
+
+
+def test_empty_percentile_raises() -> None:
+    with raises(ValueError):
+        Histogram().percentile(0.5)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from asyncio import AbstractEventLoop, Event, get_running_loop, new_event_loop, sleep
+from gc import collect
+from weakref import ReferenceType, ref
+
+from pytest import mark
+
+from nextcore.common.timer_wheel import TimerWheel, get_timer_wheel
+from tests.utils import match_time
+
+
+@mark.asyncio
+@match_time(0.1, 0.05)
+async def test_fires_after_delay() -> None:
+    wheel = TimerWheel()
+    fired = Event()
+
+    wheel.call_later(0.1, fired.set)
+    await fired.wait()
+
+    assert len(wheel) == 0
+
+
+@mark.asyncio
+async def test_never_fires_early() -> None:
+    wheel = TimerWheel(resolution=0.01, slots=4, levels=3)
+    loop = get_running_loop()
+    lateness: list[float] = []
+
+    def callback(when: float) -> None:
+        lateness.append(loop.time() - when)
+
+    for index in range(50):
+        delay = index * 0.013  # Spread out over multiple levels
+        wheel.call_later(delay, callback, loop.time() + delay)
+
+    await sleep(0.7)
+
+    assert len(lateness) == 50, "Not all timers fired"
+    # The event loop itself can wake up to its clock resolution early
+    assert min(lateness) >= -loop._clock_resolution, "A timer fired early"  # type: ignore [attr-defined]
+
+
+@mark.asyncio
+async def test_cancel() -> None:
+    wheel = TimerWheel()
+    fired: list[int] = []
+
+    handle = wheel.call_later(0.01, fired.append, 1)
+    wheel.call_later(0.01, fired.append, 2)
+    handle.cancel()
+
+    await sleep(0.05)
+
+    assert fired == [2]
+
+
+@mark.asyncio
+async def test_batches_same_tick() -> None:
+    wheel = TimerWheel(resolution=0.05)
+    fired: list[int] = []
+
+    for index in range(100):
+        wheel.call_later(0.01, fired.append, index)
+
+    await sleep(0.1)
+
+    assert fired == list(range(100)), "Timers in the same tick should fire in order"
+
+
+@mark.asyncio
+async def test_shared_per_loop() -> None:
+    assert get_timer_wheel() is get_timer_wheel()
+
+
+@mark.asyncio
+async def test_early_wakeup() -> None:
+    wheel = TimerWheel(resolution=0.001)
+    fired: list[int] = []
+
+    wheel.call_later(0.01, fired.append, 1)
+    wheel._run()  # The event loop waking up before the tick due to its clock resolution
+
+    assert fired == [1], "An early wakeup should still process the tick it was scheduled for"
+    assert wheel._wakeup_tick is None
+
+
+def test_event_loops_are_not_kept_alive() -> None:
+    async def use_wheel() -> None:
+        wheel = get_timer_wheel()
+        wheel.call_later(0.001, lambda: None)
+        wheel.call_later(60, lambda: None)  # Still pending when the loop is closed
+        await sleep(0.01)
+
+    loops: list[ReferenceType[AbstractEventLoop]] = []
+    for _ in range(5):
+        loop = new_event_loop()
+        loop.run_until_complete(use_wheel())
+        loop.close()
+        loops.append(ref(loop))
+    del loop
+    collect()
+
+    assert all(loop() is None for loop in loops), "Closed event loops were kept alive by their timer wheel"
@@ -1,4 +1,6 @@
-from pytest import mark, raises
+import asyncio
+
+from pytest import approx, mark, raises
 
 from nextcore.common.errors import RateLimitedError
 from nextcore.common.times_per import TimesPer
@@ -82,3 +84,36 @@ async def test_reset_offset_positive():
     for _ in range(2):
         async with rate_limiter.acquire():
             ...
+
+
+def test_default_acquire_is_reused():
+    rate_limiter = TimesPer(1, 1)
+
+    assert rate_limiter.acquire() is rate_limiter.acquire()
+    assert rate_limiter.acquire(priority=1) is not rate_limiter.acquire(priority=1)
+
+
+@mark.asyncio
+async def test_estimate_admission() -> None:
+    rate_limiter = TimesPer(2, 1)
+    loop = asyncio.get_running_loop()
+
+    assert rate_limiter.estimate_admission() == approx(loop.time(), abs=0.01)
+
+    for _ in range(2):
+        async with rate_limiter.acquire():
+            ...
+    tasks = [asyncio.create_task(use(rate_limiter)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    # Two of the waiting requests get through on the first reset, the third has to wait for the second reset
+    assert rate_limiter.estimate_admission(-1) == approx(loop.time() + 1, abs=0.05)
+    assert rate_limiter.estimate_admission() == approx(loop.time() + 2, abs=0.05)
+
+    await rate_limiter.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def use(rate_limiter: TimesPer) -> None:
+    async with rate_limiter.acquire():
+        ...
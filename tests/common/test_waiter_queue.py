@@ -0,0 +1,178 @@
+from asyncio import CancelledError, create_task, sleep
+
+from pytest import mark, raises
+
+from nextcore.common import WaiterQueue
+
+
+@mark.asyncio
+async def test_priority_order() -> None:
+    queue = WaiterQueue()
+
+    low = queue.put(5)
+    high = queue.put(1)
+
+    assert queue.release(1) == 1
+    assert high.done(), "Lower priority number was not released first"
+    assert not low.done()
+
+    queue.close()
+
+
+@mark.asyncio
+async def test_fifo_within_priority() -> None:
+    queue = WaiterQueue()
+
+    futures = [queue.put(0) for _ in range(10)]
+    for index, future in enumerate(futures):
+        queue.release(1)
+        assert future.done(), f"Waiter {index} was not released in order"
+
+    queue.close()
+
+
+@mark.asyncio
+async def test_skips_cancelled() -> None:
+    queue = WaiterQueue()
+
+    first = queue.put()
+    second = queue.put()
+
+    first.cancel()
+    queue.discard(first)
+
+    assert len(queue) == 1
+    assert queue.release(1) == 1
+    assert second.done() and not second.cancelled()
+    assert len(queue) == 0
+
+
+@mark.asyncio
+async def test_released_then_cancelled_passes_spot_on() -> None:
+    queue = WaiterQueue()
+
+    async def waiter(future):
+        try:
+            await future
+        except CancelledError:
+            queue.discard(future)
+            raise
+
+    first = queue.put()
+    second = queue.put()
+    task = create_task(waiter(first))
+    await sleep(0)
+
+    queue.release(1)
+    task.cancel()  # Cancelled after being released, but before it resumed
+    with raises(CancelledError):
+        await task
+
+    assert second.done(), "Spot was not passed on to the next waiter"
+
+
+@mark.asyncio
+async def test_compacts_cancelled() -> None:
+    queue = WaiterQueue()
+
+    futures = [queue.put() for _ in range(1000)]
+    for future in futures:
+        future.cancel()
+        queue.discard(future)
+
+    assert len(queue) == 0
+    assert len(queue._heap) <= WaiterQueue._COMPACT_THRESHOLD + 1, "Cancelled waiters were not compacted"
+
+
+@mark.asyncio
+async def test_close_cancels() -> None:
+    queue = WaiterQueue()
+
+    future = queue.put()
+    queue.close()
+
+    with raises(CancelledError):
+        await future
+
+    # The queue can still be used, and the closed waiter does not hand its spot on.
+    waiting = queue.put()
+    queue.discard(future)
+    assert not waiting.done(), "A waiter stopped by close was treated as released"
+    assert len(queue) == 1
+
+    queue.close()
+
+
+@mark.asyncio
+async def test_front_goes_before_same_priority() -> None:
+    queue = WaiterQueue()
+
+    normal = queue.put(0)
+    front = queue.put(0, front=True)
+    higher = queue.put(-1)
+
+    queue.release(1)
+    assert higher.done(), "Front waiter skipped a higher priority"
+
+    queue.release(1)
+    assert front.done(), "Front waiter was not released before the normal one"
+    assert not normal.done()
+
+    queue.close()
+
+
+@mark.asyncio
+async def test_move_to_keeps_order() -> None:
+    queue = WaiterQueue()
+    other = WaiterQueue()
+
+    existing = other.put(0)
+    moved = queue.put(0)
+    moved_front = queue.put(0, front=True)
+    cancelled = queue.put(0)
+    queue.discard(cancelled)
+
+    assert queue.move_to(other) == 2
+    assert len(queue) == 0
+    assert len(other) == 3
+
+    other.release(1)
+    assert moved_front.done(), "Waiter put in front lost its place"
+    other.release(1)
+    assert existing.done(), "Moved waiter went before the waiters already in the queue"
+    other.release(1)
+    assert moved.done()
+
+    other.close()
+
+
+@mark.asyncio
+async def test_count_ahead() -> None:
+    queue = WaiterQueue()
+
+    queue.put(0)
+    queue.put(1)
+    cancelled = queue.put(1)
+    queue.put(2)
+    queue.discard(cancelled)
+
+    assert queue.count_ahead(0) == 1
+    assert queue.count_ahead(1) == 2, "A discarded waiter or a lower priority waiter was counted"
+    assert queue.count_ahead(-1) == 0
+
+    queue.discard(cancelled)
+    assert len(queue) == 3, "Discarding twice removed another waiter"
+
+    queue.release(1)
+    assert queue.count_ahead(1) == 1, "A released waiter was counted"
+
+    other = WaiterQueue()
+    other.put(1)
+    queue.move_to(other)
+    assert queue.count_ahead(2) == 0
+    assert other.count_ahead(1) == 2
+    assert other.count_ahead(2) == 3
+
+    queue.close()
+    other.close()
+    assert other.count_ahead(2) == 0
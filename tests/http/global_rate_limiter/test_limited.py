@@ -1,8 +1,11 @@
-from asyncio import Task, create_task, sleep
+from asyncio import Task
+from asyncio import TimeoutError as AsyncioTimeoutError
+from asyncio import create_task, sleep, wait_for
 from logging import getLogger
 
-from pytest import mark
+from pytest import mark, raises
 
+from nextcore.common.errors import RateLimitedError
 from nextcore.http.global_rate_limiter import LimitedGlobalRateLimiter
 from tests.utils import match_time
 
@@ -50,3 +53,68 @@ async def test_exceeds_limit_concurrent() -> None:
     assert len(pending_requests) == 1, f"Expected 1 pending request, got {len(pending_requests)}"
 
     await rate_limiter.close()
+
+
+@mark.asyncio
+async def test_global_rate_limit_pauses() -> None:
+    rate_limiter = LimitedGlobalRateLimiter(limit=50)
+
+    async with rate_limiter.acquire():
+        ...
+    rate_limiter.update(1.5)
+    assert rate_limiter.paused
+
+    with raises(RateLimitedError):
+        async with rate_limiter.acquire(wait=False):
+            ...
+
+    with raises(AsyncioTimeoutError):
+        # Would get a spot when the window resets after 1 second without the pause
+        await wait_for(use(rate_limiter), timeout=1.2)
+
+    await wait_for(use(rate_limiter), timeout=0.5)
+    assert not rate_limiter.paused
+
+    await rate_limiter.close()
+
+
+@mark.asyncio
+async def test_adaptive_limit() -> None:
+    rate_limiter = LimitedGlobalRateLimiter(limit=2, adaptive=True, max_limit=3)
+
+    for _ in range(2):
+        await use(rate_limiter)
+    rate_limiter._reset()  # pyright: ignore [reportPrivateUsage]
+    assert rate_limiter.limit == 3, "The limit was not raised after using the whole window"
+
+    for _ in range(3):
+        await use(rate_limiter)
+    rate_limiter._reset()  # pyright: ignore [reportPrivateUsage]
+    assert rate_limiter.limit == 3, "The limit was raised above the maximum"
+
+    rate_limiter.update(0.1)
+    rate_limiter.update(0.1)
+    assert rate_limiter.limit == 2, "The limit went below the minimum or was lowered twice"
+
+    await rate_limiter.close()
+
+
+@mark.asyncio
+async def test_adaptive_limit_stays_lowered_after_pause() -> None:
+    rate_limiter = LimitedGlobalRateLimiter(limit=2, adaptive=True)
+    rate_limiter.limit = 4
+
+    await use(rate_limiter)
+    rate_limiter.update(0.1)
+    assert rate_limiter.limit == 2
+
+    await sleep(1.1)  # The window that was started by the request ends after the pause
+    assert not rate_limiter.paused
+    assert rate_limiter.limit == 2, "The limit was raised by the window that ended with the pause"
+
+    await rate_limiter.close()
+
+
+async def use(rate_limiter: LimitedGlobalRateLimiter) -> None:
+    async with rate_limiter.acquire():
+        ...
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from asyncio import CancelledError, create_task, gather, sleep
+
+from pytest import mark, raises
+
+from nextcore.common.errors import RateLimitedError
+from nextcore.http.global_rate_limiter import TrafficClass, WeightedFairGlobalRateLimiter
+
+
+async def fill(rate_limiter: WeightedFairGlobalRateLimiter) -> None:
+    for _ in range(rate_limiter.limit):
+        async with rate_limiter.acquire():
+            ...
+
+
+@mark.asyncio
+async def test_shares_by_weight() -> None:
+    rate_limiter = WeightedFairGlobalRateLimiter(
+        4, traffic_classes=[TrafficClass("interactions", 3), TrafficClass("bulk", 1)]
+    )
+    await fill(rate_limiter)
+    granted: list[str] = []
+
+    async def use_rate_limiter(traffic_class: str) -> None:
+        async with rate_limiter.acquire(traffic_class=traffic_class):
+            granted.append(traffic_class)
+
+    # Bulk is queued first and with more requests
+    tasks = [create_task(use_rate_limiter("bulk")) for _ in range(8)]
+    tasks.extend(create_task(use_rate_limiter("interactions")) for _ in range(4))
+    await sleep(0)
+    assert rate_limiter.pending == 12
+
+    await sleep(1.1)
+    assert sorted(granted) == ["bulk", "interactions", "interactions", "interactions"]
+    assert rate_limiter.traffic_classes["bulk"].granted == 1
+    assert rate_limiter.traffic_classes["bulk"].pending == 7
+
+    await rate_limiter.close()
+    await gather(*tasks, return_exceptions=True)
+
+
+@mark.asyncio
+async def test_min_share() -> None:
+    rate_limiter = WeightedFairGlobalRateLimiter(4)
+    rate_limiter.add_traffic_class("interactions", 100)
+    rate_limiter.add_traffic_class("moderation", 1, min_share=0.5)
+    await fill(rate_limiter)
+    granted: list[str] = []
+
+    async def use_rate_limiter(traffic_class: str) -> None:
+        async with rate_limiter.acquire(traffic_class=traffic_class):
+            granted.append(traffic_class)
+
+    tasks = [create_task(use_rate_limiter(name)) for name in ("interactions", "moderation") for _ in range(4)]
+    await sleep(1.1)
+
+    assert granted.count("moderation") == 2
+
+    await rate_limiter.close()
+    await gather(*tasks, return_exceptions=True)
+
+
+@mark.asyncio
+async def test_waiting_requests_age() -> None:
+    rate_limiter = WeightedFairGlobalRateLimiter(1, aging=0.2)
+    await fill(rate_limiter)
+    granted: list[int] = []
+
+    async def use_rate_limiter(priority: int) -> None:
+        async with rate_limiter.acquire(priority=priority):
+            granted.append(priority)
+
+    tasks = [create_task(use_rate_limiter(1))]
+    await sleep(0.3)  # Waited longer than one priority level
+    tasks.append(create_task(use_rate_limiter(0)))
+    await sleep(0.8)
+
+    assert granted == [1]
+
+    await rate_limiter.close()
+    await gather(*tasks, return_exceptions=True)
+
+
+@mark.asyncio
+async def test_no_wait_and_cancel() -> None:
+    rate_limiter = WeightedFairGlobalRateLimiter(1)
+    await fill(rate_limiter)
+
+    with raises(RateLimitedError):
+        async with rate_limiter.acquire(wait=False):
+            ...
+
+    async def use_rate_limiter() -> None:
+        async with rate_limiter.acquire():
+            ...
+
+    cancelled = create_task(use_rate_limiter())
+    waiting = create_task(use_rate_limiter())
+    await sleep(0)
+    cancelled.cancel()
+    await sleep(1.1)
+
+    assert waiting.done(), "The cancelled request took the spot"
+    assert rate_limiter.pending == 0
+
+    await rate_limiter.close()
+
+
+@mark.asyncio
+async def test_close_stops_waiters() -> None:
+    rate_limiter = WeightedFairGlobalRateLimiter(1)
+    await fill(rate_limiter)
+
+    async def use_rate_limiter() -> None:
+        async with rate_limiter.acquire():
+            ...
+
+    tasks = [create_task(use_rate_limiter()) for _ in range(3)]
+    await sleep(0)
+    await rate_limiter.close()
+    results = await gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, CancelledError) for result in results)
+    assert rate_limiter.pending == 0
+    assert rate_limiter._in_progress == 0, "Stopped waiters were counted as released"  # pyright: ignore [reportPrivateUsage]
+
+
+@mark.asyncio
+async def test_cancel_after_traffic_class_is_replaced() -> None:
+    rate_limiter = WeightedFairGlobalRateLimiter(1)
+    await fill(rate_limiter)
+
+    async def use_rate_limiter(traffic_class: str) -> None:
+        async with rate_limiter.acquire(traffic_class=traffic_class):
+            ...
+
+    cancelled = create_task(use_rate_limiter("bulk"))
+    await sleep(0)
+    old_traffic_class = rate_limiter.traffic_classes["bulk"]
+    new_traffic_class = rate_limiter.add_traffic_class("bulk", 2)
+    assert new_traffic_class.pending == 1
+
+    cancelled.cancel()
+    waiting = create_task(use_rate_limiter("interactions"))
+    await sleep(0)
+
+    assert old_traffic_class.pending == 0
+    assert new_traffic_class.pending == 0
+    assert rate_limiter.pending == 1
+
+    await sleep(1.1)
+    assert waiting.done(), "The spot was given to the cancelled request"
+
+    await rate_limiter.close()
+
+
+@mark.asyncio
+async def test_spot_skips_traffic_class_with_only_cancelled_waiters() -> None:
+    rate_limiter = WeightedFairGlobalRateLimiter(1)
+    await fill(rate_limiter)
+
+    async def use_rate_limiter(traffic_class: str) -> None:
+        async with rate_limiter.acquire(traffic_class=traffic_class):
+            ...
+
+    cancelled = create_task(use_rate_limiter("interactions"))
+    waiting = create_task(use_rate_limiter("bulk"))
+    await sleep(0)
+
+    # Released before the cancelled request has removed itself from the queue
+    cancelled.cancel()
+    rate_limiter.remaining = 1
+    rate_limiter._release()  # pyright: ignore [reportPrivateUsage]
+
+    assert rate_limiter.traffic_classes["bulk"].granted == 1
+    await sleep(0)
+    assert waiting.done()
+    assert rate_limiter.pending == 0
+
+    await rate_limiter.close()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from time import time
+from typing import Any
+
+from aiohttp import ClientSession, web
+from pytest import mark
+
+from nextcore.http import HTTPClient, InvalidRequestTracker
+from nextcore.http.proxy import HTTPProxy
+from tests.utils import FakeDiscord
+
+
+async def start_app(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore
+    return runner, f"http://127.0.0.1:{port}"
+
+
+class Upstream:
+    def __init__(self) -> None:
+        self.requests: list[dict[str, Any]] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(
+            {
+                "method": request.method,
+                "path": request.rel_url.raw_path,
+                "query": dict(request.query),
+                "headers": dict(request.headers),
+                "body": await request.read(),
+            }
+        )
+        headers = {
+            "Via": "1.1 google",
+            "X-RateLimit-Limit": "1",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(time() + 10),
+            "X-RateLimit-Reset-After": "10",
+            "X-RateLimit-Bucket": "abc",
+        }
+        if request.path.endswith("/missing"):
+            return web.json_response({"message": "Unknown Channel", "code": 10003}, status=404, headers=headers)
+        return web.json_response({"id": "123"}, headers=headers)
+
+
+def test_get_route() -> None:
+    proxy = HTTPProxy()
+
+    route = proxy.get_route("GET", "/v10/channels/123/messages/456")
+    assert route.route == "/v10/channels/{channel_id}/messages/{id0}"
+    assert route.path == "/v10/channels/123/messages/456"
+    assert route.bucket == HTTPProxy().get_route("GET", "/v10/channels/123/messages/789").bucket
+    assert route.bucket != proxy.get_route("GET", "/v10/channels/321/messages/456").bucket
+
+    webhook_route = proxy.get_route("POST", "/v10/webhooks/1/token/messages/2", authenticated=False)
+    assert webhook_route.route == "/v10/webhooks/{webhook_id}/{webhook_token}/messages/{id0}"
+    assert webhook_route.ignore_global
+
+    interaction_route = proxy.get_route("POST", "/v10/interactions/1/token/callback")
+    assert interaction_route.route == "/v10/interactions/{id0}/{interaction_token}/callback"
+    assert interaction_route.ignore_global
+
+    reaction_route = proxy.get_route("PUT", "/v10/channels/1/messages/2/reactions/%F0%9F%91%8D/@me")
+    assert reaction_route.route == "/v10/channels/{channel_id}/messages/{id0}/reactions/{emoji}/@me"
+
+    assert proxy.get_route("GET", "/v10/guilds/1/{weird}").path == "/v10/guilds/1/{weird}"
+
+
+@mark.asyncio
+async def test_forwards_requests(fake_discord: FakeDiscord) -> None:
+    upstream = Upstream()
+    fake_discord.add_route("*", "/api/{path:.*}", upstream.handle)
+    upstream_url = fake_discord.base_url
+    proxy = HTTPProxy(upstream=f"{upstream_url}/api")
+    proxy_runner, proxy_url = await start_app(proxy.create_app())
+
+    async with ClientSession() as session:
+        async with session.post(
+            f"{proxy_url}/api/v10/channels/123/messages?nonce=1",
+            headers={"Authorization": "Bot token", "X-Nextcore-Bucket-Priority": "5"},
+            json={"content": "Hello"},
+        ) as response:
+            assert response.status == 200
+            assert await response.json() == {"id": "123"}
+            assert response.headers["X-RateLimit-Bucket"] == "abc"
+
+        async with session.get(
+            f"{proxy_url}/api/v10/channels/123/missing", headers={"Authorization": "Bot token"}
+        ) as response:
+            assert response.status == 404
+            assert (await response.json())["code"] == 10003
+
+    forwarded = upstream.requests[0]
+    assert forwarded["method"] == "POST"
+    assert forwarded["path"] == "/api/v10/channels/123/messages"
+    assert forwarded["query"] == {"nonce": "1"}
+    assert forwarded["body"] == b'{"content": "Hello"}'
+    assert forwarded["headers"]["Authorization"] == "Bot token"
+    assert forwarded["headers"]["User-Agent"].startswith("DiscordBot")
+    assert "X-Nextcore-Bucket-Priority" not in forwarded["headers"]
+
+    await proxy_runner.cleanup()
+
+
+@mark.asyncio
+async def test_rate_limits_are_shared(fake_discord: FakeDiscord) -> None:
+    upstream = Upstream()
+    fake_discord.add_route("*", "/api/{path:.*}", upstream.handle)
+    upstream_url = fake_discord.base_url
+    proxy = HTTPProxy(HTTPClient(), upstream=f"{upstream_url}/api")
+    proxy_runner, proxy_url = await start_app(proxy.create_app())
+
+    async with ClientSession() as first_session, ClientSession() as second_session:
+        async with first_session.get(f"{proxy_url}/api/v10/users/@me", headers={"Authorization": "Bot token"}):
+            ...
+        async with second_session.get(
+            f"{proxy_url}/api/v10/users/@me", headers={"Authorization": "Bot token", "X-Nextcore-Wait": "false"}
+        ) as response:
+            assert response.status == 429
+            assert response.headers["X-Nextcore-Rate-Limited"] == "true"
+            assert 9 < (await response.json())["retry_after"] <= 10
+
+        # Different rate limit keys do not share buckets
+        async with second_session.get(
+            f"{proxy_url}/api/v10/users/@me", headers={"Authorization": "Bot other", "X-Nextcore-Wait": "false"}
+        ) as response:
+            assert response.status == 200
+
+        async with first_session.get(
+            f"{proxy_url}/api/v10/users/@me", headers={"X-Nextcore-Global-Priority": "high"}
+        ) as response:
+            assert response.status == 400
+
+    assert len(upstream.requests) == 2
+
+    await proxy_runner.cleanup()
+
+
+@mark.asyncio
+async def test_invalid_request_budget(fake_discord: FakeDiscord) -> None:
+    upstream = Upstream()
+    fake_discord.add_route("*", "/api/{path:.*}", upstream.handle)
+    http_client = HTTPClient()
+    http_client.invalid_request_tracker = InvalidRequestTracker(10, 60)
+    http_client.invalid_request_tracker.record(10)
+    proxy = HTTPProxy(http_client, upstream=f"{fake_discord.base_url}/api")
+    proxy_runner, proxy_url = await start_app(proxy.create_app())
+
+    async with ClientSession() as session:
+        async with session.get(f"{proxy_url}/api/v10/users/@me", headers={"Authorization": "Bot token"}) as response:
+            assert response.status == 429
+            assert response.headers["X-Nextcore-Rate-Limited"] == "true"
+            assert 59 < (await response.json())["retry_after"] <= 61
+
+    assert not upstream.requests
+
+    await proxy_runner.cleanup()
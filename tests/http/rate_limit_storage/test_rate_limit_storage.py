@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from pytest import mark
+
+from nextcore.common import json_dumps, json_loads
+from nextcore.http import Bucket, BucketMetadata, Route
+from nextcore.http.rate_limit_storage import RateLimitStorage
+
+
+# Eviction
+@mark.asyncio
+async def test_evicts_idle_buckets() -> None:
+    storage = RateLimitStorage(bucket_idle_timeout=0)
+
+    metadata = BucketMetadata()
+    bucket = Bucket(metadata)
+
+    nextcore_id = "abc123"
+
+    await storage.store_bucket_by_nextcore_id(nextcore_id, bucket)
+
+    assert await storage.get_bucket_by_nextcore_id(nextcore_id) is None, "Bucket was not evicted"
+    assert storage.evicted_buckets == 1
+
+    await storage.close()
+
+
+@mark.asyncio
+async def test_does_not_evict_dirty_buckets() -> None:
+    storage = RateLimitStorage(bucket_idle_timeout=0)
+
+    metadata = BucketMetadata()
+    bucket = Bucket(metadata)
+
+    nextcore_id = "abc123"
+
+    await bucket.update(0, 1)
+
+    await storage.store_bucket_by_nextcore_id(nextcore_id, bucket)
+
+    assert await storage.get_bucket_by_nextcore_id(nextcore_id) is not None, "Bucket should not be evicted"
+    assert storage.evicted_buckets == 0
+
+    await storage.close()
+
+
+@mark.asyncio
+async def test_evicts_least_recently_used_over_capacity() -> None:
+    storage = RateLimitStorage(max_buckets=2, bucket_idle_timeout=None)
+
+    for nextcore_id in ("a", "b"):
+        await storage.store_bucket_by_nextcore_id(nextcore_id, Bucket(BucketMetadata()))
+
+    await storage.get_bucket_by_nextcore_id("a")  # b is now the least recently used
+    await storage.store_bucket_by_nextcore_id("c", Bucket(BucketMetadata()))
+    await storage.get_bucket_by_nextcore_id("c")  # Eviction is done before the lookup
+
+    assert await storage.get_bucket_by_nextcore_id("b") is None, "Least recently used bucket was not evicted"
+    assert await storage.get_bucket_by_nextcore_id("a") is not None
+    assert storage.evicted_buckets == 1
+
+    await storage.close()
+
+
+@mark.asyncio
+async def test_evicts_metadata_over_capacity() -> None:
+    storage = RateLimitStorage(max_bucket_metadata=10)
+
+    for index in range(100):
+        await storage.store_metadata(f"/route/{index}", BucketMetadata())
+
+    assert len(storage._bucket_metadata) == 10
+    assert storage.evicted_bucket_metadata == 90
+    assert await storage.get_bucket_metadata("/route/99") is not None
+    assert await storage.get_bucket_metadata("/route/0") is None
+
+    await storage.close()
+
+
+# Getting and storing buckets
+@mark.asyncio
+async def test_stores_and_get_nextcore_id() -> None:
+    storage = RateLimitStorage()
+
+    metadata = BucketMetadata()
+    bucket = Bucket(metadata)
+
+    nextcore_id = "abc123"
+
+    assert (
+        await storage.get_bucket_by_nextcore_id(nextcore_id) is None
+    ), "Bucket should not exist as it is not added yet"
+
+    await storage.store_bucket_by_nextcore_id(nextcore_id, bucket)
+    assert await storage.get_bucket_by_nextcore_id(nextcore_id) is bucket, "Bucket was not stored"
+
+    await storage.close()
+
+
+@mark.asyncio
+async def test_stores_and_get_discord_id() -> None:
+    storage = RateLimitStorage()
+
+    metadata = BucketMetadata()
+    bucket = Bucket(metadata)
+
+    discord_id = ("abc123", None, "1", None, None)
+
+    assert (
+        await storage.get_bucket_by_discord_id(discord_id) is None
+    ), "Bucket should not exist as it is not added yet"
+
+    await storage.store_bucket_by_discord_id(discord_id, bucket)
+    assert await storage.get_bucket_by_discord_id(discord_id) is bucket, "Bucket was not stored"
+    assert (
+        await storage.get_bucket_by_discord_id(("abc123", None, "2", None, None)) is None
+    ), "Buckets with other major parameters are not the same rate limit"
+
+    await storage.close()
+
+
+# Persistence
+@mark.asyncio
+async def test_snapshot_round_trip() -> None:
+    storage = RateLimitStorage()
+
+    metadata = BucketMetadata(5, bucket_hash="hash")
+    await storage.store_metadata("GET /users/@me", metadata)
+
+    bucket = Bucket(metadata)
+    await bucket.update(2, 10)
+    await storage.store_bucket_by_nextcore_id("abc123", bucket)
+
+    snapshot = await storage.snapshot(include_buckets=True)
+    await storage.close()
+
+    restored_storage = RateLimitStorage()
+    await restored_storage.restore(snapshot)
+
+    restored_metadata = await restored_storage.get_bucket_metadata("GET /users/@me")
+    assert restored_metadata is not None, "Metadata was not restored"
+    assert restored_metadata.limit == 5
+    assert restored_metadata.bucket_hash == "hash"
+
+    restored_bucket = await restored_storage.get_bucket_by_nextcore_id("abc123")
+    assert restored_bucket is not None, "Bucket was not restored"
+    assert restored_bucket.remaining == 2
+    assert restored_bucket.metadata is restored_metadata
+
+    await restored_storage.close()
+
+
+@mark.asyncio
+async def test_snapshot_round_trip_with_route_bucket() -> None:
+    storage = RateLimitStorage()
+    routes = [Route("GET", "/channels/{channel_id}", channel_id=channel_id) for channel_id in (123, 456)]
+
+    metadata = BucketMetadata(5, bucket_hash="hash")
+    await storage.store_metadata(routes[0].route, metadata)
+
+    for route in routes:
+        bucket = Bucket(metadata)
+        await bucket.update(2, 10)
+        await storage.store_bucket_by_nextcore_id(route.bucket, bucket)
+
+    snapshot = json_loads(json_dumps(await storage.snapshot(include_buckets=True)))
+    await storage.close()
+
+    restored_storage = RateLimitStorage()
+    await restored_storage.restore(snapshot)
+
+    for route in routes:
+        restored_bucket = await restored_storage.get_bucket_by_nextcore_id(route.bucket)
+        assert restored_bucket is not None, "Bucket was not restored"
+        # The buckets share a hash, but not the major parameters, so they are not the same rate limit.
+        discord_id = ("hash", *route.bucket[1:])
+        assert await restored_storage.get_bucket_by_discord_id(discord_id) is restored_bucket  # type: ignore [arg-type]
+
+    await restored_storage.close()
+
+
+@mark.asyncio
+async def test_restore_skips_reset_buckets() -> None:
+    storage = RateLimitStorage()
+
+    snapshot = {"metadata": {"GET /users/@me": [5, False, None]}, "buckets": [["abc123", "GET /users/@me", 0, 0]]}
+    await storage.restore(snapshot)
+
+    assert await storage.get_bucket_metadata("GET /users/@me") is not None, "Metadata was not restored"
+    assert await storage.get_bucket_by_nextcore_id("abc123") is None, "Bucket that already reset was restored"
+
+    await storage.close()
+
+
+# Nowait
+def test_nowait_matches_async() -> None:
+    storage = RateLimitStorage()
+    metadata = BucketMetadata()
+    bucket = storage.create_bucket_nowait("abc123", metadata)
+
+    storage.store_bucket_by_nextcore_id_nowait("abc123", bucket)
+    storage.store_bucket_by_discord_id_nowait(("def456", None, None, None, None), bucket)
+    storage.store_metadata_nowait("/channels/{channel_id}", metadata)
+
+    assert storage.get_bucket_by_nextcore_id_nowait("abc123") is bucket
+    assert storage.get_bucket_by_discord_id_nowait(("def456", None, None, None, None)) is bucket
+    assert storage.get_bucket_metadata_nowait("/channels/{channel_id}") is metadata
+
+
+def test_supports_nowait_is_disabled_by_async_overrides() -> None:
+    class AsyncOverride(RateLimitStorage):
+        __slots__ = ()
+
+        async def get_bucket_metadata(self, bucket_route: str) -> BucketMetadata | None:
+            return None
+
+    class NowaitOverride(RateLimitStorage):
+        __slots__ = ()
+
+        def create_bucket_nowait(self, nextcore_id: str, metadata: BucketMetadata) -> Bucket:
+            return Bucket(metadata)
+
+    class ExplicitOverride(AsyncOverride):
+        __slots__ = ()
+
+        supports_nowait = True
+
+    assert RateLimitStorage.supports_nowait
+    assert not AsyncOverride.supports_nowait
+    assert NowaitOverride.supports_nowait
+    assert ExplicitOverride.supports_nowait
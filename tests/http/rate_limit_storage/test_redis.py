@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from pytest import importorskip, mark, raises, skip
+
+from nextcore.common.errors import RateLimitedError
+from nextcore.http import Bucket, BucketMetadata
+from nextcore.http.rate_limit_storage import RedisRateLimitStorage
+from nextcore.http.rate_limit_storage.redis import (
+    _RELEASE_BUCKET,
+    _RESERVE_BUCKET,
+    _UPDATE_BUCKET,
+)
+from nextcore.http.rate_limit_storage.redis_stand_in import RedisStandIn
+from tests.utils import match_time
+
+if TYPE_CHECKING:
+    from typing import AsyncIterator
+
+# The Lua scripts are ran by the stand-in if lupa is installed, and by a Redis server if one is reachable.
+REDIS_HOST, _, REDIS_PORT = os.environ.get("NEXTCORE_TEST_REDIS", "localhost:6379").rpartition(":")
+SERVERS = mark.parametrize("server_kind", ["stand-in", "lua", "redis"])
+
+
+@asynccontextmanager
+async def redis_server(server_kind: str) -> AsyncIterator[tuple[str, int, str]]:
+    """Start a server to test against.
+
+    This yields the host, port and a key prefix that is not used by other tests.
+    """
+    if server_kind != "redis":
+        if server_kind == "lua":
+            importorskip("lupa")
+        server = RedisStandIn(lua=server_kind == "lua")
+        await server.start()
+        try:
+            yield server.host, server.port, "nextcore"
+        finally:
+            await server.close()
+        return
+
+    try:
+        _, writer = await asyncio.open_connection(REDIS_HOST, int(REDIS_PORT))
+    except OSError:
+        skip(f"No Redis server at {REDIS_HOST}:{REDIS_PORT}, set NEXTCORE_TEST_REDIS to use another one")
+    writer.close()
+    yield REDIS_HOST, int(REDIS_PORT), f"nextcore-test:{uuid4().hex}"
+
+
+@mark.asyncio
+@SERVERS
+async def test_bucket_is_shared(server_kind: str) -> None:
+    async with redis_server(server_kind) as (host, port, key_prefix):
+        first_storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix, prefetch=0)
+        second_storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix, prefetch=0)
+
+        first_bucket = await first_storage.create_bucket("abc123", BucketMetadata())
+        second_bucket = await second_storage.create_bucket("abc123", BucketMetadata())
+
+        async with first_bucket.acquire():
+            first_bucket.metadata.limit = 1
+            await first_bucket.update(0, 1)
+
+        with raises(RateLimitedError):
+            async with second_bucket.acquire(wait=False):
+                ...
+
+        await first_storage.close()
+        await second_storage.close()
+
+
+@mark.asyncio
+@SERVERS
+async def test_only_one_blind_request(server_kind: str) -> None:
+    async with redis_server(server_kind) as (host, port, key_prefix):
+        first_storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix)
+        second_storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix)
+
+        first_bucket = await first_storage.create_bucket("abc123", BucketMetadata())
+        second_bucket = await second_storage.create_bucket("abc123", BucketMetadata())
+
+        async with first_bucket.acquire():
+            with raises(RateLimitedError):
+                async with second_bucket.acquire(wait=False):
+                    ...
+
+            first_bucket.metadata.limit = 2
+            await first_bucket.update(1, 1)
+
+        async with second_bucket.acquire(wait=False):
+            ...
+
+        await first_storage.close()
+        await second_storage.close()
+
+
+@mark.asyncio
+@match_time(0.1, 0.05)
+@SERVERS
+async def test_waits_for_reset_in_other_client(server_kind: str) -> None:
+    async with redis_server(server_kind) as (host, port, key_prefix):
+        first_storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix)
+        second_storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix)
+
+        first_bucket = await first_storage.create_bucket("abc123", BucketMetadata())
+        second_bucket = await second_storage.create_bucket("abc123", BucketMetadata())
+
+        async with first_bucket.acquire():
+            first_bucket.metadata.limit = 1
+            await first_bucket.update(0, 0.1)
+
+        async with second_bucket.acquire():
+            ...
+
+        await first_storage.close()
+        await second_storage.close()
+
+
+@mark.asyncio
+async def test_concurrent_reserves_are_batched() -> None:
+    server = RedisStandIn(latency=0.01)
+    await server.start()
+    storage = RedisRateLimitStorage(server.host, server.port, prefetch=0)
+
+    bucket = await storage.create_bucket("abc123", BucketMetadata(limit=100))
+    async with bucket.acquire():
+        await bucket.update(99, 10)
+    await asyncio.sleep(0.1)  # Let the update go through
+
+    calls_before = server.script_calls
+
+    async def use_bucket() -> None:
+        async with bucket.acquire():
+            ...
+
+    await asyncio.gather(*(use_bucket() for _ in range(20)))
+
+    # One reserve for the first request, and one for everyone that queued up behind it.
+    assert server.script_calls - calls_before <= 2, "Reserves were not batched"
+
+    await storage.close()
+    await server.close()
+
+
+@mark.asyncio
+async def test_prefetched_spots_skip_the_server() -> None:
+    server = RedisStandIn()
+    await server.start()
+    storage = RedisRateLimitStorage(server.host, server.port, prefetch=4)
+
+    bucket = await storage.create_bucket("abc123", BucketMetadata(limit=100))
+    async with bucket.acquire():
+        await bucket.update(99, 10)
+    await asyncio.sleep(0.1)  # Let the update go through
+
+    calls_before = server.script_calls
+    for _ in range(5):
+        async with bucket.acquire():
+            ...
+    assert server.script_calls - calls_before == 1, "Prefetched spots were not used"
+
+    await storage.close()
+    await server.close()
+
+
+@mark.asyncio
+@SERVERS
+async def test_global_limit_is_shared(server_kind: str) -> None:
+    async with redis_server(server_kind) as (host, port, key_prefix):
+        first_storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix, global_limit=2, prefetch=0)
+        second_storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix, global_limit=2, prefetch=0)
+
+        async with first_storage.global_rate_limiter.acquire(wait=False):
+            ...
+        async with second_storage.global_rate_limiter.acquire(wait=False):
+            ...
+
+        with raises(RateLimitedError):
+            async with first_storage.global_rate_limiter.acquire(wait=False):
+                ...
+
+        await first_storage.close()
+        await second_storage.close()
+
+
+@mark.asyncio
+@SERVERS
+async def test_reloads_flushed_scripts(server_kind: str) -> None:
+    async with redis_server(server_kind) as (host, port, key_prefix):
+        storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix, prefetch=0)
+
+        async with storage.global_rate_limiter.acquire():
+            ...
+
+        await storage.connection.call("SCRIPT", "FLUSH")
+
+        async with storage.global_rate_limiter.acquire():
+            ...
+
+        await storage.close()
+
+
+@mark.asyncio
+@SERVERS
+async def test_bucket_scripts(server_kind: str) -> None:
+    # Runs the scripts directly so the stand-in and the Lua scripts are held to the same replies.
+    async with redis_server(server_kind) as (host, port, key_prefix):
+        storage = RedisRateLimitStorage(host, port, key_prefix=key_prefix)
+        key = f"{key_prefix}:bucket:scripts"
+        reserve_args = (2, 0, 10_000, 50, 60_000)  # count, limit hint, blind request timeout, poll interval, ttl
+
+        # Nothing is known, so only one request can find out the limit
+        assert await storage.connection.run_script(_RESERVE_BUCKET, (key,), *reserve_args) == [1, 1, 0]
+        assert await storage.connection.run_script(_RESERVE_BUCKET, (key,), *reserve_args) == [3, 50, 0]
+
+        # remaining, reset after, limit, unlimited, bucket hash, ttl
+        await storage.connection.run_script(_UPDATE_BUCKET, (key,), 2, 10_000, 3, "0", "abc", 60_000)
+        kind, granted, reset_after = await storage.connection.run_script(_RESERVE_BUCKET, (key,), *reserve_args)
+        assert (kind, granted) == (0, 2)
+        assert 9_000 < reset_after <= 10_000
+
+        kind, wait, _ = await storage.connection.run_script(_RESERVE_BUCKET, (key,), *reserve_args)
+        assert kind == 3 and 9_000 < wait <= 10_000, "Every spot should be used"
+
+        # A failed request gives its spot back
+        await storage.connection.run_script(_RELEASE_BUCKET, (key,), "0", "1")
+        kind, granted, _ = await storage.connection.run_script(_RESERVE_BUCKET, (key,), *reserve_args)
+        assert (kind, granted) == (0, 1)
+
+        # Unlimited
+        await storage.connection.run_script(_UPDATE_BUCKET, (key,), 0, 0, 0, "1", "", 60_000)
+        assert await storage.connection.run_script(_RESERVE_BUCKET, (key,), *reserve_args) == [2, 0, 0]
+
+        await storage.close()
+
+
+@mark.asyncio
+async def test_factory_shares_connection() -> None:
+    server = RedisStandIn()
+    await server.start()
+    factory = RedisRateLimitStorage.factory(server.host, server.port)
+    first_storage = factory("token-1")
+    second_storage = factory("token-2")
+
+    assert first_storage.connection is second_storage.connection
+
+    async with first_storage.global_rate_limiter.acquire():
+        ...
+    await first_storage.close()
+
+    # Still usable by the other storage
+    async with second_storage.global_rate_limiter.acquire():
+        ...
+    await second_storage.close()
+    assert not second_storage.connection.connected
+
+    await server.close()
+
+
+@mark.asyncio
+async def test_merge_moves_waiting_requests() -> None:
+    server = RedisStandIn()
+    await server.start()
+    storage = RedisRateLimitStorage(server.host, server.port, prefetch=0)
+
+    bucket = await storage.create_bucket("abc123", BucketMetadata(limit=1))
+    async with bucket.acquire():
+        await bucket.update(0, 10)
+    other_bucket = await storage.create_bucket("def456", BucketMetadata(limit=100))
+    async with other_bucket.acquire():
+        await other_bucket.update(99, 10)
+    await asyncio.sleep(0.1)  # Let the updates go through
+
+    async def use_bucket() -> None:
+        async with bucket.acquire():
+            ...
+
+    waiting = asyncio.create_task(use_bucket())
+    await asyncio.sleep(0.1)
+    assert not waiting.done()
+
+    bucket.merge_into(other_bucket)
+    await asyncio.wait_for(waiting, 1)
+
+    with raises(TypeError):
+        other_bucket.merge_into(Bucket(BucketMetadata()))
+
+    await storage.close()
+    await server.close()
+
+
+@mark.asyncio
+async def test_global_rate_limit_drops_prefetched_spots() -> None:
+    server = RedisStandIn()
+    await server.start()
+    storage = RedisRateLimitStorage(server.host, server.port, prefetch=4)
+    global_rate_limiter = storage.global_rate_limiter
+
+    async with global_rate_limiter.acquire():
+        ...
+    global_rate_limiter.update(1)
+
+    with raises(RateLimitedError):
+        async with global_rate_limiter.acquire(wait=False):
+            ...
+
+    await storage.close()
+    await server.close()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from pathlib import Path
+from struct import pack, unpack
+from tempfile import TemporaryDirectory
+
+from pytest import mark, raises
+
+from nextcore.common.errors import RateLimitedError
+from nextcore.http import Bucket, BucketMetadata
+from nextcore.http.rate_limit_storage import SharedMemoryRateLimitStorage
+from tests.utils import match_time
+
+
+@mark.asyncio
+async def test_bucket_is_shared(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits"
+    first_storage = SharedMemoryRateLimitStorage(path)
+    second_storage = SharedMemoryRateLimitStorage(path)
+
+    first_bucket = await first_storage.create_bucket("abc123", BucketMetadata())
+    second_bucket = await second_storage.create_bucket("abc123", BucketMetadata())
+
+    async with first_bucket.acquire():
+        first_bucket.metadata.limit = 1
+        await first_bucket.update(0, 1)
+
+    with raises(RateLimitedError):
+        async with second_bucket.acquire(wait=False):
+            ...
+
+    await first_storage.close()
+    await second_storage.close()
+
+
+@mark.asyncio
+async def test_only_one_blind_request(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits"
+    first_storage = SharedMemoryRateLimitStorage(path)
+    second_storage = SharedMemoryRateLimitStorage(path)
+
+    first_bucket = await first_storage.create_bucket("abc123", BucketMetadata())
+    second_bucket = await second_storage.create_bucket("abc123", BucketMetadata())
+
+    async with first_bucket.acquire():
+        with raises(RateLimitedError):
+            async with second_bucket.acquire(wait=False):
+                ...
+
+    # The blind request finished without finding the rate limit, so the other process can try
+    async with second_bucket.acquire(wait=False):
+        ...
+
+    await first_storage.close()
+    await second_storage.close()
+
+
+@mark.asyncio
+async def test_unlimited_is_shared(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits"
+    first_storage = SharedMemoryRateLimitStorage(path)
+    second_storage = SharedMemoryRateLimitStorage(path)
+
+    first_bucket = await first_storage.create_bucket("abc123", BucketMetadata())
+    second_bucket = await second_storage.create_bucket("abc123", BucketMetadata())
+
+    async with first_bucket.acquire():
+        await first_bucket.update(unlimited=True)
+
+    async with second_bucket.acquire(wait=False):
+        ...
+    assert second_bucket.metadata.unlimited, "Unlimited was not picked up from the shared memory"
+
+    await first_storage.close()
+    await second_storage.close()
+
+
+@mark.asyncio
+@match_time(0.1, 0.05)
+async def test_waits_for_reset_in_other_process() -> None:
+    with TemporaryDirectory() as directory:
+        path = Path(directory) / "rate_limits"
+        first_storage = SharedMemoryRateLimitStorage(path)
+        second_storage = SharedMemoryRateLimitStorage(path)
+
+        first_bucket = await first_storage.create_bucket("abc123", BucketMetadata())
+        second_bucket = await second_storage.create_bucket("abc123", BucketMetadata())
+
+        async with first_bucket.acquire():
+            first_bucket.metadata.limit = 1
+            await first_bucket.update(0, 0.1)
+
+        async with second_bucket.acquire():
+            ...
+
+        await first_storage.close()
+        await second_storage.close()
+
+
+@mark.asyncio
+async def test_global_limit_is_shared(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits"
+    first_storage = SharedMemoryRateLimitStorage(path, global_limit=2)
+    second_storage = SharedMemoryRateLimitStorage(path, global_limit=2)
+
+    async with first_storage.global_rate_limiter.acquire(wait=False):
+        ...
+    async with second_storage.global_rate_limiter.acquire(wait=False):
+        ...
+
+    with raises(RateLimitedError):
+        async with first_storage.global_rate_limiter.acquire(wait=False):
+            ...
+
+    await first_storage.close()
+    await second_storage.close()
+
+
+@mark.asyncio
+async def test_record_count_mismatch(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits"
+    storage = SharedMemoryRateLimitStorage(path, max_records=16)
+
+    with raises(ValueError):
+        SharedMemoryRateLimitStorage(path, max_records=32)
+
+    await storage.close()
+
+
+@mark.asyncio
+async def test_merge_into(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits"
+    first_storage = SharedMemoryRateLimitStorage(path)
+    second_storage = SharedMemoryRateLimitStorage(path)
+
+    bucket = await first_storage.create_bucket("abc123", BucketMetadata())
+    linked_bucket = await first_storage.create_bucket("def456", BucketMetadata())
+    other_process_bucket = await second_storage.create_bucket("def456", BucketMetadata())
+
+    async with other_process_bucket.acquire():
+        other_process_bucket.metadata.limit = 1
+        await other_process_bucket.update(0, 1)
+
+    bucket.merge_into(linked_bucket)
+
+    with raises(RateLimitedError):
+        async with bucket.acquire(wait=False):
+            ...
+
+    with raises(TypeError):
+        linked_bucket.merge_into(Bucket(BucketMetadata()))
+
+    await first_storage.close()
+    await second_storage.close()
+
+
+@mark.asyncio
+async def test_cleared_after_reboot(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits"
+    storage = SharedMemoryRateLimitStorage(path, global_limit=1)
+
+    async with storage.global_rate_limiter.acquire(wait=False):
+        ...
+    await storage.close()
+
+    # Pretend the monotonic clock started a day earlier
+    with open(path, "r+b") as file:
+        file.seek(12)
+        boot_time = unpack("<d", file.read(8))[0]
+        file.seek(12)
+        file.write(pack("<d", boot_time - 86400))
+
+    storage = SharedMemoryRateLimitStorage(path, global_limit=1)
+    async with storage.global_rate_limiter.acquire(wait=False):
+        ...
+    await storage.close()
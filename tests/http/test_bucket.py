@@ -1,7 +1,10 @@
+from __future__ import annotations
+
 import asyncio
 
-from pytest import mark
+from pytest import approx, mark, raises
 
+from nextcore.common.errors import RateLimitedError
 from nextcore.http.bucket import Bucket
 from nextcore.http.bucket_metadata import BucketMetadata
 from tests.utils import match_time
@@ -142,3 +145,280 @@ async def test_reset_offset_positive():
     for _ in range(2):
         async with bucket.acquire():
             await bucket.update(0, 1)
+
+
+@mark.asyncio
+@match_time(0.1, 0.05)
+async def test_cancelled_waiter_is_skipped() -> None:
+    metadata = BucketMetadata(limit=1)
+    bucket = Bucket(metadata)
+
+    async with bucket.acquire():
+        await bucket.update(0, 0.1)
+
+    cancelled = asyncio.create_task(use_bucket(bucket))
+    waiting = asyncio.create_task(use_bucket(bucket))
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+    await waiting  # Would hang if the spot was given to the cancelled waiter
+
+    assert len(bucket._pending) == 0
+
+    await bucket.close()
+
+
+@mark.asyncio
+@match_time(0, 0.1)
+async def test_waits_for_blind_request() -> None:
+    metadata = BucketMetadata()
+    bucket = Bucket(metadata)
+    order: list[str] = []
+
+    async def blind_request() -> None:
+        async with bucket.acquire():
+            await asyncio.sleep(0)
+            order.append("blind")
+            metadata.limit = 2
+            await bucket.update(1, 1)
+
+    async def waiting_request() -> None:
+        async with bucket.acquire():
+            order.append("waiting")
+
+    await asyncio.gather(blind_request(), waiting_request())
+
+    assert order == ["blind", "waiting"]
+    assert bucket.dirty
+
+    await bucket.close()
+
+
+@mark.asyncio
+async def test_uncontended_acquire_does_not_wait() -> None:
+    metadata = BucketMetadata(limit=2)
+    bucket = Bucket(metadata)
+    loop = asyncio.get_running_loop()
+    create_future = loop.create_future
+
+    def fail() -> asyncio.Future[None]:
+        raise AssertionError("A future was created without contention")
+
+    loop.create_future = fail  # type: ignore [method-assign]
+    try:
+        async with bucket.acquire():
+            await bucket.update(1, 1)
+    finally:
+        loop.create_future = create_future  # type: ignore [method-assign]
+
+    await bucket.close()
+
+
+@mark.asyncio
+@match_time(0.1, 0.05)
+async def test_pause_holds_requests() -> None:
+    metadata = BucketMetadata(limit=5)
+    bucket = Bucket(metadata)
+
+    async with bucket.acquire():
+        await bucket.update(4, 1)
+        bucket.pause(0.1)
+
+    assert bucket.paused
+    assert bucket.dirty
+
+    async with bucket.acquire():  # Would return instantly if the pause was ignored
+        assert not bucket.paused
+
+    await bucket.close()
+
+
+@mark.asyncio
+async def test_pause_does_not_wait_raises() -> None:
+    metadata = BucketMetadata(limit=5)
+    bucket = Bucket(metadata)
+    bucket.pause(1)
+
+    with raises(RateLimitedError):
+        async with bucket.acquire(wait=False):
+            pass
+
+    await bucket.close()
+
+
+@mark.asyncio
+@match_time(0.15, 0.04)
+async def test_requeued_request_goes_first() -> None:
+    metadata = BucketMetadata(limit=1)
+    bucket = Bucket(metadata)
+    order: list[str] = []
+
+    async with bucket.acquire():
+        await bucket.update(1, 0.15)
+    bucket.pause(0.1)
+
+    async def use(name: str, requeue: bool) -> None:
+        async with bucket.acquire(requeue=requeue):
+            order.append(name)
+            await bucket.update(0, 0.05)  # Released 0.1s into the window
+
+    waiting = asyncio.create_task(use("waiting", False))
+    await asyncio.sleep(0)
+    await asyncio.gather(waiting, use("retry", True))
+
+    assert order == ["retry", "waiting"]
+
+    await bucket.close()
+
+
+@mark.asyncio
+@match_time(0.1, 0.05)
+async def test_merge_moves_waiters() -> None:
+    bucket = Bucket(BucketMetadata(limit=1))
+    merged = Bucket(BucketMetadata(limit=1))
+
+    async with bucket.acquire():
+        await bucket.update(0, 0.1)
+    async with merged.acquire():
+        await merged.update(0, 1)
+
+    waiting = asyncio.create_task(use_bucket(merged))
+    await asyncio.sleep(0)
+    in_progress = merged.acquire()
+    merged._remaining = 1  # Let one more through to test moving reservations
+    await in_progress.__aenter__()
+
+    merged.merge_into(bucket)
+    assert bucket._reserved == 1
+    assert len(bucket._pending) == 1
+
+    await in_progress.__aexit__(None, None, None)
+    assert bucket._reserved == 0
+
+    await waiting  # Released by the reset of the bucket it was merged into
+
+    await bucket.close()
+    await merged.close()
+
+
+@mark.asyncio
+async def test_speculative_requests() -> None:
+    metadata = BucketMetadata()
+    bucket = Bucket(metadata)
+    bucket.speculative_requests = 3
+    in_progress = 0
+    most_in_progress = 0
+    speculated: list[bool] = []
+
+    async def blind_request() -> None:
+        nonlocal in_progress, most_in_progress
+        async with bucket.acquire() as speculative:
+            speculated.append(speculative)
+            in_progress += 1
+            most_in_progress = max(most_in_progress, in_progress)
+            await asyncio.sleep(0)
+            in_progress -= 1
+            metadata.limit = 10
+            await bucket.update(5, 1)
+
+    await asyncio.gather(*[blind_request() for _ in range(5)])
+
+    assert most_in_progress == 3
+    assert speculated[:3] == [False, True, True]
+    assert bucket._blind_requests == 0
+    assert bucket._reserved == 0
+
+    await bucket.close()
+
+
+@mark.asyncio
+async def test_out_of_order_update_is_ignored() -> None:
+    metadata = BucketMetadata(limit=5)
+    bucket = Bucket(metadata)
+
+    await bucket.update(2, 1)
+    await bucket.update(3, 1)  # Sent earlier in the same window
+    assert bucket.remaining == 2
+
+    reset_at = bucket.reset_at
+    await bucket.update(1, 0.9)
+    assert bucket.remaining == 1
+    assert bucket.reset_at == reset_at, "A response from the same window moved the reset"
+
+    await bucket.close()
+
+
+@mark.asyncio
+async def test_update_from_reset_window_is_ignored() -> None:
+    metadata = BucketMetadata(limit=5)
+    bucket = Bucket(metadata)
+
+    await bucket.update(4, 0.1)
+    await asyncio.sleep(0.12)
+    assert bucket.reset_at is None
+
+    await bucket.update(0, -0.02)  # A late response from the window that reset
+    assert bucket.remaining is None
+    assert bucket.reset_at is None
+
+    await bucket.close()
+
+
+@mark.asyncio
+@match_time(0, 0.05)
+async def test_new_window_releases_requests() -> None:
+    metadata = BucketMetadata(limit=2)
+    bucket = Bucket(metadata)
+
+    await bucket.update(0, 0.2)
+    waiting = asyncio.create_task(use_bucket(bucket))
+    await asyncio.sleep(0)
+
+    # Discord already reset the window before the bucket did
+    await bucket.update(1, 1)
+    await waiting
+
+    await bucket.close()
+
+
+@mark.asyncio
+async def test_available() -> None:
+    assert Bucket(BucketMetadata()).available is None
+    assert Bucket(BucketMetadata(unlimited=True)).available is None
+
+    bucket = Bucket(BucketMetadata(limit=2))
+    assert bucket.available == 2
+
+    async with bucket.acquire():
+        assert bucket.available == 1
+    await bucket.update(0, 1)
+    assert bucket.available == 0
+
+    await bucket.close()
+
+
+@mark.asyncio
+async def test_estimate_admission() -> None:
+    loop = asyncio.get_running_loop()
+    bucket = Bucket(BucketMetadata(limit=2))
+    assert bucket.estimate_admission() == approx(loop.time(), abs=0.01)
+
+    async with bucket.acquire():
+        await bucket.update(0, 0.5)
+
+    async def use() -> None:
+        async with bucket.acquire(priority=1):
+            ...
+
+    tasks = [asyncio.create_task(use()) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    assert bucket.estimate_admission(0) == approx(loop.time() + 0.5, abs=0.05)
+    # Behind the two waiting requests, so it has to wait for the next window
+    assert bucket.estimate_admission(1) == approx(loop.time() + 1, abs=0.05)
+
+    bucket.pause(2)
+    assert bucket.estimate_admission(0) == approx(loop.time() + 2, abs=0.05)
+
+    await bucket.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,574 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from time import time
+from typing import Any, AsyncContextManager
+
+from aiohttp import web
+from pytest import approx, mark, raises
+
+from nextcore.common import TimesPer
+from nextcore.http import (
+    BotAuthentication,
+    Bucket,
+    BucketMetadata,
+    DeadlineExceededError,
+    ForbiddenError,
+    HTTPClient,
+    InvalidRequestBudgetError,
+    InvalidRequestTracker,
+    RateLimitStorage,
+    RequestTimings,
+    Route,
+    UnlimitedGlobalRateLimiter,
+)
+from tests.utils import FakeDiscord, rate_limit_headers
+
+
+@mark.asyncio
+async def test_rate_limit_state_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits.json"
+    token = "Bot super.secret.token"
+
+    http_client = HTTPClient()
+    await http_client.rate_limit_storages[token].store_metadata("GET /users/@me", BucketMetadata(5))
+    await http_client.save_rate_limit_state(path)
+    await http_client.close()
+
+    assert token not in path.read_text(), "Rate limit key was saved in plain text"
+
+    restored_client = HTTPClient()
+    await restored_client.load_rate_limit_state(path)
+
+    rate_limit_storage = await restored_client._get_rate_limit_storage(token)  # pyright: ignore [reportPrivateUsage]
+    metadata = await rate_limit_storage.get_bucket_metadata("GET /users/@me")
+    assert metadata is not None, "Metadata was not restored"
+    assert metadata.limit == 5
+
+    await restored_client.close()
+
+
+@mark.asyncio
+async def test_rate_limit_state_old_version(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits.json"
+    path.write_text('{"version": 1, "storages": {}}')
+
+    http_client = HTTPClient()
+    with raises(ValueError):
+        await http_client.load_rate_limit_state(path)
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_close_when_saving_fails(tmp_path: Path) -> None:
+    http_client = HTTPClient(rate_limit_state_path=tmp_path / "missing" / "rate_limits.json")
+    await http_client.setup()
+    session = http_client._session  # pyright: ignore [reportPrivateUsage]
+
+    await http_client.close()
+    assert session is not None and session.closed, "The session was not closed after saving failed"
+
+
+@mark.asyncio
+async def test_async_storage_overrides_are_used() -> None:
+    class CountingStorage(RateLimitStorage):
+        __slots__ = ("lookups",)
+
+        def __init__(self) -> None:
+            super().__init__()
+            self.lookups: int = 0
+
+        async def get_bucket_by_nextcore_id(self, nextcore_id: str) -> Bucket | None:
+            self.lookups += 1
+            return await super().get_bucket_by_nextcore_id(nextcore_id)
+
+    storage = CountingStorage()
+    http_client = HTTPClient()
+    route = Route("GET", "/users/@me")
+
+    assert not storage.supports_nowait
+    await http_client._get_bucket(route, storage)  # pyright: ignore [reportPrivateUsage]
+    assert storage.lookups == 1
+
+    await storage.close()
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_bound_client(fake_discord: FakeDiscord) -> None:
+    received_headers: list[dict[str, str]] = []
+
+    async def handle(request: web.Request) -> web.Response:
+        received_headers.append(dict(request.headers))
+        return web.json_response({})
+
+    fake_discord.add_route("GET", "/users/@me", handle)
+
+    http_client = HTTPClient()
+    await http_client.setup()
+    authentication = BotAuthentication("super.secret.token")
+    bound_client = http_client.bind(authentication)
+
+    assert bound_client.rate_limit_key == authentication.rate_limit_key
+
+    response = await bound_client.request(fake_discord.Route("GET", "/users/@me"), headers={"X-Audit-Log-Reason": "Testing"})
+    response.release()
+    response = await bound_client.request(fake_discord.Route("GET", "/users/@me"))
+    response.release()
+
+    assert received_headers[0]["Authorization"] == "Bot super.secret.token"
+    assert received_headers[0]["X-Audit-Log-Reason"] == "Testing"
+    assert received_headers[0]["User-Agent"] == http_client.default_headers["User-Agent"]
+    assert "X-Audit-Log-Reason" not in received_headers[1]
+    assert list(http_client.rate_limit_storages) == [authentication.rate_limit_key]
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_shared_rate_limit_pauses_bucket(fake_discord: FakeDiscord) -> None:
+    received_at: list[float] = []
+
+    async def handle(request: web.Request) -> web.Response:
+        now = time()
+        received_at.append(now)
+        headers = rate_limit_headers(5, 4, 1, "shared")
+        if len(received_at) == 1:
+            headers["X-RateLimit-Scope"] = "shared"
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": 0.2, "global": False},
+                status=429,
+                headers=headers,
+            )
+        return web.json_response({}, headers=headers)
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    http_client = HTTPClient()
+    await http_client.setup()
+
+    response = await http_client.request(fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1), None)
+    response.release()
+
+    assert len(received_at) == 2, "The rate limited request was retried more than once"
+    assert received_at[1] - received_at[0] >= 0.2, "The retry did not wait for retry_after"
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_shared_bucket_hash_is_enforced_once(fake_discord: FakeDiscord) -> None:
+    limit = 2
+    window_length = 0.3
+    window_reset_at = 0.0
+    window_used = 0
+    rate_limited = 0
+
+    async def handle(request: web.Request) -> web.Response:
+        nonlocal window_reset_at, window_used, rate_limited
+        now = time()
+        if window_reset_at <= now:
+            window_reset_at = now + window_length
+            window_used = 0
+        window_used += 1
+        headers = rate_limit_headers(limit, max(limit - window_used, 0), window_reset_at - now, "shared-hash")
+        if window_used > limit:
+            rate_limited += 1
+            headers["X-RateLimit-Scope"] = "user"
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": window_reset_at - now, "global": False},
+                status=429,
+                headers=headers,
+            )
+        return web.json_response({}, headers=headers)
+
+    fake_discord.add_route("GET", "/a", handle)
+    fake_discord.add_route("GET", "/b", handle)
+
+    http_client = HTTPClient()
+    await http_client.setup()
+
+    async def request(path: str) -> None:
+        response = await http_client.request(fake_discord.Route("GET", path), None)
+        response.release()
+
+    await request("/a")
+    # The first /b request finds out it shares the rate limit with /a, and the others were waiting for it
+    await asyncio.gather(request("/b"), request("/b"), request("/b"))
+    await request("/a")  # Would be sent straight away if /a did not know about the /b requests
+
+    storage = await http_client._get_rate_limit_storage(None)  # pyright: ignore [reportPrivateUsage]
+    assert storage.get_bucket_by_nextcore_id_nowait(fake_discord.Route("GET", "/a").bucket) is (
+        storage.get_bucket_by_nextcore_id_nowait(fake_discord.Route("GET", "/b").bucket)
+    )
+    assert rate_limited == 0, "The shared rate limit was exceeded"
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_bucket_hash_is_shared_per_major_parameters(fake_discord: FakeDiscord) -> None:
+    async def handle(request: web.Request) -> web.Response:
+        return web.json_response({}, headers=rate_limit_headers(5, 4, 1, "messages"))
+
+    fake_discord.add_route("POST", "/channels/{channel_id}/messages", handle)
+
+    http_client = HTTPClient()
+    await http_client.setup()
+    create_message = fake_discord.Route.compile("POST", "/channels/{channel_id}/messages")
+
+    for channel_id in (1, 2):
+        response = await http_client.request(create_message(channel_id=channel_id), None)
+        response.release()
+
+    storage = await http_client._get_rate_limit_storage(None)  # pyright: ignore [reportPrivateUsage]
+    first_bucket = storage.get_bucket_by_nextcore_id_nowait(create_message(channel_id=1).bucket)
+    second_bucket = storage.get_bucket_by_nextcore_id_nowait(create_message(channel_id=2).bucket)
+    assert first_bucket is not None and second_bucket is not None
+    assert first_bucket is not second_bucket, "Channels with the same bucket hash share a rate limit"
+    assert first_bucket.remaining == second_bucket.remaining == 4
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_speculative_requests_are_retried(fake_discord: FakeDiscord) -> None:
+    limit = 2
+    window_length = 0.2
+    window_reset_at = 0.0
+    window_used = 0
+
+    async def handle(request: web.Request) -> web.Response:
+        nonlocal window_reset_at, window_used
+        now = time()
+        if window_reset_at <= now:
+            window_reset_at = now + window_length
+            window_used = 0
+        window_used += 1
+        headers = rate_limit_headers(limit, max(limit - window_used, 0), window_reset_at - now, "speculative")
+        if window_used > limit:
+            headers["X-RateLimit-Scope"] = "user"
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": window_reset_at - now, "global": False},
+                status=429,
+                headers=headers,
+            )
+        return web.json_response({}, headers=headers)
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    get_channel = fake_discord.Route.compile("GET", "/channels/{channel_id}", speculative_requests=4)
+
+    http_client = HTTPClient()
+    await http_client.setup()
+
+    async def request() -> int:
+        response = await http_client.request(get_channel(channel_id=1), None)
+        response.release()
+        return response.status
+
+    statuses = await asyncio.gather(*[request() for _ in range(4)])
+
+    assert statuses == [200] * 4, "A speculative request that was rate limited was not retried"
+    assert http_client.speculation_wins + http_client.speculation_losses == 3
+    assert http_client.speculation_losses >= 1
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_speculative_requests_are_set_when_the_bucket_is_created(fake_discord: FakeDiscord) -> None:
+    async def handle(request: web.Request) -> web.Response:
+        return web.json_response({}, headers=rate_limit_headers(5, 4, 1, "speculative"))
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    http_client = HTTPClient(speculative_requests=2)
+    await http_client.setup()
+    storage = await http_client._get_rate_limit_storage(None)  # pyright: ignore [reportPrivateUsage]
+
+    route = fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1, speculative_requests=4)
+    response = await http_client.request(route, None)
+    response.release()
+    bucket = await storage.get_bucket_by_nextcore_id(route.bucket)
+    assert bucket is not None
+    assert bucket.speculative_requests == 4
+
+    # Other routes using the bucket do not change it
+    response = await http_client.request(fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1), None)
+    response.release()
+    assert bucket.speculative_requests == 4
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_request_timings(fake_discord: FakeDiscord) -> None:
+    async def handle(request: web.Request) -> web.Response:
+        return web.json_response({}, headers=rate_limit_headers(5, 4, 1, "timings"))
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    http_client = HTTPClient(dispatch_request_timings=True)
+    await http_client.setup()
+    dispatched: list[RequestTimings] = []
+    http_client.dispatcher.add_listener(dispatched.append, "request_timings")
+
+    for _ in range(2):
+        response = await http_client.request(fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1), None)
+        response.release()
+    await asyncio.sleep(0)  # Let the listener run
+
+    assert len(dispatched) == 2
+    assert dispatched[0].status == 200
+    assert dispatched[0].connection is not None, "The connection time was not traced"
+    assert dispatched[0].total >= dispatched[0].time_to_headers
+
+    histograms = http_client.request_timings.get("GET/channels/{channel_id}", "2xx")
+    assert histograms is not None
+    assert histograms["total"].count == 2
+    assert histograms["connection"].count == 2
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_hedge_threshold_includes_connection() -> None:
+    http_client = HTTPClient(hedge_percentile=0.5)
+    route = Route("GET", "/channels/{channel_id}", channel_id=1)
+
+    # New connections take 500ms, and the response takes 50ms after that
+    for _ in range(http_client.hedge_min_samples):
+        timings = RequestTimings(route.bucket[0], 0)
+        timings.status = 200
+        timings.connected_at = 0.5
+        timings.headers_at = timings.finished_at = 0.55
+        http_client.request_timings.record(timings)
+
+    threshold = http_client._get_hedge_threshold(route, 0.5)  # pyright: ignore [reportPrivateUsage]
+    assert threshold is not None
+    assert threshold >= 0.5, "The hedge delay starts before the connection, so the threshold should include it"
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_slow_requests_are_hedged(fake_discord: FakeDiscord) -> None:
+    received = 0
+
+    async def handle(request: web.Request) -> web.Response:
+        nonlocal received
+        received += 1
+        if received == 1:
+            await asyncio.sleep(1)
+        return web.json_response({}, headers=rate_limit_headers(5, 4, 1, "hedged"))
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    http_client = HTTPClient(hedge_percentile=0.95)
+    await http_client.setup()
+    storage = await http_client._get_rate_limit_storage(None)  # pyright: ignore [reportPrivateUsage]
+    route = fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1)
+    bucket = Bucket(BucketMetadata(5))
+    await storage.store_bucket_by_nextcore_id(route.bucket, bucket)
+
+    # Pretend the route usually responds in 50ms
+    for _ in range(http_client.hedge_min_samples):
+        timings = RequestTimings(route.bucket[0], 0)
+        timings.status = 200
+        timings.bucket_acquired_at = timings.global_acquired_at = 0
+        timings.headers_at = timings.finished_at = 0.05
+        http_client.request_timings.record(timings)
+
+    started_at = time()
+    response = await http_client.request(route, None)
+    response.release()
+
+    assert time() - started_at < 0.5, "The slow request was not hedged"
+    assert http_client.hedged_requests == 1
+    assert http_client.hedge_wins == 1
+    assert received == 2
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_hedged_requests_that_lost_use_their_spot(fake_discord: FakeDiscord) -> None:
+    received = 0
+
+    async def handle(request: web.Request) -> web.Response:
+        nonlocal received
+        received += 1
+        if received == 1:
+            await asyncio.sleep(1)
+        return web.json_response({}, headers=rate_limit_headers(5, 4, 1, "hedged"))
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    http_client = HTTPClient(hedge_percentile=0.95)
+    await http_client.setup()
+    storage = await http_client._get_rate_limit_storage(None)  # pyright: ignore [reportPrivateUsage]
+    route = fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1)
+    bucket = Bucket(BucketMetadata(5))
+    await storage.store_bucket_by_nextcore_id(route.bucket, bucket)
+    global_rate_limiter = storage.global_rate_limiter
+    assert isinstance(global_rate_limiter, TimesPer)
+    global_remaining = global_rate_limiter.remaining
+
+    for _ in range(http_client.hedge_min_samples):
+        timings = RequestTimings(route.bucket[0], 0)
+        timings.status = 200
+        timings.bucket_acquired_at = timings.global_acquired_at = 0
+        timings.headers_at = timings.finished_at = 0.05
+        http_client.request_timings.record(timings)
+
+    response = await http_client.request(route, None)
+    response.release()
+    await asyncio.sleep(0.1)  # The request that lost is cancelled in the background
+
+    assert http_client.hedge_wins == 1
+    # The request that lost was sent, so Discord counted it
+    assert bucket._remaining == 3  # pyright: ignore [reportPrivateUsage]
+    assert global_rate_limiter.remaining == global_remaining - 2
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_invalid_requests_are_counted(fake_discord: FakeDiscord) -> None:
+    async def handle(request: web.Request) -> web.Response:
+        return web.json_response({"message": "Missing Access", "code": 50001}, status=403)
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    class CountingTracker(InvalidRequestTracker):
+        __slots__ = ("acquires",)
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            self.acquires: int = 0
+
+        async def acquire(self, *, priority: int = 0, wait: bool = True) -> None:
+            self.acquires += 1
+            await super().acquire(priority=priority, wait=wait)
+
+    tracker = CountingTracker(4, reject_at=0.5)
+    http_client = HTTPClient()
+    http_client.invalid_request_tracker = tracker
+    await http_client.setup()
+    route = fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1)
+
+    for _ in range(2):
+        with raises(ForbiddenError):
+            await http_client.request(route, None, bucket_priority=1)
+    assert tracker.count == 2
+    assert tracker.acquires == 0, "Requests that are not delayed should not wait on the tracker"
+
+    with raises(InvalidRequestBudgetError):
+        await http_client.request(route, None, bucket_priority=1)
+    with raises(ForbiddenError):
+        await http_client.request(route, None)  # High priority requests are still done
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_deadline(fake_discord: FakeDiscord) -> None:
+    received = 0
+
+    async def handle(request: web.Request) -> web.Response:
+        nonlocal received
+        received += 1
+        return web.json_response({}, headers=rate_limit_headers(1, 0, 1, "deadline"))
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    http_client = HTTPClient()
+    await http_client.setup()
+    loop = asyncio.get_running_loop()
+    route = fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1)
+
+    response = await http_client.request(route, None, deadline=loop.time() + 0.5)
+    response.release()
+
+    # The bucket resets in a second
+    with raises(DeadlineExceededError) as error:
+        await http_client.request(route, None, deadline=loop.time() + 0.5)
+    assert error.value.estimated_admission is not None
+
+    # The reset is not known until the request in progress is done, so this has to wait in the queue
+    storage = await http_client._get_rate_limit_storage(None)  # pyright: ignore [reportPrivateUsage]
+    other_route = fake_discord.Route("GET", "/channels/{channel_id}", channel_id=2)
+    bucket = http_client._get_bucket_nowait(other_route, storage)  # pyright: ignore [reportPrivateUsage]
+    async with bucket.acquire():
+        with raises(DeadlineExceededError) as error:
+            await http_client.request(other_route, None, deadline=loop.time() + 0.2)
+        assert error.value.estimated_admission is None, "The request was not dropped from the queue"
+        assert bucket.pending == 0
+
+        # Cancelling the request is not mistaken for the deadline passing
+        task = asyncio.create_task(http_client.request(other_route, None, deadline=loop.time() + 5))
+        await asyncio.sleep(0.05)
+        assert bucket.pending == 1
+        task.cancel()
+        with raises(asyncio.CancelledError):
+            await task
+        assert bucket.pending == 0
+    assert received == 1
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_global_rate_limiter_without_traffic_classes(fake_discord: FakeDiscord) -> None:
+    async def handle(request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    fake_discord.add_route("GET", "/channels/{channel_id}", handle)
+
+    class LegacyGlobalRateLimiter(UnlimitedGlobalRateLimiter):
+        __slots__ = ()
+
+        def acquire(  # type: ignore [override]
+            self, *, priority: int = 0, wait: bool = True
+        ) -> AsyncContextManager[None]:
+            return super().acquire(priority=priority, wait=wait)
+
+    http_client = HTTPClient()
+    await http_client.setup()
+    storage = await http_client._get_rate_limit_storage(None)  # pyright: ignore [reportPrivateUsage]
+    storage.global_rate_limiter = LegacyGlobalRateLimiter()
+
+    response = await http_client.request(fake_discord.Route("GET", "/channels/{channel_id}", channel_id=1), None)
+    response.release()
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_estimate_wait() -> None:
+    http_client = HTTPClient()
+    route = Route("GET", "/channels/{channel_id}", channel_id=1)
+
+    assert await http_client.estimate_wait(route, None) == 0, "A unused route had to wait"
+
+    storage = await http_client._get_rate_limit_storage(None)  # pyright: ignore [reportPrivateUsage]
+    bucket = Bucket(BucketMetadata(1))
+    await storage.store_bucket_by_nextcore_id(route.bucket, bucket)
+    async with bucket.acquire():
+        await bucket.update(0, 1)
+
+    assert await http_client.estimate_wait(route, None) == approx(1, abs=0.05)
+    assert bucket.pending == 0, "Estimating reserved a spot"
+
+    # Estimating does not count as using the bucket, so it can still be evicted
+    other_route = Route("GET", "/guilds/{guild_id}", guild_id=1)
+    await storage.store_bucket_by_nextcore_id(other_route.bucket, Bucket(BucketMetadata(1)))
+    await http_client.estimate_wait(route, None)
+    assert [nextcore_id for nextcore_id, _ in storage.iter_buckets()] == [route.bucket, other_route.bucket]
+
+    http_client.invalid_request_tracker.record(http_client.invalid_request_tracker.limit)
+    assert await http_client.estimate_wait(route, None) == float("inf")
+
+    await http_client.close()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from email.utils import formatdate
+
+from pytest import approx
+
+from nextcore.http import ClockEstimator
+
+
+def test_learns_offset() -> None:
+    clock_estimator = ClockEstimator()
+
+    # The Discord clock is 2 seconds ahead, and the response was created half way through the request
+    clock_estimator.observe(0.2, 1002.9, received_at=1001)
+
+    assert clock_estimator.offset == approx(2)
+    assert clock_estimator.round_trip_time == approx(0.2)
+    assert clock_estimator.samples == 1
+
+
+def test_smooths_samples() -> None:
+    clock_estimator = ClockEstimator(smoothing=0.5)
+
+    clock_estimator.observe(0, 1000, received_at=1000)
+    clock_estimator.observe(0, 1001, received_at=1000)
+
+    assert clock_estimator.offset == approx(0.5)
+
+
+def test_date_is_only_used_for_big_offsets() -> None:
+    clock_estimator = ClockEstimator()
+
+    clock_estimator.observe_date(0, formatdate(1000, usegmt=True), received_at=1000)
+    assert clock_estimator.offset == 0, "The Date header is not precise enough to correct small offsets"
+
+    clock_estimator.observe_date(0, formatdate(1010, usegmt=True), received_at=1000)
+    assert clock_estimator.offset == approx(10.5)
+
+    clock_estimator.observe(0, 1000, received_at=1000)
+    clock_estimator.observe_date(0, formatdate(1010, usegmt=True), received_at=1000)
+    assert clock_estimator.offset == 0, "The Date header was used after a precise sample"
+
+
+def test_safety_margin() -> None:
+    clock_estimator = ClockEstimator(max_safety_margin=0.15, safety_margin_decay=0.5)
+
+    clock_estimator.observe_rate_limited()
+    assert clock_estimator.safety_margin == approx(0.05)
+    clock_estimator.observe_rate_limited()
+    clock_estimator.observe_rate_limited()
+    assert clock_estimator.safety_margin == approx(0.15)
+
+    clock_estimator.observe(0, 1000, received_at=1000)
+    assert clock_estimator.safety_margin == approx(0.075)
+    assert clock_estimator.adjust_reset_after(1) == approx(1.075)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+
+from pytest import approx, mark, raises
+
+from nextcore.common.errors import RateLimitedError
+from nextcore.http import InvalidRequestBudgetError, InvalidRequestTracker
+
+
+def test_stages() -> None:
+    tracker = InvalidRequestTracker(10, throttle_at=0.5, reject_at=0.8, shed_at=1, max_throttle_delay=1)
+
+    tracker.record(4)
+    assert tracker.count == 4
+    assert tracker.remaining == 6
+    assert tracker.delay(1) == 0
+
+    tracker.record(2)
+    assert tracker.usage == 0.6
+    assert tracker.delay(1) == approx(1 / 3)
+    assert tracker.delay(0) == 0, "High priority requests were throttled"
+
+    tracker.record(2)
+    with raises(InvalidRequestBudgetError):
+        tracker.delay(1)
+    assert tracker.delay(0) == 0
+
+    tracker.record(2)
+    with raises(InvalidRequestBudgetError):
+        tracker.delay(0)
+
+
+@mark.asyncio
+async def test_window_slides() -> None:
+    tracker = InvalidRequestTracker(10, 0.3)
+    tracker.record(10)
+    with raises(InvalidRequestBudgetError):
+        await tracker.acquire()
+
+    await asyncio.sleep(0.35)
+
+    assert tracker.count == 0
+    await tracker.acquire()
+
+
+@mark.asyncio
+async def test_retry_after() -> None:
+    tracker = InvalidRequestTracker(10, 0.3, reject_at=0.5, shed_at=1)
+    assert tracker.retry_after() == 0
+
+    tracker.record(5)
+    assert tracker.retry_after(0) == 0
+    assert tracker.retry_after(1) > 0
+
+    tracker.record(5)
+    retry_after = tracker.retry_after(0)
+    assert 0 < retry_after <= 0.3 + 0.3 / 60
+
+    await asyncio.sleep(retry_after + 0.01)
+    tracker.delay(1)
+
+
+@mark.asyncio
+async def test_acquire_without_waiting() -> None:
+    tracker = InvalidRequestTracker(10, max_throttle_delay=0.1)
+    tracker.record(6)
+
+    with raises(RateLimitedError):
+        await tracker.acquire(priority=1, wait=False)
+    await tracker.acquire(priority=1)
@@ -1,5 +1,14 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from pytest import mark, raises
+
 from nextcore.http.route import Route
 
+if TYPE_CHECKING:
+    from typing_extensions import LiteralString
+
 
 def test_same_no_changes():
     r1 = Route("GET", "/example")
@@ -20,3 +29,61 @@ def test_major_params():
     r2 = Route("GET", "/example/{guild_id}", guild_id=4)
 
     assert r1.bucket != r2.bucket, "Ignored major params"
+
+
+def test_template_matches_route():
+    template = Route.compile("GET", "/channels/{channel_id}/messages/{message_id}")
+    compiled = template(channel_id=1, message_id=2)
+    route = Route("GET", "/channels/{channel_id}/messages/{message_id}", channel_id="1", message_id=3)
+
+    assert compiled.bucket == route.bucket, "Template and route did not share a bucket"
+    assert compiled.path == "/channels/1/messages/2"
+    assert compiled.url == Route.BASE_URL + compiled.path
+    assert compiled.route == route.route
+    assert template.major_parameters == {"channel_id"}
+
+
+def test_template_major_params():
+    template = Route.compile("GET", "/guilds/{guild_id}")
+
+    assert template(guild_id=4).bucket != template(guild_id=5).bucket, "Ignored major params"
+
+
+def test_template_missing_param():
+    template = Route.compile("GET", "/guilds/{guild_id}")
+
+    with raises(KeyError):
+        template()
+
+
+def test_template_uses_route_subclass():
+    class LocalRoute(Route):
+        __slots__ = ()
+
+        BASE_URL = "http://127.0.0.1"
+
+    route = LocalRoute.compile("GET", "/users/@me", ignore_global=True)()
+
+    assert isinstance(route, LocalRoute)
+    assert route.url == "http://127.0.0.1/users/@me"
+    assert route.ignore_global
+
+
+def test_template_ignores_major_params_outside_path():
+    template = Route.compile("GET", "/channels/{channel_id}")
+
+    assert template(channel_id=1, guild_id=4).bucket == template(channel_id=1, guild_id=5).bucket
+
+
+@mark.parametrize(
+    ("path", "parameters"),
+    [
+        ("/users/@me", {}),
+        ("/channels/{channel_id}", {"channel_id": 1}),
+        ("/channels/{channel_id}", {"channel_id": 1, "guild_id": 2}),
+        ("/guilds/{guild_id}/members/{user_id}", {"guild_id": 1, "user_id": 2}),
+        ("/webhooks/{webhook_id}/{webhook_token}", {"webhook_id": 1, "webhook_token": "token"}),
+    ],
+)
+def test_template_and_route_bucket_keys_are_equal(path: LiteralString, parameters: dict[str, Any]) -> None:
+    assert Route.compile("GET", path)(**parameters).bucket == Route("GET", path, **parameters).bucket
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from aiohttp import ClientSession
+from pytest import mark
+
+from nextcore.common import TimesPer
+from nextcore.gateway import Shard
+from nextcore.http import BucketMetadata, HTTPClient, Route
+from nextcore.metrics import MetricsExporter
+
+
+@mark.asyncio
+async def test_render() -> None:
+    http_client = HTTPClient()
+    http_client.rate_limited_responses["shared"] += 2
+    storage = http_client.rate_limit_storages[None]
+
+    route = Route("GET", "/channels/{channel_id}", channel_id=1)
+    bucket = storage.create_bucket_nowait(route.bucket, BucketMetadata(limit=5))
+    storage.store_bucket_by_nextcore_id_nowait(route.bucket, bucket)
+    await bucket.update(3, 10)
+    # Clean buckets are not exported
+    clean_route = Route("GET", "/guilds/{guild_id}", guild_id=2)
+    storage.store_bucket_by_nextcore_id_nowait(
+        clean_route.bucket, storage.create_bucket_nowait(clean_route.bucket, BucketMetadata())
+    )
+
+    shard = Shard(0, 1, 0, "token", TimesPer(1, 5), http_client)
+    shard.reconnects = 3
+
+    exporter = MetricsExporter(http_clients=[http_client], shards=[shard])
+    metrics = exporter.render()
+
+    assert "# TYPE nextcore_bucket_remaining gauge" in metrics
+    assert 'nextcore_bucket_remaining{rate_limit_key="null",route="GET/channels/{channel_id}"} 3.0' in metrics
+    assert "channel_id=" not in metrics, "Major parameters should only be exported when opted in"
+    assert "/guilds/" not in metrics
+    assert 'nextcore_rate_limited_responses_total{scope="shared"} 2.0' in metrics
+    assert 'nextcore_global_remaining{rate_limit_key="null"} 50.0' in metrics
+    assert 'nextcore_shard_reconnects_total{shard_id="0",state="active"} 3.0' in metrics
+    assert metrics.count("# TYPE nextcore_speculative_requests_total counter") == 1
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_buckets_are_combined_by_route() -> None:
+    http_client = HTTPClient()
+    storage = http_client.rate_limit_storages[None]
+
+    for channel_id, remaining in ((1, 3), (2, 1)):
+        route = Route("GET", "/channels/{channel_id}", channel_id=channel_id)
+        bucket = storage.create_bucket_nowait(route.bucket, BucketMetadata(limit=5))
+        storage.store_bucket_by_nextcore_id_nowait(route.bucket, bucket)
+        await bucket.update(remaining, 10)
+
+    metrics = MetricsExporter(http_clients=[http_client]).render()
+    assert 'nextcore_buckets{rate_limit_key="null",route="GET/channels/{channel_id}"} 2.0' in metrics
+    assert 'nextcore_bucket_remaining{rate_limit_key="null",route="GET/channels/{channel_id}"} 1.0' in metrics
+
+    metrics = MetricsExporter(http_clients=[http_client], major_parameter_labels=True).render()
+    assert 'nextcore_bucket_remaining{rate_limit_key="null",route="GET/channels/{channel_id}",channel_id="1"} 3.0' in (
+        metrics
+    )
+    assert 'nextcore_bucket_remaining{rate_limit_key="null",route="GET/channels/{channel_id}",channel_id="2"} 1.0' in (
+        metrics
+    )
+
+    await http_client.close()
+
+
+@mark.asyncio
+async def test_metrics_endpoint() -> None:
+    exporter = MetricsExporter(http_clients=[HTTPClient()])
+    await exporter.start(port=0)
+    port = exporter._runner.addresses[0][1]  # type: ignore
+
+    async with ClientSession() as session:
+        async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.status == 200
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "nextcore_speculative_requests_total" in await response.text()
+
+    await exporter.close()
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from asyncio import TimeoutError, wait_for
+from functools import wraps
 from time import time
 from typing import TYPE_CHECKING
 
+from aiohttp import web
+
+from nextcore.http import Route
+
 if TYPE_CHECKING:
-    from typing import Any, Callable
+    from typing import Any, Awaitable, Callable
 
     from typing_extensions import ParamSpec
 
@@ -16,6 +21,7 @@ def match_time(estimated: float, max_offset: float):
     """Errror if the estimated time is off"""
 
     def outer(func: Callable[P, Any]):
+        @wraps(func)
         async def inner(*args: P.args, **kwargs: P.kwargs) -> None:
             start = time()
             try:
@@ -36,3 +42,56 @@ def match_time(estimated: float, max_offset: float):
         return inner
 
     return outer
+
+
+class FakeDiscord:
+    """A local server for :class:`~nextcore.http.HTTPClient` to send requests to.
+
+    Handlers can be added while it is running. Use :attr:`FakeDiscord.Route` to create routes that are sent to it.
+    """
+
+    def __init__(self) -> None:
+        self._router: web.UrlDispatcher = web.UrlDispatcher()
+        self._runner: web.AppRunner | None = None
+        self.base_url: str = ""
+        self.Route: type[Route] = Route
+
+    def add_route(self, method: str, path: str, handler: Callable[[web.Request], Awaitable[web.StreamResponse]]) -> None:
+        self._router.add_route(method, path, handler)
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        match_info = await self._router.resolve(request)
+        return await match_info.handler(request)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore
+        self.base_url = f"http://127.0.0.1:{port}"
+
+        class LocalRoute(Route):
+            __slots__ = ()
+
+            BASE_URL = self.base_url
+
+        self.Route = LocalRoute
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def rate_limit_headers(limit: int, remaining: int, reset_after: float, bucket_hash: str) -> dict[str, str]:
+    """The headers Discord sends with a bucket rate limit"""
+    return {
+        "Via": "1.1 google",
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(time() + reset_after),
+        "X-RateLimit-Reset-After": str(reset_after),
+        "X-RateLimit-Bucket": bucket_hash,
+    }